@@ -0,0 +1,34 @@
+"""
+CLI Atribuciones
+"""
+
+import click
+
+from orion.app import create_app
+from orion.blueprints.atribuciones.models import ATRIBUCIONES_TEXTO
+from orion.blueprints.atribuciones_ct.models import ATRIBUCIONES_CT_TEXTO
+from orion.extensions import database
+
+app = create_app()
+app.app_context().push()
+database.app = app
+
+
+@click.group()
+def cli():
+    """Atribuciones"""
+
+
+@click.command()
+def crear_texto_completo():
+    """Agregar la columna tsvector y su índice GIN a atribuciones y atribuciones_ct, sólo en PostgreSQL"""
+    if database.engine.dialect.name != "postgresql":
+        click.echo("No es PostgreSQL, la búsqueda de texto completo usa el índice BM25 en memoria.")
+        return
+    for busqueda in (ATRIBUCIONES_TEXTO, ATRIBUCIONES_CT_TEXTO):
+        busqueda.create()
+        click.echo(f"Columna {busqueda.columna} e índice listos en {busqueda.tabla}.")
+    click.echo(click.style("Termina crear texto completo.", fg="green"))
+
+
+cli.add_command(crear_texto_completo)
@@ -0,0 +1,65 @@
+"""
+CLI Auditoría
+"""
+
+import time
+
+import click
+
+from lib.auditoria import AUDITORIA_ESPERA, AUDITORIA_FALLIDOS_KEY, AUDITORIA_KEY, flush, requeue_fallidos
+from orion.app import create_app
+from orion.extensions import database
+
+app = create_app()
+app.app_context().push()
+database.app = app
+
+
+@click.group()
+def cli():
+    """Auditoría"""
+
+
+@click.command()
+def mostrar():
+    """Mostrar la cantidad de registros pendientes y fallidos"""
+    click.echo(f"Pendientes: {app.redis.llen(AUDITORIA_KEY)}")
+    click.echo(f"Fallidos:   {app.redis.llen(AUDITORIA_FALLIDOS_KEY)}")
+
+
+@click.command()
+def vaciar():
+    """Insertar los registros pendientes en la base de datos"""
+    cantidad = flush()
+    click.echo(f"Se insertaron {cantidad} registros de auditoría.")
+
+
+@click.command()
+def reintentar():
+    """Regresar los registros fallidos a la cola e insertarlos"""
+    cantidad = requeue_fallidos()
+    click.echo(f"Se regresaron {cantidad} registros fallidos a la cola.")
+    cantidad = flush()
+    click.echo(f"Se insertaron {cantidad} registros de auditoría.")
+
+
+@click.command()
+@click.option("--segundos", default=AUDITORIA_ESPERA, help="Segundos de espera entre cada vaciado")
+def vigilar(segundos):
+    """Vaciar continuamente, como alternativa al worker de RQ"""
+    click.echo(f"Vaciando la auditoría cada {segundos} segundos. Presione Ctrl+C para terminar.")
+    while True:
+        try:
+            cantidad = flush()
+        except Exception as error:  # El lote que falló ya está en los fallidos, se recupera con reintentar
+            click.echo(click.style(f"Error al vaciar: {error}", fg="red"))
+            cantidad = 0
+        if cantidad > 0:
+            click.echo(f"Se insertaron {cantidad} registros de auditoría.")
+        time.sleep(segundos)
+
+
+cli.add_command(mostrar)
+cli.add_command(reintentar)
+cli.add_command(vaciar)
+cli.add_command(vigilar)
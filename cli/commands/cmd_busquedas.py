@@ -0,0 +1,53 @@
+"""
+CLI Búsquedas
+"""
+
+import click
+from sqlalchemy import delete, insert
+
+from orion.app import create_app
+from orion.blueprints.busquedas.indice import FUENTES, formar_renglon
+from orion.blueprints.busquedas.models import Busqueda
+from orion.extensions import database
+
+app = create_app()
+app.app_context().push()
+database.app = app
+
+LOTE = 1000
+
+
+@click.group()
+def cli():
+    """Búsquedas"""
+
+
+@click.command()
+@click.option("--modulo", default="", type=str, help="Sólo este módulo, por ejemplo PERSONAS")
+def reindexar(modulo):
+    """Crear la tabla busquedas si falta y llenarla con los registros de los módulos"""
+    if modulo != "" and modulo not in FUENTES:
+        click.echo(click.style(f"El módulo {modulo} no está en el buscador, use uno de {', '.join(FUENTES)}", fg="red"))
+        return
+    Busqueda.__table__.create(database.engine, checkfirst=True)
+    for fuente in FUENTES.values():
+        if modulo != "" and fuente.modulo != modulo:
+            continue
+        database.session.execute(delete(Busqueda).where(Busqueda.modulo == fuente.modulo))
+        contador = 0
+        renglones = []
+        for registro in fuente.model.query.order_by(fuente.model.id).yield_per(LOTE):
+            renglones.append(formar_renglon(fuente, registro))
+            if len(renglones) == LOTE:
+                database.session.execute(insert(Busqueda), renglones)
+                contador += len(renglones)
+                renglones = []
+        if len(renglones) > 0:
+            database.session.execute(insert(Busqueda), renglones)
+            contador += len(renglones)
+        database.session.commit()
+        click.echo(f"{fuente.modulo}: {contador} registros.")
+    click.echo(click.style("Termina reindexar.", fg="green"))
+
+
+cli.add_command(reindexar)
@@ -0,0 +1,71 @@
+"""
+CLI Cambios
+"""
+
+import sys
+
+import click
+from redis.exceptions import RedisError
+
+from lib.cambios import CAMBIOS_STREAM, create_cambios_group, get_cambios_models, replay_cambios
+from orion.app import create_app
+from orion.extensions import database
+
+app = create_app()
+app.app_context().push()
+database.app = app
+
+
+@click.group()
+def cli():
+    """Cambios"""
+
+
+@click.command()
+@click.option("--desde", required=True, type=click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%d %H:%M:%S"]), help="AAAA-MM-DD")
+@click.option("--tabla", multiple=True, help="Sólo esta tabla, se puede repetir")
+def reponer(desde, tabla):
+    """Volver a emitir al stream los registros con modificado desde la fecha"""
+    tablas = [modelo.__tablename__ for modelo in get_cambios_models()]
+    for nombre in tabla:
+        if nombre not in tablas:
+            click.echo(click.style(f"La tabla {nombre} no tiene UniversalMixin", fg="red"))
+            sys.exit(1)
+    total = 0
+    for nombre, cantidad in replay_cambios(desde, list(tabla)):
+        total += cantidad
+        click.echo(f"{nombre}: {cantidad} eventos.")
+    click.echo(click.style(f"Termina reponer con {total} eventos.", fg="green"))
+
+
+@click.command()
+@click.argument("grupo", type=str)
+@click.option("--desde", default="$", type=str, help="$ para sólo los nuevos, 0 para todos los del stream")
+def crear_grupo(grupo, desde):
+    """Crear un grupo de consumidores del stream"""
+    if create_cambios_group(grupo, desde):
+        click.echo(click.style(f"Grupo {grupo} creado.", fg="green"))
+    else:
+        click.echo(f"El grupo {grupo} ya existía.")
+
+
+@click.command()
+def grupos():
+    """Mostrar el largo del stream y los pendientes de cada grupo"""
+    try:
+        largo = app.redis.xlen(CAMBIOS_STREAM)
+        informes = app.redis.xinfo_groups(CAMBIOS_STREAM) if largo > 0 else []
+    except RedisError as error:
+        click.echo(click.style(str(error), fg="red"))
+        sys.exit(1)
+    click.echo(f"{CAMBIOS_STREAM}: {largo} eventos.")
+    for informe in informes:
+        nombre = informe["name"].decode("utf-8") if isinstance(informe["name"], bytes) else informe["name"]
+        atraso = informe.get("lag")
+        click.echo(f"{nombre}: {informe['consumers']} consumidores, {informe['pending']} pendientes, atraso {atraso}")
+    click.echo(click.style(f"Termina grupos con {len(informes)} grupos.", fg="green"))
+
+
+cli.add_command(reponer)
+cli.add_command(crear_grupo)
+cli.add_command(grupos)
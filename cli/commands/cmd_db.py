@@ -2,11 +2,14 @@
 CLI Base de Datos
 """
 
+import json
 import os
 import sys
 
 import click
 from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 
 from cli.commands.alimentar_modulos import alimentar_modulos
 from cli.commands.alimentar_permisos import alimentar_permisos
@@ -16,7 +19,14 @@ from cli.commands.alimentar_usuarios_roles import alimentar_usuarios_roles
 from cli.commands.respaldar_modulos import respaldar_modulos
 from cli.commands.respaldar_roles_permisos import respaldar_roles_permisos
 from cli.commands.respaldar_usuarios_roles import respaldar_usuarios_roles
+from lib.datatables import get_response_metrics, reset_response_metrics
+from lib.exceptions import MyAnyError
+from lib.explicar import explicar_listados
+from lib.indices import create_indexes
+from lib.unit_of_work import unit_of_work
 from orion.app import create_app
+from orion.blueprints.personas.models import Persona
+from orion.blueprints.usuarios.models import Usuario
 from orion.extensions import database
 
 app = create_app()
@@ -50,11 +60,12 @@ def alimentar():
     if entorno_implementacion == "PRODUCTION":
         click.echo("PROHIBIDO: No se alimenta porque este es el servidor de producción.")
         sys.exit(1)
-    alimentar_modulos()
-    alimentar_roles()
-    alimentar_permisos()
-    alimentar_usuarios()
-    alimentar_usuarios_roles()
+    with unit_of_work():
+        alimentar_modulos()
+        alimentar_roles()
+        alimentar_permisos()
+        alimentar_usuarios()
+        alimentar_usuarios_roles()
     click.echo("Termina alimentar.")
 
 
@@ -75,7 +86,97 @@ def respaldar():
     click.echo("Termina respaldar.")
 
 
+@click.command()
+@click.option("--tabla", multiple=True, help="Sólo esta tabla, se puede repetir")
+def indices(tabla):
+    """Crear los índices que falten y verificar que estén todos"""
+    faltantes = 0
+    for nombre_tabla, indice, estado in create_indexes(list(tabla)):
+        if estado in ("EXISTE", "CREADO"):
+            click.echo(f"{nombre_tabla}: {indice} {estado}")
+        else:
+            faltantes += 1
+            click.echo(click.style(f"{nombre_tabla}: {indice} {estado}", fg="red"))
+    if faltantes > 0:
+        click.echo(click.style(f"Faltan {faltantes} índices.", fg="red"))
+        sys.exit(1)
+    click.echo(click.style("Termina indices, están todos.", fg="green"))
+
+
+@click.command()
+@click.option("--email", required=True, type=str, help="E-mail del usuario con el que se consultan los listados")
+@click.option("--endpoint", multiple=True, help="Sólo este endpoint, por ejemplo licencias.datatable_json")
+@click.option("--salida", default="", type=str, help="Guardar el reporte JSON en este archivo")
+def explicar(email, endpoint, salida):
+    """Explicar las consultas de los listados y señalar recorridos secuenciales, ordenamientos en disco y ciclos anidados"""
+    usuario = Usuario.query.filter_by(email=email).filter_by(estatus="A").first()
+    if usuario is None:
+        click.echo(click.style(f"No existe el usuario {email}", fg="red"))
+        sys.exit(1)
+    try:
+        reporte = explicar_listados(app, usuario.id, list(endpoint))
+    except MyAnyError as error:
+        click.echo(click.style(str(error), fg="red"))
+        sys.exit(1)
+    hallazgos = 0
+    for resultado in reporte["endpoints"]:
+        for sentencia in resultado["sentencias"]:
+            for hallazgo in sentencia["hallazgos"]:
+                hallazgos += 1
+                filtros = json.dumps(resultado["filtros"])
+                click.echo(f"{resultado['endpoint']} {filtros}: {hallazgo['tipo']} {hallazgo['detalle']}")
+                if hallazgo["sugerencia"]:
+                    click.echo(click.style(f"  {hallazgo['sugerencia']}", fg="yellow"))
+    if salida != "":
+        with open(salida, "w", encoding="utf-8") as archivo:
+            json.dump(reporte, archivo, ensure_ascii=False, indent=2, sort_keys=True)
+        click.echo(f"Reporte guardado en {salida}")
+    click.echo(click.style(f"Termina explicar con {hallazgos} hallazgos.", fg="green"))
+
+
+@click.command()
+def indices_unicos():
+    """Cambiar las restricciones únicas de personas y usuarios por los índices únicos parciales de los activos"""
+    anteriores = [
+        "ALTER TABLE personas DROP CONSTRAINT IF EXISTS personas_numero_empleado_key",
+        "ALTER TABLE personas DROP CONSTRAINT IF EXISTS personas_curp_key",
+        "DROP INDEX IF EXISTS ix_usuarios_email",
+    ]
+    for sentencia in anteriores:
+        database.session.execute(text(sentencia))
+    database.session.commit()
+    for tabla in (Persona.__table__, Usuario.__table__):
+        for indice in tabla.indexes:
+            try:
+                indice.create(database.engine, checkfirst=True)
+            except IntegrityError as error:
+                click.echo(click.style(f"No se creó {indice.name}, hay valores repetidos: {error.orig}", fg="red"))
+                continue
+            click.echo(f"Índice {indice.name} listo.")
+    click.echo(click.style("Termina indices_unicos.", fg="green"))
+
+
+@click.command()
+@click.option("--reiniciar", is_flag=True, help="Poner los contadores en cero después de mostrarlos")
+def metricas_respuestas(reiniciar):
+    """Mostrar la tasa de aciertos de la caché de respuestas de los listados"""
+    metricas = get_response_metrics()
+    if metricas is None:
+        click.echo(click.style("Redis no está disponible.", fg="red"))
+        sys.exit(1)
+    for endpoint, metrica in metricas.items():
+        click.echo(f"{endpoint}: {metrica['aciertos']} aciertos, {metrica['fallos']} fallos, tasa {metrica['tasa']:.1%}")
+    if reiniciar:
+        reset_response_metrics()
+        click.echo("Contadores en cero.")
+    click.echo(click.style(f"Termina metricas_respuestas con {len(metricas)} endpoints.", fg="green"))
+
+
 cli.add_command(inicializar)
 cli.add_command(alimentar)
 cli.add_command(reiniciar)
 cli.add_command(respaldar)
+cli.add_command(indices)
+cli.add_command(explicar)
+cli.add_command(indices_unicos)
+cli.add_command(metricas_respuestas)
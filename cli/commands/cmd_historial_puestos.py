@@ -0,0 +1,62 @@
+"""
+CLI Historial de Puestos
+"""
+
+import click
+from sqlalchemy import delete, insert
+
+from orion.app import create_app
+from orion.blueprints.historial_puestos.models import HistorialPuesto, PuestoVigente, formar_puestos_vigentes
+from orion.extensions import database
+
+app = create_app()
+app.app_context().push()
+database.app = app
+
+LOTE = 1000
+
+
+@click.group()
+def cli():
+    """Historial de Puestos"""
+
+
+@click.command()
+def reconstruir_vigentes():
+    """Crear la tabla puestos_vigentes si falta y llenarla con el historial de puestos activo"""
+    PuestoVigente.__table__.create(database.engine, checkfirst=True)
+    database.session.execute(delete(PuestoVigente))
+    consulta = (
+        database.session.query(
+            HistorialPuesto.persona_id,
+            HistorialPuesto.id,
+            HistorialPuesto.puesto_funcion_id,
+            HistorialPuesto.fecha_inicio,
+        )
+        .filter(HistorialPuesto.estatus == "A")
+        .order_by(HistorialPuesto.persona_id, HistorialPuesto.fecha_inicio, HistorialPuesto.id)
+    )
+    contador = 0
+    intervalos = []
+    persona_id = None
+    renglones = []
+    for renglon in consulta.yield_per(LOTE):
+        if renglon.persona_id != persona_id and len(renglones) > 0:
+            intervalos.extend(formar_puestos_vigentes(persona_id, renglones))
+            renglones = []
+        persona_id = renglon.persona_id
+        renglones.append((renglon.id, renglon.puesto_funcion_id, renglon.fecha_inicio))
+        if len(intervalos) >= LOTE:
+            database.session.execute(insert(PuestoVigente), intervalos)
+            contador += len(intervalos)
+            intervalos = []
+    if len(renglones) > 0:
+        intervalos.extend(formar_puestos_vigentes(persona_id, renglones))
+    if len(intervalos) > 0:
+        database.session.execute(insert(PuestoVigente), intervalos)
+        contador += len(intervalos)
+    database.session.commit()
+    click.echo(click.style(f"Termina reconstruir_vigentes con {contador} intervalos.", fg="green"))
+
+
+cli.add_command(reconstruir_vigentes)
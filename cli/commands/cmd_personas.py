@@ -0,0 +1,95 @@
+"""
+CLI Personas
+"""
+
+import click
+from sqlalchemy import inspect, or_, text, update
+
+from orion.app import create_app
+from orion.blueprints.personas.models import Persona
+from orion.blueprints.personas.tasks import buscar_duplicados, detectar_duplicados, elaborar_xlsx
+from orion.extensions import database
+
+app = create_app()
+app.app_context().push()
+database.app = app
+
+LOTE = 1000
+
+
+@click.group()
+def cli():
+    """Personas"""
+
+
+@click.command()
+@click.option("--todos", is_flag=True, help="Recalcular todas, no sólo las que no tienen nombre_busqueda o nombre_fonetico")
+def actualizar_busqueda(todos):
+    """Crear las columnas y los índices de nombre_busqueda y nombre_fonetico si faltan y llenarlas"""
+    # Crear las columnas, la extensión y los índices si faltan
+    columnas = [columna["name"] for columna in inspect(database.engine).get_columns(Persona.__tablename__)]
+    for columna in ("nombre_busqueda", "nombre_fonetico"):
+        if columna not in columnas:
+            database.session.execute(text(f"ALTER TABLE personas ADD COLUMN {columna} VARCHAR(400)"))
+            click.echo(f"Se agregó la columna {columna}.")
+    if database.engine.dialect.name == "postgresql":
+        database.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    database.session.commit()
+    for indice in Persona.__table__.indexes:
+        indice.create(database.engine, checkfirst=True)
+    # Consultar las personas a actualizar, sin modificar la columna modificado
+    consulta = database.session.query(
+        Persona.id,
+        Persona.nombres,
+        Persona.apellido_primero,
+        Persona.apellido_segundo,
+        Persona.modificado,
+    )
+    if not todos:
+        consulta = consulta.filter(or_(Persona.nombre_busqueda == None, Persona.nombre_fonetico == None))
+    contador = 0
+    renglones = []
+    for renglon in consulta.order_by(Persona.id).all():
+        renglones.append(
+            {
+                "id": renglon.id,
+                "nombre_busqueda": Persona.formar_nombre_busqueda(
+                    renglon.nombres, renglon.apellido_primero, renglon.apellido_segundo
+                ),
+                "nombre_fonetico": Persona.formar_nombre_fonetico(
+                    renglon.nombres, renglon.apellido_primero, renglon.apellido_segundo
+                ),
+                "modificado": renglon.modificado,
+            }
+        )
+        if len(renglones) == LOTE:
+            database.session.execute(update(Persona), renglones)
+            database.session.commit()
+            contador += len(renglones)
+            renglones = []
+            click.echo(click.style(".", fg="green"), nl=False)
+    if len(renglones) > 0:
+        database.session.execute(update(Persona), renglones)
+        database.session.commit()
+        contador += len(renglones)
+    click.echo()
+    click.echo(click.style(f"Se actualizaron {contador} nombres de búsqueda y fonéticos.", fg="green"))
+
+
+@click.command()
+@click.option("--archivo", default="", type=str, help="Guardar el reporte XLSX en este archivo en lugar de subirlo a GCS")
+def detectar_duplicados_cmd(archivo):
+    """Detectar personas duplicadas por bloques y elaborar el reporte XLSX"""
+    if archivo == "":
+        mensaje, _, url = detectar_duplicados()
+        click.echo(click.style(mensaje, fg="green"))
+        click.echo(f"Reporte en {url}")
+        return
+    parejas = buscar_duplicados()
+    with open(archivo, "wb") as salida:
+        salida.write(elaborar_xlsx(parejas))
+    click.echo(click.style(f"Se encontraron {len(parejas)} posibles personas duplicadas, reporte en {archivo}", fg="green"))
+
+
+cli.add_command(actualizar_busqueda)
+cli.add_command(detectar_duplicados_cmd, name="detectar_duplicados")
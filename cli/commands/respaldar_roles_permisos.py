@@ -7,6 +7,7 @@ import sys
 from pathlib import Path
 
 import click
+from sqlalchemy.orm import selectinload
 
 from orion.blueprints.modulos.models import Modulo
 from orion.blueprints.roles.models import Rol
@@ -30,7 +31,7 @@ def respaldar_roles_permisos():
         encabezados.append("estatus")
         respaldo = csv.writer(puntero)
         respaldo.writerow(encabezados)
-        for rol in Rol.query.order_by(Rol.id).all():
+        for rol in Rol.query.options(selectinload(Rol.permisos)).order_by(Rol.id).all():
             renglon = [rol.id, rol.nombre]
             for modulo in modulos:
                 permiso_str = ""
@@ -7,8 +7,10 @@ import sys
 from pathlib import Path
 
 import click
+from sqlalchemy.orm import selectinload
 
 from orion.blueprints.usuarios.models import Usuario
+from orion.blueprints.usuarios_roles.models import UsuarioRol
 
 USUARIOS_ROLES_CSV = "seed/usuarios_roles.csv"
 
@@ -36,7 +38,8 @@ def respaldar_usuarios_roles():
                 "estatus",
             ]
         )
-        for usuario in Usuario.query.order_by(Usuario.id).all():
+        consulta = Usuario.query.options(selectinload(Usuario.usuarios_roles).joinedload(UsuarioRol.rol))
+        for usuario in consulta.order_by(Usuario.id).all():
             roles_list = []
             for usuario_rol in usuario.usuarios_roles:
                 if usuario_rol.estatus == "A":
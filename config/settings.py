@@ -22,6 +22,12 @@ Para desarrollo, debe crear un archivo .env con las variables de entorno:
 - SECRET_KEY
 - SQLALCHEMY_DATABASE_URI
 - TASK_QUEUE
+
+Opcionalmente, sin necesidad de secretos, puede cambiar con variables de entorno:
+
+- USER_LOADER: principal (por defecto) o orm para cargar el modelo Usuario en cada petición
+- SQL_STATEMENTS_LIMIT: 0 (por defecto) no vigila, en desarrollo use por ejemplo 10 para
+  provocar un error cuando un listado ejecute más sentencias SQL, señal de consultas N+1
 """
 
 import os
@@ -69,6 +75,8 @@ class Settings(BaseSettings):
     SECRET_KEY: str = get_secret("secret_key")
     SQLALCHEMY_DATABASE_URI: str = get_secret("sqlalchemy_database_uri")
     TASK_QUEUE: str = get_secret("task_queue")
+    USER_LOADER: str = os.getenv("USER_LOADER", "principal")
+    SQL_STATEMENTS_LIMIT: int = int(os.getenv("SQL_STATEMENTS_LIMIT", "0"))
 
     class Config:
         """Load configuration"""
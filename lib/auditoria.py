@@ -0,0 +1,123 @@
+"""
+Auditoría
+
+Las bitácoras y las entradas-salidas no se guardan durante la petición, se
+agregan a una lista en Redis y después se insertan por lotes con un INSERT
+de múltiples renglones.
+
+- Bitacora.save() y EntradaSalida.save() llaman a push_registro()
+- Si Redis no está disponible, se guardan en la base de datos como siempre
+- Dentro de una unidad de trabajo se agregan a la cola con on_commit(), así
+  lo que termina en rollback no queda en la auditoría
+- El primer registro de cada ventana programa una tarea RQ con enqueue_in,
+  por lo que el worker debe ejecutarse con --with-scheduler
+- También puede vaciar con la orden de la CLI: auditoria vaciar
+- Los lotes que no se pudieron insertar quedan en AUDITORIA_FALLIDOS_KEY, una vez
+  corregida la causa se regresan a la cola y se vacían con: auditoria reintentar
+- En las pruebas llame a flush() para insertar lo pendiente
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from flask import current_app
+from redis.exceptions import RedisError
+from sqlalchemy import insert
+
+from lib.table_versions import increment_table_version
+from lib.unit_of_work import is_unit_of_work, on_commit
+from orion.extensions import database
+
+AUDITORIA_KEY = "orion:auditoria"
+AUDITORIA_FALLIDOS_KEY = "orion:auditoria:fallidos"
+AUDITORIA_PROGRAMADO_KEY = "orion:auditoria:programado"
+AUDITORIA_LOTE = 500
+AUDITORIA_ESPERA = 5  # Segundos que se juntan registros antes de vaciar
+COLUMNAS_FECHAS = ("creado", "modificado")
+COLUMNAS_OMITIDAS = ("id",)
+
+
+def push_registro(registro) -> bool:
+    """Agregar el registro a la cola, entrega falso si debe guardarse en la base de datos"""
+    ahora = datetime.now()
+    valores = {}
+    for columna in registro.__table__.columns:
+        if columna.name in COLUMNAS_OMITIDAS:
+            continue
+        valor = getattr(registro, columna.key)
+        if columna.name in COLUMNAS_FECHAS:
+            valor = (valor if isinstance(valor, datetime) else ahora).isoformat()
+        elif columna.name == "estatus" and valor is None:
+            valor = "A"
+        elif valor is None and not columna.nullable:
+            return False  # Falta un valor, por ejemplo una relación sin id, mejor guardar en la base de datos
+        valores[columna.name] = valor
+    evento = json.dumps({"tabla": registro.__tablename__, "valores": valores})
+    if is_unit_of_work():
+        on_commit(lambda: push_evento(evento) or insert_lote([json.loads(evento)]))
+        return True
+    return push_evento(evento)
+
+
+def push_evento(evento: str) -> bool:
+    """Agregar el evento a la cola y programar el vaciado, entrega falso si Redis no está disponible"""
+    try:
+        current_app.redis.rpush(AUDITORIA_KEY, evento)
+        if current_app.redis.set(AUDITORIA_PROGRAMADO_KEY, 1, nx=True, ex=AUDITORIA_ESPERA):
+            current_app.task_queue.enqueue_in(
+                timedelta(seconds=AUDITORIA_ESPERA),
+                "orion.blueprints.bitacoras.tasks.vaciar_auditoria",
+            )
+    except RedisError:
+        return False
+    return True
+
+
+def pop_lote(limite: int = AUDITORIA_LOTE) -> list:
+    """Sacar de la cola un lote de eventos de forma atómica"""
+    with current_app.redis.pipeline(transaction=True) as pipeline:
+        pipeline.lrange(AUDITORIA_KEY, 0, limite - 1)
+        pipeline.ltrim(AUDITORIA_KEY, limite, -1)
+        guardados, _ = pipeline.execute()
+    return [json.loads(guardado) for guardado in guardados]
+
+
+def insert_lote(eventos: list) -> int:
+    """Insertar los eventos agrupados por tabla, un INSERT de múltiples renglones por tabla"""
+    por_tabla = {}
+    for evento in eventos:
+        valores = evento["valores"]
+        for columna in COLUMNAS_FECHAS:
+            if columna in valores:
+                valores[columna] = datetime.fromisoformat(valores[columna])
+        por_tabla.setdefault(evento["tabla"], []).append(valores)
+    for tabla, renglones in por_tabla.items():
+        database.session.execute(insert(database.metadata.tables[tabla]).values(renglones))
+    database.session.commit()
+    for tabla in por_tabla:
+        increment_table_version(tabla)
+    return len(eventos)
+
+
+def flush(limite: int = AUDITORIA_LOTE) -> int:
+    """Vaciar toda la cola en la base de datos, entrega la cantidad insertada"""
+    cantidad = 0
+    while True:
+        eventos = pop_lote(limite)
+        if len(eventos) == 0:
+            break
+        try:
+            cantidad += insert_lote(eventos)
+        except Exception:
+            database.session.rollback()
+            current_app.redis.rpush(AUDITORIA_FALLIDOS_KEY, *[json.dumps(evento, default=str) for evento in eventos])
+            raise
+    return cantidad
+
+
+def requeue_fallidos() -> int:
+    """Regresar a la cola los eventos fallidos, entrega la cantidad"""
+    cantidad = 0
+    while current_app.redis.lmove(AUDITORIA_FALLIDOS_KEY, AUDITORIA_KEY, "LEFT", "RIGHT") is not None:
+        cantidad += 1
+    return cantidad
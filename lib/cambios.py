@@ -0,0 +1,193 @@
+"""
+Cambios
+
+Flujo de eventos de cambio en un Redis Stream para que las cachés, los índices
+y la sincronización se actualicen por partes, sin consultar modificado.
+
+En el evento after_flush de la sesión se anota un evento por cada registro de
+un modelo con UniversalMixin que se insertó, modificó o eliminó; en
+after_commit se agregan todos a CAMBIOS_STREAM en un solo viaje, y en el
+rollback se descartan. Cada evento es compacto
+
+    {"tabla": "personas", "id": "123", "operacion": "U", "estatus": "B", "modificado": "2024-05-01T10:00:00"}
+
+- operacion es I (insert), U (update), D (delete de la base de datos) o R (repuesto)
+- El borrado lógico y la recuperación son U con su estatus
+- modificado es la hora del flush si la columna la fija la base de datos
+- Lo que se escribe con insert() o update() de Core, como la auditoría, no pasa
+  por la sesión y no emite eventos
+
+Para consumirlo con un grupo, cada consumidor recibe eventos distintos y
+confirma los que procesó; los que no confirme quedan pendientes
+
+    create_cambios_group("busquedas")
+    for evento_id, evento in read_cambios("busquedas", "worker-1"):
+        ...
+        ack_cambios("busquedas", evento_id)
+
+Si Redis no está disponible los eventos se pierden; para reponerlos desde la
+columna modificado use
+
+    orion cambios reponer --desde 2024-05-01
+"""
+
+from datetime import datetime
+
+from flask import current_app
+from redis.exceptions import RedisError, ResponseError
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from lib.universal_mixin import UniversalMixin
+from orion.extensions import database
+
+CAMBIOS_STREAM = "orion:cambios"
+CAMBIOS_MAXLEN = 100000  # Eventos que se conservan, aproximado
+CAMBIOS_LOTE = 500
+CAMBIOS_ESPERA = 5000  # Milisegundos que espera read_cambios si no hay eventos
+CAMBIOS_PENDIENTES_KEY = "cambios_pendientes"
+
+
+def formar_cambio(registro, operacion: str, ahora: datetime) -> dict:
+    """Evento de cambio del registro, sin consultar la base de datos"""
+    estado = inspect(registro)
+    modificado = estado.dict.get("modificado")
+    llave = estado.mapper.primary_key_from_instance(registro)  # En after_flush los nuevos aún no tienen identity
+    return {
+        "tabla": registro.__tablename__,
+        "id": str(llave[0]) if llave[0] is not None else "",
+        "operacion": operacion,
+        "estatus": estado.dict.get("estatus") or "A",
+        "modificado": (modificado if isinstance(modificado, datetime) else ahora).isoformat(),
+    }
+
+
+def anotar_cambios(session, flush_context) -> None:
+    """Anotar en la sesión los cambios del flush"""
+    ahora = datetime.now()
+    pendientes = session.info.setdefault(CAMBIOS_PENDIENTES_KEY, [])
+    for operacion, registros in (("I", session.new), ("U", session.dirty), ("D", session.deleted)):
+        for registro in registros:
+            if not isinstance(registro, UniversalMixin):
+                continue
+            if operacion == "U" and not session.is_modified(registro, include_collections=False):
+                continue
+            pendientes.append(formar_cambio(registro, operacion, ahora))
+
+
+def push_cambios(cambios: list) -> int:
+    """Agregar los eventos al stream en un solo viaje, entrega cuántos se agregaron"""
+    if len(cambios) == 0:
+        return 0
+    try:
+        with current_app.redis.pipeline(transaction=False) as tuberia:
+            for cambio in cambios:
+                tuberia.xadd(CAMBIOS_STREAM, cambio, maxlen=CAMBIOS_MAXLEN, approximate=True)
+            tuberia.execute()
+    except RedisError:
+        return 0
+    return len(cambios)
+
+
+def emitir_cambios(session) -> None:
+    """Después del commit, agregar al stream los cambios anotados"""
+    push_cambios(session.info.pop(CAMBIOS_PENDIENTES_KEY, []))
+
+
+def descartar_cambios(session) -> None:
+    """Después del rollback, descartar los cambios anotados"""
+    session.info.pop(CAMBIOS_PENDIENTES_KEY, None)
+
+
+def init_cambios(app) -> None:
+    """Registrar los eventos de la sesión, una sola vez"""
+    if not event.contains(Session, "after_flush", anotar_cambios):
+        event.listen(Session, "after_flush", anotar_cambios)
+        event.listen(Session, "after_commit", emitir_cambios)
+        event.listen(Session, "after_rollback", descartar_cambios)
+
+
+def create_cambios_group(grupo: str, desde: str = "$") -> bool:
+    """Crear el grupo de consumidores, desde "$" sólo recibe los nuevos y desde "0" todos; entrega falso si ya existía"""
+    try:
+        current_app.redis.xgroup_create(CAMBIOS_STREAM, grupo, id=desde, mkstream=True)
+    except ResponseError as error:
+        if "BUSYGROUP" in str(error):
+            return False
+        raise
+    return True
+
+
+def decode_cambio(valores: dict) -> dict:
+    """Convertir el evento leído de Redis en un diccionario de textos"""
+    return {
+        (llave.decode("utf-8") if isinstance(llave, bytes) else llave): (
+            valor.decode("utf-8") if isinstance(valor, bytes) else valor
+        )
+        for llave, valor in valores.items()
+    }
+
+
+def read_cambios(grupo: str, consumidor: str, cantidad: int = CAMBIOS_LOTE, espera: int = CAMBIOS_ESPERA) -> list:
+    """Leer los eventos nuevos para el consumidor del grupo, entrega [(evento_id, evento)]"""
+    respuesta = current_app.redis.xreadgroup(grupo, consumidor, {CAMBIOS_STREAM: ">"}, count=cantidad, block=espera)
+    eventos = []
+    for _, mensajes in respuesta or []:
+        for evento_id, valores in mensajes:
+            evento_id = evento_id.decode("ascii") if isinstance(evento_id, bytes) else evento_id
+            eventos.append((evento_id, decode_cambio(valores)))
+    return eventos
+
+
+def ack_cambios(grupo: str, *eventos_ids: str) -> int:
+    """Confirmar los eventos procesados, entrega cuántos se confirmaron"""
+    if len(eventos_ids) == 0:
+        return 0
+    return current_app.redis.xack(CAMBIOS_STREAM, grupo, *eventos_ids)
+
+
+def claim_cambios(grupo: str, consumidor: str, inactivo: int = 60000, cantidad: int = CAMBIOS_LOTE) -> list:
+    """Tomar los eventos pendientes de otros consumidores sin confirmar por más de inactivo milisegundos"""
+    respuesta = current_app.redis.xautoclaim(CAMBIOS_STREAM, grupo, consumidor, inactivo, start_id="0-0", count=cantidad)
+    eventos = []
+    for evento_id, valores in respuesta[1]:
+        if valores is None:
+            continue  # El stream ya lo recortó
+        evento_id = evento_id.decode("ascii") if isinstance(evento_id, bytes) else evento_id
+        eventos.append((evento_id, decode_cambio(valores)))
+    return eventos
+
+
+def get_cambios_models() -> list:
+    """Modelos con UniversalMixin, ordenados por su tabla"""
+    modelos = [mapper.class_ for mapper in database.Model.registry.mappers if issubclass(mapper.class_, UniversalMixin)]
+    return sorted(modelos, key=lambda modelo: modelo.__tablename__)
+
+
+def replay_cambios(desde: datetime, tablas: list = None):
+    """Volver a emitir como R los registros con modificado desde esa fecha; entrega (tabla, cantidad) de cada tabla"""
+    for modelo in get_cambios_models():
+        if tablas and modelo.__tablename__ not in tablas:
+            continue
+        consulta = (
+            database.session.query(modelo.id, modelo.estatus, modelo.modificado)
+            .filter(modelo.modificado >= desde)
+            .order_by(modelo.modificado, modelo.id)
+        )
+        cantidad = 0
+        lote = []
+        for renglon in consulta.yield_per(CAMBIOS_LOTE):
+            lote.append(
+                {
+                    "tabla": modelo.__tablename__,
+                    "id": str(renglon.id),
+                    "operacion": "R",
+                    "estatus": renglon.estatus,
+                    "modificado": renglon.modificado.isoformat(),
+                }
+            )
+            if len(lote) >= CAMBIOS_LOTE:
+                cantidad += push_cambios(lote)
+                lote = []
+        cantidad += push_cambios(lote)
+        yield modelo.__tablename__, cantidad
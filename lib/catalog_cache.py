@@ -0,0 +1,184 @@
+"""
+Catalog Cache
+
+Copia inmutable en la memoria de cada worker de los registros activos de un
+catálogo que cambia poco, como bancos, distritos o roles, para que los
+formularios y los Select2 no consulten la base de datos.
+
+    ROLES = CatalogCache(Rol, columns={"nombre": Rol.nombre}, order=[Rol.nombre])
+
+    self.rol.choices = ROLES.choices(lambda renglon: renglon.nombre)
+
+La copia es una tupla de namedtuple con id y las columnas, ordenada; se cambia
+completa, nunca se modifica, así puede leerse sin candado.
+
+Cada copia guarda la versión de su tabla (lib.table_versions). Cada proceso
+tiene un hilo suscrito al canal TABLA_CAMBIOS_CANAL de Redis; al recibir el
+nombre de una tabla de catálogo marca su copia para revisar la versión en la
+siguiente lectura. Mientras el hilo escucha, la versión se revisa a lo más cada
+CATALOGO_REVISION segundos; sin él, en cada lectura. Si Redis no está
+disponible se recarga de la base de datos cada CATALOGO_REVISION segundos.
+
+CatalogBundle junta varios catálogos en un JSON compacto con la huella de su
+contenido, para que el navegador los guarde y no los vuelva a pedir mientras
+la huella no cambie.
+"""
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+from threading import Lock, Thread
+from time import monotonic, sleep
+
+from flask import current_app
+from redis.exceptions import RedisError
+
+from lib.table_versions import TABLA_CAMBIOS_CANAL, get_table_version
+from orion.extensions import database
+
+CATALOGO_REVISION = 60  # Segundos entre revisiones de la versión
+CATALOGO_REINTENTO = 5  # Segundos antes de volver a suscribirse si se pierde la conexión
+
+CATALOGOS = {}  # tabla -> CatalogCache
+
+escucha = {"pid": None, "activa": False}
+escucha_candado = Lock()
+
+
+def vencer_catalogos() -> None:
+    """Marcar todas las copias para revisar su versión, por si se perdió algún mensaje"""
+    for catalogo in CATALOGOS.values():
+        catalogo.expire()
+
+
+def escuchar_cambios(redis) -> None:
+    """Hilo que marca la copia de un catálogo al recibir el nombre de su tabla"""
+    while True:
+        try:
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(TABLA_CAMBIOS_CANAL)
+            vencer_catalogos()
+            escucha["activa"] = True
+            for mensaje in pubsub.listen():
+                tabla = mensaje["data"]
+                if isinstance(tabla, bytes):
+                    tabla = tabla.decode("utf-8")
+                if tabla in CATALOGOS:
+                    CATALOGOS[tabla].expire()
+        except RedisError:
+            pass
+        escucha["activa"] = False
+        vencer_catalogos()
+        sleep(CATALOGO_REINTENTO)
+
+
+def iniciar_escucha() -> None:
+    """Iniciar el hilo una vez por proceso, después del fork de los workers de gunicorn"""
+    if escucha["pid"] == os.getpid():
+        return
+    with escucha_candado:
+        if escucha["pid"] == os.getpid():
+            return
+        escucha["pid"] = os.getpid()
+        escucha["activa"] = False
+        Thread(target=escuchar_cambios, args=(current_app.redis,), daemon=True, name="catalogos").start()
+
+
+class CatalogCache:
+    """Copia en memoria de los registros activos de un catálogo"""
+
+    def __init__(self, model, columns: dict, order: list):
+        self.model = model
+        self.columns = columns
+        self.order = order
+        self.Renglon = namedtuple(f"{model.__name__}Renglon", ["id", *columns])
+        self._renglones = None
+        self._por_id = {}
+        self._version = None
+        self._cargado = 0
+        self._revisar = 0  # Hasta este momento no hace falta revisar la versión
+        self._avisos = 0  # Mensajes recibidos, para no perder uno que llegue mientras se carga
+        self._candado = Lock()
+        CATALOGOS[model.__tablename__] = self
+
+    @property
+    def tabla(self) -> str:
+        """Nombre de la tabla"""
+        return self.model.__tablename__
+
+    def expire(self) -> None:
+        """Revisar la versión en la siguiente lectura"""
+        self._avisos += 1
+        self._revisar = 0
+
+    def _cargar(self, version) -> None:
+        """Leer los registros activos y cambiar la copia completa"""
+        consulta = database.session.query(self.model.id, *[columna.label(nombre) for nombre, columna in self.columns.items()])
+        consulta = consulta.filter(self.model.estatus == "A").order_by(*self.order)
+        renglones = tuple(self.Renglon(*renglon) for renglon in consulta.all())
+        self._por_id = {renglon.id: renglon for renglon in renglones}
+        self._renglones = renglones
+        self._version = version
+        self._cargado = monotonic()
+
+    def all(self) -> tuple:
+        """Entregar los renglones activos en orden"""
+        iniciar_escucha()
+        if self._renglones is not None and monotonic() < self._revisar:
+            return self._renglones
+        avisos = self._avisos
+        version = get_table_version(self.tabla)
+        with self._candado:
+            if version is None:
+                # Sin Redis, recargar de vez en cuando
+                if self._renglones is None or monotonic() - self._cargado > CATALOGO_REVISION:
+                    self._cargar(None)
+                return self._renglones
+            if self._renglones is None or version != self._version:
+                self._cargar(version)
+            if escucha["activa"] and avisos == self._avisos:
+                self._revisar = monotonic() + CATALOGO_REVISION
+            return self._renglones
+
+    def get(self, registro_id: int):
+        """Entregar el renglón activo con ese id, None si no existe"""
+        self.all()
+        return self._por_id.get(registro_id)
+
+    def choices(self, texto, **grupos) -> list:
+        """Opciones (id, texto) para un SelectField, opcionalmente filtradas por igualdad"""
+        return [
+            (renglon.id, texto(renglon))
+            for renglon in self.all()
+            if all(getattr(renglon, campo) == valor for campo, valor in grupos.items())
+        ]
+
+
+class CatalogBundle:
+    """Paquete JSON de varios catálogos con la huella de su contenido"""
+
+    def __init__(self, catalogs: dict):
+        self.catalogs = catalogs
+        self._paquete = None  # (copias, huella, contenido)
+        self._candado = Lock()
+
+    def get(self) -> tuple:
+        """Entregar (huella, contenido), sólo se vuelve a formar si cambió la copia de algún catálogo"""
+        copias = {nombre: catalogo.all() for nombre, catalogo in self.catalogs.items()}
+        paquete = self._paquete
+        if paquete is not None and all(copias[nombre] is paquete[0][nombre] for nombre in copias):
+            return paquete[1], paquete[2]
+        with self._candado:
+            catalogos = {
+                nombre: {
+                    "columnas": list(self.catalogs[nombre].Renglon._fields),
+                    "renglones": [list(renglon) for renglon in copia],
+                }
+                for nombre, copia in copias.items()
+            }
+            datos = json.dumps(catalogos, separators=(",", ":"), ensure_ascii=False, default=str)
+            huella = hashlib.sha1(datos.encode("utf-8")).hexdigest()[:16]
+            contenido = f'{{"huella":"{huella}","catalogos":{datos}}}'.encode("utf-8")
+            self._paquete = (copias, huella, contenido)
+        return huella, contenido
@@ -0,0 +1,196 @@
+"""
+DataTable Engine
+
+Una especificación declara las columnas a proyectar, los JOIN, los filtros,
+el orden y la forma de cada renglón. El motor la compila en una sola consulta
+que trae sólo esas columnas, sin cargar las entidades ni sus relaciones, así
+no hay una consulta más por cada renglón.
+
+    def area_renglon(renglon):
+        return {
+            "detalle": {"nombre": renglon.nombre, "url": url_for("areas.detail", area_id=renglon.id)},
+            "centro_trabajo": renglon.centro_trabajo_clave_nombre,
+        }
+
+    AREAS_DATATABLE = DataTableSpec(
+        model=Area,
+        columns={
+            "id": Area.id,
+            "nombre": Area.nombre,
+            "centro_trabajo_clave_nombre": CentroTrabajo.clave_nombre,
+        },
+        joins=[(CentroTrabajo, Area.centro_trabajo_id == CentroTrabajo.id)],
+        filters=[filter_contains("nombre", Area.nombre)],
+        order=[Area.nombre],
+        row=area_renglon,
+    )
+
+    @areas.route("/areas/datatable_json", methods=["GET", "POST"])
+    def datatable_json():
+        return AREAS_DATATABLE.output()
+
+- Los renglones son tuplas con nombre, se leen con renglon.nombre de la columna
+- El estatus se filtra siempre, por defecto "A"
+- Un filtro sólo se aplica si su campo viene en el formulario y no queda vacío,
+  si la función para limpiar provoca ValueError se ignora
+- Para paginar por cursor indique keyset, los nombres de esas columnas en columns
+  deben ser iguales a su nombre en el modelo, por ejemplo "id" para Bitacora.id
+- Para buscar en texto completo indique search con un FullTextSearch, con el campo
+  search_field en el formulario se agregan las columnas relevancia y fragmento
+- Con count CONTEO_ESTIMADO, si algún filtro del formulario o la búsqueda se
+  aplica el total se cuenta con CONTEO_CACHE
+- Para guardar la respuesta en Redis indique cache con los segundos, por ejemplo
+  RESPUESTA_TTL; la llave lleva la versión de las tablas de la consulta
+"""
+
+from collections import namedtuple
+
+from flask import request
+from sqlalchemy import and_, or_
+
+from lib.datatables import (
+    CONTEO_CACHE,
+    CONTEO_ESTIMADO,
+    CONTEO_VENTANA,
+    count_datatable,
+    get_datatable_parameters,
+    get_query_tables,
+    output_cached,
+    output_datatable_json,
+    paginate_keyset,
+    paginate_offset,
+)
+from lib.safe_string import safe_string
+from orion.extensions import database
+
+DataTableFilter = namedtuple("DataTableFilter", ["campo", "criterio", "limpiar"])
+
+
+def filter_equal(campo: str, columna, limpiar=None) -> DataTableFilter:
+    """Filtro por igualdad"""
+    return DataTableFilter(campo, lambda valor: columna == valor, limpiar)
+
+
+def filter_greater_equal(campo: str, columna, limpiar=None) -> DataTableFilter:
+    """Filtro mayor o igual, como una fecha desde"""
+    return DataTableFilter(campo, lambda valor: columna >= valor, limpiar)
+
+
+def filter_less_equal(campo: str, columna, limpiar=None) -> DataTableFilter:
+    """Filtro menor o igual, como una fecha hasta"""
+    return DataTableFilter(campo, lambda valor: columna <= valor, limpiar)
+
+
+def filter_contains(campo: str, *columnas, limpiar=safe_string) -> DataTableFilter:
+    """Filtro que contiene el texto en alguna de las columnas"""
+    return DataTableFilter(campo, lambda valor: or_(*[columna.contains(valor) for columna in columnas]), limpiar)
+
+
+def filter_words(campo: str, *columnas, limpiar=safe_string) -> DataTableFilter:
+    """Filtro donde cada palabra debe estar en alguna de las columnas, como el nombre completo"""
+    return DataTableFilter(
+        campo,
+        lambda valor: and_(*[or_(*[columna.contains(palabra) for columna in columnas]) for palabra in valor.split(" ")]),
+        limpiar,
+    )
+
+
+class DataTableSpec:
+    """Especificación de un DataTable"""
+
+    def __init__(
+        self,
+        model,
+        columns: dict,
+        row,
+        order: list = None,
+        joins: list = None,
+        outer_joins: list = None,
+        filters: list = None,
+        where: list = None,
+        keyset: list = None,
+        count: str = CONTEO_VENTANA,
+        search=None,
+        search_field: str = "texto",
+        cache: int = 0,
+    ):
+        self.model = model
+        self.columns = columns
+        self.row = row
+        self.order = order or []
+        self.joins = joins or []
+        self.outer_joins = outer_joins or []
+        self.filters = filters or []
+        self.where = where or []
+        self.keyset = keyset
+        self.count = count
+        self.search = search
+        self.search_field = search_field
+        self.cache = cache
+
+    def query(self):
+        """Compilar la consulta con las columnas proyectadas, los JOIN y los filtros del formulario"""
+        consulta = database.session.query(*[columna.label(nombre) for nombre, columna in self.columns.items()])
+        consulta = consulta.select_from(self.model)
+        for destino, condicion in self.joins:
+            consulta = consulta.join(destino, condicion)
+        for destino, condicion in self.outer_joins:
+            consulta = consulta.outerjoin(destino, condicion)
+        consulta = consulta.filter(self.model.estatus == request.form.get("estatus", "A"))
+        for criterio in self.where:
+            consulta = consulta.filter(criterio)
+        for criterio in self.form_filters():
+            consulta = consulta.filter(criterio)
+        if self.search is not None:
+            consulta = self.search.apply(consulta, request.form.get(self.search_field, ""))
+        return consulta
+
+    def form_filters(self) -> list:
+        """Criterios de los filtros que vienen en el formulario y no quedan vacíos"""
+        criterios = []
+        for filtro in self.filters:
+            if filtro.campo not in request.form:
+                continue
+            valor = request.form[filtro.campo]
+            if filtro.limpiar is not None:
+                try:
+                    valor = filtro.limpiar(valor)
+                except ValueError:
+                    continue
+            if valor == "":
+                continue
+            criterios.append(filtro.criterio(valor))
+        return criterios
+
+    def count_strategy(self) -> str:
+        """Estrategia para el total, la estimación sólo sin filtros del formulario porque con ellos se aleja mucho"""
+        if self.count != CONTEO_ESTIMADO:
+            return self.count
+        if len(self.form_filters()) > 0:
+            return CONTEO_CACHE
+        if self.search is not None and request.form.get(self.search_field, "").strip() != "":
+            return CONTEO_CACHE
+        return CONTEO_ESTIMADO
+
+    def output(self):
+        """Entregar el JSON para DataTable, de la caché de respuestas si se indicó cache"""
+        if self.cache > 0:
+            return output_cached(get_query_tables(self.query()), self.produce, self.cache)
+        return self.produce()
+
+    def produce(self):
+        """Ordenar, paginar y entregar el JSON para DataTable"""
+        draw, start, rows_per_page = get_datatable_parameters()
+        consulta = self.query()
+        conteo = self.count_strategy()
+        if self.keyset:
+            registros, cursor = paginate_keyset(consulta, self.keyset, start, rows_per_page)
+            total = count_datatable(consulta, conteo)
+        else:
+            orden = self.order
+            if self.search is not None:
+                orden = self.search.order(request.form.get(self.search_field, "")) + orden
+            registros, total = paginate_offset(consulta, orden, start, rows_per_page, conteo)
+            cursor = None
+        data = [self.row(renglon) for renglon in registros]
+        return output_datatable_json(draw, total, data, cursor)
@@ -1,8 +1,73 @@
 """
 Datatables
+
+Para las tablas grandes que sólo crecen, como bitacoras o entradas_salidas,
+use la paginación por cursor (keyset) en lugar de offset, así el costo de
+cada página es el mismo sin importar qué tan lejos esté
+
+    draw, start, rows_per_page = get_datatable_parameters()
+    consulta = Bitacora.query.filter_by(estatus="A")
+    registros, cursor = paginate_keyset(consulta, [Bitacora.id], start, rows_per_page)
+    total = consulta.count()
+    ...
+    return output_datatable_json(draw, total, data, cursor)
+
+Y en la plantilla active el cursor antes de precargar
+
+    constructorDataTable.keyset('#bitacoras_datatable');
+
+Si la petición no trae el cursor, por ejemplo al saltar a la última página, se usa offset.
+
+Para el total hay varias estrategias
+
+- CONTEO_VENTANA: count(*) OVER () en la misma consulta de la página, con paginate_offset()
+- CONTEO_EXACTO: consulta.count() como una segunda consulta
+- CONTEO_CACHE: consulta.count() guardado en Redis con un TTL corto, la llave se forma
+  con el SQL y sus parámetros más la versión de la tabla
+- CONTEO_ESTIMADO: la estimación de renglones de EXPLAIN, sólo si es mayor a ESTIMADO_MINIMO,
+  de lo contrario CONTEO_CACHE; para tablas muy grandes como bitacoras y sólo sin
+  filtros del formulario, con ellos la estimación se aleja mucho y debe usar CONTEO_CACHE
+
+    registros, total = paginate_offset(consulta, [Area.nombre], start, rows_per_page)
+    total = count_datatable(consulta, CONTEO_ESTIMADO)
+
+Para los listados que muchos usuarios consultan con los mismos filtros, la
+respuesta completa puede guardarse en Redis por RESPUESTA_TTL segundos con
+
+    return output_cached(get_query_tables(consulta), producir)  # producir() consulta y entrega el JSON
+
+La llave se forma con el endpoint, los campos del formulario sin vacíos ni draw
+(filtros, página y cursor), la huella de los permisos del usuario y la versión
+de las tablas de la consulta, así un cambio guardado con UniversalMixin la deja
+sin uso. Lo que no pase por UniversalMixin o por esas tablas sólo se refleja al
+vencer el TTL. Los aciertos y fallos por endpoint se cuentan en
+RESPUESTA_METRICAS_KEY, consúltelos con get_response_metrics().
 """
 
-from flask import request
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+
+from flask import current_app, request
+from flask_login import current_user
+from redis.exceptions import RedisError
+from sqlalchemy import func, tuple_
+
+from lib.table_versions import get_table_versions
+from orion.extensions import database
+
+CONTEO_EXACTO = "exacto"
+CONTEO_VENTANA = "ventana"
+CONTEO_CACHE = "cache"
+CONTEO_ESTIMADO = "estimado"
+CONTEO_KEY = "orion:conteo:{huella}"
+CONTEO_TTL = 60  # Segundos
+ESTIMADO_MINIMO = 100000
+RESPUESTA_KEY = "orion:respuesta:{huella}"
+RESPUESTA_METRICAS_KEY = "orion:respuesta:metricas"
+RESPUESTA_TTL = 30  # Segundos
+RESPUESTA_IGNORAR = ("draw", "csrf_token", "_")  # Campos que cambian en cada petición sin cambiar la respuesta
 
 
 def get_datatable_parameters():
@@ -18,11 +83,216 @@ def get_datatable_parameters():
     return draw, start, rows_per_page
 
 
-def output_datatable_json(draw, total, data):
+def encode_cursor(valores: list) -> str:
+    """Codificar los valores del último renglón en un cursor opaco"""
+    serializados = [valor.isoformat() if isinstance(valor, (date, datetime)) else valor for valor in valores]
+    return base64.urlsafe_b64encode(json.dumps(serializados).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, columnas: list):
+    """Decodificar el cursor, entrega None si no es válido"""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != len(columnas):
+        return None
+    decodificados = []
+    for columna, valor in zip(columnas, valores):
+        tipo = columna.type.python_type
+        try:
+            if tipo is datetime:
+                valor = datetime.fromisoformat(valor)
+            elif tipo is date:
+                valor = date.fromisoformat(valor)
+            elif not isinstance(valor, tipo):
+                valor = tipo(valor)
+        except (TypeError, ValueError):
+            return None
+        decodificados.append(valor)
+    return decodificados
+
+
+def paginate_keyset(consulta, columnas: list, start: int, rows_per_page: int, descending: bool = True):
+    """Ordenar y paginar por las columnas, la última debe ser única como el id; entrega los registros y el cursor siguiente"""
+    cursor = decode_cursor(request.form.get("cursor", ""), columnas)
+    if cursor is not None:
+        if descending:
+            consulta = consulta.filter(tuple_(*columnas) < tuple_(*cursor))
+        else:
+            consulta = consulta.filter(tuple_(*columnas) > tuple_(*cursor))
+    consulta = consulta.order_by(*[columna.desc() if descending else columna.asc() for columna in columnas])
+    if cursor is None and start > 0:
+        consulta = consulta.offset(start)
+    registros = consulta.limit(rows_per_page).all()
+    siguiente = ""
+    if len(registros) == rows_per_page:
+        siguiente = encode_cursor([getattr(registros[-1], columna.key) for columna in columnas])
+    return registros, siguiente
+
+
+def paginate_offset(consulta, orden: list, start: int, rows_per_page: int, conteo: str = CONTEO_VENTANA):
+    """Ordenar y paginar por offset; entrega los registros y el total"""
+    if conteo != CONTEO_VENTANA:
+        registros = consulta.order_by(*orden).offset(start).limit(rows_per_page).all()
+        return registros, count_datatable(consulta, conteo)
+    renglones = consulta.add_columns(func.count().over()).order_by(*orden).offset(start).limit(rows_per_page).all()
+    if len(renglones) == 0:
+        return [], consulta.count() if start > 0 else 0
+    if len(consulta.column_descriptions) > 1:
+        return renglones, renglones[0][-1]  # Consulta de columnas proyectadas, el total queda como la última
+    return [renglon[0] for renglon in renglones], renglones[0][-1]
+
+
+def get_query_tables(consulta) -> list:
+    """Nombres de las tablas que participan en la consulta"""
+    tablas = set()
+    for from_clause in consulta.statement.get_final_froms():
+        tablas.update(tabla.name for tabla in _tables_of(from_clause))
+    return sorted(tablas)
+
+
+def _tables_of(from_clause) -> list:
+    """Tablas de un FROM, incluyendo las de sus JOIN"""
+    if hasattr(from_clause, "left") and hasattr(from_clause, "right"):
+        return _tables_of(from_clause.left) + _tables_of(from_clause.right)
+    if hasattr(from_clause, "name"):
+        return [from_clause]
+    return []
+
+
+def count_cached(consulta) -> int:
+    """Contar con consulta.count() y guardar en Redis con la versión de las tablas"""
+    tablas = get_query_tables(consulta)
+    versiones = get_table_versions(tablas)
+    if versiones is None:
+        return consulta.count()
+    compilado = consulta.statement.compile()
+    texto = json.dumps([str(compilado), compilado.params, tablas, versiones], default=str, sort_keys=True)
+    llave = CONTEO_KEY.format(huella=hashlib.sha1(texto.encode("utf-8")).hexdigest())
+    try:
+        guardado = current_app.redis.get(llave)
+    except RedisError:
+        guardado = None
+    if guardado is not None:
+        return int(guardado)
+    total = consulta.count()
+    try:
+        current_app.redis.set(llave, total, ex=CONTEO_TTL)
+    except RedisError:
+        pass
+    return total
+
+
+def count_estimated(consulta):
+    """Estimación de renglones del planificador de PostgreSQL, None si no está disponible"""
+    conexion = database.session.connection()
+    if conexion.dialect.name != "postgresql":
+        return None
+    compilado = consulta.statement.compile(dialect=conexion.dialect)
+    plan = conexion.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compilado), compilado.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_datatable(consulta, conteo: str = CONTEO_EXACTO) -> int:
+    """Contar los registros con la estrategia elegida"""
+    if conteo == CONTEO_ESTIMADO:
+        estimado = count_estimated(consulta)
+        if estimado is not None and estimado >= ESTIMADO_MINIMO:
+            return estimado
+        return count_cached(consulta)
+    if conteo == CONTEO_CACHE:
+        return count_cached(consulta)
+    return consulta.count()
+
+
+def output_datatable_json(draw, total, data, cursor=None):
     """Entregar JSON"""
-    return {
+    salida = {
         "draw": draw,
         "iTotalRecords": total,
         "iTotalDisplayRecords": total,
         "aaData": data,
     }
+    if cursor is not None:
+        salida["cursor"] = cursor
+    return salida
+
+
+def get_permissions_fingerprint() -> str:
+    """Huella de los permisos del usuario, los renglones pueden cambiar según lo que puede ver"""
+    permisos = sorted(current_user.permisos.items()) if current_user.is_authenticated else []  # Puede ser un MappingProxyType
+    return hashlib.sha1(json.dumps(permisos).encode("utf-8")).hexdigest()[:12]
+
+
+def get_normalized_form() -> dict:
+    """Campos del formulario sin los vacíos ni los que cambian en cada petición, ordenados"""
+    return {
+        campo: valor.strip()
+        for campo, valor in sorted(request.form.items())
+        if campo not in RESPUESTA_IGNORAR and valor.strip() != ""
+    }
+
+
+def count_response(endpoint: str, resultado: str) -> None:
+    """Contar un acierto o un fallo de la caché de respuestas"""
+    try:
+        current_app.redis.hincrby(RESPUESTA_METRICAS_KEY, f"{endpoint}:{resultado}", 1)
+    except RedisError:
+        pass
+
+
+def output_cached(tablas: list, producir, ttl: int = RESPUESTA_TTL) -> dict:
+    """Entregar la respuesta guardada en Redis, o producirla con la función producir y guardarla"""
+    versiones = get_table_versions(tablas)
+    if versiones is None:
+        return producir()
+    texto = json.dumps(
+        [request.endpoint, get_permissions_fingerprint(), get_normalized_form(), tablas, versiones],
+        sort_keys=True,
+    )
+    llave = RESPUESTA_KEY.format(huella=hashlib.sha1(texto.encode("utf-8")).hexdigest())
+    draw, _, _ = get_datatable_parameters()
+    try:
+        guardado = current_app.redis.get(llave)
+    except RedisError:
+        guardado = None
+    if guardado is not None:
+        count_response(request.endpoint, "aciertos")
+        salida = json.loads(guardado)
+        salida["draw"] = draw
+        return salida
+    count_response(request.endpoint, "fallos")
+    salida = producir()
+    try:
+        current_app.redis.set(llave, json.dumps(salida, default=str), ex=ttl)
+    except RedisError:
+        pass
+    return salida
+
+
+def get_response_metrics() -> dict:
+    """Entregar {endpoint: {"aciertos", "fallos", "tasa"}} de la caché de respuestas, None si Redis no está disponible"""
+    try:
+        contadores = current_app.redis.hgetall(RESPUESTA_METRICAS_KEY)
+    except RedisError:
+        return None
+    metricas = {}
+    for campo, valor in contadores.items():
+        campo = campo.decode("utf-8") if isinstance(campo, bytes) else campo
+        endpoint, _, resultado = campo.rpartition(":")
+        metricas.setdefault(endpoint, {"aciertos": 0, "fallos": 0})[resultado] = int(valor)
+    for metrica in metricas.values():
+        consultas = metrica["aciertos"] + metrica["fallos"]
+        metrica["tasa"] = metrica["aciertos"] / consultas if consultas > 0 else 0.0
+    return dict(sorted(metricas.items()))
+
+
+def reset_response_metrics() -> None:
+    """Poner en cero los contadores de la caché de respuestas"""
+    try:
+        current_app.redis.delete(RESPUESTA_METRICAS_KEY)
+    except RedisError:
+        pass
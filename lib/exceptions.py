@@ -83,6 +83,10 @@ class MyTimeoutError(MyAnyError):
     """Excepción porque se agoto el tiempo de espera"""
 
 
+class MyTooManyStatementsError(MyAnyError):
+    """Excepción porque un listado ejecutó demasiadas sentencias SQL"""
+
+
 class MyUnknownError(MyAnyError):
     """Excepción porque hubo un error desconocido"""
 
@@ -0,0 +1,212 @@
+"""
+Explicar
+
+Pasa por EXPLAIN (ANALYZE, BUFFERS) las consultas de los listados, los
+endpoints datatable_json y query_*_json, para saber cuáles recorren tablas
+completas. Sólo funciona con PostgreSQL.
+
+Con el cliente de pruebas de Flask se llama a cada listado como lo haría el
+navegador, primero sin filtros y luego con cada filtro de su DataTableSpec que
+sea una columna del modelo, usando el valor más frecuente de esa columna. Las
+sentencias SELECT que se ejecutan en la petición se capturan y se explican.
+
+De cada plan se marcan
+
+- SEQ_SCAN: recorrido secuencial de una tabla con más de EXPLICAR_FILAS filas
+- SORT_DISK: ordenamiento que no cupo en work_mem y usó el disco
+- NESTED_LOOP: ciclo anidado que repite el lado interno más de EXPLICAR_CICLOS veces
+
+y se sugiere el índice parcial de los activos con las columnas del filtro o
+del orden. El reporte es un diccionario ordenado para guardarlo en JSON y
+compararlo entre versiones.
+"""
+
+import hashlib
+import re
+from importlib import import_module
+
+from sqlalchemy import event, func
+
+from lib.datatable_engine import DataTableSpec
+from lib.exceptions import MyNotValidParamError
+from lib.statement_guard import is_list_endpoint
+from orion.extensions import database
+
+EXPLICAR_FILAS = 1000
+EXPLICAR_CICLOS = 1000
+EXPLICAR_OPCIONES = "ANALYZE, BUFFERS, FORMAT JSON"
+
+FILTRO_COLUMNA_REGEXP = re.compile(r"\((?:\w+\.)?(\w+)(?:\)::\w+)? (=|<>|>=|<=|<|>|~~\*?) ")
+
+
+def get_list_endpoints(app, solo: list = None) -> list:
+    """Entregar (endpoint, url) de los listados sin parámetros en la ruta"""
+    endpoints = []
+    for regla in app.url_map.iter_rules():
+        if not is_list_endpoint(regla.endpoint) or regla.arguments or "POST" not in regla.methods:
+            continue
+        if solo and regla.endpoint not in solo:
+            continue
+        endpoints.append((regla.endpoint, regla.rule))
+    return sorted(endpoints)
+
+
+def get_specs(app, endpoint: str) -> list:
+    """Entregar los DataTableSpec del módulo de la vista"""
+    modulo = import_module(app.view_functions[endpoint].__module__)
+    return [valor for valor in vars(modulo).values() if isinstance(valor, DataTableSpec)]
+
+
+def get_escenarios(app, endpoint: str) -> list:
+    """Entregar los formularios a probar: sin filtros y con cada filtro en su valor más frecuente"""
+    escenarios = [{}]
+    for spec in get_specs(app, endpoint):
+        for filtro in spec.filters:
+            if filtro.campo not in spec.model.__table__.columns:
+                continue
+            columna = spec.model.__table__.columns[filtro.campo]
+            renglon = (
+                database.session.query(columna)
+                .filter(spec.model.estatus == "A")
+                .filter(columna.isnot(None))
+                .group_by(columna)
+                .order_by(func.count().desc())
+                .first()
+            )
+            if renglon is not None:
+                escenarios.append({filtro.campo: str(renglon[0])})
+    return escenarios
+
+
+def capturar(cliente, url: str, formulario: dict) -> tuple:
+    """Hacer la petición y entregar el código de estado y las sentencias SELECT que se ejecutaron, sin repetir"""
+    sentencias = {}
+
+    def guardar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            sentencias.setdefault(statement, parameters)
+
+    event.listen(database.engine, "before_cursor_execute", guardar)
+    try:
+        respuesta = cliente.post(url, data={"draw": 1, "start": 0, "length": 10, "page": 1, **formulario})
+    finally:
+        event.remove(database.engine, "before_cursor_execute", guardar)
+    return respuesta.status_code, list(sentencias.items())
+
+
+def explicar(sentencia: str, parametros) -> dict:
+    """Ejecutar EXPLAIN de la sentencia con sus parámetros y entregar el plan"""
+    conexion = database.engine.raw_connection()
+    try:
+        cursor = conexion.cursor()
+        cursor.execute(f"EXPLAIN ({EXPLICAR_OPCIONES}) {sentencia}", parametros)
+        plan = cursor.fetchone()[0][0]
+        cursor.close()
+    finally:
+        conexion.rollback()  # ANALYZE ejecuta la consulta, no debe quedar nada
+        conexion.close()
+    return plan
+
+
+def get_columnas_filtro(filtro: str) -> list:
+    """Columnas de la condición de un nodo, primero las de igualdad; sin estatus porque va en el WHERE del índice"""
+    iguales, rangos = [], []
+    for columna, operador in FILTRO_COLUMNA_REGEXP.findall(filtro or ""):
+        if columna == "estatus":
+            continue
+        destino = iguales if operador == "=" else rangos
+        if columna not in iguales + rangos:
+            destino.append(columna)
+    return iguales + rangos
+
+
+def sugerir_indice(tabla: str, columnas: list, activos: bool) -> str:
+    """Sentencia del índice sugerido"""
+    if tabla == "" or len(columnas) == 0:
+        return ""
+    sugerencia = f"CREATE INDEX ON {tabla} ({', '.join(columnas)})"
+    return sugerencia + " WHERE estatus = 'A'" if activos else sugerencia
+
+
+def revisar_plan(nodo: dict, hallazgos: list = None, orden: list = None) -> list:
+    """Recorrer el plan y entregar los hallazgos"""
+    hallazgos = [] if hallazgos is None else hallazgos
+    tipo = nodo.get("Node Type", "")
+    tabla = nodo.get("Relation Name", "")
+    ciclos = nodo.get("Actual Loops", 1)
+    if tipo == "Sort":
+        orden = [re.sub(r"^\w+\.| DESC$| ASC$", "", llave) for llave in nodo.get("Sort Key", [])]
+        if nodo.get("Sort Space Type") == "Disk":
+            hallazgos.append(
+                {
+                    "tipo": "SORT_DISK",
+                    "tabla": "",
+                    "detalle": f"Ordena {', '.join(nodo.get('Sort Key', []))} con {nodo.get('Sort Space Used', 0)} kB en disco",
+                    "sugerencia": "",
+                }
+            )
+    if tipo == "Seq Scan":
+        leidas = nodo.get("Actual Rows", 0) * ciclos + nodo.get("Rows Removed by Filter", 0) * ciclos
+        if leidas > EXPLICAR_FILAS:
+            filtro = nodo.get("Filter", "")
+            columnas = get_columnas_filtro(filtro)
+            columnas += [columna for columna in orden or [] if columna not in columnas]
+            hallazgos.append(
+                {
+                    "tipo": "SEQ_SCAN",
+                    "tabla": tabla,
+                    "detalle": f"Lee {leidas} filas de {tabla} con el filtro {filtro or 'ninguno'}",
+                    "sugerencia": sugerir_indice(tabla, columnas, "estatus" in filtro),
+                }
+            )
+    if tipo == "Nested Loop" and len(nodo.get("Plans", [])) == 2:
+        interno = nodo["Plans"][1]
+        if interno.get("Actual Loops", 1) > EXPLICAR_CICLOS:
+            tabla_interna = interno.get("Relation Name", "")
+            sugerencia = ""
+            if not interno.get("Node Type", "").startswith("Index"):  # Sin índice en el lado interno
+                sugerencia = sugerir_indice(tabla_interna, get_columnas_filtro(interno.get("Filter", "")), False)
+            hallazgos.append(
+                {
+                    "tipo": "NESTED_LOOP",
+                    "tabla": tabla_interna,
+                    "detalle": f"Repite {interno.get('Node Type')} {interno.get('Actual Loops')} veces",
+                    "sugerencia": sugerencia,
+                }
+            )
+    for hijo in nodo.get("Plans", []):
+        revisar_plan(hijo, hallazgos, orden)
+    return hallazgos
+
+
+def get_huella(sentencia: str) -> str:
+    """Huella corta de la sentencia para compararla entre reportes"""
+    return hashlib.sha1(" ".join(sentencia.split()).encode("utf-8")).hexdigest()[:12]
+
+
+def explicar_listados(app, usuario_id: int, solo: list = None) -> dict:
+    """Explicar las consultas de los listados como el usuario y entregar el reporte"""
+    if database.engine.dialect.name != "postgresql":
+        raise MyNotValidParamError(f"EXPLAIN (ANALYZE, BUFFERS) requiere PostgreSQL, no {database.engine.dialect.name}")
+    app.config["WTF_CSRF_ENABLED"] = False
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion["_user_id"] = str(usuario_id)
+        sesion["_fresh"] = True
+    reporte = {"endpoints": []}
+    for endpoint, url in get_list_endpoints(app, solo):
+        for formulario in get_escenarios(app, endpoint):
+            estado, sentencias = capturar(cliente, url, formulario)
+            resultado = {"endpoint": endpoint, "filtros": formulario, "estado": estado, "sentencias": []}
+            for sentencia, parametros in sentencias:
+                plan = explicar(sentencia, parametros)
+                resultado["sentencias"].append(
+                    {
+                        "huella": get_huella(sentencia),
+                        "sentencia": " ".join(sentencia.split()),
+                        "tiempo_ms": round(plan.get("Execution Time", 0), 1),
+                        "hallazgos": revisar_plan(plan["Plan"]),
+                    }
+                )
+            reporte["endpoints"].append(resultado)
+    return reporte
@@ -0,0 +1,68 @@
+"""
+Fonética
+
+Clave fonética en español para encontrar nombres mal escritos, como
+González, Gonzales o Gonsalez, que comparten la clave GNSLS.
+
+- Sin acentos ni signos y en mayúsculas, como safe_search
+- Se igualan los sonidos: B y V; C suave, S, Z; C dura, K, QU; G suave y J;
+  LL y Y; CH; PH y F; la H es muda
+- Se conserva la vocal inicial como A y se quitan las demás vocales
+- Se juntan las letras repetidas
+
+    clave_fonetica("Gonzalez")  # "GNSLS"
+    distancia_edicion("GONZALEZ", "GONSALES")  # 2
+"""
+
+import re
+
+from lib.safe_string import safe_search
+
+REGLAS_FONETICAS = [
+    (r"PH", "F"),
+    (r"CH", "1"),  # Marca temporal para CH
+    (r"QU", "K"),
+    (r"G(?=[EI])", "J"),
+    (r"GU(?=[EI])", "G"),
+    (r"C(?=[EI])", "S"),
+    (r"C", "K"),
+    (r"Z", "S"),
+    (r"X", "KS"),
+    (r"LL", "Y"),
+    (r"Y(?![AEIOU])", "I"),
+    (r"V", "B"),
+    (r"W", "U"),
+    (r"H", ""),
+    (r"RR", "R"),
+]
+
+
+def clave_fonetica(palabra: str) -> str:
+    """Clave fonética de una palabra"""
+    palabra = safe_search(palabra).replace(" ", "")
+    for patron, reemplazo in REGLAS_FONETICAS:
+        palabra = re.sub(patron, reemplazo, palabra)
+    if palabra == "":
+        return ""
+    inicial = "A" if palabra[0] in "AEIOU" else ""
+    consonantes = re.sub(r"[AEIOU]", "", palabra).replace("1", "C")
+    return re.sub(r"(.)\1+", r"\1", inicial + consonantes)
+
+
+def claves_foneticas(texto: str) -> list:
+    """Claves fonéticas de cada palabra del texto"""
+    claves = [clave_fonetica(palabra) for palabra in safe_search(texto).split()]
+    return [clave for clave in claves if clave != ""]
+
+
+def distancia_edicion(primera: str, segunda: str) -> int:
+    """Distancia de Levenshtein entre dos textos"""
+    if len(primera) < len(segunda):
+        primera, segunda = segunda, primera
+    anterior = list(range(len(segunda) + 1))
+    for i, letra in enumerate(primera, 1):
+        actual = [i]
+        for j, otra in enumerate(segunda, 1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (letra != otra)))
+        anterior = actual
+    return anterior[-1]
@@ -0,0 +1,197 @@
+"""
+Full Text
+
+Búsqueda de texto completo en columnas largas, como norma, fundamento y
+fragmento de las atribuciones.
+
+En PostgreSQL la tabla tiene la columna generada texto_tsv, un tsvector con
+el diccionario spanish, y un índice GIN sobre ella; se filtra con @@, se ordena
+con ts_rank_cd y el fragmento resaltado sale de ts_headline. La columna y el
+índice se crean con la tabla, para una tabla que ya existe use create().
+
+En otros dialectos, como SQLite en las pruebas, se usa un índice BM25 en la
+memoria del worker que se reconstruye cuando cambia la versión de la tabla.
+
+    ATRIBUCIONES_TEXTO = FullTextSearch(Atribucion, [Atribucion.norma, Atribucion.fundamento, Atribucion.fragmento])
+
+    ATRIBUCIONES_DATATABLE = DataTableSpec(..., search=ATRIBUCIONES_TEXTO)
+
+Con el campo texto en el formulario, el DataTable agrega las columnas relevancia
+y fragmento, y ordena primero por relevancia. Para mostrar el fragmento use
+resaltar(renglon.fragmento), escapa el HTML y marca las palabras encontradas.
+"""
+
+import math
+from collections import Counter
+from threading import Lock
+
+from markupsafe import Markup, escape
+from sqlalchemy import DDL, case, event, false, func, literal, literal_column, text
+
+from lib.safe_string import safe_search, safe_string
+from lib.table_versions import get_table_version
+from orion.extensions import database
+
+FULL_TEXT_INICIO = "⟦"
+FULL_TEXT_FIN = "⟧"
+FULL_TEXT_MAXIMO = 1000  # Máximo de resultados del índice BM25
+FULL_TEXT_PALABRAS = 30  # Palabras del fragmento del índice BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+PALABRAS_VACIAS = {"A", "AL", "CON", "DE", "DEL", "EL", "EN", "LA", "LAS", "LO", "LOS", "O", "POR", "PARA", "QUE", "SE", "Y"}
+
+
+def get_terminos(texto: str) -> list:
+    """Términos para BM25: palabras sin acentos, sin palabras vacías y sin la s del plural"""
+    terminos = []
+    for palabra in safe_search(texto, max_len=len(texto or "")).split():
+        if palabra in PALABRAS_VACIAS:
+            continue
+        if len(palabra) > 4 and palabra.endswith("S"):
+            palabra = palabra[:-1]
+        terminos.append(palabra)
+    return terminos
+
+
+def resaltar(fragmento: str) -> Markup:
+    """Escapar el HTML del fragmento y marcar las palabras encontradas con <mark>"""
+    escapado = str(escape(fragmento or ""))
+    return Markup(escapado.replace(FULL_TEXT_INICIO, "<mark>").replace(FULL_TEXT_FIN, "</mark>"))
+
+
+class Bm25Index:
+    """Índice BM25 en memoria"""
+
+    def __init__(self, documentos: dict):
+        self.frecuencias = {}  # id -> Counter de términos
+        self.longitudes = {}
+        self.documentos = documentos
+        apariciones = Counter()
+        for registro_id, documento in documentos.items():
+            conteo = Counter(get_terminos(documento))
+            self.frecuencias[registro_id] = conteo
+            self.longitudes[registro_id] = sum(conteo.values())
+            apariciones.update(conteo.keys())
+        total = len(documentos)
+        self.promedio = sum(self.longitudes.values()) / total if total else 0
+        self.idf = {termino: math.log(1 + (total - n + 0.5) / (n + 0.5)) for termino, n in apariciones.items()}
+
+    def search(self, texto: str, maximo: int = FULL_TEXT_MAXIMO) -> list:
+        """Entregar (id, puntaje) de los documentos con todos los términos, del más relevante al menos"""
+        terminos = set(get_terminos(texto))
+        if len(terminos) == 0:
+            return []
+        resultados = []
+        for registro_id, conteo in self.frecuencias.items():
+            if not terminos.issubset(conteo):
+                continue
+            normalizador = BM25_K1 * (1 - BM25_B + BM25_B * self.longitudes[registro_id] / (self.promedio or 1))
+            puntaje = 0.0
+            for termino in terminos:
+                frecuencia = conteo[termino]
+                puntaje += self.idf[termino] * frecuencia * (BM25_K1 + 1) / (frecuencia + normalizador)
+            resultados.append((registro_id, puntaje))
+        resultados.sort(key=lambda resultado: (-resultado[1], resultado[0]))
+        return resultados[:maximo]
+
+    def snippet(self, registro_id: int, texto: str) -> str:
+        """Fragmento alrededor de la primera palabra encontrada, con las marcas de inicio y fin"""
+        terminos = set(get_terminos(texto))
+        palabras = self.documentos[registro_id].split()
+        marcadas = []
+        primera = None
+        for posicion, palabra in enumerate(palabras):
+            if set(get_terminos(palabra)) & terminos:
+                marcadas.append(FULL_TEXT_INICIO + palabra + FULL_TEXT_FIN)
+                primera = posicion if primera is None else primera
+            else:
+                marcadas.append(palabra)
+        inicio = max((primera or 0) - FULL_TEXT_PALABRAS // 3, 0)
+        fin = inicio + FULL_TEXT_PALABRAS
+        fragmento = " ".join(marcadas[inicio:fin])
+        return ("… " if inicio > 0 else "") + fragmento + (" …" if fin < len(marcadas) else "")
+
+
+class FullTextSearch:
+    """Búsqueda de texto completo sobre columnas de un modelo"""
+
+    def __init__(self, model, columns: list, diccionario: str = "spanish", columna: str = "texto_tsv"):
+        self.model = model
+        self.columns = columns
+        self.diccionario = diccionario
+        self.columna = columna
+        self._indice = None
+        self._version = None
+        self._candado = Lock()
+        for sentencia in self.ddl():
+            event.listen(model.__table__, "after_create", DDL(sentencia).execute_if(dialect="postgresql"))
+
+    @property
+    def tabla(self) -> str:
+        """Nombre de la tabla"""
+        return self.model.__tablename__
+
+    def ddl(self) -> list:
+        """Sentencias para agregar la columna generada y su índice GIN en PostgreSQL"""
+        documento = " || ' ' || ".join(f"coalesce({columna.key}, '')" for columna in self.columns)
+        return [
+            f"ALTER TABLE {self.tabla} ADD COLUMN IF NOT EXISTS {self.columna} tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('{self.diccionario}'::regconfig, {documento})) STORED",
+            f"CREATE INDEX IF NOT EXISTS {self.tabla}_{self.columna}_gin ON {self.tabla} USING gin ({self.columna})",
+        ]
+
+    def create(self) -> None:
+        """Agregar la columna generada y el índice a una tabla que ya existe, sólo en PostgreSQL"""
+        if database.session.get_bind().dialect.name != "postgresql":
+            return
+        for sentencia in self.ddl():
+            database.session.execute(text(sentencia))
+        database.session.commit()
+
+    def get_texto(self, texto: str) -> str:
+        """Limpiar lo buscado igual que se guardan las columnas"""
+        return safe_string(texto, max_len=256, save_enie=True)
+
+    def get_index(self) -> Bm25Index:
+        """Índice BM25 de todos los registros, se reconstruye si cambió la versión de la tabla"""
+        version = get_table_version(self.tabla)
+        with self._candado:
+            if self._indice is None or version is None or version != self._version:
+                consulta = database.session.query(self.model.id, *self.columns)
+                documentos = {renglon[0]: " ".join(valor or "" for valor in renglon[1:]) for renglon in consulta.all()}
+                self._indice = Bm25Index(documentos)
+                self._version = version
+            return self._indice
+
+    def apply(self, consulta, texto: str):
+        """Filtrar por lo buscado y agregar las columnas relevancia y fragmento"""
+        texto = self.get_texto(texto)
+        if texto == "":
+            return consulta.add_columns(literal(0.0).label("relevancia"), literal("").label("fragmento"))
+        if database.session.get_bind().dialect.name == "postgresql":
+            vector = literal_column(f"{self.tabla}.{self.columna}")
+            busqueda = func.websearch_to_tsquery(literal_column(f"'{self.diccionario}'::regconfig"), texto)
+            documento = func.concat_ws(" ", *self.columns)
+            opciones = f"StartSel={FULL_TEXT_INICIO}, StopSel={FULL_TEXT_FIN}, MaxFragments=2, MaxWords=30, MinWords=10"
+            fragmento = func.ts_headline(literal_column(f"'{self.diccionario}'::regconfig"), documento, busqueda, opciones)
+            return consulta.filter(vector.op("@@")(busqueda)).add_columns(
+                func.ts_rank_cd(vector, busqueda).label("relevancia"),
+                fragmento.label("fragmento"),
+            )
+        indice = self.get_index()
+        resultados = indice.search(texto)
+        if len(resultados) == 0:
+            return consulta.filter(false()).add_columns(literal(0.0).label("relevancia"), literal("").label("fragmento"))
+        puntajes = dict(resultados)
+        fragmentos = {registro_id: indice.snippet(registro_id, texto) for registro_id in puntajes}
+        return consulta.filter(self.model.id.in_(puntajes)).add_columns(
+            case(puntajes, value=self.model.id, else_=0.0).label("relevancia"),
+            case(fragmentos, value=self.model.id, else_="").label("fragmento"),
+        )
+
+    def order(self, texto: str) -> list:
+        """Orden por relevancia si hay algo que buscar"""
+        if self.get_texto(texto) == "":
+            return []
+        return [literal_column("relevancia").desc()]
@@ -0,0 +1,74 @@
+"""
+Índices
+
+Casi todas las consultas filtran estatus = 'A' y luego ordenan por una fecha o
+por el id; un índice parcial de los activos con las columnas del filtro y del
+orden evita recorrer toda la tabla.
+
+    __table_args__ = (active_index("licencias", "persona_id", "fecha_inicio"),)
+
+Para traer los cambios desde una fecha, sin importar el estatus, use el índice
+completo de (modificado, id)
+
+    __table_args__ = (modified_index("licencias"),)
+
+Para las bases de datos que ya existen, create_indexes() crea los índices que
+falten de todas las tablas y verifica que estén todos.
+"""
+
+from sqlalchemy import Index, inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from orion.extensions import database
+
+
+def get_active_index_name(tabla: str, columnas: tuple) -> str:
+    """Nombre del índice parcial de los activos"""
+    return f"{tabla}_{'_'.join(columnas)}_activo_idx"
+
+
+def active_index(tabla: str, *columnas: str) -> Index:
+    """Índice parcial sobre los registros activos con las columnas del filtro y del orden"""
+    condicion = text("estatus = 'A'")
+    return Index(
+        get_active_index_name(tabla, columnas),
+        *columnas,
+        postgresql_where=condicion,
+        sqlite_where=condicion,
+    )
+
+
+def modified_index(tabla: str) -> Index:
+    """Índice de todos los registros por (modificado, id), incluye los eliminados"""
+    return Index(f"{tabla}_modificado_id_idx", "modificado", "id")
+
+
+def create_indexes(tablas: list = None) -> list:
+    """Crear los índices que falten y entregar (tabla, índice, estado) de cada uno"""
+    resultados = []
+    for tabla in database.metadata.sorted_tables:
+        if tablas and tabla.name not in tablas:
+            continue
+        inspector = inspect(database.engine)
+        if not inspector.has_table(tabla.name):
+            resultados.append((tabla.name, "", "SIN TABLA"))
+            continue
+        existentes = {indice["name"] for indice in inspector.get_indexes(tabla.name)}
+        errores = set()
+        for indice in sorted(tabla.indexes, key=lambda indice: indice.name):
+            if indice.name in existentes:
+                resultados.append((tabla.name, indice.name, "EXISTE"))
+                continue
+            try:
+                indice.create(database.engine, checkfirst=True)
+            except SQLAlchemyError as error:
+                errores.add(indice.name)
+                resultados.append((tabla.name, indice.name, f"ERROR {getattr(error, 'orig', error)}"))
+                continue
+            resultados.append((tabla.name, indice.name, "CREADO"))
+        # Verificar que ya estén todos
+        existentes = {indice["name"] for indice in inspect(database.engine).get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in existentes and indice.name not in errores:
+                resultados.append((tabla.name, indice.name, "FALTA"))
+    return resultados
@@ -0,0 +1,60 @@
+"""
+Local Cache
+
+Caché LRU en la memoria de cada worker, con tiempo de vida opcional.
+
+    cache = LocalCache(maxsize=512, ttl=60)
+    cache.set(("permisos", usuario_id), permisos)
+    permisos = cache.get(("permisos", usuario_id))  # None si no existe o expiró
+
+No es compartida entre workers, por eso las llaves deben incluir una versión
+que se consulte en Redis cuando se necesite coherencia entre ellos.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+
+class LocalCache:
+    """Caché LRU local al worker"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._candado = Lock()
+
+    def get(self, llave, default=None):
+        """Obtener un valor, None si no existe o si ya expiró"""
+        with self._candado:
+            if llave not in self._datos:
+                return default
+            expiracion, valor = self._datos[llave]
+            if expiracion and expiracion < monotonic():
+                del self._datos[llave]
+                return default
+            self._datos.move_to_end(llave)
+            return valor
+
+    def set(self, llave, valor):
+        """Guardar un valor, descartando el menos usado si se llena"""
+        expiracion = monotonic() + self.ttl if self.ttl else 0
+        with self._candado:
+            self._datos[llave] = (expiracion, valor)
+            self._datos.move_to_end(llave)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+
+    def delete(self, llave):
+        """Eliminar un valor"""
+        with self._candado:
+            self._datos.pop(llave, None)
+
+    def clear(self):
+        """Vaciar"""
+        with self._candado:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
@@ -0,0 +1,92 @@
+"""
+Permisos Cache
+
+Guarda el diccionario modulo -> nivel de cada usuario en Redis y en una caché
+LRU local de cada worker, para que permission_required no consulte la base de datos.
+
+Las llaves incluyen dos versiones que se leen de Redis en un solo viaje (MGET):
+
+- La versión global cambia al modificar permisos, roles o módulos
+- La versión del usuario cambia al modificar sus usuarios_roles
+
+Después de guardar un cambio, invalide con
+
+    invalidate_permisos()  # Todos los usuarios
+    invalidate_permisos(usuario_id=usuario.id)  # Solo un usuario
+
+Si Redis no está disponible, se consulta la base de datos como siempre.
+"""
+
+import json
+
+from flask import current_app
+from redis.exceptions import RedisError
+
+from lib.local_cache import LocalCache
+from lib.unit_of_work import on_commit
+
+PERMISOS_VERSION_KEY = "orion:permisos:version"
+PERMISOS_USUARIO_VERSION_KEY = "orion:permisos:version:{usuario_id}"
+PERMISOS_KEY = "orion:permisos:{version}:{usuario_id}:{usuario_version}"
+PERMISOS_TTL = 24 * 60 * 60  # Un día en segundos
+
+local_cache = LocalCache(maxsize=512)
+
+
+def get_permisos_versions(usuario_id: int) -> tuple[int, int]:
+    """Consultar en Redis la versión global y la del usuario"""
+    version, usuario_version = current_app.redis.mget(
+        PERMISOS_VERSION_KEY,
+        PERMISOS_USUARIO_VERSION_KEY.format(usuario_id=usuario_id),
+    )
+    return int(version or 0), int(usuario_version or 0)
+
+
+def get_permisos(usuario_id: int, consultar) -> dict:
+    """Entregar los permisos del usuario desde la caché, o consultarlos con la función consultar"""
+    try:
+        version, usuario_version = get_permisos_versions(usuario_id)
+    except RedisError:
+        return consultar()
+
+    # Primero buscar en la caché local del worker
+    llave = PERMISOS_KEY.format(version=version, usuario_id=usuario_id, usuario_version=usuario_version)
+    permisos = local_cache.get(llave)
+    if permisos is not None:
+        return permisos
+
+    # Después buscar en Redis
+    try:
+        guardado = current_app.redis.get(llave)
+    except RedisError:
+        guardado = None
+    if guardado is not None:
+        permisos = json.loads(guardado)
+        local_cache.set(llave, permisos)
+        return permisos
+
+    # Por último consultar la base de datos y guardar en ambas cachés
+    permisos = consultar()
+    local_cache.set(llave, permisos)
+    try:
+        current_app.redis.set(llave, json.dumps(permisos), ex=PERMISOS_TTL)
+    except RedisError:
+        pass
+    return permisos
+
+
+def invalidate_permisos(usuario_id: int = None) -> None:
+    """Invalidar los permisos de un usuario, o de todos si no se da usuario_id"""
+    on_commit(lambda: increment_permisos_version(usuario_id))
+
+
+def increment_permisos_version(usuario_id: int = None) -> None:
+    """Incrementar la versión global o la del usuario"""
+    if usuario_id is None:
+        llave = PERMISOS_VERSION_KEY
+    else:
+        llave = PERMISOS_USUARIO_VERSION_KEY.format(usuario_id=usuario_id)
+    try:
+        current_app.redis.incr(llave)
+    except RedisError:
+        local_cache.clear()  # Sin Redis no hay versiones, al menos vaciar la caché de este worker
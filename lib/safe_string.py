@@ -124,3 +124,12 @@ def safe_string(input_str, max_len=250, do_unidecode=True, save_enie=False, to_u
     if max_len == 0:
         return final
     return (final[:max_len] + "...") if len(final) > max_len else final
+
+
+def safe_search(input_str, max_len=400) -> str:
+    """Safe search, sin acentos ni signos, en mayúsculas y con un solo espacio entre palabras"""
+    if not isinstance(input_str, str):
+        return ""
+    clean_string = re.sub(r"[^A-Z0-9]+", " ", unidecode(input_str).upper())
+    final = clean_string.strip()
+    return final[:max_len]
@@ -0,0 +1,71 @@
+"""
+Statement Guard
+
+Cuenta las sentencias SQL de cada petición y provoca un error si un listado
+rebasa el límite, así se detectan en desarrollo las consultas N+1 antes de
+llegar a producción.
+
+Se activa con la variable de entorno SQL_STATEMENTS_LIMIT mayor a cero, por
+ejemplo 10 en el archivo .env de desarrollo. Vigila los endpoints datatable_json
+y query_*_json de todos los blueprints; otro endpoint puede vigilarse o cambiar
+su límite con el decorador
+
+    @personas.route("/personas/exportar_json")
+    @statement_limit(20)
+    def exportar_json():
+"""
+
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from lib.exceptions import MyTooManyStatementsError
+
+STATEMENTS_KEY = "sql_statements"
+STATEMENTS_LIMIT_KEY = "sql_statements_limit"
+
+
+def is_list_endpoint(endpoint: str) -> bool:
+    """¿El endpoint es un listado?"""
+    nombre = endpoint.rsplit(".", 1)[-1]
+    return nombre == "datatable_json" or (nombre.startswith("query_") and nombre.endswith("_json"))
+
+
+def statement_limit(limite: int):
+    """Decorador para vigilar la vista con un límite propio de sentencias SQL"""
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            g.sql_statements_limit = limite
+            return f(*args, **kwargs)
+
+        return decorated_function
+
+    return decorator
+
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    """Sumar una sentencia a la petición en curso"""
+    if has_request_context():
+        g.sql_statements = g.get(STATEMENTS_KEY, 0) + 1
+
+
+def init_statement_guard(app):
+    """Registrar en la app el conteo de sentencias SQL, sólo si SQL_STATEMENTS_LIMIT es mayor a cero"""
+    if app.config.get("SQL_STATEMENTS_LIMIT", 0) <= 0:
+        return
+    if not event.contains(Engine, "before_cursor_execute", count_statement):
+        event.listen(Engine, "before_cursor_execute", count_statement)
+
+    @app.after_request
+    def statement_guard(response):
+        limite = g.pop(STATEMENTS_LIMIT_KEY, None)
+        if limite is None and request.endpoint is not None and is_list_endpoint(request.endpoint):
+            limite = current_app.config["SQL_STATEMENTS_LIMIT"]
+        sentencias = g.pop(STATEMENTS_KEY, 0)
+        if limite is not None and sentencias > limite:
+            raise MyTooManyStatementsError(f"{request.endpoint} ejecutó {sentencias} sentencias SQL, el límite es {limite}")
+        return response
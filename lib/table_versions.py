@@ -0,0 +1,51 @@
+"""
+Table Versions
+
+Contador en Redis por tabla que se incrementa cada vez que UniversalMixin
+guarda, elimina o recupera un registro. Las cachés que dependen del contenido
+de una tabla incluyen su versión en la llave, así no necesitan borrarse.
+
+Al incrementar también se publica el nombre de la tabla en el canal
+TABLA_CAMBIOS_CANAL, para que los workers que lo escuchan se enteren al momento.
+"""
+
+from flask import current_app
+from redis.exceptions import RedisError
+
+from lib.unit_of_work import on_commit
+
+TABLA_VERSION_KEY = "orion:tabla:version:{tabla}"
+TABLA_CAMBIOS_CANAL = "orion:tabla:cambios"
+
+
+def get_table_version(tabla: str):
+    """Consultar la versión de la tabla, None si Redis no está disponible"""
+    try:
+        return int(current_app.redis.get(TABLA_VERSION_KEY.format(tabla=tabla)) or 0)
+    except RedisError:
+        return None
+
+
+def get_table_versions(tablas: list):
+    """Consultar las versiones de varias tablas en un solo viaje, None si Redis no está disponible"""
+    try:
+        versiones = current_app.redis.mget([TABLA_VERSION_KEY.format(tabla=tabla) for tabla in tablas])
+    except RedisError:
+        return None
+    return [int(version or 0) for version in versiones]
+
+
+def increment_table_version(tabla: str) -> None:
+    """Incrementar la versión de la tabla y publicar el cambio, en un solo viaje"""
+    try:
+        with current_app.redis.pipeline() as tuberia:
+            tuberia.incr(TABLA_VERSION_KEY.format(tabla=tabla))
+            tuberia.publish(TABLA_CAMBIOS_CANAL, tabla)
+            tuberia.execute()
+    except RedisError:
+        pass
+
+
+def invalidate_table(tabla: str) -> None:
+    """Incrementar la versión de la tabla después del commit"""
+    on_commit(lambda: increment_table_version(tabla))
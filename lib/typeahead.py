@@ -0,0 +1,264 @@
+"""
+Typeahead
+
+Índice en la memoria de cada worker para los Select2 (query_*_json), así
+cada tecla no consulta la base de datos con contains(). Se carga con los
+registros activos del catálogo y guarda las palabras normalizadas con
+safe_search en una lista ordenada, buscar un prefijo es una bisección; para
+buscar dentro de las palabras guarda también sus trigramas.
+
+    AREAS_TYPEAHEAD = TypeaheadIndex(
+        model=Area,
+        columns={"nombre": Area.nombre, "centro_trabajo_id": Area.centro_trabajo_id},
+        text=lambda renglon: renglon.nombre,
+        search=["nombre"],
+        order=Area.nombre,
+        groups=["centro_trabajo_id"],
+    )
+
+    @areas.route("/areas/query_areas_json", methods=["POST"])
+    def query_areas_json():
+        return AREAS_TYPEAHEAD.output("nombre")
+
+Como el contains() que reemplaza, cada palabra escrita puede estar en cualquier
+parte de alguna palabra del registro, "GARC" encuentra a "GARCIA" y a
+"DEGARCIA". Con tres letras o más se intersectan las palabras de sus trigramas;
+con una o dos sólo se buscan prefijos, salvo que el catálogo tenga a lo más
+TYPEAHEAD_RECORRIDO palabras distintas, entonces se recorren todas. Los grupos
+filtran por igualdad, por ejemplo las áreas de un centro de trabajo.
+
+Para mantenerse al día consulta la versión de la tabla (lib.table_versions)
+en cada petición; si cambió, vuelve a leer sólo los registros con modificado
+reciente y quita los que ya no están activos. Cada TYPEAHEAD_TTL segundos se
+recarga completo, es lo único que lo actualiza si Redis no está disponible.
+
+Si el catálogo tiene copia en memoria (lib.catalog_cache), indíquela en catalog
+y el índice se reconstruye de ella cuando cambia, sin consultar la base de
+datos; sus columnas deben incluir las de search, groups y order.
+"""
+
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import timedelta
+from threading import Lock
+from time import monotonic
+
+from flask import request
+from sqlalchemy import func
+
+from lib.safe_string import safe_search
+from lib.table_versions import get_table_version
+from orion.extensions import database
+
+TYPEAHEAD_POR_PAGINA = 15
+TYPEAHEAD_TTL = 600  # Segundos entre recargas completas
+TYPEAHEAD_TRASLAPE = 60  # Segundos hacia atrás al releer los modificados, por las transacciones largas
+TYPEAHEAD_RECORRIDO = 5000  # Máximo de palabras distintas para recorrerlas al buscar una o dos letras
+
+TypeaheadEntry = namedtuple("TypeaheadEntry", ["id", "texto", "palabras", "grupos"])
+
+
+def get_trigramas(palabra: str) -> set:
+    """Trigramas de la palabra, vacío si tiene menos de tres letras"""
+    return {palabra[posicion : posicion + 3] for posicion in range(len(palabra) - 2)}
+
+
+class TypeaheadIndex:
+    """Índice de palabras de un catálogo"""
+
+    def __init__(self, model, columns: dict, text, search: list, order, groups: list = None, catalog=None):
+        self.model = model
+        self.columns = columns
+        self.text = text
+        self.search_columns = search
+        self.order = order
+        self.groups = groups or []
+        self.catalog = catalog
+        self._copia = None  # Última copia del catálogo usada
+        self._entradas = {}  # id -> TypeaheadEntry
+        self._palabras = {}  # palabra -> set de ids
+        self._ordenadas = []  # Palabras ordenadas para buscar prefijos
+        self._trigramas = {}  # trigrama -> set de palabras
+        self._ids = []  # Ids en el orden del catálogo
+        self._orden = {}  # id -> llave de orden
+        self._version = None
+        self._marca = None  # Mayor modificado de la tabla en la última lectura
+        self._cargado = 0
+        self._candado = Lock()
+
+    def _consulta(self):
+        """Consulta de columnas proyectadas, sin crear objetos del modelo"""
+        etiquetas = [columna.label(nombre) for nombre, columna in self.columns.items()]
+        return database.session.query(self.model.id, self.model.estatus, self.order.label("_orden"), *etiquetas)
+
+    def _agregar(self, renglon) -> None:
+        """Agregar un renglón activo al índice"""
+        texto = " ".join(str(getattr(renglon, campo) or "") for campo in self.search_columns)
+        palabras = frozenset(safe_search(texto).split())
+        grupos = {campo: getattr(renglon, campo) for campo in self.groups}
+        self._entradas[renglon.id] = TypeaheadEntry(renglon.id, self.text(renglon), palabras, grupos)
+        for palabra in palabras:
+            if palabra not in self._palabras:
+                self._palabras[palabra] = set()
+                for trigrama in get_trigramas(palabra):
+                    self._trigramas.setdefault(trigrama, set()).add(palabra)
+            self._palabras[palabra].add(renglon.id)
+
+    def _quitar(self, registro_id: int) -> None:
+        """Quitar un registro del índice"""
+        entrada = self._entradas.pop(registro_id, None)
+        if entrada is None:
+            return
+        for palabra in entrada.palabras:
+            ids = self._palabras.get(palabra)
+            if ids is not None:
+                ids.discard(registro_id)
+                if len(ids) == 0:
+                    del self._palabras[palabra]
+                    for trigrama in get_trigramas(palabra):
+                        palabras = self._trigramas.get(trigrama)
+                        if palabras is not None:
+                            palabras.discard(palabra)
+                            if len(palabras) == 0:
+                                del self._trigramas[trigrama]
+
+    def _ordenar(self) -> None:
+        """Ordenar las palabras y los ids después de cargar"""
+        self._ordenadas = sorted(self._palabras)
+        self._ids = [entrada.id for entrada in sorted(self._entradas.values(), key=lambda e: self._orden[e.id])]
+
+    def _marcar(self):
+        """Mayor modificado de la tabla, incluyendo los registros inactivos"""
+        return database.session.query(func.max(self.model.modificado)).scalar()
+
+    def _cargar(self, version) -> None:
+        """Cargar todos los registros activos"""
+        marca = self._marcar()
+        self._entradas = {}
+        self._palabras = {}
+        self._trigramas = {}
+        self._orden = {}
+        for renglon in self._consulta().filter(self.model.estatus == "A").all():
+            self._agregar(renglon)
+            self._orden[renglon.id] = (renglon._orden is None, renglon._orden, renglon.id)
+        self._ordenar()
+        self._version = version
+        self._marca = marca
+        self._cargado = monotonic()
+
+    def _actualizar(self, version) -> None:
+        """Releer sólo los registros modificados desde la última lectura"""
+        marca = self._marcar()
+        consulta = self._consulta()
+        if self._marca is not None:
+            consulta = consulta.filter(self.model.modificado >= self._marca - timedelta(seconds=TYPEAHEAD_TRASLAPE))
+        for renglon in consulta.all():
+            self._quitar(renglon.id)
+            self._orden.pop(renglon.id, None)
+            if renglon.estatus == "A":
+                self._agregar(renglon)
+                self._orden[renglon.id] = (renglon._orden is None, renglon._orden, renglon.id)
+        self._ordenar()
+        self._version = version
+        self._marca = marca
+
+    def _cargar_catalogo(self, copia: tuple) -> None:
+        """Cargar todos los renglones de la copia del catálogo"""
+        self._entradas = {}
+        self._palabras = {}
+        self._trigramas = {}
+        self._orden = {}
+        for renglon in copia:
+            self._agregar(renglon)
+            valor = getattr(renglon, self.order.key)
+            self._orden[renglon.id] = (valor is None, valor, renglon.id)
+        self._ordenar()
+        self._copia = copia
+
+    def refresh(self) -> None:
+        """Cargar o actualizar el índice si la tabla cambió"""
+        if self.catalog is not None:
+            copia = self.catalog.all()
+            with self._candado:
+                if copia is not self._copia:
+                    self._cargar_catalogo(copia)
+            return
+        version = get_table_version(self.model.__tablename__)
+        with self._candado:
+            if self._cargado == 0 or monotonic() - self._cargado > TYPEAHEAD_TTL:
+                self._cargar(version)
+            elif version is not None and version != self._version:
+                self._actualizar(version)
+
+    def _prefijo(self, palabra: str) -> set:
+        """Palabras que empiezan con el prefijo"""
+        encontradas = set()
+        posicion = bisect_left(self._ordenadas, palabra)
+        while posicion < len(self._ordenadas) and self._ordenadas[posicion].startswith(palabra):
+            encontradas.add(self._ordenadas[posicion])
+            posicion += 1
+        return encontradas
+
+    def _contiene(self, palabra: str) -> set:
+        """Palabras del índice que contienen el texto"""
+        trigramas = get_trigramas(palabra)
+        if len(trigramas) > 0:
+            conjuntos = sorted((self._trigramas.get(trigrama, set()) for trigrama in trigramas), key=len)
+            return {candidata for candidata in conjuntos[0].intersection(*conjuntos[1:]) if palabra in candidata}
+        if len(self._ordenadas) <= TYPEAHEAD_RECORRIDO:
+            return {ordenada for ordenada in self._ordenadas if palabra in ordenada}
+        return self._prefijo(palabra)
+
+    def search(self, texto: str, grupos: dict = None, pagina: int = 1, por_pagina: int = TYPEAHEAD_POR_PAGINA):
+        """Buscar; entrega los registros (id, texto) de la página y si hay más"""
+        self.refresh()
+        with self._candado:
+            coincidencias = []  # (registros estimados, palabras del índice) de cada palabra escrita
+            for palabra in set(safe_search(texto).split()):
+                encontradas = self._contiene(palabra)
+                estimado = sum(len(self._palabras[encontrada]) for encontrada in encontradas)
+                if estimado == 0:
+                    return [], False
+                coincidencias.append((estimado, encontradas))
+            coincidencias.sort(key=lambda coincidencia: coincidencia[0])
+            if len(coincidencias) > 0 and coincidencias[0][0] <= len(self._ids) // 8:
+                # Se parte de los registros de la palabra más selectiva, las demás sólo los filtran
+                candidatos = set()
+                for encontrada in coincidencias[0][1]:
+                    candidatos.update(self._palabras[encontrada])
+                coincidencias = coincidencias[1:]
+                recorrido = sorted(candidatos, key=self._orden.__getitem__)
+            else:
+                recorrido = self._ids  # Todas son comunes, se recorre el catálogo hasta llenar la página
+            inicio = (max(pagina, 1) - 1) * por_pagina
+            encontrados = []
+            for registro_id in recorrido:
+                entrada = self._entradas[registro_id]
+                if any(entrada.palabras.isdisjoint(encontradas) for _, encontradas in coincidencias):
+                    continue
+                if any(entrada.grupos[campo] != valor for campo, valor in (grupos or {}).items()):
+                    continue
+                encontrados.append(entrada)
+                if len(encontrados) > inicio + por_pagina:
+                    break
+        pagina_actual = [(entrada.id, entrada.texto) for entrada in encontrados[inicio : inicio + por_pagina]]
+        return pagina_actual, len(encontrados) > inicio + por_pagina
+
+    def output(self, campo: str):
+        """Entregar el JSON para Select2 tomando lo escrito del campo, la página y los grupos del formulario"""
+        try:
+            pagina = int(request.form.get("page", 1))
+        except ValueError:
+            pagina = 1
+        grupos = {}
+        for grupo in self.groups:
+            if grupo in request.form:
+                try:
+                    grupos[grupo] = int(request.form[grupo])
+                except ValueError:
+                    return {"results": [], "pagination": {"more": False}}
+        registros, mas = self.search(request.form.get(campo, ""), grupos, pagina)
+        return {
+            "results": [{"id": registro_id, "text": texto} for registro_id, texto in registros],
+            "pagination": {"more": mas},
+        }
@@ -0,0 +1,103 @@
+"""
+Unicidad
+
+Campos que no se pueden repetir entre los registros activos, como la CURP de
+una persona o el e-mail de un usuario.
+
+La base de datos lo garantiza con índices únicos parciales sobre estatus = 'A',
+así un registro eliminado no impide volver a dar de alta el mismo valor.
+
+    __table_args__ = (unique_active_index("personas", "curp"),)
+
+Antes de guardar, una sola consulta entrega todos los campos en conflicto; si
+otra petición gana la carrera, el error del índice también se convierte en los
+campos en conflicto.
+
+    conflictos = save_unique(persona, {"curp": "Esta CURP ya se encuentra en uso."})
+    if conflictos:
+        add_form_errors(form, conflictos)
+        return render_template("personas/new.jinja2", form=form)
+"""
+
+from flask import flash
+from sqlalchemy import Index, case, func, or_, text
+from sqlalchemy.exc import IntegrityError
+
+from lib.unit_of_work import is_unit_of_work
+from orion.extensions import database
+
+
+def get_unique_index_name(tabla: str, campo: str) -> str:
+    """Nombre del índice único parcial de un campo"""
+    return f"{tabla}_{campo}_activo_key"
+
+
+def unique_active_index(tabla: str, campo: str, texto: bool = True) -> Index:
+    """Índice único parcial sobre los registros activos, sin contar nulos ni textos vacíos"""
+    condicion = f"estatus = 'A' AND {campo} IS NOT NULL"
+    if texto:
+        condicion += f" AND {campo} <> ''"
+    return Index(
+        get_unique_index_name(tabla, campo),
+        campo,
+        unique=True,
+        postgresql_where=text(condicion),
+        sqlite_where=text(condicion),
+    )
+
+
+def find_conflicts(model, valores: dict, excluir_id: int = None) -> list:
+    """Entregar los campos cuyo valor ya tiene otro registro activo, con una sola consulta"""
+    valores = {campo: valor for campo, valor in valores.items() if valor is not None and valor != ""}
+    if len(valores) == 0:
+        return []
+    columnas = {campo: getattr(model, campo) for campo in valores}
+    consulta = database.session.query(
+        *[func.max(case((columna == valores[campo], 1), else_=0)).label(campo) for campo, columna in columnas.items()]
+    ).filter(model.estatus == "A")
+    consulta = consulta.filter(or_(*[columna == valores[campo] for campo, columna in columnas.items()]))
+    if excluir_id is not None:
+        consulta = consulta.filter(model.id != excluir_id)
+    with database.session.no_autoflush:
+        renglon = consulta.one()
+    return [campo for campo in valores if getattr(renglon, campo)]
+
+
+def get_conflicts_from_error(model, campos: list, error: IntegrityError) -> list:
+    """Entregar los campos del índice que rechazó el registro"""
+    diagnostico = getattr(error.orig, "diag", None)  # psycopg2 entrega el nombre de la restricción
+    restriccion = getattr(diagnostico, "constraint_name", None) or str(error.orig)
+    return [campo for campo in campos if get_unique_index_name(model.__tablename__, campo) in restriccion]
+
+
+def save_unique(registro, campos: dict) -> dict:
+    """Guardar el registro si no choca con otro activo, si choca entrega {campo: mensaje} de los conflictos"""
+    model = type(registro)
+    valores = {campo: getattr(registro, campo) for campo in campos}
+    conflictos = find_conflicts(model, valores, registro.id)
+    if len(conflictos) == 0:
+        try:
+            # El punto de guardado sólo descarta este registro; si es nuevo se inserta dentro de él
+            with database.session.begin_nested():
+                database.session.add(registro)
+        except IntegrityError as error:
+            if not database.session.is_active:
+                # Falló un cambio pendiente antes del punto de guardado, dentro de una unidad de trabajo no se recupera
+                if is_unit_of_work():
+                    raise
+                database.session.rollback()
+            conflictos = get_conflicts_from_error(model, list(campos), error)
+            conflictos = conflictos or find_conflicts(model, valores, registro.id) or list(campos)
+        else:
+            registro.save()
+            return {}
+    if registro in database.session:
+        database.session.expire(registro)  # Descartar los cambios, el formulario conserva lo capturado
+    return {campo: campos[campo] for campo in conflictos}
+
+
+def add_form_errors(form, conflictos: dict) -> None:
+    """Agregar los conflictos como errores de los campos del formulario y como avisos"""
+    for campo, mensaje in conflictos.items():
+        getattr(form, campo).errors.append(mensaje)
+        flash(mensaje, "warning")
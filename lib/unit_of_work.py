@@ -0,0 +1,114 @@
+"""
+Unit of Work
+
+Dentro de una unidad de trabajo, save(), delete() y recover() de UniversalMixin
+sólo hacen flush (para obtener los id) y hay un solo commit al final.
+
+1) En una vista, agregue el decorador y el commit se hará al terminar la
+petición, o el rollback si hubo un error
+
+    @personas.route("/personas/nuevo", methods=["GET", "POST"])
+    @permission_required(MODULO, Permiso.CREAR)
+    @unit_of_work_request
+    def new():
+
+2) En la CLI o en tareas en el fondo, use el administrador de contexto
+
+    with unit_of_work():
+        for renglon in renglones:
+            Persona(...).save()
+
+Las funciones que deben ejecutarse hasta que los cambios sean visibles para
+los demás, como invalidar cachés, se registran con on_commit(funcion).
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g
+
+from orion.extensions import database
+
+UNIT_OF_WORK_KEY = "unit_of_work"
+ON_COMMIT_KEY = "unit_of_work_on_commit"
+
+
+def is_unit_of_work() -> bool:
+    """¿Hay una unidad de trabajo activa?"""
+    return database.session.info.get(UNIT_OF_WORK_KEY, False)
+
+
+def on_commit(funcion) -> None:
+    """Ejecutar la función después del commit, o de inmediato si no hay unidad de trabajo"""
+    if is_unit_of_work():
+        database.session.info.setdefault(ON_COMMIT_KEY, []).append(funcion)
+    else:
+        funcion()
+
+
+def begin() -> bool:
+    """Iniciar la unidad de trabajo, entrega falso si ya había una"""
+    if is_unit_of_work():
+        return False
+    database.session.info[UNIT_OF_WORK_KEY] = True
+    database.session.info[ON_COMMIT_KEY] = []
+    return True
+
+
+def commit() -> None:
+    """Hacer el commit y ejecutar las funciones pendientes"""
+    funciones = database.session.info.pop(ON_COMMIT_KEY, [])
+    database.session.info.pop(UNIT_OF_WORK_KEY, None)
+    database.session.commit()
+    for funcion in funciones:
+        funcion()
+
+
+def rollback() -> None:
+    """Descartar los cambios y las funciones pendientes"""
+    database.session.info.pop(ON_COMMIT_KEY, None)
+    database.session.info.pop(UNIT_OF_WORK_KEY, None)
+    database.session.rollback()
+
+
+@contextmanager
+def unit_of_work():
+    """Administrador de contexto, si ya hay una unidad de trabajo se integra a ella"""
+    if not begin():
+        yield database.session
+        return
+    try:
+        yield database.session
+        commit()
+    except BaseException:
+        rollback()
+        raise
+
+
+def unit_of_work_request(f):
+    """Decorador para que la vista haga un solo commit al terminar la petición"""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.unit_of_work = begin()
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+
+def init_unit_of_work(app):
+    """Registrar en la app el commit y el rollback al terminar las peticiones"""
+
+    @app.after_request
+    def unit_of_work_commit(response):
+        if g.pop("unit_of_work", False):
+            if response.status_code < 400:
+                commit()
+            else:
+                rollback()
+        return response
+
+    @app.teardown_request
+    def unit_of_work_rollback(error=None):
+        if g.pop("unit_of_work", False):
+            rollback()
@@ -10,6 +10,8 @@ from sqlalchemy.sql.functions import now
 from sqlalchemy.types import CHAR
 
 from config.settings import get_settings
+from lib.table_versions import invalidate_table
+from lib.unit_of_work import is_unit_of_work
 from orion.extensions import database
 
 settings = get_settings()
@@ -39,9 +41,13 @@ class UniversalMixin:
         return None
 
     def save(self):
-        """Guardar registro"""
+        """Guardar registro, dentro de una unidad de trabajo sólo hace flush"""
         database.session.add(self)
-        database.session.commit()
+        if is_unit_of_work():
+            database.session.flush()
+        else:
+            database.session.commit()
+        invalidate_table(self.__tablename__)
         return self
 
     def encode_id(self) -> str:
@@ -5,14 +5,20 @@ Flask App
 import rq
 from flask import Flask
 from redis import Redis
+from sqlalchemy.exc import SQLAlchemyError
 
 from config.settings import Settings
+from lib.cambios import init_cambios
+from lib.statement_guard import init_statement_guard
+from lib.unit_of_work import init_unit_of_work
 from orion.blueprints.areas.views import areas
 from orion.blueprints.atribuciones.views import atribuciones
 from orion.blueprints.atribuciones_ct.views import atribuciones_ct
 from orion.blueprints.bancos.views import bancos
 from orion.blueprints.bitacoras.views import bitacoras
+from orion.blueprints.busquedas.views import busquedas
 from orion.blueprints.carreras.views import carreras
+from orion.blueprints.catalogos.views import catalogos
 from orion.blueprints.centros_trabajos.views import centros_trabajos
 from orion.blueprints.distritos.views import distritos
 from orion.blueprints.domicilios.views import domicilios
@@ -21,6 +27,7 @@ from orion.blueprints.historial_academicos.views import historial_academicos
 from orion.blueprints.historial_puestos.views import historial_puestos
 from orion.blueprints.incapacidades.views import incapacidades
 from orion.blueprints.licencias.views import licencias
+from orion.blueprints.modulos.registry import modulos_registry
 from orion.blueprints.modulos.views import modulos
 from orion.blueprints.niveles_academicos.views import niveles_academicos
 from orion.blueprints.organos.views import organos
@@ -33,10 +40,12 @@ from orion.blueprints.personas_nombramientos.views import personas_nombramientos
 from orion.blueprints.puestos.views import puestos
 from orion.blueprints.puestos_funciones.views import puestos_funciones
 from orion.blueprints.roles.views import roles
+from orion.blueprints.sincronizaciones.views import sincronizaciones
 from orion.blueprints.sistemas.views import sistemas
 from orion.blueprints.tareas.views import tareas
 from orion.blueprints.turnos.views import turnos
 from orion.blueprints.usuarios.models import Usuario
+from orion.blueprints.usuarios.principal import load_principal
 from orion.blueprints.usuarios.views import usuarios
 from orion.blueprints.usuarios_roles.views import usuarios_roles
 from orion.extensions import csrf, database, login_manager, moment
@@ -60,7 +69,9 @@ def create_app():
     app.register_blueprint(atribuciones_ct)
     app.register_blueprint(bancos)
     app.register_blueprint(bitacoras)
+    app.register_blueprint(busquedas)
     app.register_blueprint(carreras)
+    app.register_blueprint(catalogos)
     app.register_blueprint(centros_trabajos)
     app.register_blueprint(distritos)
     app.register_blueprint(domicilios)
@@ -81,6 +92,7 @@ def create_app():
     app.register_blueprint(puestos)
     app.register_blueprint(puestos_funciones)
     app.register_blueprint(roles)
+    app.register_blueprint(sincronizaciones)
     app.register_blueprint(sistemas)
     app.register_blueprint(tareas)
     app.register_blueprint(turnos)
@@ -91,7 +103,10 @@ def create_app():
     extensions(app)
 
     # Inicializar autenticación
-    authentication(Usuario)
+    authentication(Usuario, app.config["USER_LOADER"])
+
+    # Cargar el registro de módulos
+    registries(app)
 
     # Entregar app
     return app
@@ -103,13 +118,27 @@ def extensions(app):
     database.init_app(app)
     login_manager.init_app(app)
     moment.init_app(app)
+    init_unit_of_work(app)
+    init_statement_guard(app)
+    init_cambios(app)
     # socketio.init_app(app)
 
 
-def authentication(user_model):
+def registries(app):
+    """Cargar los registros en memoria"""
+    with app.app_context():
+        try:
+            modulos_registry.load(modulos_registry.get_version())
+        except SQLAlchemyError:
+            pass  # Si aun no existen las tablas, se cargará con la primera consulta
+
+
+def authentication(user_model, user_loader="principal"):
     """Inicializar Flask-Login"""
     login_manager.login_view = "usuarios.login"
 
     @login_manager.user_loader
     def load_user(uid):
+        if user_loader == "principal":
+            return load_principal(int(uid))
         return user_model.query.get(uid)
@@ -21,7 +21,7 @@ class Area(database.Model, UniversalMixin):
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Clave foránea
-    centro_trabajo_id: Mapped[int] = mapped_column(ForeignKey("centros_trabajos.id"))
+    centro_trabajo_id: Mapped[int] = mapped_column(ForeignKey("centros_trabajos.id"), index=True)
     centro_trabajo: Mapped["CentroTrabajo"] = relationship(back_populates="areas")
 
     # Columnas
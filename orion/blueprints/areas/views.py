@@ -3,17 +3,18 @@
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
-from sqlalchemy import or_
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains
 from lib.safe_string import safe_string, safe_message
+from lib.typeahead import TypeaheadIndex
 
 from orion.blueprints.areas.forms import AreaForm
 from orion.blueprints.bitacoras.models import Bitacora
+from orion.blueprints.catalogos.cache import AREAS
 from orion.blueprints.centros_trabajos.models import CentroTrabajo
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.areas.models import Area
@@ -30,50 +31,42 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Áreas"""
+    return {
+        "detalle": {
+            "nombre": renglon.nombre,
+            "url": url_for("areas.detail", area_id=renglon.id),
+        },
+        "centro_trabajo": {
+            "nombre": renglon.centro_trabajo_clave_nombre,
+            "url": url_for("centros_trabajos.detail", centro_trabajo_id=renglon.centro_trabajo_id),
+        },
+    }
+
+
+AREAS_DATATABLE = DataTableSpec(
+    model=Area,
+    columns={
+        "id": Area.id,
+        "nombre": Area.nombre,
+        "centro_trabajo_id": Area.centro_trabajo_id,
+        "centro_trabajo_clave_nombre": CentroTrabajo.clave_nombre,
+    },
+    joins=[(CentroTrabajo, Area.centro_trabajo_id == CentroTrabajo.id)],
+    filters=[
+        filter_contains("nombre", Area.nombre),
+        filter_contains("centro_trabajo", CentroTrabajo.clave, CentroTrabajo.nombre),
+    ],
+    order=[Area.nombre],
+    row=datatable_renglon,
+)
+
+
 @areas.route("/areas/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Áreas"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Area.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"])
-        if nombre != "":
-            consulta = consulta.filter(Area.nombre.contains(nombre))
-    # Luego filtrar por columnas de otras tablas
-    if "centro_trabajo" in request.form:
-        centro_trabajo = safe_string(request.form["centro_trabajo"])
-        if centro_trabajo != "":
-            consulta = consulta.join(CentroTrabajo)
-            consulta = consulta.filter(
-                or_(CentroTrabajo.clave.contains(centro_trabajo), CentroTrabajo.nombre.contains(centro_trabajo))
-            )
-    # Ordenar y paginar
-    registros = consulta.order_by(Area.nombre).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "nombre": resultado.nombre,
-                    "url": url_for("areas.detail", area_id=resultado.id),
-                },
-                "centro_trabajo": {
-                    "nombre": resultado.centro_trabajo.clave_nombre,
-                    "url": url_for("centros_trabajos.detail", centro_trabajo_id=resultado.centro_trabajo.id),
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return AREAS_DATATABLE.output()
 
 
 @areas.route("/areas")
@@ -124,8 +117,8 @@ def new():
         )
         area.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Área {area.nombre}"),
             url=url_for("areas.detail", area_id=area.id),
         )
@@ -156,8 +149,8 @@ def edit(area_id):
             area.centro_trabajo_id = form.centro_trabajo.data
             area.save()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Área {area.nombre}"),
                 url=url_for("areas.detail", area_id=area.id),
             )
@@ -177,8 +170,8 @@ def delete(area_id):
     if area.estatus == "A":
         area.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Área {area.nombre}"),
             url=url_for("areas.detail", area_id=area.id),
         )
@@ -195,8 +188,8 @@ def recover(area_id):
     if area.estatus == "B":
         area.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Área {area.nombre}"),
             url=url_for("areas.detail", area_id=area.id),
         )
@@ -205,22 +198,18 @@ def recover(area_id):
     return redirect(url_for("areas.detail", area_id=area.id))
 
 
+AREAS_TYPEAHEAD = TypeaheadIndex(
+    model=Area,
+    columns={"nombre": Area.nombre, "centro_trabajo_id": Area.centro_trabajo_id},
+    text=lambda renglon: renglon.nombre,
+    search=["nombre"],
+    order=Area.nombre,
+    groups=["centro_trabajo_id"],
+    catalog=AREAS,
+)
+
+
 @areas.route("/areas/query_areas_json", methods=["POST"])
 def query_areas_json():
     """Proporcionar el JSON de Áreas para elegir en un Select2"""
-    consulta = Area.query.filter_by(estatus="A")
-    if "centro_trabajo_id" in request.form:
-        consulta = consulta.filter(Area.centro_trabajo_id == request.form["centro_trabajo_id"])
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"]).upper()
-        if nombre != "":
-            consulta = consulta.filter(Area.nombre.contains(nombre))
-    results = []
-    for area in consulta.order_by(Area.nombre).limit(15).all():
-        results.append(
-            {
-                "id": area.id,
-                "text": area.nombre,
-            }
-        )
-    return {"results": results, "pagination": {"more": False}}
+    return AREAS_TYPEAHEAD.output("nombre")
@@ -7,6 +7,7 @@ from typing import List, Optional
 from sqlalchemy import Enum, ForeignKey, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from lib.full_text import FullTextSearch
 from lib.universal_mixin import UniversalMixin
 from orion.extensions import database
 
@@ -33,9 +34,9 @@ class Atribucion(database.Model, UniversalMixin):
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Clave foránea
-    funcion_id: Mapped[int] = mapped_column(ForeignKey("puestos_funciones.id"))
+    funcion_id: Mapped[int] = mapped_column(ForeignKey("puestos_funciones.id"), index=True)
     funcion: Mapped["PuestoFuncion"] = relationship(back_populates="atribuciones")
-    centro_trabajo_id: Mapped[int] = mapped_column(ForeignKey("centros_trabajos.id"))
+    centro_trabajo_id: Mapped[int] = mapped_column(ForeignKey("centros_trabajos.id"), index=True)
     centro_trabajo: Mapped["CentroTrabajo"] = relationship(back_populates="atribuciones")
 
     # Columnas
@@ -47,3 +48,7 @@ class Atribucion(database.Model, UniversalMixin):
     def __repr__(self):
         """Representación"""
         return f"<Atribucion {self.id}>"
+
+
+# Búsqueda de texto completo en norma, fundamento y fragmento
+ATRIBUCIONES_TEXTO = FullTextSearch(Atribucion, [Atribucion.norma, Atribucion.fundamento, Atribucion.fragmento])
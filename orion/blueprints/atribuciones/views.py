@@ -3,17 +3,18 @@ Atribuciones, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains, filter_equal
+from lib.full_text import resaltar
 from lib.safe_string import safe_string, safe_message, safe_clave
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
-from orion.blueprints.atribuciones.models import Atribucion
+from orion.blueprints.atribuciones.models import ATRIBUCIONES_TEXTO, Atribucion
 from orion.blueprints.atribuciones.forms import AtribucionForm
 from orion.blueprints.puestos_funciones.models import PuestoFuncion
 from orion.blueprints.puestos.models import Puesto
@@ -31,69 +32,68 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Atribuciones"""
+    return {
+        "detalle": {
+            "id": renglon.id,
+            "url": url_for("atribuciones.detail", atribucion_id=renglon.id),
+        },
+        "funcion": {
+            "nombre": renglon.funcion_nombre,
+            "url": url_for("puestos_funciones.detail", puesto_funcion_id=renglon.funcion_id),
+        },
+        "tipo_cargo": Atribucion.CARGOS[renglon.tipo_cargo],
+        "puesto": {
+            "texto": renglon.puesto_clave,
+            "descripcion": renglon.puesto_nombre,
+            "url": url_for("puestos.detail", puesto_id=renglon.puesto_id),
+        },
+        "centro_trabajo": {
+            "texto": renglon.centro_trabajo_clave,
+            "descripcion": renglon.centro_trabajo_nombre,
+            "url": url_for("centros_trabajos.detail", centro_trabajo_id=renglon.centro_trabajo_id),
+        },
+        "fragmento": resaltar(renglon.fragmento),
+    }
+
+
+ATRIBUCIONES_DATATABLE = DataTableSpec(
+    model=Atribucion,
+    columns={
+        "id": Atribucion.id,
+        "tipo_cargo": Atribucion.tipo_cargo,
+        "funcion_id": Atribucion.funcion_id,
+        "funcion_nombre": PuestoFuncion.nombre,
+        "puesto_id": Puesto.id,
+        "puesto_clave": Puesto.clave,
+        "puesto_nombre": Puesto.nombre,
+        "centro_trabajo_id": Atribucion.centro_trabajo_id,
+        "centro_trabajo_clave": CentroTrabajo.clave,
+        "centro_trabajo_nombre": CentroTrabajo.nombre,
+    },
+    joins=[
+        (PuestoFuncion, Atribucion.funcion_id == PuestoFuncion.id),
+        (Puesto, PuestoFuncion.puesto_id == Puesto.id),
+        (CentroTrabajo, Atribucion.centro_trabajo_id == CentroTrabajo.id),
+    ],
+    filters=[
+        filter_equal("atribucion_id", Atribucion.id),
+        filter_equal("tipo", Atribucion.tipo_cargo),
+        filter_contains("funcion", PuestoFuncion.nombre, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+        filter_contains("centro_trabajo", CentroTrabajo.clave, limpiar=safe_clave),
+        filter_contains("puesto", Puesto.clave, limpiar=safe_clave),
+    ],
+    order=[Atribucion.id.desc()],
+    row=datatable_renglon,
+    search=ATRIBUCIONES_TEXTO,
+)
+
+
 @atribuciones.route("/atribuciones/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Atribuciones"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Atribucion.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter(Atribucion.estatus == request.form["estatus"])
-    else:
-        consulta = consulta.filter(Atribucion.estatus == "A")
-    if "atribucion_id" in request.form:
-        consulta = consulta.filter(Atribucion.id == request.form["atribucion_id"])
-    if "tipo" in request.form:
-        consulta = consulta.filter(Atribucion.tipo_cargo == request.form["tipo"])
-    # Luego filtrar por columnas de otras tablas
-    if "funcion" in request.form:
-        funcion = safe_string(request.form["funcion"], save_enie=True)
-        if funcion != "":
-            consulta = consulta.join(PuestoFuncion)
-            consulta = consulta.filter(PuestoFuncion.nombre.contains(funcion))
-    if "centro_trabajo" in request.form:
-        centro_trabajo = safe_clave(request.form["centro_trabajo"])
-        if centro_trabajo != "":
-            consulta = consulta.join(CentroTrabajo)
-            consulta = consulta.filter(CentroTrabajo.clave.contains(centro_trabajo))
-    # if "puesto" in request.form:
-    # TODO: Hacer join con Puesto a PuestoFuncion con Atribuciones
-    #     puesto = safe_clave(request.form["puesto"])
-    #     if puesto != "":
-    #         consulta = consulta.join(Puesto)
-    # Ordenar y paginar
-    registros = consulta.order_by(Atribucion.id.desc()).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "id": resultado.id,
-                    "url": url_for("atribuciones.detail", atribucion_id=resultado.id),
-                },
-                "funcion": {
-                    "nombre": resultado.funcion.nombre,
-                    "url": url_for("puestos_funciones.detail", puesto_funcion_id=resultado.funcion.id),
-                },
-                "tipo_cargo": Atribucion.CARGOS[resultado.tipo_cargo],
-                "puesto": {
-                    "texto": resultado.funcion.puesto.clave,
-                    "descripcion": resultado.funcion.puesto.nombre,
-                    "url": url_for("puestos.detail", puesto_id=resultado.funcion.puesto.id),
-                },
-                "centro_trabajo": {
-                    "texto": resultado.centro_trabajo.clave,
-                    "descripcion": resultado.centro_trabajo.nombre,
-                    "url": url_for("centros_trabajos.detail", centro_trabajo_id=resultado.centro_trabajo.id),
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return ATRIBUCIONES_DATATABLE.output()
 
 
 @atribuciones.route("/atribuciones")
@@ -144,8 +144,8 @@ def new():
         )
         atribucion.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Atribución {atribucion.id}"),
             url=url_for("atribuciones.detail", atribucion_id=atribucion.id),
         )
@@ -170,8 +170,8 @@ def edit(atribucion_id):
         atribucion.fragmento = safe_string(form.fragmento.data, save_enie=True)
         atribucion.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Editado Atribución {atribucion.norma}"),
             url=url_for("atribuciones.detail", atribucion_id=atribucion.id),
         )
@@ -193,8 +193,8 @@ def delete(atribucion_id):
     if atribucion.estatus == "A":
         atribucion.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Atribución {atribucion.id}"),
             url=url_for("atribuciones.detail", atribucion_id=atribucion.id),
         )
@@ -211,8 +211,8 @@ def recover(atribucion_id):
     if atribucion.estatus == "B":
         atribucion.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Atribución {atribucion.id}"),
             url=url_for("atribuciones.detail", atribucion_id=atribucion.id),
         )
@@ -7,6 +7,7 @@ from typing import List
 from sqlalchemy import ForeignKey, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from lib.full_text import FullTextSearch
 from lib.universal_mixin import UniversalMixin
 from orion.extensions import database
 
@@ -21,7 +22,7 @@ class AtribucionCT(database.Model, UniversalMixin):
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Clave foránea
-    area_id: Mapped[int] = mapped_column(ForeignKey("areas.id"))
+    area_id: Mapped[int] = mapped_column(ForeignKey("areas.id"), index=True)
     area: Mapped["Area"] = relationship(back_populates="atribuciones_ct")
 
     # Columnas
@@ -32,3 +33,7 @@ class AtribucionCT(database.Model, UniversalMixin):
     def __repr__(self):
         """Representación"""
         return f"<AtribucionCT {self.id}>"
+
+
+# Búsqueda de texto completo en norma, fundamento y fragmento
+ATRIBUCIONES_CT_TEXTO = FullTextSearch(AtribucionCT, [AtribucionCT.norma, AtribucionCT.fundamento, AtribucionCT.fragmento])
@@ -3,17 +3,18 @@ Atribuciones CT, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains, filter_equal
+from lib.full_text import resaltar
 from lib.safe_string import safe_string, safe_message
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
-from orion.blueprints.atribuciones_ct.models import AtribucionCT
+from orion.blueprints.atribuciones_ct.models import ATRIBUCIONES_CT_TEXTO, AtribucionCT
 from orion.blueprints.areas.models import Area
 from orion.blueprints.centros_trabajos.models import CentroTrabajo
 from orion.blueprints.atribuciones_ct.forms import AtribucionCTForm
@@ -30,58 +31,55 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Atribuciones CT"""
+    return {
+        "detalle": {
+            "id": renglon.id,
+            "url": url_for("atribuciones_ct.detail", atribucion_ct_id=renglon.id),
+        },
+        "centro_trabajo": {
+            "clave": renglon.centro_trabajo_clave,
+            "nombre": renglon.centro_trabajo_nombre,
+            "url": url_for("centros_trabajos.detail", centro_trabajo_id=renglon.centro_trabajo_id),
+        },
+        "area": {
+            "nombre": renglon.area_nombre,
+            "url": url_for("areas.detail", area_id=renglon.area_id),
+        },
+        "fragmento": resaltar(renglon.fragmento),
+    }
+
+
+ATRIBUCIONES_CT_DATATABLE = DataTableSpec(
+    model=AtribucionCT,
+    columns={
+        "id": AtribucionCT.id,
+        "area_id": AtribucionCT.area_id,
+        "area_nombre": Area.nombre,
+        "centro_trabajo_id": Area.centro_trabajo_id,
+        "centro_trabajo_clave": CentroTrabajo.clave,
+        "centro_trabajo_nombre": CentroTrabajo.nombre,
+    },
+    joins=[
+        (Area, AtribucionCT.area_id == Area.id),
+        (CentroTrabajo, Area.centro_trabajo_id == CentroTrabajo.id),
+    ],
+    filters=[
+        filter_equal("atribucion_ct_id", AtribucionCT.id),
+        filter_contains("area", Area.nombre, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+        filter_contains("centro_trabajo", CentroTrabajo.clave, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+    ],
+    order=[AtribucionCT.id.desc()],
+    row=datatable_renglon,
+    search=ATRIBUCIONES_CT_TEXTO,
+)
+
+
 @atribuciones_ct.route("/atribuciones_ct/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Atribuciones CT"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = AtribucionCT.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter(AtribucionCT.estatus == request.form["estatus"])
-    else:
-        consulta = consulta.filter(AtribucionCT.estatus == "A")
-    if "atribucion_ct_id" in request.form:
-        consulta = consulta.filter(AtribucionCT.id == request.form["atribucion_ct_id"])
-    # Luego filtrar por columnas de otras tablas
-    if "area" in request.form:
-        nombre = safe_string(request.form["area"], save_enie=True)
-        if nombre != "":
-            consulta = consulta.join(Area)
-            consulta = consulta.filter(Area.nombre.contains(nombre))
-    if "centro_trabajo" in request.form:
-        clave = safe_string(request.form["centro_trabajo"], save_enie=True)
-        if clave != "":
-            if "area" not in request.form:
-                consulta = consulta.join(Area)
-            consulta = consulta.join(CentroTrabajo, Area.centro_trabajo_id == CentroTrabajo.id)
-            consulta = consulta.filter(CentroTrabajo.clave.contains(clave))
-    # Ordenar y paginar
-    registros = consulta.order_by(AtribucionCT.id.desc()).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "id": resultado.id,
-                    "url": url_for("atribuciones_ct.detail", atribucion_ct_id=resultado.id),
-                },
-                "centro_trabajo": {
-                    "clave": resultado.area.centro_trabajo.clave,
-                    "nombre": resultado.area.centro_trabajo.nombre,
-                    "url": url_for("centros_trabajos.detail", centro_trabajo_id=resultado.area.centro_trabajo.id),
-                },
-                "area": {
-                    "nombre": resultado.area.nombre,
-                    "url": url_for("areas.detail", area_id=resultado.area.id),
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return ATRIBUCIONES_CT_DATATABLE.output()
 
 
 @atribuciones_ct.route("/atribuciones_ct")
@@ -133,8 +131,8 @@ def new():
         )
         atribucion.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Atribución CT {atribucion.id}"),
             url=url_for("atribuciones_ct.detail", atribucion_id=atribucion.id),
         )
@@ -167,8 +165,8 @@ def edit(atribucion_ct_id):
         atribucion_ct.fragmento = safe_string(form.fragmento.data, save_enie=True)
         atribucion_ct.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Editado Atribución CT {atribucion_ct.norma}"),
             url=url_for("atribuciones_ct.detail", atribucion_ct_id=atribucion_ct.id),
         )
@@ -189,8 +187,8 @@ def delete(atribucion_ct_id):
     if atribucion_ct.estatus == "A":
         atribucion_ct.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Atribución CT {atribucion_ct.id}"),
             url=url_for("atribuciones_ct.detail", atribucion_ct_id=atribucion_ct.id),
         )
@@ -207,8 +205,8 @@ def recover(atribucion_ct_id):
     if atribucion_ct.estatus == "B":
         atribucion_ct.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Atribución CT {atribucion_ct.id}"),
             url=url_for("atribuciones_ct.detail", atribucion_ct_id=atribucion_ct.id),
         )
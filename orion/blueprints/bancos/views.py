@@ -3,14 +3,14 @@ Bancos, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains
 from lib.safe_string import safe_string, safe_message
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.bancos.models import Banco
@@ -28,38 +28,34 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Bancos"""
+    return {
+        "detalle": {
+            "nombre": renglon.nombre,
+            "url": url_for("bancos.detail", banco_id=renglon.id),
+        },
+    }
+
+
+BANCOS_DATATABLE = DataTableSpec(
+    model=Banco,
+    columns={
+        "id": Banco.id,
+        "nombre": Banco.nombre,
+    },
+    filters=[
+        filter_contains("nombre", Banco.nombre),
+    ],
+    order=[Banco.nombre],
+    row=datatable_renglon,
+)
+
+
 @bancos.route("/bancos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Bancos"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Banco.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"])
-        if nombre != "":
-            consulta = consulta.filter(Banco.nombre.contains(nombre))
-    # Ordenar y paginar
-    registros = consulta.order_by(Banco.nombre).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "nombre": resultado.nombre,
-                    "url": url_for("bancos.detail", banco_id=resultado.id),
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return BANCOS_DATATABLE.output()
 
 
 @bancos.route("/bancos")
@@ -107,8 +103,8 @@ def new():
         banco = Banco(nombre=nombre)
         banco.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Banco {banco.nombre}"),
             url=url_for("bancos.detail", banco_id=banco.id),
         )
@@ -138,8 +134,8 @@ def edit(banco_id):
             banco.nombre = safe_string(form.nombre.data)
             banco.save()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Banco {banco.nombre}"),
                 url=url_for("bancos.detail", banco_id=banco.id),
             )
@@ -158,8 +154,8 @@ def delete(banco_id):
     if banco.estatus == "A":
         banco.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Banco {banco.nombre}"),
             url=url_for("bancos.detail", banco_id=banco.id),
         )
@@ -176,8 +172,8 @@ def recover(banco_id):
     if banco.estatus == "B":
         banco.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Banco {banco.nombre}"),
             url=url_for("bancos.detail", banco_id=banco.id),
         )
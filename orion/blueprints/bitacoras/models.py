@@ -6,6 +6,8 @@ from sqlalchemy import ForeignKey, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from orion.extensions import database
+from lib.auditoria import push_registro
+from lib.indices import active_index
 from lib.universal_mixin import UniversalMixin
 
 
@@ -15,19 +17,31 @@ class Bitacora(database.Model, UniversalMixin):
     # Nombre de la tabla
     __tablename__ = "bitacoras"
 
+    # Índices parciales de los activos con las columnas del filtro y del orden de los listados
+    __table_args__ = (
+        active_index("bitacoras", "usuario_id", "id"),
+        active_index("bitacoras", "modulo_id", "id"),
+    )
+
     # Clave primaria
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Claves foráneas
-    modulo_id: Mapped[int] = mapped_column(ForeignKey("modulos.id"))
+    modulo_id: Mapped[int] = mapped_column(ForeignKey("modulos.id"), index=True)
     modulo: Mapped["Modulo"] = relationship(back_populates="bitacoras")
-    usuario_id: Mapped[int] = mapped_column(ForeignKey("usuarios.id"))
+    usuario_id: Mapped[int] = mapped_column(ForeignKey("usuarios.id"), index=True)
     usuario: Mapped["Usuario"] = relationship(back_populates="bitacoras")
 
     # Columnas
     descripcion: Mapped[str] = mapped_column(String(256))
     url: Mapped[str] = mapped_column(String(512))
 
+    def save(self):
+        """Guardar en la cola de auditoría, o en la base de datos si no está disponible"""
+        if push_registro(self):
+            return self
+        return super().save()
+
     def __repr__(self):
         """Representación"""
         return f"<Bitacora {self.creado} {self.descripcion}>"
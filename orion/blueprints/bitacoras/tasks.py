@@ -0,0 +1,16 @@
+"""
+Bitácoras, tareas en el fondo
+"""
+
+from lib.auditoria import flush
+from orion.app import create_app
+from orion.extensions import database
+
+app = create_app()
+app.app_context().push()
+database.app = app
+
+
+def vaciar_auditoria() -> int:
+    """Insertar por lotes las bitácoras y entradas-salidas pendientes en la cola"""
+    return flush()
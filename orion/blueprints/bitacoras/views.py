@@ -2,7 +2,7 @@
 Bitácoras
 """
 
-from flask import Blueprint, render_template, request, url_for
+from flask import Blueprint, render_template, url_for
 from flask_login import current_user, login_required
 
 from orion.blueprints.bitacoras.models import Bitacora
@@ -10,7 +10,8 @@ from orion.blueprints.modulos.models import Modulo
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.usuarios.models import Usuario
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains, filter_equal
+from lib.datatables import CONTEO_ESTIMADO
 from lib.safe_string import safe_email, safe_string
 
 MODULO = "BITACORAS"
@@ -25,61 +26,57 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Bitacoras"""
+    return {
+        "creado": renglon.creado.strftime("%Y-%m-%d %H:%M:%S"),
+        "usuario": {
+            "email": renglon.usuario_email,
+            "url": url_for("usuarios.detail", usuario_id=renglon.usuario_id) if current_user.can_view("USUARIOS") else "",
+        },
+        "modulo": {
+            "nombre": renglon.modulo_nombre,
+            "url": url_for("modulos.detail", modulo_id=renglon.modulo_id) if current_user.can_view("MODULOS") else "",
+        },
+        "vinculo": {
+            "descripcion": renglon.descripcion,
+            "url": renglon.url,
+        },
+    }
+
+
+BITACORAS_DATATABLE = DataTableSpec(
+    model=Bitacora,
+    columns={
+        "id": Bitacora.id,
+        "creado": Bitacora.creado,
+        "descripcion": Bitacora.descripcion,
+        "url": Bitacora.url,
+        "usuario_id": Bitacora.usuario_id,
+        "usuario_email": Usuario.email,
+        "modulo_id": Bitacora.modulo_id,
+        "modulo_nombre": Modulo.nombre,
+    },
+    joins=[
+        (Usuario, Bitacora.usuario_id == Usuario.id),
+        (Modulo, Bitacora.modulo_id == Modulo.id),
+    ],
+    filters=[
+        filter_equal("modulo_id", Bitacora.modulo_id),
+        filter_equal("usuario_id", Bitacora.usuario_id),
+        filter_contains("modulo_nombre", Modulo.nombre, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+        filter_contains("usuario_email", Usuario.email, limpiar=lambda texto: safe_email(texto, search_fragment=True)),
+    ],
+    keyset=[Bitacora.id],
+    count=CONTEO_ESTIMADO,
+    row=datatable_renglon,
+)
+
+
 @bitacoras.route("/bitacoras/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Bitacoras"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Bitacora.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter(Bitacora.estatus == request.form["estatus"])
-    else:
-        consulta = consulta.filter(Bitacora.estatus == "A")
-    if "modulo_id" in request.form:
-        consulta = consulta.filter(Bitacora.modulo_id == request.form["modulo_id"])
-    if "usuario_id" in request.form:
-        consulta = consulta.filter(Bitacora.usuario_id == request.form["usuario_id"])
-    # Luego filtrar por columnas de otras tablas
-    if "modulo_nombre" in request.form:
-        modulo_nombre = safe_string(request.form["modulo_nombre"], save_enie=True)
-        if modulo_nombre != "":
-            consulta = consulta.join(Modulo).filter(Modulo.nombre.contains(modulo_nombre))
-    if "usuario_email" in request.form:
-        try:
-            usuario_email = safe_email(request.form["usuario_email"], search_fragment=True)
-            if usuario_email != "":
-                consulta = consulta.join(Usuario).filter(Usuario.email.contains(usuario_email))
-        except ValueError:
-            pass
-    # Ordenar y paginar
-    registros = consulta.order_by(Bitacora.id.desc()).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "creado": resultado.creado.strftime("%Y-%m-%d %H:%M:%S"),
-                "usuario": {
-                    "email": resultado.usuario.email,
-                    "url": (
-                        url_for("usuarios.detail", usuario_id=resultado.usuario_id) if current_user.can_view("USUARIOS") else ""
-                    ),
-                },
-                "modulo": {
-                    "nombre": resultado.modulo.nombre,
-                    "url": url_for("modulos.detail", modulo_id=resultado.modulo_id) if current_user.can_view("MODULOS") else "",
-                },
-                "vinculo": {
-                    "descripcion": resultado.descripcion,
-                    "url": resultado.url,
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return BITACORAS_DATATABLE.output()
 
 
 @bitacoras.route("/bitacoras")
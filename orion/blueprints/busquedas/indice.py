@@ -0,0 +1,166 @@
+"""
+Búsquedas, índice
+
+La tabla busquedas tiene un renglón por cada registro de los módulos
+registrados aquí, con su título, su descripción y un texto sin acentos ni
+signos (safe_search) con todo lo que se puede buscar. Se escribe desde los
+eventos after_insert y after_update de cada modelo, en la misma transacción,
+así el borrado lógico también cambia su estatus.
+
+El buscador global consulta sólo esta tabla, en PostgreSQL con el índice GIN
+de trigramas, y entrega los mejores BUSQUEDA_POR_MODULO de cada módulo que el
+usuario puede ver.
+
+Para llenar la tabla con los registros existentes use
+
+    orion busquedas reindexar
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import event, func, insert, update
+
+from lib.safe_string import safe_search
+from orion.blueprints.areas.models import Area
+from orion.blueprints.atribuciones.models import Atribucion
+from orion.blueprints.busquedas.models import Busqueda
+from orion.blueprints.centros_trabajos.models import CentroTrabajo
+from orion.blueprints.personas.models import Persona
+from orion.blueprints.puestos.models import Puesto
+from orion.blueprints.usuarios.models import Usuario
+from orion.extensions import database
+
+BUSQUEDA_POR_MODULO = 5
+
+BusquedaFuente = namedtuple("BusquedaFuente", ["modulo", "model", "endpoint", "parametro", "titulo", "descripcion", "textos"])
+
+FUENTES = {}  # modulo -> BusquedaFuente
+
+
+def formar_renglon(fuente: BusquedaFuente, registro) -> dict:
+    """Renglón de busquedas para el registro"""
+    textos = [str(texto) for texto in fuente.textos(registro) if texto is not None]
+    return {
+        "modulo": fuente.modulo,
+        "registro_id": registro.id,
+        "titulo": str(fuente.titulo(registro))[:256],
+        "descripcion": str(fuente.descripcion(registro) or "")[:512],
+        "texto": safe_search(" ".join(textos), max_len=1024),
+        "estatus": registro.estatus,
+    }
+
+
+def formar_persona_nombre(persona) -> str:
+    """Nombre completo de la persona, el apellido segundo puede ser nulo"""
+    return " ".join(nombre for nombre in (persona.nombres, persona.apellido_primero, persona.apellido_segundo) if nombre)
+
+
+def register_busqueda(modulo: str, model, endpoint: str, parametro: str, titulo, descripcion, textos) -> None:
+    """Registrar un modelo en el buscador global y escuchar sus inserciones y modificaciones"""
+    fuente = BusquedaFuente(modulo, model, endpoint, parametro, titulo, descripcion, textos)
+    FUENTES[modulo] = fuente
+
+    def indexar(mapper, connection, registro):
+        """Actualizar o insertar el renglón de busquedas del registro"""
+        renglon = formar_renglon(fuente, registro)
+        tabla = Busqueda.__table__
+        resultado = connection.execute(
+            update(tabla)
+            .where(tabla.c.modulo == fuente.modulo, tabla.c.registro_id == registro.id)
+            .values(
+                titulo=renglon["titulo"],
+                descripcion=renglon["descripcion"],
+                texto=renglon["texto"],
+                estatus=renglon["estatus"],
+                modificado=func.now(),
+            )
+        )
+        if resultado.rowcount == 0:
+            connection.execute(insert(tabla).values(**renglon))
+
+    event.listen(model, "after_insert", indexar)
+    event.listen(model, "after_update", indexar)
+
+
+def buscar(texto: str, modulos: list, por_modulo: int = BUSQUEDA_POR_MODULO) -> dict:
+    """Buscar en los módulos dados con una sola consulta; entrega modulo -> renglones"""
+    palabras = safe_search(texto).split()
+    if len(palabras) == 0 or len(modulos) == 0:
+        return {}
+    if database.session.get_bind().dialect.name == "postgresql":
+        relevancia = func.similarity(Busqueda.texto, " ".join(palabras)).desc()
+    else:
+        relevancia = Busqueda.titulo
+    lugar = func.row_number().over(partition_by=Busqueda.modulo, order_by=[relevancia, Busqueda.id]).label("lugar")
+    subconsulta = (
+        database.session.query(Busqueda.modulo, Busqueda.registro_id, Busqueda.titulo, Busqueda.descripcion, lugar)
+        .filter(Busqueda.estatus == "A")
+        .filter(Busqueda.modulo.in_(modulos))
+        .filter(*[Busqueda.texto.contains(palabra) for palabra in palabras])
+        .subquery()
+    )
+    consulta = (
+        database.session.query(subconsulta)
+        .filter(subconsulta.c.lugar <= por_modulo)
+        .order_by(subconsulta.c.modulo, subconsulta.c.lugar)
+    )
+    grupos = {}
+    for renglon in consulta.all():
+        grupos.setdefault(renglon.modulo, []).append(renglon)
+    return grupos
+
+
+register_busqueda(
+    modulo="PERSONAS",
+    model=Persona,
+    endpoint="personas.detail",
+    parametro="persona_id",
+    titulo=formar_persona_nombre,
+    descripcion=lambda persona: f"CURP {persona.curp}, RFC {persona.rfc}",
+    textos=lambda persona: [formar_persona_nombre(persona), persona.curp, persona.rfc, persona.numero_empleado],
+)
+register_busqueda(
+    modulo="USUARIOS",
+    model=Usuario,
+    endpoint="usuarios.detail",
+    parametro="usuario_id",
+    titulo=lambda usuario: usuario.email,
+    descripcion=lambda usuario: usuario.nombre,
+    textos=lambda usuario: [usuario.email, usuario.nombre],
+)
+register_busqueda(
+    modulo="CENTROS TRABAJOS",
+    model=CentroTrabajo,
+    endpoint="centros_trabajos.detail",
+    parametro="centro_trabajo_id",
+    titulo=lambda centro_trabajo: centro_trabajo.clave_nombre,
+    descripcion=lambda centro_trabajo: centro_trabajo.telefono,
+    textos=lambda centro_trabajo: [centro_trabajo.clave, centro_trabajo.nombre],
+)
+register_busqueda(
+    modulo="AREAS",
+    model=Area,
+    endpoint="areas.detail",
+    parametro="area_id",
+    titulo=lambda area: area.nombre,
+    descripcion=lambda area: "",
+    textos=lambda area: [area.nombre],
+)
+register_busqueda(
+    modulo="PUESTOS",
+    model=Puesto,
+    endpoint="puestos.detail",
+    parametro="puesto_id",
+    titulo=lambda puesto: puesto.clave_nombre,
+    descripcion=lambda puesto: puesto.tipo_cargo,
+    textos=lambda puesto: [puesto.clave, puesto.nombre],
+)
+register_busqueda(
+    modulo="ATRIBUCIONES",
+    model=Atribucion,
+    endpoint="atribuciones.detail",
+    parametro="atribucion_id",
+    titulo=lambda atribucion: atribucion.norma,
+    descripcion=lambda atribucion: atribucion.fragmento,
+    textos=lambda atribucion: [atribucion.norma, atribucion.fundamento, atribucion.fragmento],
+)
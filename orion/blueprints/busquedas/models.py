@@ -0,0 +1,45 @@
+"""
+Búsquedas, modelos
+"""
+
+from sqlalchemy import DDL, Index, String, UniqueConstraint, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+from lib.universal_mixin import UniversalMixin
+from orion.extensions import database
+
+
+class Busqueda(database.Model, UniversalMixin):
+    """Busqueda, un renglón por cada registro que se puede encontrar en el buscador global"""
+
+    # Nombre de la tabla
+    __tablename__ = "busquedas"
+    __table_args__ = (
+        UniqueConstraint("modulo", "registro_id", name="busquedas_modulo_registro_id_key"),
+        Index(
+            "busquedas_texto_trgm",
+            "texto",
+            postgresql_using="gin",
+            postgresql_ops={"texto": "gin_trgm_ops"},
+        ),
+    )
+
+    # Clave primaria
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    # Columnas
+    modulo: Mapped[str] = mapped_column(String(64), index=True)
+    registro_id: Mapped[int]
+    titulo: Mapped[str] = mapped_column(String(256))
+    descripcion: Mapped[str] = mapped_column(String(512))
+    texto: Mapped[str] = mapped_column(String(1024))
+
+    def __repr__(self):
+        """Representación"""
+        return f"<Busqueda {self.id}>"
+
+
+# La extensión pg_trgm debe existir antes de crear el índice
+event.listen(
+    Busqueda.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
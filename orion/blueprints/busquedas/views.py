@@ -0,0 +1,49 @@
+"""
+Búsquedas, vistas
+"""
+
+from flask import Blueprint, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from orion.blueprints.busquedas.indice import FUENTES, buscar
+
+busquedas = Blueprint("busquedas", __name__, template_folder="templates")
+
+
+@busquedas.before_request
+@login_required
+def before_request():
+    """Permiso por defecto"""
+
+
+def buscar_permitidos(texto: str) -> list:
+    """Buscar sólo en los módulos que el usuario puede ver; entrega una lista de grupos"""
+    modulos = [modulo for modulo in FUENTES if current_user.can_view(modulo)]
+    grupos = []
+    for modulo, renglones in buscar(texto, modulos).items():
+        fuente = FUENTES[modulo]
+        resultados = []
+        for renglon in renglones:
+            resultados.append(
+                {
+                    "id": renglon.registro_id,
+                    "titulo": renglon.titulo,
+                    "descripcion": renglon.descripcion,
+                    "url": url_for(fuente.endpoint, **{fuente.parametro: renglon.registro_id}),
+                }
+            )
+        grupos.append({"modulo": modulo, "resultados": resultados})
+    return grupos
+
+
+@busquedas.route("/busquedas")
+def search():
+    """Buscador global"""
+    texto = request.args.get("q", "")
+    return render_template("busquedas/search.jinja2", q=texto, grupos=buscar_permitidos(texto))
+
+
+@busquedas.route("/busquedas/query_busquedas_json", methods=["POST"])
+def query_busquedas_json():
+    """Proporcionar el JSON del buscador global"""
+    return {"grupos": buscar_permitidos(request.form.get("q", ""))}
@@ -4,15 +4,15 @@ Carreras, vistas
 
 import json
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains
 from lib.safe_string import safe_message, safe_string
 from orion.blueprints.bitacoras.models import Bitacora
 from orion.blueprints.carreras.forms import CarreraForm
 from orion.blueprints.carreras.models import Carrera
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
 
@@ -28,38 +28,34 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Carreras"""
+    return {
+        "detalle": {
+            "nombre": renglon.nombre,
+            "url": url_for("carreras.detail", carrera_id=renglon.id),
+        },
+    }
+
+
+CARRERAS_DATATABLE = DataTableSpec(
+    model=Carrera,
+    columns={
+        "id": Carrera.id,
+        "nombre": Carrera.nombre,
+    },
+    filters=[
+        filter_contains("nombre", Carrera.nombre),
+    ],
+    order=[Carrera.id],
+    row=datatable_renglon,
+)
+
+
 @carreras.route("/carreras/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Carreras"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Carrera.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"])
-        if nombre != "":
-            consulta = consulta.filter(Carrera.nombre.contains(nombre))
-    # Ordenar y paginar
-    registros = consulta.order_by(Carrera.id).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "nombre": resultado.nombre,
-                    "url": url_for("carreras.detail", carrera_id=resultado.id),
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return CARRERAS_DATATABLE.output()
 
 
 @carreras.route("/carreras")
@@ -107,8 +103,8 @@ def new():
         carrera = Carrera(nombre=nombre)
         carrera.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Carrera {carrera.nombre}"),
             url=url_for("carreras.detail", carrera_id=carrera.id),
         )
@@ -138,8 +134,8 @@ def edit(carrera_id):
             carrera.nombre = safe_string(form.nombre.data)
             carrera.save()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Carrera {carrera.nombre}"),
                 url=url_for("carreras.detail", carrera_id=carrera.id),
             )
@@ -158,8 +154,8 @@ def delete(carrera_id):
     if carrera.estatus == "A":
         carrera.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Carrera {carrera.nombre}"),
             url=url_for("carreras.detail", carrera_id=carrera.id),
         )
@@ -176,8 +172,8 @@ def recover(carrera_id):
     if carrera.estatus == "B":
         carrera.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Carrera {carrera.nombre}"),
             url=url_for("carreras.detail", carrera_id=carrera.id),
         )
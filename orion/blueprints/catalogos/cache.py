@@ -0,0 +1,87 @@
+"""
+Catálogos, caché
+
+Copias en memoria de los catálogos que cambian poco (lib.catalog_cache), para
+las opciones de los formularios y los Select2.
+
+    from orion.blueprints.catalogos.cache import CARRERAS
+
+    self.carrera.choices = CARRERAS.choices(lambda renglon: renglon.nombre)
+
+BUNDLE es el paquete que entrega /catalogos/bundle.json para los Select2 del
+navegador; no lleva módulos ni roles porque sólo los usan los administradores.
+"""
+
+from lib.catalog_cache import CatalogBundle, CatalogCache
+from orion.blueprints.areas.models import Area
+from orion.blueprints.bancos.models import Banco
+from orion.blueprints.carreras.models import Carrera
+from orion.blueprints.centros_trabajos.models import CentroTrabajo
+from orion.blueprints.distritos.models import Distrito
+from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.niveles_academicos.models import NivelAcademico
+from orion.blueprints.organos.models import Organo
+from orion.blueprints.puestos.models import Puesto
+from orion.blueprints.puestos_funciones.models import PuestoFuncion
+from orion.blueprints.roles.models import Rol
+from orion.blueprints.turnos.models import Turno
+
+AREAS = CatalogCache(
+    Area,
+    columns={"nombre": Area.nombre, "centro_trabajo_id": Area.centro_trabajo_id},
+    order=[Area.nombre],
+)
+
+BANCOS = CatalogCache(Banco, columns={"nombre": Banco.nombre}, order=[Banco.nombre])
+
+CARRERAS = CatalogCache(Carrera, columns={"nombre": Carrera.nombre}, order=[Carrera.nombre])
+
+CENTROS_TRABAJOS = CatalogCache(
+    CentroTrabajo,
+    columns={
+        "clave": CentroTrabajo.clave,
+        "nombre": CentroTrabajo.nombre,
+        "distrito_id": CentroTrabajo.distrito_id,
+        "organo_id": CentroTrabajo.organo_id,
+    },
+    order=[CentroTrabajo.clave],
+)
+
+DISTRITOS = CatalogCache(Distrito, columns={"clave": Distrito.clave, "nombre": Distrito.nombre}, order=[Distrito.clave])
+
+MODULOS = CatalogCache(Modulo, columns={"nombre": Modulo.nombre}, order=[Modulo.nombre])
+
+NIVELES_ACADEMICOS = CatalogCache(
+    NivelAcademico,
+    columns={"clave": NivelAcademico.clave, "nombre": NivelAcademico.nombre},
+    order=[NivelAcademico.nombre],
+)
+
+ORGANOS = CatalogCache(Organo, columns={"clave": Organo.clave, "nombre": Organo.nombre}, order=[Organo.clave])
+
+PUESTOS = CatalogCache(Puesto, columns={"clave": Puesto.clave, "nombre": Puesto.nombre}, order=[Puesto.clave])
+
+PUESTOS_FUNCIONES = CatalogCache(
+    PuestoFuncion,
+    columns={"nombre": PuestoFuncion.nombre, "puesto_id": PuestoFuncion.puesto_id},
+    order=[PuestoFuncion.nombre],
+)
+
+ROLES = CatalogCache(Rol, columns={"nombre": Rol.nombre}, order=[Rol.nombre])
+
+TURNOS = CatalogCache(Turno, columns={"nombre": Turno.nombre}, order=[Turno.nombre])
+
+BUNDLE = CatalogBundle(
+    {
+        "areas": AREAS,
+        "bancos": BANCOS,
+        "carreras": CARRERAS,
+        "centros_trabajos": CENTROS_TRABAJOS,
+        "distritos": DISTRITOS,
+        "niveles_academicos": NIVELES_ACADEMICOS,
+        "organos": ORGANOS,
+        "puestos": PUESTOS,
+        "puestos_funciones": PUESTOS_FUNCIONES,
+        "turnos": TURNOS,
+    }
+)
@@ -0,0 +1,44 @@
+"""
+Catálogos, vistas
+"""
+
+from flask import Blueprint, current_app, request, url_for
+from flask_login import login_required
+
+from orion.blueprints.catalogos.cache import BUNDLE
+
+CATALOGOS_BUNDLE_MAX_AGE = 365 * 24 * 60 * 60  # Un año, la URL cambia con la huella
+
+catalogos = Blueprint("catalogos", __name__)
+
+
+@catalogos.before_request
+@login_required
+def before_request():
+    """Permiso por defecto"""
+
+
+@catalogos.app_context_processor
+def inject_catalogos_bundle():
+    """Funciones para las plantillas, la huella y la URL del paquete de catálogos"""
+
+    def catalogos_bundle():
+        huella, _ = BUNDLE.get()
+        return {"huella": huella, "url": url_for("catalogos.bundle", v=huella)}
+
+    return {"catalogos_bundle": catalogos_bundle}
+
+
+@catalogos.route("/catalogos/bundle.json")
+def bundle():
+    """Paquete JSON con los catálogos activos; con la huella en la URL se guarda en el navegador por un año"""
+    huella, contenido = BUNDLE.get()
+    respuesta = current_app.response_class(contenido, mimetype="application/json")
+    respuesta.set_etag(huella)
+    respuesta.cache_control.private = True
+    if request.args.get("v") == huella:
+        respuesta.cache_control.max_age = CATALOGOS_BUNDLE_MAX_AGE
+        respuesta.cache_control.immutable = True
+    else:
+        respuesta.cache_control.no_cache = True
+    return respuesta.make_conditional(request)
@@ -5,8 +5,10 @@ Centros de Trabajos, modelos
 from typing import List, Optional
 
 from sqlalchemy import ForeignKey, String
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from lib.indices import modified_index
 from lib.universal_mixin import UniversalMixin
 from orion.extensions import database
 
@@ -17,13 +19,16 @@ class CentroTrabajo(database.Model, UniversalMixin):
     # Nombre de la tabla
     __tablename__ = "centros_trabajos"
 
+    # Índice de todos los registros por (modificado, id) para la API de cambios
+    __table_args__ = (modified_index("centros_trabajos"),)
+
     # Clave primaria
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Clave foránea
-    distrito_id: Mapped[int] = mapped_column(ForeignKey("distritos.id"))
+    distrito_id: Mapped[int] = mapped_column(ForeignKey("distritos.id"), index=True)
     distrito: Mapped["Distrito"] = relationship(back_populates="centros_trabajos")
-    organo_id: Mapped[int] = mapped_column(ForeignKey("organos.id"))
+    organo_id: Mapped[int] = mapped_column(ForeignKey("organos.id"), index=True)
     organo: Mapped["Organo"] = relationship(back_populates="centros_trabajos")
 
     # Columnas
@@ -37,7 +42,7 @@ class CentroTrabajo(database.Model, UniversalMixin):
     areas: Mapped[List["Area"]] = relationship(back_populates="centro_trabajo")
     atribuciones: Mapped[List["Atribucion"]] = relationship(back_populates="centro_trabajo")
 
-    @property
+    @hybrid_property
     def clave_nombre(self):
         """Regresa la clave y el nombre"""
         return self.clave + ": " + self.nombre
@@ -3,16 +3,17 @@ Centros de Trabajo, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
-from sqlalchemy import or_
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains, filter_equal
 from lib.safe_string import safe_string, safe_message, safe_clave
+from lib.typeahead import TypeaheadIndex
 
 from orion.blueprints.bitacoras.models import Bitacora
+from orion.blueprints.catalogos.cache import CENTROS_TRABAJOS
 from orion.blueprints.centros_trabajos.forms import CentroTrabajoForm
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.centros_trabajos.models import CentroTrabajo
@@ -29,51 +30,39 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Centros de Trabajos"""
+    return {
+        "detalle": {
+            "clave": renglon.clave,
+            "url": url_for("centros_trabajos.detail", centro_trabajo_id=renglon.id),
+        },
+        "nombre": renglon.nombre,
+    }
+
+
+CENTROS_TRABAJOS_DATATABLE = DataTableSpec(
+    model=CentroTrabajo,
+    columns={
+        "id": CentroTrabajo.id,
+        "clave": CentroTrabajo.clave,
+        "nombre": CentroTrabajo.nombre,
+    },
+    filters=[
+        filter_contains("clave", CentroTrabajo.clave, limpiar=safe_clave),
+        filter_contains("nombre", CentroTrabajo.nombre),
+        filter_equal("distrito_id", CentroTrabajo.distrito_id),
+        filter_equal("organo_id", CentroTrabajo.organo_id),
+    ],
+    order=[CentroTrabajo.clave],
+    row=datatable_renglon,
+)
+
+
 @centros_trabajos.route("/centros_trabajos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Centros de Trabajos"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = CentroTrabajo.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "clave" in request.form:
-        clave = safe_clave(request.form["clave"])
-        if clave != "":
-            consulta = consulta.filter(CentroTrabajo.clave.contains(clave))
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"])
-        if nombre != "":
-            consulta = consulta.filter(CentroTrabajo.nombre.contains(nombre))
-    if "distrito_id" in request.form:
-        consulta = consulta.filter_by(distrito_id=request.form["distrito_id"])
-    if "organo_id" in request.form:
-        consulta = consulta.filter_by(organo_id=request.form["organo_id"])
-    # Luego filtrar por columnas de otras tablas
-    # if "persona_rfc" in request.form:
-    #     consulta = consulta.join(Persona)
-    #     consulta = consulta.filter(Persona.rfc.contains(safe_rfc(request.form["persona_rfc"], search_fragment=True)))
-    # Ordenar y paginar
-    registros = consulta.order_by(CentroTrabajo.clave).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "clave": resultado.clave,
-                    "url": url_for("centros_trabajos.detail", centro_trabajo_id=resultado.id),
-                },
-                "nombre": resultado.nombre,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return CENTROS_TRABAJOS_DATATABLE.output()
 
 
 @centros_trabajos.route("/centros_trabajos")
@@ -129,8 +118,8 @@ def new():
         )
         centro_trabajo.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Centro de Trabajo {centro_trabajo.clave}"),
             url=url_for("centros_trabajos.detail", centro_trabajo_id=centro_trabajo.id),
         )
@@ -166,8 +155,8 @@ def edit(centro_trabajo_id):
             centro_trabajo.activo = form.activo.data
             centro_trabajo.save()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Centro de Trabajo {centro_trabajo.clave}"),
                 url=url_for("centros_trabajos.detail", centro_trabajo_id=centro_trabajo.id),
             )
@@ -192,8 +181,8 @@ def delete(centro_trabajo_id):
     if centro_trabajo.estatus == "A":
         centro_trabajo.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Centro de Trabajo {centro_trabajo.clave}"),
             url=url_for("centros_trabajos.detail", centro_trabajo_id=centro_trabajo.id),
         )
@@ -210,8 +199,8 @@ def recover(centro_trabajo_id):
     if centro_trabajo.estatus == "B":
         centro_trabajo.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Centro de Trabajo {centro_trabajo.clave}"),
             url=url_for("centros_trabajos.detail", centro_trabajo_id=centro_trabajo.id),
         )
@@ -220,22 +209,17 @@ def recover(centro_trabajo_id):
     return redirect(url_for("centros_trabajos.detail", centro_trabajo_id=centro_trabajo.id))
 
 
+CENTROS_TRABAJOS_TYPEAHEAD = TypeaheadIndex(
+    model=CentroTrabajo,
+    columns={"clave": CentroTrabajo.clave, "nombre": CentroTrabajo.nombre},
+    text=lambda renglon: f"{renglon.clave}: {renglon.nombre}",
+    search=["clave", "nombre"],
+    order=CentroTrabajo.id,
+    catalog=CENTROS_TRABAJOS,
+)
+
+
 @centros_trabajos.route("/centros_trabajos/query_centros_trabajos_json", methods=["POST"])
 def query_centros_trabajos_json():
     """Proporcionar el JSON de Centros de Trabajos para elegir en un Select2"""
-    consulta = CentroTrabajo.query.filter_by(estatus="A")
-    if "clave_nombre" in request.form:
-        clave_nombre = safe_string(request.form["clave_nombre"]).upper()
-        if clave_nombre != "":
-            consulta = consulta.filter(
-                or_(CentroTrabajo.clave.contains(clave_nombre), CentroTrabajo.nombre.contains(clave_nombre))
-            )
-    results = []
-    for centro_trabajo in consulta.order_by(CentroTrabajo.id).limit(15).all():
-        results.append(
-            {
-                "id": centro_trabajo.id,
-                "text": centro_trabajo.clave_nombre,
-            }
-        )
-    return {"results": results, "pagination": {"more": False}}
+    return CENTROS_TRABAJOS_TYPEAHEAD.output("clave_nombre")
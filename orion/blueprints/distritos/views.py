@@ -3,16 +3,17 @@ Distritos, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
-from sqlalchemy import or_
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains
 from lib.safe_string import safe_string, safe_message, safe_clave
+from lib.typeahead import TypeaheadIndex
 
 from orion.blueprints.bitacoras.models import Bitacora
+from orion.blueprints.catalogos.cache import DISTRITOS
 from orion.blueprints.distritos.forms import DistritoForm
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.distritos.models import Distrito
@@ -29,43 +30,37 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Distritos"""
+    return {
+        "detalle": {
+            "clave": renglon.clave,
+            "url": url_for("distritos.detail", distrito_id=renglon.id),
+        },
+        "nombre": renglon.nombre,
+    }
+
+
+DISTRITOS_DATATABLE = DataTableSpec(
+    model=Distrito,
+    columns={
+        "id": Distrito.id,
+        "clave": Distrito.clave,
+        "nombre": Distrito.nombre,
+    },
+    filters=[
+        filter_contains("clave", Distrito.clave, limpiar=safe_clave),
+        filter_contains("nombre", Distrito.nombre, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+    ],
+    order=[Distrito.clave],
+    row=datatable_renglon,
+)
+
+
 @distritos.route("/distritos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Distrito"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Distrito.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "clave" in request.form:
-        clave = safe_clave(request.form["clave"])
-        if clave != "":
-            consulta = consulta.filter(Distrito.clave.contains(clave))
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"], save_enie=True)
-        if nombre != "":
-            consulta = consulta.filter(Distrito.nombre.contains(nombre))
-    # Ordenar y paginar
-    registros = consulta.order_by(Distrito.clave).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "clave": resultado.clave,
-                    "url": url_for("distritos.detail", distrito_id=resultado.id),
-                },
-                "nombre": resultado.nombre,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return DISTRITOS_DATATABLE.output()
 
 
 @distritos.route("/distritos")
@@ -116,8 +111,8 @@ def new():
         )
         distrito.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Distrito {distrito.nombre}"),
             url=url_for("distritos.detail", distrito_id=distrito.id),
         )
@@ -148,8 +143,8 @@ def edit(distrito_id):
             distrito.nombre = safe_string(form.nombre.data, save_enie=True)
             distrito.save()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Distrito {distrito.clave}"),
                 url=url_for("distritos.detail", distrito_id=distrito.id),
             )
@@ -169,8 +164,8 @@ def delete(distrito_id):
     if distrito.estatus == "A":
         distrito.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Distrito {distrito.clave}"),
             url=url_for("distritos.detail", distrito_id=distrito.id),
         )
@@ -187,8 +182,8 @@ def recover(distrito_id):
     if distrito.estatus == "B":
         distrito.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Distrito {distrito.clave}"),
             url=url_for("distritos.detail", distrito_id=distrito.id),
         )
@@ -197,20 +192,17 @@ def recover(distrito_id):
     return redirect(url_for("distritos.detail", distrito_id=distrito.id))
 
 
+DISTRITOS_TYPEAHEAD = TypeaheadIndex(
+    model=Distrito,
+    columns={"clave": Distrito.clave, "nombre": Distrito.nombre},
+    text=lambda renglon: f"{renglon.clave}: {renglon.nombre}",
+    search=["clave", "nombre"],
+    order=Distrito.id,
+    catalog=DISTRITOS,
+)
+
+
 @distritos.route("/distritos/query_distritos_json", methods=["POST"])
 def query_distritos_json():
     """Proporcionar el JSON de Distritos para elegir en un Select2"""
-    consulta = Distrito.query.filter_by(estatus="A")
-    if "clave_nombre" in request.form:
-        clave_nombre = safe_string(request.form["clave_nombre"]).upper()
-        if clave_nombre != "":
-            consulta = consulta.filter(or_(Distrito.clave.contains(clave_nombre), Distrito.nombre.contains(clave_nombre)))
-    results = []
-    for centro_trabajo in consulta.order_by(Distrito.id).limit(15).all():
-        results.append(
-            {
-                "id": centro_trabajo.id,
-                "text": centro_trabajo.nombre_descriptivo,
-            }
-        )
-    return {"results": results, "pagination": {"more": False}}
+    return DISTRITOS_TYPEAHEAD.output("clave_nombre")
@@ -10,7 +10,7 @@ from lib.datatables import get_datatable_parameters, output_datatable_json
 from lib.safe_string import safe_string, safe_message
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.domicilios.models import Domicilio
@@ -71,8 +71,8 @@ def new_with_persona_id(persona_id):
         ).save()
         # Guardar en bitacora
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Domicilio {domicilio.calle}"),
             url=url_for("domicilios.detail", domicilio_id=domicilio.id),
         )
@@ -101,8 +101,8 @@ def edit(persona_id, domicilio_id):
         domicilio.cp = form.codigo_postal.data
         domicilio.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Editado Domicilio de {persona.nombre_completo}"),
             url=url_for("domicilios.detail", domicilio_id=domicilio.id),
         )
@@ -129,8 +129,8 @@ def delete(domicilio_id):
     if domicilio.estatus == "A":
         domicilio.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Domicilio {domicilio.id}"),
             url=url_for("domicilios.detail", domicilio_id=domicilio.id),
         )
@@ -147,8 +147,8 @@ def recover(domicilio_id):
     if domicilio.estatus == "B":
         domicilio.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Domicilio {domicilio.id}"),
             url=url_for("domicilios.detail", domicilio_id=domicilio.id),
         )
@@ -6,6 +6,8 @@ from sqlalchemy import Enum, ForeignKey, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from orion.extensions import database
+from lib.auditoria import push_registro
+from lib.indices import active_index
 from lib.universal_mixin import UniversalMixin
 
 
@@ -20,17 +22,26 @@ class EntradaSalida(database.Model, UniversalMixin):
     # Nombre de la tabla
     __tablename__ = "entradas_salidas"
 
+    # Índices parciales de los activos con las columnas del filtro y del orden de los listados
+    __table_args__ = (active_index("entradas_salidas", "usuario_id", "id"),)
+
     # Clave primaria
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Claves foráneas
-    usuario_id: Mapped[int] = mapped_column(ForeignKey("usuarios.id"))
+    usuario_id: Mapped[int] = mapped_column(ForeignKey("usuarios.id"), index=True)
     usuario: Mapped["Usuario"] = relationship(back_populates="entradas_salidas")
 
     # Columnas
     tipo: Mapped[str] = mapped_column(Enum(*TIPOS, name="entradas_salidas_tipos", native_enum=False), index=True)
     direccion_ip: Mapped[str] = mapped_column(String(64))
 
+    def save(self):
+        """Guardar en la cola de auditoría, o en la base de datos si no está disponible"""
+        if push_registro(self):
+            return self
+        return super().save()
+
     def __repr__(self):
         """Representación"""
         return f"<EntradaSalida {self.id}>"
@@ -2,11 +2,12 @@
 Entradas-Salidas
 """
 
-from flask import Blueprint, render_template, request, url_for
+from flask import Blueprint, render_template, url_for
 from flask_login import login_required
 
 from lib.safe_string import safe_email
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains, filter_equal
+from lib.datatables import CONTEO_ESTIMADO
 from orion.blueprints.entradas_salidas.models import EntradaSalida
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
@@ -24,46 +25,42 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Entradas-Salidas"""
+    return {
+        "creado": renglon.creado.strftime("%Y-%m-%d %H:%M:%S"),
+        "tipo": renglon.tipo,
+        "usuario": {
+            "email": renglon.usuario_email,
+            "url": url_for("usuarios.detail", usuario_id=renglon.usuario_id),
+        },
+    }
+
+
+ENTRADAS_SALIDAS_DATATABLE = DataTableSpec(
+    model=EntradaSalida,
+    columns={
+        "id": EntradaSalida.id,
+        "creado": EntradaSalida.creado,
+        "tipo": EntradaSalida.tipo,
+        "usuario_id": EntradaSalida.usuario_id,
+        "usuario_email": Usuario.email,
+    },
+    joins=[(Usuario, EntradaSalida.usuario_id == Usuario.id)],
+    filters=[
+        filter_equal("usuario_id", EntradaSalida.usuario_id),
+        filter_contains("usuario_email", Usuario.email, limpiar=lambda texto: safe_email(texto, search_fragment=True)),
+    ],
+    keyset=[EntradaSalida.id],
+    count=CONTEO_ESTIMADO,
+    row=datatable_renglon,
+)
+
+
 @entradas_salidas.route("/entradas_salidas/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Entradas-Salidas"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = EntradaSalida.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "usuario_id" in request.form:
-        consulta = consulta.filter_by(usuario_id=request.form["usuario_id"])
-    # Luego filtrar por columnas de otras tablas
-    if "usuario_email" in request.form:
-        try:
-            usuario_email = safe_email(request.form["usuario_email"], search_fragment=True)
-            if usuario_email != "":
-                consulta = consulta.join(Usuario).filter(Usuario.email.contains(usuario_email))
-        except ValueError:
-            pass
-    # Ordenar y paginar
-    registros = consulta.order_by(EntradaSalida.id.desc()).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "creado": resultado.creado.strftime("%Y-%m-%d %H:%M:%S"),
-                "tipo": resultado.tipo,
-                "usuario": {
-                    "email": resultado.usuario.email,
-                    "url": url_for("usuarios.detail", usuario_id=resultado.usuario_id),
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return ENTRADAS_SALIDAS_DATATABLE.output()
 
 
 @entradas_salidas.route("/entradas_salidas")
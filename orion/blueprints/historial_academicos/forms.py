@@ -5,7 +5,7 @@ Historial Académicos, formularios
 from flask_wtf import FlaskForm
 from wtforms import StringField, SubmitField, SelectField, IntegerField
 from wtforms.validators import DataRequired, Length, Optional
-from orion.blueprints.niveles_academicos.models import NivelAcademico
+from orion.blueprints.catalogos.cache import NIVELES_ACADEMICOS
 
 
 class HistorialAcademicoForm(FlaskForm):
@@ -22,10 +22,7 @@ class HistorialAcademicoForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         """Inicializar y cargar opciones de niveles_academicos"""
         super().__init__(*args, **kwargs)
-        self.nivel_academico.choices = [
-            (r.id, f"{r.clave}: {r.nombre}")
-            for r in NivelAcademico.query.filter_by(estatus="A").order_by(NivelAcademico.nombre).all()
-        ]
+        self.nivel_academico.choices = NIVELES_ACADEMICOS.choices(lambda r: f"{r.clave}: {r.nombre}")
 
 
 class HistorialAcademicoWithPersonaForm(FlaskForm):
@@ -42,7 +39,4 @@ class HistorialAcademicoWithPersonaForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         """Inicializar y cargar opciones de niveles_academicos"""
         super().__init__(*args, **kwargs)
-        self.nivel_academico.choices = [
-            (r.id, f"{r.clave}: {r.nombre}")
-            for r in NivelAcademico.query.filter_by(estatus="A").order_by(NivelAcademico.nombre).all()
-        ]
+        self.nivel_academico.choices = NIVELES_ACADEMICOS.choices(lambda r: f"{r.clave}: {r.nombre}")
@@ -7,6 +7,7 @@ from typing import Optional
 from sqlalchemy import ForeignKey, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from lib.indices import active_index
 from lib.universal_mixin import UniversalMixin
 from orion.extensions import database
 
@@ -17,13 +18,16 @@ class HistorialAcademico(database.Model, UniversalMixin):
     # Nombre de la tabla
     __tablename__ = "historial_academicos"
 
+    # Índices parciales de los activos con las columnas del filtro y del orden de los listados
+    __table_args__ = (active_index("historial_academicos", "persona_id", "ano_inicio"),)
+
     # Clave primaria
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Clave foránea
-    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"))
+    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"), index=True)
     persona: Mapped["Persona"] = relationship(back_populates="historial_academicos")
-    nivel_academico_id: Mapped[int] = mapped_column(ForeignKey("niveles_academicos.id"))
+    nivel_academico_id: Mapped[int] = mapped_column(ForeignKey("niveles_academicos.id"), index=True)
     nivel_academico: Mapped["NivelAcademico"] = relationship(back_populates="historial_academicos")
 
     # Columnas
@@ -3,17 +3,18 @@ Historial Académico, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_equal
 from lib.safe_string import safe_string, safe_message
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.historial_academicos.models import HistorialAcademico
+from orion.blueprints.niveles_academicos.models import NivelAcademico
 from orion.blueprints.historial_academicos.forms import HistorialAcademicoForm, HistorialAcademicoWithPersonaForm
 from orion.blueprints.personas.models import Persona
 
@@ -29,43 +30,42 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Historial Académicos"""
+    return {
+        "detalle": {
+            "periodo": f"{renglon.ano_inicio} — {renglon.ano_termino}",
+            "url": url_for("historial_academicos.detail", historial_academico_id=renglon.id),
+        },
+        "nivel": renglon.nivel_academico_nombre,
+        "escuela": renglon.nombre_escuela,
+        "ciudad": renglon.nombre_ciudad,
+    }
+
+
+HISTORIAL_ACADEMICOS_DATATABLE = DataTableSpec(
+    model=HistorialAcademico,
+    columns={
+        "id": HistorialAcademico.id,
+        "ano_inicio": HistorialAcademico.ano_inicio,
+        "ano_termino": HistorialAcademico.ano_termino,
+        "nombre_escuela": HistorialAcademico.nombre_escuela,
+        "nombre_ciudad": HistorialAcademico.nombre_ciudad,
+        "nivel_academico_nombre": NivelAcademico.nombre,
+    },
+    joins=[(NivelAcademico, HistorialAcademico.nivel_academico_id == NivelAcademico.id)],
+    filters=[
+        filter_equal("persona_id", HistorialAcademico.persona_id),
+    ],
+    order=[HistorialAcademico.ano_inicio.desc()],
+    row=datatable_renglon,
+)
+
+
 @historial_academicos.route("/historial_academicos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Historial Académicos"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = HistorialAcademico.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "persona_id" in request.form:
-        consulta = consulta.filter_by(persona_id=request.form["persona_id"])
-    # Luego filtrar por columnas de otras tablas
-    # if "persona_rfc" in request.form:
-    #     consulta = consulta.join(Persona)
-    #     consulta = consulta.filter(Persona.rfc.contains(safe_rfc(request.form["persona_rfc"], search_fragment=True)))
-    # Ordenar y paginar
-    registros = consulta.order_by(HistorialAcademico.ano_inicio.desc()).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "periodo": f"{resultado.ano_inicio} — {resultado.ano_termino}",
-                    "url": url_for("historial_academicos.detail", historial_academico_id=resultado.id),
-                },
-                "nivel": resultado.nivel_academico.nombre,
-                "escuela": resultado.nombre_escuela,
-                "ciudad": resultado.nombre_ciudad,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return HISTORIAL_ACADEMICOS_DATATABLE.output()
 
 
 @historial_academicos.route("/historial_academicos")
@@ -119,8 +119,8 @@ def new_with_persona_id(persona_id):
         )
         historial_academico.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Historial Académico {historial_academico.persona.nombre_completo}"),
             url=url_for("historial_academicos.detail", historial_academico_id=historial_academico.id),
         )
@@ -149,8 +149,8 @@ def edit(historial_academico_id):
         historial_academico.ano_termino = form.ano_termino.data
         historial_academico.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Editado Historial Académicos {historial_academico.persona.nombre_completo}"),
             url=url_for("historial_academicos.detail", historial_academico_id=historial_academico.id),
         )
@@ -175,8 +175,8 @@ def delete(historial_academico_id):
     if historial_academico.estatus == "A":
         historial_academico.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Historial Académico {historial_academico.id}"),
             url=url_for("historial_academicos.detail", historial_academico_id=historial_academico.id),
         )
@@ -193,8 +193,8 @@ def recover(historial_academico_id):
     if historial_academico.estatus == "B":
         historial_academico.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Historial Académico {historial_academico.id}"),
             url=url_for("historial_academicos.detail", historial_academico_id=historial_academico.id),
         )
@@ -5,10 +5,26 @@ Historial de Puestos, modelos
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, JSON, Integer, String, Text, Uuid
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+    Uuid,
+    delete,
+    event,
+    insert,
+    inspect,
+    select,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql.functions import now
 
+from lib.indices import active_index, modified_index
 from lib.universal_mixin import UniversalMixin
 from orion.extensions import database
 
@@ -24,15 +40,22 @@ class HistorialPuesto(database.Model, UniversalMixin):
     # Nombre de la tabla
     __tablename__ = "historial_puestos"
 
+    # Índices parciales de los activos con las columnas del filtro y del orden de los listados
+    # Índice de todos los registros por (modificado, id) para la API de cambios
+    __table_args__ = (
+        active_index("historial_puestos", "persona_id", "fecha_inicio"),
+        modified_index("historial_puestos"),
+    )
+
     # Clave primaria
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Clave foránea
-    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"))
+    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"), index=True)
     persona: Mapped["Persona"] = relationship(back_populates="historial_puestos")
-    puesto_funcion_id: Mapped[int] = mapped_column(ForeignKey("puestos_funciones.id"))
+    puesto_funcion_id: Mapped[int] = mapped_column(ForeignKey("puestos_funciones.id"), index=True)
     puesto_funcion: Mapped["PuestoFuncion"] = relationship(back_populates="historial_puestos")
-    turno_id: Mapped[int] = mapped_column(ForeignKey("turnos.id"))
+    turno_id: Mapped[int] = mapped_column(ForeignKey("turnos.id"), index=True)
     turno: Mapped["Turno"] = relationship(back_populates="historial_puestos")
 
     # Columnas
@@ -49,3 +72,75 @@ class HistorialPuesto(database.Model, UniversalMixin):
     def __repr__(self):
         """Representación"""
         return f"<HistorialPuesto {self.id}>"
+
+
+class PuestoVigente(database.Model, UniversalMixin):
+    """PuestoVigente, intervalo en el que una persona tuvo un puesto, se mantiene con el historial de puestos activo"""
+
+    # Nombre de la tabla
+    __tablename__ = "puestos_vigentes"
+
+    # Índice para encontrar el intervalo de una persona en una fecha
+    __table_args__ = (active_index("puestos_vigentes", "persona_id", "desde"),)
+
+    # Clave primaria
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    # Claves foráneas
+    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"), index=True)
+    historial_puesto_id: Mapped[int] = mapped_column(ForeignKey("historial_puestos.id"), index=True)
+    puesto_funcion_id: Mapped[int] = mapped_column(ForeignKey("puestos_funciones.id"), index=True)
+
+    # Columnas
+    desde: Mapped[datetime]  # La fecha de inicio del historial de puesto
+    hasta: Mapped[Optional[datetime]]  # La fecha de inicio del siguiente, sin incluirla; nulo si sigue vigente
+
+    def __repr__(self):
+        """Representación"""
+        return f"<PuestoVigente {self.id}>"
+
+
+def formar_puestos_vigentes(persona_id: int, renglones: list) -> list:
+    """Intervalos de la persona con los renglones (id, puesto_funcion_id, fecha_inicio) ordenados por fecha de inicio"""
+    intervalos = []
+    for posicion, (historial_puesto_id, puesto_funcion_id, fecha_inicio) in enumerate(renglones):
+        hasta = renglones[posicion + 1][2] if posicion + 1 < len(renglones) else None
+        if hasta is not None and hasta <= fecha_inicio:
+            continue  # Otro puesto inicia el mismo día, vale el último
+        intervalos.append(
+            {
+                "persona_id": persona_id,
+                "historial_puesto_id": historial_puesto_id,
+                "puesto_funcion_id": puesto_funcion_id,
+                "desde": fecha_inicio,
+                "hasta": hasta,
+            }
+        )
+    return intervalos
+
+
+def actualizar_puestos_vigentes(connection, persona_id: int) -> None:
+    """Reconstruir los intervalos de la persona con su historial de puestos activo"""
+    historial = HistorialPuesto.__table__
+    vigentes = PuestoVigente.__table__
+    renglones = connection.execute(
+        select(historial.c.id, historial.c.puesto_funcion_id, historial.c.fecha_inicio)
+        .where(historial.c.persona_id == persona_id)
+        .where(historial.c.estatus == "A")
+        .order_by(historial.c.fecha_inicio, historial.c.id)
+    ).all()
+    connection.execute(delete(vigentes).where(vigentes.c.persona_id == persona_id))
+    intervalos = formar_puestos_vigentes(persona_id, renglones)
+    if len(intervalos) > 0:
+        connection.execute(insert(vigentes), intervalos)
+
+
+@event.listens_for(HistorialPuesto, "after_insert")
+@event.listens_for(HistorialPuesto, "after_update")
+def historial_puesto_cambiado(mapper, connection, historial_puesto):
+    """Al guardar, eliminar o recuperar un historial de puesto se reconstruyen los intervalos de la persona"""
+    personas_ids = {historial_puesto.persona_id}
+    personas_ids.update(inspect(historial_puesto).attrs.persona_id.history.deleted)  # Si cambió de persona
+    for persona_id in personas_ids:
+        if persona_id is not None:
+            actualizar_puestos_vigentes(connection, persona_id)
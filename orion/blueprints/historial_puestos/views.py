@@ -3,19 +3,21 @@ Historial Puestos, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_equal
 from lib.safe_string import safe_string, safe_message
 
 from orion.blueprints.areas.models import Area
 from orion.blueprints.bitacoras.models import Bitacora
 from orion.blueprints.centros_trabajos.models import CentroTrabajo
 from orion.blueprints.historial_puestos.forms import HistorialPuestoForm
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.personas.models import Persona
+from orion.blueprints.puestos.models import Puesto
+from orion.blueprints.puestos_funciones.models import PuestoFuncion
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.historial_puestos.models import HistorialPuesto
 
@@ -31,46 +33,48 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Historial de Puestos"""
+    periodo = renglon.fecha_inicio.strftime("%Y-%m-%d") + " — ACTUALMENTE"
+    if renglon.fecha_termino != None:
+        periodo = renglon.fecha_inicio.strftime("%Y-%m-%d") + " — " + renglon.fecha_termino.strftime("%Y-%m-%d")
+    return {
+        "detalle": {
+            "periodo": periodo,
+            "url": url_for("historial_puestos.detail", historial_puesto_id=renglon.id),
+        },
+        "clave_puesto": renglon.puesto_clave,
+        "puesto_funcion": renglon.puesto_funcion_nombre,
+        "centro_trabajo": renglon.centro_trabajo,
+    }
+
+
+HISTORIAL_PUESTOS_DATATABLE = DataTableSpec(
+    model=HistorialPuesto,
+    columns={
+        "id": HistorialPuesto.id,
+        "fecha_inicio": HistorialPuesto.fecha_inicio,
+        "fecha_termino": HistorialPuesto.fecha_termino,
+        "centro_trabajo": HistorialPuesto.centro_trabajo,
+        "puesto_funcion_nombre": PuestoFuncion.nombre,
+        "puesto_clave": Puesto.clave,
+    },
+    joins=[
+        (PuestoFuncion, HistorialPuesto.puesto_funcion_id == PuestoFuncion.id),
+        (Puesto, PuestoFuncion.puesto_id == Puesto.id),
+    ],
+    filters=[
+        filter_equal("persona_id", HistorialPuesto.persona_id),
+    ],
+    order=[HistorialPuesto.fecha_inicio.desc()],
+    row=datatable_renglon,
+)
+
+
 @historial_puestos.route("/historial_puestos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Historial de Puestos"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = HistorialPuesto.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter(HistorialPuesto.estatus == request.form["estatus"])
-    else:
-        consulta = consulta.filter(HistorialPuesto.estatus == "A")
-    # if "persona_id" in request.form:
-    #     consulta = consulta.filter_by(persona_id=request.form["persona_id"])
-    # Luego filtrar por columnas de otras tablas
-    if "persona_id" in request.form:
-        consulta = consulta.join(Persona)
-        consulta = consulta.filter(Persona.id == request.form["persona_id"])
-    # Ordenar y paginar
-    registros = consulta.order_by(HistorialPuesto.fecha_inicio.desc()).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        periodo = resultado.fecha_inicio.strftime("%Y-%m-%d") + " — ACTUALMENTE"
-        if resultado.fecha_termino != None:
-            periodo = resultado.fecha_inicio.strftime("%Y-%m-%d") + " — " + resultado.fecha_termino.strftime("%Y-%m-%d")
-        data.append(
-            {
-                "detalle": {
-                    "periodo": periodo,
-                    "url": url_for("historial_puestos.detail", historial_puesto_id=resultado.id),
-                },
-                "clave_puesto": resultado.puesto_funcion.puesto.clave,
-                "puesto_funcion": resultado.puesto_funcion.nombre,
-                "centro_trabajo": resultado.centro_trabajo,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return HISTORIAL_PUESTOS_DATATABLE.output()
 
 
 @historial_puestos.route("/historial_puestos/<int:historial_puesto_id>")
@@ -118,8 +122,8 @@ def new_with_persona_id(persona_id):
         )
         historial_puesto.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Historial de Puesto {historial_puesto.id}"),
             url=url_for("historial_puestos.detail", historial_puesto_id=historial_puesto.id),
         )
@@ -166,8 +170,8 @@ def edit(historial_puesto_id):
         # Guardar cambios
         historial_puesto.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Editado Historial de Puesto {historial_puesto.id}"),
             url=url_for("historial_puestos.detail", historial_puesto_id=historial_puesto.id),
         )
@@ -204,8 +208,8 @@ def delete(historial_puesto_id):
     if historial_puesto.estatus == "A":
         historial_puesto.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Historial de Puesto {historial_puesto.id}"),
             url=url_for("historial_puestos.detail", historial_puesto_id=historial_puesto.id),
         )
@@ -222,8 +226,8 @@ def recover(historial_puesto_id):
     if historial_puesto.estatus == "B":
         historial_puesto.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Historial de Puesto {historial_puesto.id}"),
             url=url_for("historial_puestos.detail", historial_puesto_id=historial_puesto.id),
         )
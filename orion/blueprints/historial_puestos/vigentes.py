@@ -0,0 +1,93 @@
+"""
+Historial de Puestos, puestos vigentes
+
+La tabla puestos_vigentes tiene un intervalo [desde, hasta) por cada
+historial de puesto activo de una persona; hasta es la fecha de inicio del
+siguiente, o nulo si sigue vigente. Se reconstruye para la persona en los
+eventos after_insert y after_update de HistorialPuesto, así se mantiene al
+guardar, eliminar y recuperar.
+
+Para una persona en una fecha
+
+    puesto_funcion = get_puesto_vigente(persona_id, fecha_inicio)
+
+Para muchas con una sola consulta
+
+    puestos = get_puestos_vigentes([(licencia.persona_id, licencia.fecha_inicio) for licencia in licencias])
+
+En un reporte, unir con la condición
+
+    consulta.outerjoin(PuestoVigente, condicion_vigente(Licencia.persona_id, Licencia.fecha_inicio))
+
+Para llenar la tabla con el historial que ya existe use
+
+    orion historial_puestos reconstruir_vigentes
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime, time
+
+from sqlalchemy import and_, or_
+
+from orion.blueprints.historial_puestos.models import PuestoVigente
+from orion.blueprints.puestos_funciones.models import PuestoFuncion
+from orion.extensions import database
+
+
+def get_instante(fecha) -> datetime:
+    """Las fechas de los intervalos son datetime, una fecha se toma al inicio del día"""
+    if isinstance(fecha, datetime):
+        return fecha
+    if isinstance(fecha, date):
+        return datetime.combine(fecha, time())
+    return fecha
+
+
+def condicion_vigente(persona_id, fecha):
+    """Condición para unir puestos_vigentes por la persona y la fecha"""
+    return and_(
+        PuestoVigente.persona_id == persona_id,
+        PuestoVigente.estatus == "A",
+        PuestoVigente.desde <= fecha,
+        or_(PuestoVigente.hasta.is_(None), PuestoVigente.hasta > fecha),
+    )
+
+
+def get_puesto_vigente(persona_id: int, fecha) -> PuestoFuncion:
+    """Puesto función que tenía la persona en la fecha, None si no tenía"""
+    return (
+        PuestoFuncion.query.join(PuestoVigente, PuestoVigente.puesto_funcion_id == PuestoFuncion.id)
+        .filter(condicion_vigente(persona_id, get_instante(fecha)))
+        .first()
+    )
+
+
+def get_puestos_vigentes(pares: list) -> dict:
+    """Entregar {(persona_id, fecha): PuestoFuncion} de los pares que tenían puesto, con una sola consulta"""
+    personas_ids = {persona_id for persona_id, _ in pares}
+    if len(personas_ids) == 0:
+        return {}
+    consulta = (
+        database.session.query(PuestoVigente.persona_id, PuestoVigente.desde, PuestoVigente.hasta, PuestoFuncion)
+        .join(PuestoFuncion, PuestoVigente.puesto_funcion_id == PuestoFuncion.id)
+        .filter(PuestoVigente.persona_id.in_(personas_ids))
+        .filter(PuestoVigente.estatus == "A")
+        .order_by(PuestoVigente.persona_id, PuestoVigente.desde)
+    )
+    intervalos = {}  # persona_id -> ([desde], [(hasta, puesto_funcion)])
+    for persona_id, desde, hasta, puesto_funcion in consulta.all():
+        desdes, puestos = intervalos.setdefault(persona_id, ([], []))
+        desdes.append(desde)
+        puestos.append((hasta, puesto_funcion))
+    resultados = {}
+    for persona_id, fecha in pares:
+        if persona_id not in intervalos or fecha is None:
+            continue
+        desdes, puestos = intervalos[persona_id]
+        posicion = bisect_right(desdes, get_instante(fecha)) - 1
+        if posicion < 0:
+            continue
+        hasta, puesto_funcion = puestos[posicion]
+        if hasta is None or get_instante(fecha) < hasta:
+            resultados[(persona_id, fecha)] = puesto_funcion
+    return resultados
@@ -3,21 +3,21 @@ Incapacidades, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
-from sqlalchemy import or_
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_equal, filter_greater_equal, filter_less_equal
 from lib.safe_string import safe_string, safe_message
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.incapacidades.models import Incapacidad
+from orion.blueprints.personas.busqueda import filter_persona_nombre
 from orion.blueprints.personas.models import Persona
 from orion.blueprints.incapacidades.forms import IncapacidadForm, IncapacidadWithPersonaForm
-from orion.blueprints.historial_puestos.models import HistorialPuesto
+from orion.blueprints.historial_puestos.vigentes import get_puesto_vigente
 
 MODULO = "INCAPACIDADES"
 
@@ -31,62 +31,48 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Incapacidades"""
+    return {
+        "detalle": {
+            "periodo": renglon.fecha_inicio.strftime("%Y-%m-%d") + " — " + renglon.fecha_termino.strftime("%Y-%m-%d"),
+            "url": url_for("incapacidades.detail", incapacidad_id=renglon.id),
+        },
+        "persona": {
+            "nombre": renglon.persona_nombre_completo,
+            "url": url_for("personas.detail", persona_id=renglon.persona_id),
+        },
+        "dias": f"{(renglon.fecha_termino - renglon.fecha_inicio).days + 1} DÍAS",
+        "motivo": renglon.motivo,
+    }
+
+
+INCAPACIDADES_DATATABLE = DataTableSpec(
+    model=Incapacidad,
+    columns={
+        "id": Incapacidad.id,
+        "fecha_inicio": Incapacidad.fecha_inicio,
+        "fecha_termino": Incapacidad.fecha_termino,
+        "motivo": Incapacidad.motivo,
+        "persona_id": Incapacidad.persona_id,
+        "persona_nombre_completo": Persona.nombre_completo,
+    },
+    joins=[(Persona, Incapacidad.persona_id == Persona.id)],
+    filters=[
+        filter_greater_equal("fecha_inicio", Incapacidad.fecha_inicio),
+        filter_less_equal("fecha_termino", Incapacidad.fecha_termino),
+        filter_persona_nombre("persona_nombre_completo"),
+        filter_equal("persona_id", Incapacidad.persona_id),
+    ],
+    order=[Incapacidad.fecha_inicio.desc()],
+    row=datatable_renglon,
+)
+
+
 @incapacidades.route("/incapacidades/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Incapacidades"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Incapacidad.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter(Incapacidad.estatus == request.form["estatus"])
-    else:
-        consulta = consulta.filter(Incapacidad.estatus == "A")
-    if "fecha_inicio" in request.form:
-        consulta = consulta.filter(Incapacidad.fecha_inicio >= request.form["fecha_inicio"])
-    if "fecha_termino" in request.form:
-        consulta = consulta.filter(Incapacidad.fecha_termino <= request.form["fecha_termino"])
-    # Luego filtrar por columnas de otras tablas
-    if "persona_nombre_completo" in request.form:
-        nombre_completo = safe_string(request.form["persona_nombre_completo"])
-        if nombre_completo != "":
-            consulta = consulta.join(Persona)
-            for palabra in nombre_completo.split(" "):
-                consulta = consulta.filter(
-                    or_(
-                        Persona.nombres.contains(palabra),
-                        Persona.apellido_primero.contains(palabra),
-                        Persona.apellido_segundo.contains(palabra),
-                    )
-                )
-    if "persona_id" in request.form:
-        consulta = consulta.join(Persona)
-        consulta = consulta.filter(Persona.id == request.form["persona_id"])
-    # Ordenar y paginar
-    registros = consulta.order_by(Incapacidad.fecha_inicio.desc()).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "periodo": resultado.fecha_inicio.strftime("%Y-%m-%d")
-                    + " — "
-                    + resultado.fecha_termino.strftime("%Y-%m-%d"),
-                    "url": url_for("incapacidades.detail", incapacidad_id=resultado.id),
-                },
-                "persona": {
-                    "nombre": resultado.persona.nombre_completo,
-                    "url": url_for("personas.detail", persona_id=resultado.persona.id),
-                },
-                "dias": f"{(resultado.fecha_termino - resultado.fecha_inicio).days + 1} DÍAS",
-                "motivo": resultado.motivo,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return INCAPACIDADES_DATATABLE.output()
 
 
 @incapacidades.route("/incapacidades")
@@ -142,11 +128,9 @@ def new():
             return render_template("incapacidades/new.jinja2", form=form)
         # Buscar puesto en historial de puestos
         puesto_nombre = None
-        historial_puesto = HistorialPuesto.query.filter_by(persona_id=form.persona.data).filter_by(estatus="A")
-        historial_puesto = historial_puesto.filter(form.fecha_inicio.data >= HistorialPuesto.fecha_inicio)
-        historial_puesto = historial_puesto.order_by(HistorialPuesto.fecha_inicio.desc()).first()
-        if historial_puesto:
-            puesto_nombre = historial_puesto.puesto_funcion.nombre
+        puesto_funcion = get_puesto_vigente(form.persona.data, form.fecha_inicio.data)
+        if puesto_funcion:
+            puesto_nombre = puesto_funcion.nombre
         # Guardar registro
         incapacidad = Incapacidad(
             persona_id=form.persona.data,
@@ -159,8 +143,8 @@ def new():
         )
         incapacidad.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Incapacidad {incapacidad.persona.nombre_completo}"),
             url=url_for("incapacidades.detail", incapacidad_id=incapacidad.id),
         )
@@ -194,11 +178,9 @@ def new_with_persona_id(persona_id):
             return render_template("incapacidades/new_with_persona_id.jinja2", form=form, persona=persona)
         # Buscar puesto en historial de puestos
         puesto_nombre = None
-        historial_puesto = HistorialPuesto.query.filter_by(persona=persona).filter_by(estatus="A")
-        historial_puesto = historial_puesto.filter(form.fecha_inicio.data >= HistorialPuesto.fecha_inicio)
-        historial_puesto = historial_puesto.order_by(HistorialPuesto.fecha_inicio.desc()).first()
-        if historial_puesto:
-            puesto_nombre = historial_puesto.puesto_funcion.nombre
+        puesto_funcion = get_puesto_vigente(persona.id, form.fecha_inicio.data)
+        if puesto_funcion:
+            puesto_nombre = puesto_funcion.nombre
         # Guardar registro
         incapacidad = Incapacidad(
             persona=persona,
@@ -211,8 +193,8 @@ def new_with_persona_id(persona_id):
         )
         incapacidad.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Incapacidad {incapacidad.persona.nombre_completo}"),
             url=url_for("incapacidades.detail", incapacidad_id=incapacidad.id),
         )
@@ -250,22 +232,20 @@ def edit(incapacidad_id):
         if es_valido:
             # Buscar puesto en historial de puestos
             puesto_nombre = None
-            historial_puesto = HistorialPuesto.query.filter_by(persona=incapacidad.persona).filter_by(estatus="A")
-            historial_puesto = historial_puesto.filter(form.fecha_inicio.data >= HistorialPuesto.fecha_inicio)
-            historial_puesto = historial_puesto.order_by(HistorialPuesto.fecha_inicio.desc()).first()
-            if historial_puesto:
-                puesto_nombre = historial_puesto.puesto_funcion.nombre
+            puesto_funcion = get_puesto_vigente(incapacidad.persona_id, form.fecha_inicio.data)
+            if puesto_funcion:
+                puesto_nombre = puesto_funcion.nombre
             # Guardar cambios
             incapacidad.fecha_inicio = form.fecha_inicio.data
             incapacidad.fecha_termino = form.fecha_termino.data
             incapacidad.clave_incapacidad = form.clave_incapacidad.data
             incapacidad.region = form.region.data
             incapacidad.motivo = safe_string(form.motivo.data, save_enie=True)
-            incapacidad.puesto = puesto_nombre
+            incapacidad.puesto_nombre = puesto_nombre
             incapacidad.save()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Incapacidad {incapacidad.motivo}"),
                 url=url_for("incapacidades.detail", incapacidad_id=incapacidad.id),
             )
@@ -290,8 +270,8 @@ def delete(incapacidad_id):
     if incapacidad.estatus == "A":
         incapacidad.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Incapacidad {incapacidad.id}"),
             url=url_for("incapacidades.detail", incapacidad_id=incapacidad.id),
         )
@@ -308,8 +288,8 @@ def recover(incapacidad_id):
     if incapacidad.estatus == "B":
         incapacidad.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Incapacidad {incapacidad.id}"),
             url=url_for("incapacidades.detail", incapacidad_id=incapacidad.id),
         )
@@ -9,6 +9,7 @@ from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, JSON, Integer, Strin
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql.functions import now
 
+from lib.indices import active_index, modified_index
 from lib.universal_mixin import UniversalMixin
 from orion.extensions import database
 
@@ -27,11 +28,19 @@ class Licencia(database.Model, UniversalMixin):
     # Nombre de la tabla
     __tablename__ = "licencias"
 
+    # Índices parciales de los activos con las columnas del filtro y del orden de los listados
+    # Índice de todos los registros por (modificado, id) para la API de cambios
+    __table_args__ = (
+        active_index("licencias", "persona_id", "fecha_inicio"),
+        active_index("licencias", "fecha_inicio"),
+        modified_index("licencias"),
+    )
+
     # Clave primaria
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Clave foránea
-    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"))
+    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"), index=True)
     persona: Mapped["Persona"] = relationship(back_populates="licencias")
 
     # Columnas
@@ -3,17 +3,18 @@ Licencias, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
-from sqlalchemy import or_
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_equal, filter_greater_equal, filter_less_equal
+from lib.datatables import RESPUESTA_TTL
 from lib.safe_string import safe_string, safe_message
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.historial_puestos.models import HistorialPuesto
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.historial_puestos.vigentes import get_puesto_vigente
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
+from orion.blueprints.personas.busqueda import filter_persona_nombre
 from orion.blueprints.personas.models import Persona
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.licencias.models import Licencia
@@ -31,64 +32,52 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Licencias"""
+    return {
+        "detalle": {
+            "periodo": renglon.fecha_inicio.strftime("%Y-%m-%d") + " — " + renglon.fecha_termino.strftime("%Y-%m-%d"),
+            "url": url_for("licencias.detail", licencia_id=renglon.id),
+        },
+        "tipo": renglon.tipo,
+        "dias": f"{(renglon.fecha_termino - renglon.fecha_inicio).days + 1} DÍAS",
+        "persona": {
+            "nombre": renglon.persona_nombre_completo,
+            "url": url_for("personas.detail", persona_id=renglon.persona_id),
+        },
+        "motivo": renglon.motivo,
+    }
+
+
+LICENCIAS_DATATABLE = DataTableSpec(
+    model=Licencia,
+    columns={
+        "id": Licencia.id,
+        "fecha_inicio": Licencia.fecha_inicio,
+        "fecha_termino": Licencia.fecha_termino,
+        "tipo": Licencia.tipo,
+        "motivo": Licencia.motivo,
+        "persona_id": Licencia.persona_id,
+        "persona_nombre_completo": Persona.nombre_completo,
+    },
+    joins=[(Persona, Licencia.persona_id == Persona.id)],
+    filters=[
+        filter_greater_equal("fecha_inicio", Licencia.fecha_inicio),
+        filter_less_equal("fecha_termino", Licencia.fecha_termino),
+        filter_equal("tipo", Licencia.tipo),
+        filter_equal("persona_id", Licencia.persona_id),
+        filter_persona_nombre("persona_nombre_completo"),
+    ],
+    order=[Licencia.fecha_inicio.desc()],
+    cache=RESPUESTA_TTL,
+    row=datatable_renglon,
+)
+
+
 @licencias.route("/licencias/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Licencias"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Licencia.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "fecha_inicio" in request.form:
-        consulta = consulta.filter(Licencia.fecha_inicio >= request.form["fecha_inicio"])
-    if "fecha_termino" in request.form:
-        consulta = consulta.filter(Licencia.fecha_termino <= request.form["fecha_termino"])
-    if "tipo" in request.form:
-        consulta = consulta.filter(Licencia.tipo == request.form["tipo"])
-    if "persona_id" in request.form:
-        consulta = consulta.filter(Licencia.persona_id == request.form["persona_id"])
-    # Luego filtrar por columnas de otras tablas
-    if "persona_nombre_completo" in request.form:
-        nombre_completo = safe_string(request.form["persona_nombre_completo"])
-        if nombre_completo != "":
-            consulta = consulta.join(Persona)
-            for palabra in nombre_completo.split(" "):
-                consulta = consulta.filter(
-                    or_(
-                        Persona.nombres.contains(palabra),
-                        Persona.apellido_primero.contains(palabra),
-                        Persona.apellido_segundo.contains(palabra),
-                    )
-                )
-    # Ordenar y paginar
-    registros = consulta.order_by(Licencia.fecha_inicio.desc()).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "periodo": resultado.fecha_inicio.strftime("%Y-%m-%d")
-                    + " — "
-                    + resultado.fecha_termino.strftime("%Y-%m-%d"),
-                    "url": url_for("licencias.detail", licencia_id=resultado.id),
-                },
-                "tipo": resultado.tipo,
-                "dias": f"{(resultado.fecha_termino - resultado.fecha_inicio).days + 1} DÍAS",
-                "persona": {
-                    "nombre": resultado.persona.nombre_completo,
-                    "url": url_for("personas.detail", persona_id=resultado.persona.id),
-                },
-                "motivo": resultado.motivo,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return LICENCIAS_DATATABLE.output()
 
 
 @licencias.route("/licencias")
@@ -133,12 +122,10 @@ def new():
             flash("La fecha de inicio no puede ser mayor a la fecha de termino.", "warning")
             return render_template("licencias/new.jinja2", form=form)
         # Leer el historial de puestos para extraer el nombre del puesto en esa fecha.
-        historial_puesto = HistorialPuesto.query.filter_by(persona_id=form.persona.data).filter_by(estatus="A")
-        historial_puesto = historial_puesto.filter(form.fecha_inicio.data >= HistorialPuesto.fecha_inicio)
-        historial_puesto = historial_puesto.order_by(HistorialPuesto.fecha_inicio.desc()).first()
+        puesto_funcion = get_puesto_vigente(form.persona.data, form.fecha_inicio.data)
         puesto_nombre = None
-        if historial_puesto:
-            puesto_nombre = historial_puesto.puesto_funcion.nombre
+        if puesto_funcion:
+            puesto_nombre = puesto_funcion.nombre
         # Guardar la Licencia
         liciencia = Licencia(
             persona_id=form.persona.data,
@@ -151,8 +138,8 @@ def new():
         )
         liciencia.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Licencia {liciencia.persona.nombre_completo}"),
             url=url_for("licencias.detail", liciencia_id=liciencia.id),
         )
@@ -173,12 +160,10 @@ def new_with_persona_id(persona_id):
             flash("La fecha de inicio no puede ser mayor a la fecha de termino.", "warning")
             return render_template("licencias/new_with_persona_id.jinja2", form=form, persona=persona)
         # Leer el historial de puestos para extraer el nombre del puesto en esa fecha.
-        historial_puesto = HistorialPuesto.query.filter_by(persona=persona).filter_by(estatus="A")
-        historial_puesto = historial_puesto.filter(form.fecha_inicio.data >= HistorialPuesto.fecha_inicio)
-        historial_puesto = historial_puesto.order_by(HistorialPuesto.fecha_inicio.desc()).first()
+        puesto_funcion = get_puesto_vigente(persona.id, form.fecha_inicio.data)
         puesto_nombre = None
-        if historial_puesto:
-            puesto_nombre = historial_puesto.puesto_funcion.nombre
+        if puesto_funcion:
+            puesto_nombre = puesto_funcion.nombre
         # Guardar la Licencia
         liciencia = Licencia(
             persona=persona,
@@ -191,8 +176,8 @@ def new_with_persona_id(persona_id):
         )
         liciencia.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nueva Licencia {liciencia.persona.nombre_completo}"),
             url=url_for("licencias.detail", liciencia_id=liciencia.id),
         )
@@ -214,12 +199,10 @@ def edit(licencia_id):
             flash("La fecha de inicio no puede ser mayor a la fecha de término", "warning")
             return render_template("licencias/edit.jinja2", form=form, licencia=licencia)
         # Guardar el historial de puesto.
-        historial_puesto = HistorialPuesto.query.filter_by(persona=licencia.persona).filter_by(estatus="A")
-        historial_puesto = historial_puesto.filter(form.fecha_inicio.data >= HistorialPuesto.fecha_inicio)
-        historial_puesto = historial_puesto.order_by(HistorialPuesto.fecha_inicio.desc()).first()
+        puesto_funcion = get_puesto_vigente(licencia.persona_id, form.fecha_inicio.data)
         licencia.puesto_nombre = None
-        if historial_puesto:
-            licencia.puesto_nombre = historial_puesto.puesto_funcion.nombre
+        if puesto_funcion:
+            licencia.puesto_nombre = puesto_funcion.nombre
         licencia.tipo = form.tipo.data
         licencia.fecha_inicio = form.fecha_inicio.data
         licencia.fecha_termino = form.fecha_termino.data
@@ -227,8 +210,8 @@ def edit(licencia_id):
         licencia.motivo = safe_string(form.motivo.data, save_enie=True)
         licencia.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Editado Licencia {licencia.persona}"),
             url=url_for("licencias.detail", licencia_id=licencia.id),
         )
@@ -252,8 +235,8 @@ def delete(licencia_id):
     if licencia.estatus == "A":
         licencia.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Licencia {licencia.persona.nombre_completo}"),
             url=url_for("licencias.detail", licencia_id=licencia.id),
         )
@@ -270,8 +253,8 @@ def recover(licencia_id):
     if licencia.estatus == "B":
         licencia.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Licencia {licencia.persona.nombre_completo}"),
             url=url_for("licencias.detail", licencia_id=licencia.id),
         )
@@ -0,0 +1,103 @@
+"""
+Modulos, menú principal
+
+El menú de navegación depende sólo de los roles activos del usuario, y muchos
+usuarios comparten los mismos roles. Por eso se guarda por la huella de los
+roles_ids, en Redis y en una caché local del worker, junto con su HTML ya elaborado.
+
+La llave incluye la versión global de la caché de permisos, que cambia al
+modificar módulos, permisos o roles, así el menú nunca queda desactualizado.
+"""
+
+import hashlib
+import json
+from collections import namedtuple
+
+from flask import current_app, get_template_attribute
+from markupsafe import Markup
+from redis.exceptions import RedisError
+
+from lib.local_cache import LocalCache
+from lib.permisos_cache import PERMISOS_VERSION_KEY
+from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.permisos.models import Permiso
+from orion.extensions import database
+
+MENU_KEY = "orion:menu:{version}:{huella}"
+MENU_TTL = 24 * 60 * 60  # Un día en segundos
+
+ModuloMenu = namedtuple("ModuloMenu", ["nombre", "nombre_corto", "ruta", "icono"])
+
+local_cache = LocalCache(maxsize=128)
+
+
+def get_huella(roles_ids) -> str:
+    """Huella del conjunto de roles"""
+    texto = ",".join(str(rol_id) for rol_id in sorted(set(roles_ids)))
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def consultar_menu(roles_ids) -> tuple:
+    """Consultar los módulos del menú para los roles, ordenados por nombre corto"""
+    if len(roles_ids) == 0:
+        return ()
+    consulta = (
+        database.session.query(Modulo.nombre, Modulo.nombre_corto, Modulo.ruta, Modulo.icono)
+        .join(Permiso, Permiso.modulo_id == Modulo.id)
+        .filter(Permiso.rol_id.in_(roles_ids))
+        .filter(Permiso.estatus == "A")
+        .filter(Permiso.nivel > 0)
+        .filter(Modulo.en_navegacion == True)
+        .filter(Modulo.en_plataforma_orion == True)
+        .distinct()
+        .order_by(Modulo.nombre_corto)
+    )
+    return tuple(ModuloMenu(*renglon) for renglon in consulta.all())
+
+
+def get_menu_entrada(roles_ids, version: int = None) -> dict:
+    """Entregar el diccionario con los modulos y el html del menú, desde la caché"""
+    if version is None:
+        try:
+            version = int(current_app.redis.get(PERMISOS_VERSION_KEY) or 0)
+        except RedisError:
+            return {"modulos": consultar_menu(roles_ids), "html": None}
+    llave = MENU_KEY.format(version=version, huella=get_huella(roles_ids))
+
+    # Primero buscar en la caché local del worker
+    entrada = local_cache.get(llave)
+    if entrada is not None:
+        return entrada
+
+    # Después buscar en Redis, o consultar la base de datos
+    try:
+        guardado = current_app.redis.get(llave)
+    except RedisError:
+        guardado = None
+    if guardado is not None:
+        modulos = tuple(ModuloMenu(*renglon) for renglon in json.loads(guardado))
+    else:
+        modulos = consultar_menu(roles_ids)
+        try:
+            current_app.redis.set(llave, json.dumps(modulos), ex=MENU_TTL)
+        except RedisError:
+            pass
+    entrada = {"modulos": modulos, "html": None}
+    local_cache.set(llave, entrada)
+    return entrada
+
+
+def get_menu(roles_ids, version: int = None) -> tuple:
+    """Entregar los módulos del menú principal"""
+    return get_menu_entrada(roles_ids, version)["modulos"]
+
+
+def get_menu_html(roles_ids, version: int = None) -> Markup:
+    """Entregar el HTML de las opciones del menú principal, elaborado una sola vez"""
+    entrada = get_menu_entrada(roles_ids, version)
+    if entrada["html"] is None:
+        menu_option = get_template_attribute("macros/navigation.jinja2", "menu_option")
+        entrada["html"] = Markup("").join(
+            menu_option(modulo.nombre_corto, modulo.ruta, modulo.icono) for modulo in entrada["modulos"]
+        )
+    return entrada["html"]
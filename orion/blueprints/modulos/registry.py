@@ -0,0 +1,86 @@
+"""
+Modulos, registro en memoria
+
+Cada escritura guarda una Bitacora con el id de su módulo. Para no consultar
+Modulo por su nombre en cada una, se carga el diccionario nombre -> id al crear
+la app y se recarga cuando cambia la versión guardada en Redis.
+
+    bitacora = Bitacora(
+        modulo_id=get_modulo_id(MODULO),
+        usuario_id=current_user.id,
+        descripcion=safe_message(f"Nuevo Área {area.nombre}"),
+        url=url_for("areas.detail", area_id=area.id),
+    )
+    bitacora.save()
+
+Al agregar o cambiar el nombre de un módulo, use invalidate_modulos() para que
+todos los workers recarguen.
+"""
+
+from threading import Lock
+
+from flask import current_app
+from redis.exceptions import RedisError
+
+from lib.exceptions import MyNotExistsError
+from lib.unit_of_work import on_commit
+from orion.blueprints.modulos.models import Modulo
+from orion.extensions import database
+
+MODULOS_VERSION_KEY = "orion:modulos:version"
+
+
+class ModuloRegistry:
+    """Diccionario nombre -> id de los módulos"""
+
+    def __init__(self):
+        self.ids = {}
+        self.version = None
+        self._candado = Lock()
+
+    def load(self, version: int = None) -> None:
+        """Cargar todos los módulos con una sola consulta"""
+        ids = dict(database.session.query(Modulo.nombre, Modulo.id).all())
+        with self._candado:
+            self.ids = ids
+            self.version = version
+
+    def get_version(self):
+        """Consultar la versión en Redis, None si no está disponible"""
+        try:
+            return int(current_app.redis.get(MODULOS_VERSION_KEY) or 0)
+        except RedisError:
+            return None
+
+    def get_id(self, nombre: str) -> int:
+        """Entregar el id del módulo, recargando si cambió la versión o si no se encuentra"""
+        version = self.get_version()
+        if version is not None and version != self.version:
+            self.load(version)
+        if nombre not in self.ids:
+            self.load(version)
+        if nombre not in self.ids:
+            raise MyNotExistsError(f"No existe el módulo {nombre}")
+        return self.ids[nombre]
+
+
+modulos_registry = ModuloRegistry()
+
+
+def get_modulo_id(nombre: str) -> int:
+    """Entregar el id del módulo por su nombre, sin consultar la base de datos"""
+    return modulos_registry.get_id(nombre)
+
+
+def invalidate_modulos() -> None:
+    """Pedir a todos los workers que recarguen el registro de módulos, después del commit"""
+    on_commit(increment_modulos_version)
+
+
+def increment_modulos_version() -> None:
+    """Incrementar la versión del registro de módulos"""
+    try:
+        current_app.redis.incr(MODULOS_VERSION_KEY)
+    except RedisError:
+        pass
+    modulos_registry.version = None
@@ -4,15 +4,17 @@ Modulos, vistas
 
 import json
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
 from orion.blueprints.bitacoras.models import Bitacora
 from orion.blueprints.modulos.forms import ModuloForm
 from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id, invalidate_modulos
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains
+from lib.permisos_cache import invalidate_permisos
 from lib.safe_string import safe_message, safe_string
 
 MODULO = "MODULOS"
@@ -27,40 +29,38 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Modulos"""
+    return {
+        "detalle": {
+            "nombre": renglon.nombre,
+            "url": url_for("modulos.detail", modulo_id=renglon.id),
+        },
+        "icono": renglon.icono,
+        "en_navegacion": renglon.en_navegacion,
+    }
+
+
+MODULOS_DATATABLE = DataTableSpec(
+    model=Modulo,
+    columns={
+        "id": Modulo.id,
+        "nombre": Modulo.nombre,
+        "icono": Modulo.icono,
+        "en_navegacion": Modulo.en_navegacion,
+    },
+    filters=[
+        filter_contains("nombre", Modulo.nombre, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+    ],
+    order=[Modulo.nombre],
+    row=datatable_renglon,
+)
+
+
 @modulos.route("/modulos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Modulos"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Modulo.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"], save_enie=True)
-        if nombre != "":
-            consulta = consulta.filter(Modulo.nombre.contains(nombre))
-    # Ordenar y paginar
-    registros = consulta.order_by(Modulo.nombre).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "nombre": resultado.nombre,
-                    "url": url_for("modulos.detail", modulo_id=resultado.id),
-                },
-                "icono": resultado.icono,
-                "en_navegacion": resultado.en_navegacion,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return MODULOS_DATATABLE.output()
 
 
 @modulos.route("/modulos")
@@ -114,9 +114,10 @@ def new():
             en_plataforma_orion=form.en_plataforma_orion.data,
         )
         modulo.save()
+        invalidate_modulos()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Modulo {modulo.nombre}"),
             url=url_for("modulos.detail", modulo_id=modulo.id),
         )
@@ -150,9 +151,11 @@ def edit(modulo_id):
             modulo.en_navegacion = form.en_navegacion.data
             modulo.en_plataforma_orion = form.en_plataforma_orion.data
             modulo.save()
+            invalidate_permisos()
+            invalidate_modulos()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Modulo {modulo.nombre}"),
                 url=url_for("modulos.detail", modulo_id=modulo.id),
             )
@@ -179,10 +182,12 @@ def delete(modulo_id):
         # Dar de baja los permisos asociados
         for permiso in este_modulo.permisos:
             permiso.delete()
+        # Invalidar la caché de permisos
+        invalidate_permisos()
         # Guardar en la bitacora
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Modulo {este_modulo.nombre}"),
             url=url_for("modulos.detail", modulo_id=este_modulo.id),
         )
@@ -202,10 +207,12 @@ def recover(modulo_id):
         # Dar de alta los permisos asociados
         for permiso in este_modulo.permisos:
             permiso.recover()
+        # Invalidar la caché de permisos
+        invalidate_permisos()
         # Guardar en la bitacora
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Modulo {este_modulo.nombre}"),
             url=url_for("modulos.detail", modulo_id=este_modulo.id),
         )
@@ -3,14 +3,14 @@ Niveles Académicos, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains
 from lib.safe_string import safe_string, safe_message, safe_clave
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.niveles_academicos.forms import NivelAcademicoForm
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
@@ -28,43 +28,37 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Niveles Académicos"""
+    return {
+        "detalle": {
+            "clave": renglon.clave,
+            "url": url_for("niveles_academicos.detail", nivel_academico_id=renglon.id),
+        },
+        "nombre": renglon.nombre,
+    }
+
+
+NIVELES_ACADEMICOS_DATATABLE = DataTableSpec(
+    model=NivelAcademico,
+    columns={
+        "id": NivelAcademico.id,
+        "clave": NivelAcademico.clave,
+        "nombre": NivelAcademico.nombre,
+    },
+    filters=[
+        filter_contains("clave", NivelAcademico.clave, limpiar=safe_clave),
+        filter_contains("nombre", NivelAcademico.nombre),
+    ],
+    order=[NivelAcademico.clave],
+    row=datatable_renglon,
+)
+
+
 @niveles_academicos.route("/niveles_academicos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Niveles Académicos"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = NivelAcademico.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "clave" in request.form:
-        clave = safe_clave(request.form["clave"])
-        if clave != "":
-            consulta = consulta.filter(NivelAcademico.clave.contains(clave))
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"])
-        if nombre != "":
-            consulta = consulta.filter(NivelAcademico.nombre.contains(nombre))
-    # Ordenar y paginar
-    registros = consulta.order_by(NivelAcademico.clave).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "clave": resultado.clave,
-                    "url": url_for("niveles_academicos.detail", nivel_academico_id=resultado.id),
-                },
-                "nombre": resultado.nombre,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return NIVELES_ACADEMICOS_DATATABLE.output()
 
 
 @niveles_academicos.route("/niveles_academicos")
@@ -115,8 +109,8 @@ def new():
         )
         nivel_academico.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Nivel Académico {nivel_academico.clave}"),
             url=url_for("niveles_academicos.detail", nivel_academico_id=nivel_academico.id),
         )
@@ -146,8 +140,8 @@ def edit(nivel_academico_id):
             nivel_academico.nombre = safe_string(form.nombre.data)
             nivel_academico.save()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Nivel Académico {nivel_academico.nombre}"),
                 url=url_for("niveles_academicos.detail", nivel_academico_id=nivel_academico.id),
             )
@@ -167,8 +161,8 @@ def delete(nivel_academico_id):
     if nivel_academico.estatus == "A":
         nivel_academico.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Nivel Académico {nivel_academico.nombre}"),
             url=url_for("niveles_academicos.detail", nivel_academico_id=nivel_academico.id),
         )
@@ -185,8 +179,8 @@ def recover(nivel_academico_id):
     if nivel_academico.estatus == "B":
         nivel_academico.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Nivel Académico {nivel_academico.nombre}"),
             url=url_for("niveles_academicos.detail", nivel_academico_id=nivel_academico.id),
         )
@@ -3,15 +3,16 @@
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
-from sqlalchemy import or_
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains
 from lib.safe_string import safe_string, safe_message, safe_clave
+from lib.typeahead import TypeaheadIndex
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.catalogos.cache import ORGANOS
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.organos.forms import OrganoForm
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
@@ -29,43 +30,37 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Organos"""
+    return {
+        "detalle": {
+            "clave": renglon.clave,
+            "url": url_for("organos.detail", organo_id=renglon.id),
+        },
+        "nombre": renglon.nombre,
+    }
+
+
+ORGANOS_DATATABLE = DataTableSpec(
+    model=Organo,
+    columns={
+        "id": Organo.id,
+        "clave": Organo.clave,
+        "nombre": Organo.nombre,
+    },
+    filters=[
+        filter_contains("clave", Organo.clave, limpiar=safe_clave),
+        filter_contains("nombre", Organo.nombre),
+    ],
+    order=[Organo.clave],
+    row=datatable_renglon,
+)
+
+
 @organos.route("/organos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Organos"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Organo.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "clave" in request.form:
-        clave = safe_clave(request.form["clave"])
-        if clave != "":
-            consulta = consulta.filter(Organo.clave.contains(clave))
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"])
-        if nombre != "":
-            consulta = consulta.filter(Organo.nombre.contains(nombre))
-    # Ordenar y paginar
-    registros = consulta.order_by(Organo.clave).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "clave": resultado.clave,
-                    "url": url_for("organos.detail", organo_id=resultado.id),
-                },
-                "nombre": resultado.nombre,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return ORGANOS_DATATABLE.output()
 
 
 @organos.route("/organos")
@@ -116,8 +111,8 @@ def new():
         )
         organo.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Órgano {organo.clave}"),
             url=url_for("organos.detail", organo_id=organo.id),
         )
@@ -148,8 +143,8 @@ def edit(organo_id):
             organo.nombre = safe_string(form.nombre.data)
             organo.save()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Órgano {organo.clave}"),
                 url=url_for("organos.detail", organo_id=organo.id),
             )
@@ -169,8 +164,8 @@ def delete(organo_id):
     if organo.estatus == "A":
         organo.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Órgano {organo.clave}"),
             url=url_for("organos.detail", organo_id=organo.id),
         )
@@ -187,8 +182,8 @@ def recover(organo_id):
     if organo.estatus == "B":
         organo.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Órgano {organo.clave}"),
             url=url_for("organos.detail", organo_id=organo.id),
         )
@@ -197,20 +192,17 @@ def recover(organo_id):
     return redirect(url_for("organos.detail", organo_id=organo.id))
 
 
+ORGANOS_TYPEAHEAD = TypeaheadIndex(
+    model=Organo,
+    columns={"clave": Organo.clave, "nombre": Organo.nombre},
+    text=lambda renglon: f"{renglon.clave}: {renglon.nombre}",
+    search=["clave", "nombre"],
+    order=Organo.id,
+    catalog=ORGANOS,
+)
+
+
 @organos.route("/organos/query_organos_json", methods=["POST"])
 def query_organos_json():
     """Proporcionar el JSON de Órganos para elegir en un Select2"""
-    consulta = Organo.query.filter_by(estatus="A")
-    if "clave_nombre" in request.form:
-        clave_nombre = safe_string(request.form["clave_nombre"]).upper()
-        if clave_nombre != "":
-            consulta = consulta.filter(or_(Organo.clave.contains(clave_nombre), Organo.nombre.contains(clave_nombre)))
-    results = []
-    for centro_trabajo in consulta.order_by(Organo.id).limit(15).all():
-        results.append(
-            {
-                "id": centro_trabajo.id,
-                "text": centro_trabajo.nombre_descriptivo,
-            }
-        )
-    return {"results": results, "pagination": {"more": False}}
+    return ORGANOS_TYPEAHEAD.output("clave_nombre")
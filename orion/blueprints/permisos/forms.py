@@ -6,8 +6,7 @@ from flask_wtf import FlaskForm
 from wtforms import RadioField, SelectField, StringField, SubmitField
 from wtforms.validators import DataRequired
 
-from orion.blueprints.modulos.models import Modulo
-from orion.blueprints.roles.models import Rol
+from orion.blueprints.catalogos.cache import MODULOS, ROLES
 
 NIVELES = [
     (1, "1) Ver"),
@@ -37,7 +36,7 @@ class PermisoNewWithModuloForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         """Inicializar y cargar opciones para rol"""
         super().__init__(*args, **kwargs)
-        self.rol.choices = [(r.id, r.nombre) for r in Rol.query.filter_by(estatus="A").order_by(Rol.nombre).all()]
+        self.rol.choices = ROLES.choices(lambda r: r.nombre)
 
 
 class PermisoNewWithRolForm(FlaskForm):
@@ -51,4 +50,4 @@ class PermisoNewWithRolForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         """Inicializar y cargar opciones para modulo"""
         super().__init__(*args, **kwargs)
-        self.modulo.choices = [(m.id, m.nombre) for m in Modulo.query.filter_by(estatus="A").order_by(Modulo.nombre).all()]
+        self.modulo.choices = MODULOS.choices(lambda m: m.nombre)
@@ -4,13 +4,15 @@ Permisos, vistas
 
 import json
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains, filter_equal
+from lib.permisos_cache import invalidate_permisos
 from lib.safe_string import safe_message, safe_string
 from orion.blueprints.bitacoras.models import Bitacora
 from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.forms import PermisoEditForm, PermisoNewWithModuloForm, PermisoNewWithRolForm
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.roles.models import Rol
@@ -28,66 +30,58 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Permisos"""
+    return {
+        "detalle": {
+            "nombre": renglon.nombre,
+            "url": url_for("permisos.detail", permiso_id=renglon.id),
+        },
+        "nivel": Permiso.NIVELES[renglon.nivel],
+        "modulo": {
+            "nombre": renglon.modulo_nombre,
+            "url": url_for("modulos.detail", modulo_id=renglon.modulo_id) if current_user.can_view("MODULOS") else "",
+        },
+        "rol": {
+            "nombre": renglon.rol_nombre,
+            "url": url_for("roles.detail", rol_id=renglon.rol_id) if current_user.can_view("ROLES") else "",
+        },
+    }
+
+
+PERMISOS_DATATABLE = DataTableSpec(
+    model=Permiso,
+    columns={
+        "id": Permiso.id,
+        "nombre": Permiso.nombre,
+        "nivel": Permiso.nivel,
+        "modulo_id": Permiso.modulo_id,
+        "modulo_nombre": Modulo.nombre,
+        "rol_id": Permiso.rol_id,
+        "rol_nombre": Rol.nombre,
+    },
+    joins=[
+        (Modulo, Permiso.modulo_id == Modulo.id),
+        (Rol, Permiso.rol_id == Rol.id),
+    ],
+    where=[Modulo.en_plataforma_orion == True],  # Solo los módulos en Plataforma Orión
+    filters=[
+        filter_equal("modulo_id", Permiso.modulo_id),
+        filter_equal("rol_id", Permiso.rol_id),
+        filter_contains("nombre", Permiso.nombre, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+        filter_equal("nivel", Permiso.nivel, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+        filter_contains("rol_nombre", Rol.nombre, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+        filter_contains("modulo_nombre", Modulo.nombre, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+    ],
+    order=[Permiso.nombre],
+    row=datatable_renglon,
+)
+
+
 @permisos.route("/permisos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Permisos"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Permiso.query
-    # Solo los módulos en Plataforma Orión
-    consulta = consulta.join(Modulo).filter(Modulo.en_plataforma_orion == True)
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter(Permiso.estatus == request.form["estatus"])
-    else:
-        consulta = consulta.filter(Permiso.estatus == "A")
-    if "modulo_id" in request.form:
-        consulta = consulta.filter(Permiso.modulo_id == request.form["modulo_id"])
-    if "rol_id" in request.form:
-        consulta = consulta.filter(Permiso.rol_id == request.form["rol_id"])
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"], save_enie=True)
-        if nombre != "":
-            consulta = consulta.filter(Permiso.nombre.contains(nombre))
-    if "nivel" in request.form:
-        nivel = safe_string(request.form["nivel"], save_enie=True)
-        if nivel != "":
-            consulta = consulta.filter(Permiso.nivel == nivel)
-    # Luego filtrar por columnas de otras tablas
-    if "rol_nombre" in request.form:
-        rol_nombre = safe_string(request.form["rol_nombre"], save_enie=True)
-        if rol_nombre != "":
-            consulta = consulta.join(Rol).filter(Rol.nombre.contains(rol_nombre))
-    if "modulo_nombre" in request.form:
-        modulo_nombre = safe_string(request.form["modulo_nombre"], save_enie=True)
-        if modulo_nombre != "":
-            consulta = consulta.filter(Modulo.nombre.contains(modulo_nombre))  # Antes se hizo el join(Modulo)
-    # Ordenar y paginar
-    registros = consulta.order_by(Permiso.nombre).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "nombre": resultado.nombre,
-                    "url": url_for("permisos.detail", permiso_id=resultado.id),
-                },
-                "nivel": resultado.nivel_descrito,
-                "modulo": {
-                    "nombre": resultado.modulo.nombre,
-                    "url": url_for("modulos.detail", modulo_id=resultado.modulo_id) if current_user.can_view("MODULOS") else "",
-                },
-                "rol": {
-                    "nombre": resultado.rol.nombre,
-                    "url": url_for("roles.detail", rol_id=resultado.rol_id) if current_user.can_view("ROLES") else "",
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return PERMISOS_DATATABLE.output()
 
 
 @permisos.route("/permisos")
@@ -136,6 +130,7 @@ def new_with_rol(rol_id):
                 permiso_existente.nivel = nivel
                 permiso_existente.estatus = "A"
                 permiso_existente.save()
+                invalidate_permisos()
                 flash(f"Se ha recuperado {nombre}.", "success")
             else:
                 flash(f"Ya existe {nombre}. Nada por hacer.", "warning")
@@ -147,6 +142,7 @@ def new_with_rol(rol_id):
             nivel=nivel,
         )
         permiso.save()
+        invalidate_permisos()
         flash(safe_message(f"Nuevo permiso {nombre}"), "success")
         return redirect(url_for("roles.detail", rol_id=rol.id))
     form.rol.data = rol.nombre  # Solo lectura
@@ -174,6 +170,7 @@ def new_with_modulo(modulo_id):
                 permiso_existente.nivel = nivel
                 permiso_existente.estatus = "A"
                 permiso_existente.save()
+                invalidate_permisos()
                 flash(f"Se ha recuperado {nombre}.", "success")
             else:
                 flash(f"Ya existe {nombre}. Nada por hacer.", "warning")
@@ -185,6 +182,7 @@ def new_with_modulo(modulo_id):
             nivel=nivel,
         )
         permiso.save()
+        invalidate_permisos()
         flash(safe_message(f"Nuevo permiso {nombre}"), "success")
         return redirect(url_for("modulos.detail", modulo_id=modulo.id))
     form.modulo.data = modulo.nombre  # Solo lectura
@@ -206,9 +204,10 @@ def edit(permiso_id):
         permiso.nivel = form.nivel.data
         permiso.nombre = f"{permiso.rol.nombre} puede {Permiso.NIVELES[permiso.nivel]} en {permiso.modulo.nombre}"
         permiso.save()
+        invalidate_permisos()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Editado Permiso {permiso.nombre}"),
             url=url_for("permisos.detail", permiso_id=permiso.id),
         )
@@ -228,9 +227,10 @@ def delete(permiso_id):
     permiso = Permiso.query.get_or_404(permiso_id)
     if permiso.estatus == "A":
         permiso.delete()
+        invalidate_permisos()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Permiso {permiso.nombre}"),
             url=url_for("permisos.detail", permiso_id=permiso.id),
         )
@@ -246,9 +246,10 @@ def recover(permiso_id):
     permiso = Permiso.query.get_or_404(permiso_id)
     if permiso.estatus == "B":
         permiso.recover()
+        invalidate_permisos()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Permiso {permiso.nombre}"),
             url=url_for("permisos.detail", permiso_id=permiso.id),
         )
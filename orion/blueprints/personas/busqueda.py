@@ -0,0 +1,106 @@
+"""
+Personas, búsqueda por nombre
+
+La columna nombre_busqueda guarda los nombres y apellidos sin acentos ni
+signos y en mayúsculas, se actualiza al insertar o modificar una persona.
+En PostgreSQL tiene un índice GIN de trigramas (pg_trgm), con él las
+búsquedas LIKE '%PALABRA%' no recorren toda la tabla y se ordenan por
+similitud. En SQLite, como en las pruebas, se usa el mismo LIKE sin índice
+de trigramas y se ordena poniendo primero los que empiezan con lo buscado.
+
+    consulta = buscar_personas("jose perez", Persona.query.filter_by(estatus="A"))
+
+Para los filtros de los DataTables use filter_persona_nombre("persona_nombre_completo")
+
+Si ninguna persona coincide con lo escrito, se buscan los nombres parecidos:
+la columna nombre_fonetico guarda las claves fonéticas (lib.fonetica) y sirve
+para juntar un bloque de candidatos con las mismas claves, dentro del bloque
+se ordenan por la distancia de edición contra nombre_busqueda.
+
+    personas_ids = buscar_similares("jose gonsales")
+"""
+
+from sqlalchemy import and_, case, func
+
+from lib.datatable_engine import DataTableFilter
+from lib.fonetica import clave_fonetica, distancia_edicion
+from lib.safe_string import safe_search
+from orion.blueprints.personas.models import Persona
+from orion.extensions import database
+
+FONETICA_BLOQUE = 500  # Máximo de candidatos con las mismas claves fonéticas
+FONETICA_RESULTADOS = 50  # Máximo de personas parecidas
+
+
+def get_palabras(texto: str) -> list:
+    """Palabras normalizadas igual que nombre_busqueda"""
+    return safe_search(texto).split()
+
+
+def criterio_nombre(texto: str):
+    """Cada palabra debe estar en nombre_busqueda"""
+    return and_(*[Persona.nombre_busqueda.contains(palabra) for palabra in get_palabras(texto)])
+
+
+def orden_nombre(texto: str) -> list:
+    """Orden por relevancia, similitud de trigramas en PostgreSQL, en otro caso los que empiezan con lo buscado"""
+    buscado = " ".join(get_palabras(texto))
+    if database.session.get_bind().dialect.name == "postgresql":
+        return [func.similarity(Persona.nombre_busqueda, buscado).desc(), Persona.id]
+    return [case((Persona.nombre_busqueda.startswith(buscado), 0), else_=1), Persona.nombre_busqueda, Persona.id]
+
+
+def buscar_personas(texto: str, consulta=None):
+    """Filtrar por nombre y ordenar por relevancia"""
+    if consulta is None:
+        consulta = Persona.query
+    if len(get_palabras(texto)) == 0:
+        return consulta.order_by(Persona.id)
+    return consulta.filter(criterio_nombre(texto)).order_by(*orden_nombre(texto))
+
+
+def get_tolerancia(palabra: str) -> int:
+    """Distancia de edición aceptada para una palabra, una letra por cada tres"""
+    return max(1, len(palabra) // 3)
+
+
+def buscar_similares(texto: str, limite: int = FONETICA_RESULTADOS) -> list:
+    """Ids de las personas activas con nombre parecido, del más cercano al más lejano"""
+    palabras = [palabra for palabra in get_palabras(texto) if clave_fonetica(palabra) != ""]
+    if len(palabras) == 0:
+        return []
+    bloque = (
+        database.session.query(Persona.id, Persona.nombre_busqueda)
+        .filter(Persona.estatus == "A")
+        .filter(*[Persona.nombre_fonetico.contains(f" {clave_fonetica(palabra)} ") for palabra in palabras])
+        .limit(FONETICA_BLOQUE)
+        .all()
+    )
+    parecidas = []
+    for persona_id, nombre_busqueda in bloque:
+        nombre = (nombre_busqueda or "").split()
+        if len(nombre) == 0:
+            continue
+        distancias = [min(distancia_edicion(palabra, otra) for otra in nombre) for palabra in palabras]
+        if all(distancia <= get_tolerancia(palabra) for palabra, distancia in zip(palabras, distancias)):
+            parecidas.append((sum(distancias), persona_id))
+    parecidas.sort()
+    return [persona_id for _, persona_id in parecidas[:limite]]
+
+
+def criterio_nombre_similar(texto: str):
+    """Cada palabra debe estar en nombre_busqueda, si ninguna persona coincide entonces las de nombre parecido"""
+    criterio = criterio_nombre(texto)
+    if database.session.query(Persona.query.filter(Persona.estatus == "A").filter(criterio).exists()).scalar():
+        return criterio
+    return Persona.id.in_(buscar_similares(texto))
+
+
+def filter_persona_nombre(campo: str) -> DataTableFilter:
+    """Filtro de DataTable por el nombre de la persona"""
+    return DataTableFilter(campo, criterio_nombre, safe_search)
+
+
+def filter_persona_nombre_similar(campo: str) -> DataTableFilter:
+    """Filtro de DataTable por el nombre de la persona, con los nombres parecidos si nadie coincide"""
+    return DataTableFilter(campo, criterio_nombre_similar, safe_search)
@@ -6,8 +6,7 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, SubmitField, IntegerField, SelectField, DateField, BooleanField, RadioField, TextAreaField
 from wtforms.validators import DataRequired, Length, Optional, Email
 
-from orion.blueprints.carreras.models import Carrera
-from orion.blueprints.niveles_academicos.models import NivelAcademico
+from orion.blueprints.catalogos.cache import CARRERAS, NIVELES_ACADEMICOS
 from orion.blueprints.personas.models import Persona
 
 
@@ -62,14 +61,9 @@ class PersonaEditDatosAcademicosForm(FlaskForm):
         """Inicializar y cargar opciones de nivel_max_estudios"""
         super().__init__(*args, **kwargs)
         # Nivel Máximo de Estudios
-        self.nivel_max_estudios.choices = [
-            (r.id, f"{r.clave}: {r.nombre}")
-            for r in NivelAcademico.query.filter_by(estatus="A").order_by(NivelAcademico.nombre).all()
-        ]
+        self.nivel_max_estudios.choices = NIVELES_ACADEMICOS.choices(lambda r: f"{r.clave}: {r.nombre}")
         # Carreras
-        self.carrera.choices = [
-            (r.id, f"{r.nombre}") for r in Carrera.query.filter_by(estatus="A").order_by(Carrera.nombre).all()
-        ]
+        self.carrera.choices = CARRERAS.choices(lambda r: r.nombre)
 
 
 class PersonaEditDatosPersonalesForm(FlaskForm):
@@ -5,10 +5,15 @@ Personas, modelos
 from datetime import date, datetime
 from typing import List, Optional
 
-from sqlalchemy import JSON, Boolean, Date, DateTime, Enum, ForeignKey, Integer, String, Text, Uuid
+from sqlalchemy import DDL, JSON, Boolean, Date, DateTime, Enum, ForeignKey, Index, Integer, String, Text, Uuid, event, func
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql.functions import now
 
+from lib.fonetica import claves_foneticas
+from lib.indices import active_index, modified_index
+from lib.safe_string import safe_search
+from lib.unicidad import unique_active_index
 from lib.universal_mixin import UniversalMixin
 from orion.extensions import database
 
@@ -72,25 +77,53 @@ class Persona(database.Model, UniversalMixin):
     # Nombre de la tabla
     __tablename__ = "personas"
 
+    # Índices de trigramas para buscar por nombre, en SQLite son índices normales
+    # Índices únicos parciales, los valores no se repiten entre las personas activas
+    # Índices parciales de los activos con las columnas del filtro y del orden del listado
+    # Índice de todos los registros por (modificado, id) para la API de cambios
+    __table_args__ = (
+        Index(
+            "personas_nombre_busqueda_trgm",
+            "nombre_busqueda",
+            postgresql_using="gin",
+            postgresql_ops={"nombre_busqueda": "gin_trgm_ops"},
+        ),
+        Index(
+            "personas_nombre_fonetico_trgm",
+            "nombre_fonetico",
+            postgresql_using="gin",
+            postgresql_ops={"nombre_fonetico": "gin_trgm_ops"},
+        ),
+        unique_active_index("personas", "numero_empleado", texto=False),
+        unique_active_index("personas", "curp"),
+        unique_active_index("personas", "rfc"),
+        unique_active_index("personas", "email"),
+        active_index("personas", "modificado", "id"),
+        active_index("personas", "situacion", "modificado", "id"),
+        modified_index("personas"),
+    )
+
     # Clave primaria
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Claves foráneas
     # ciudad_nacimiento_id = db.Column(db.Integer, db.ForeignKey("cat_ciudades.id"))
     # ciudad_nacimiento = db.relationship("CatCiudad", back_populates="personas")
-    carrera_id: Mapped[int] = mapped_column(ForeignKey("carreras.id"))
+    carrera_id: Mapped[int] = mapped_column(ForeignKey("carreras.id"), index=True)
     carrera: Mapped["Carrera"] = relationship(back_populates="personas")
-    nivel_estudios_max_id: Mapped[int] = mapped_column(ForeignKey("niveles_academicos.id"))
+    nivel_estudios_max_id: Mapped[int] = mapped_column(ForeignKey("niveles_academicos.id"), index=True)
     nivel_estudios_max: Mapped["NivelAcademico"] = relationship(back_populates="personas")
 
     # Columnas
     nombres: Mapped[str] = mapped_column(String(128))
     apellido_primero: Mapped[str] = mapped_column(String(128))
     apellido_segundo: Mapped[Optional[str]] = mapped_column(String(128))
-    numero_empleado: Mapped[Optional[int]] = mapped_column(unique=True)
+    nombre_busqueda: Mapped[Optional[str]] = mapped_column(String(400))  # Sin acentos, se actualiza al guardar
+    nombre_fonetico: Mapped[Optional[str]] = mapped_column(String(400))  # Claves fonéticas, se actualiza al guardar
+    numero_empleado: Mapped[Optional[int]]
     numero_empleado_temporal: Mapped[bool] = mapped_column(default=False)
     rfc: Mapped[str] = mapped_column(String(13))
-    curp: Mapped[str] = mapped_column(String(18), unique=True)
+    curp: Mapped[str] = mapped_column(String(18))
     email: Mapped[Optional[str]] = mapped_column(String(64))
     email_secundario: Mapped[Optional[str]] = mapped_column(String(64))
     telefono_personal: Mapped[Optional[str]] = mapped_column(String(32))
@@ -153,11 +186,43 @@ class Persona(database.Model, UniversalMixin):
     adjuntos: Mapped[List["PersonaAdjunto"]] = relationship(back_populates="persona")
     nombramientos: Mapped[List["PersonaNombramiento"]] = relationship(back_populates="persona")
 
-    @property
+    @hybrid_property
     def nombre_completo(self):
-        """Junta nombres, apellido primero y apellido segundo"""
-        return self.nombres + " " + self.apellido_primero + " " + self.apellido_segundo
+        """Junta nombres, apellido primero y apellido segundo, omite los vacíos"""
+        return " ".join(nombre for nombre in (self.nombres, self.apellido_primero, self.apellido_segundo) if nombre)
+
+    @nombre_completo.expression
+    def nombre_completo(cls):
+        """En SQL el apellido segundo nulo o vacío se omite, así el nombre completo no queda nulo"""
+        return cls.nombres + " " + cls.apellido_primero + func.coalesce(" " + func.nullif(cls.apellido_segundo, ""), "")
+
+    @staticmethod
+    def formar_nombre_busqueda(nombres, apellido_primero, apellido_segundo) -> str:
+        """Junta nombres y apellidos sin acentos ni signos para nombre_busqueda"""
+        return safe_search(f"{nombres} {apellido_primero} {apellido_segundo or ''}")
+
+    @staticmethod
+    def formar_nombre_fonetico(nombres, apellido_primero, apellido_segundo) -> str:
+        """Junta las claves fonéticas de nombres y apellidos, con espacios en los extremos para buscar palabras completas"""
+        claves = claves_foneticas(f"{nombres} {apellido_primero} {apellido_segundo or ''}")
+        return f" {' '.join(claves)} "
 
     def __repr__(self):
         """Representación"""
         return f"<Persona {self.id}>"
+
+
+@event.listens_for(Persona, "before_insert")
+@event.listens_for(Persona, "before_update")
+def actualizar_nombre_busqueda(mapper, connection, persona):
+    """Actualizar nombre_busqueda y nombre_fonetico con los nombres y apellidos"""
+    persona.nombre_busqueda = Persona.formar_nombre_busqueda(
+        persona.nombres, persona.apellido_primero, persona.apellido_segundo
+    )
+    persona.nombre_fonetico = Persona.formar_nombre_fonetico(
+        persona.nombres, persona.apellido_primero, persona.apellido_segundo
+    )
+
+
+# La extensión pg_trgm debe existir antes de crear el índice
+event.listen(Persona.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
@@ -0,0 +1,188 @@
+"""
+Personas, tareas en el fondo
+
+Detectar personas duplicadas sin comparar todas contra todas: se recorre la
+tabla una sola vez con un cursor del lado del servidor y cada persona se pone
+en los bloques de sus llaves
+
+- CURP: los primeros 10 caracteres, iniciales y fecha de nacimiento
+- FECHA: la fecha de nacimiento con las claves fonéticas del nombre
+- RFC: la raíz de 10 caracteres, sin la homoclave
+
+Sólo se comparan las parejas dentro de cada bloque; los bloques con más de
+BLOQUE_MAXIMO personas se omiten porque sus llaves no distinguen. Cada pareja
+recibe un puntaje entre 0 y 1, las de PUNTAJE_MINIMO o más van al reporte XLSX
+que se sube a Google Cloud Storage para descargarlo desde la Tarea.
+"""
+
+from datetime import datetime
+from io import BytesIO
+
+from flask import current_app
+from openpyxl import Workbook
+
+from lib.exceptions import MyAnyError
+from lib.fonetica import distancia_edicion
+from lib.google_cloud_storage import upload_file_to_gcs
+from lib.tasks import set_task_error, set_task_progress
+from orion.app import create_app
+from orion.blueprints.personas.models import Persona
+from orion.extensions import database
+
+app = create_app()
+app.app_context().push()
+database.app = app
+
+BLOQUE_MAXIMO = 50
+LOTE = 1000
+PUNTAJE_MINIMO = 0.6
+GCS_BASE_DIRECTORIO = "personas_duplicados"
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def get_llaves(persona) -> list:
+    """Llaves de bloque de una persona"""
+    llaves = []
+    if persona.curp and len(persona.curp) >= 10:
+        llaves.append(f"CURP:{persona.curp[:10]}")
+    if persona.fecha_nacimiento and persona.nombre_fonetico and persona.nombre_fonetico.strip():
+        llaves.append(f"FECHA:{persona.fecha_nacimiento.isoformat()}:{persona.nombre_fonetico.strip()}")
+    if persona.rfc and len(persona.rfc) >= 10:
+        llaves.append(f"RFC:{persona.rfc[:10]}")
+    return llaves
+
+
+def calcular_puntaje(primera, segunda) -> tuple:
+    """Puntaje de 0 a 1 de que sean la misma persona y los motivos"""
+    puntaje = 0.0
+    motivos = []
+    if primera.curp and segunda.curp:
+        if primera.curp[:16] == segunda.curp[:16]:
+            puntaje += 0.4
+            motivos.append("CURP sin homoclave")
+        elif primera.curp[:10] == segunda.curp[:10]:
+            puntaje += 0.2
+            motivos.append("CURP raíz")
+    if primera.rfc and segunda.rfc and primera.rfc[:10] == segunda.rfc[:10]:
+        puntaje += 0.15
+        motivos.append("RFC raíz")
+    if primera.fecha_nacimiento == segunda.fecha_nacimiento:
+        puntaje += 0.1
+        motivos.append("Fecha de nacimiento")
+    nombre_primera = primera.nombre_busqueda or ""
+    nombre_segunda = segunda.nombre_busqueda or ""
+    largo = max(len(nombre_primera), len(nombre_segunda))
+    if largo > 0:
+        parecido = 1 - distancia_edicion(nombre_primera, nombre_segunda) / largo
+        puntaje += 0.35 * parecido
+        if parecido >= 0.8:
+            motivos.append(f"Nombre {int(parecido * 100)}%")
+    return round(puntaje, 3), motivos
+
+
+def buscar_duplicados() -> list:
+    """Recorrer las personas activas y entregar las parejas sospechosas, de mayor a menor puntaje"""
+    consulta = (
+        database.session.query(
+            Persona.id,
+            Persona.numero_empleado,
+            Persona.curp,
+            Persona.rfc,
+            Persona.fecha_nacimiento,
+            Persona.nombre_busqueda,
+            Persona.nombre_fonetico,
+        )
+        .filter(Persona.estatus == "A")
+        .order_by(Persona.id)
+        .execution_options(yield_per=LOTE)
+    )
+    personas = {}
+    bloques = {}
+    for persona in consulta:  # Sin cambiar la tarea aquí, un commit cerraría el cursor del servidor
+        personas[persona.id] = persona
+        for llave in get_llaves(persona):
+            bloques.setdefault(llave, []).append(persona.id)
+    set_task_progress(50, f"Se leyeron {len(personas)} personas en {len(bloques)} bloques")
+    comparadas = set()
+    parejas = []
+    for personas_ids in bloques.values():
+        if len(personas_ids) < 2 or len(personas_ids) > BLOQUE_MAXIMO:
+            continue
+        for posicion, primera_id in enumerate(personas_ids):
+            for segunda_id in personas_ids[posicion + 1 :]:
+                if (primera_id, segunda_id) in comparadas:
+                    continue
+                comparadas.add((primera_id, segunda_id))
+                puntaje, motivos = calcular_puntaje(personas[primera_id], personas[segunda_id])
+                if puntaje >= PUNTAJE_MINIMO:
+                    parejas.append((puntaje, motivos, personas[primera_id], personas[segunda_id]))
+    parejas.sort(key=lambda pareja: (-pareja[0], pareja[2].id, pareja[3].id))
+    return parejas
+
+
+def elaborar_xlsx(parejas: list) -> bytes:
+    """Elaborar el reporte XLSX de las parejas sospechosas"""
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("Duplicados")
+    hoja.append(
+        [
+            "Puntaje",
+            "Motivos",
+            "ID A",
+            "No. empleado A",
+            "Nombre A",
+            "CURP A",
+            "RFC A",
+            "ID B",
+            "No. empleado B",
+            "Nombre B",
+            "CURP B",
+            "RFC B",
+        ]
+    )
+    for puntaje, motivos, primera, segunda in parejas:
+        hoja.append(
+            [
+                puntaje,
+                ", ".join(motivos),
+                primera.id,
+                primera.numero_empleado,
+                primera.nombre_busqueda,
+                primera.curp,
+                primera.rfc,
+                segunda.id,
+                segunda.numero_empleado,
+                segunda.nombre_busqueda,
+                segunda.curp,
+                segunda.rfc,
+            ]
+        )
+    archivo = BytesIO()
+    libro.save(archivo)
+    return archivo.getvalue()
+
+
+def detectar_duplicados() -> tuple:
+    """Detectar duplicados, subir el reporte XLSX y entregar el mensaje, el nombre del archivo y el URL"""
+    parejas = buscar_duplicados()
+    set_task_progress(75, f"Se encontraron {len(parejas)} parejas, elaborando el reporte")
+    ahora = datetime.now()
+    archivo = f"personas_duplicados_{ahora.strftime('%Y-%m-%d_%H%M%S')}.xlsx"
+    url = upload_file_to_gcs(
+        bucket_name=current_app.config["CLOUD_STORAGE_DEPOSITO"],
+        blob_name=f"{GCS_BASE_DIRECTORIO}/{ahora.strftime('%Y/%m')}/{archivo}",
+        content_type=XLSX_CONTENT_TYPE,
+        data=elaborar_xlsx(parejas),
+    )
+    return f"Se encontraron {len(parejas)} posibles personas duplicadas", archivo, url
+
+
+def lanzar_detectar_duplicados() -> str:
+    """Tarea en el fondo para detectar personas duplicadas"""
+    set_task_progress(0, "Inicia detectar personas duplicadas")
+    try:
+        mensaje, archivo, url = detectar_duplicados()
+    except MyAnyError as error:
+        return set_task_error(str(error))
+    set_task_progress(100, mensaje, archivo, url)
+    return mensaje
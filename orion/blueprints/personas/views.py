@@ -8,15 +8,19 @@ from datetime import date
 
 from flask import Blueprint, flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
-from sqlalchemy import or_
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_equal
+from lib.datatables import CONTEO_CACHE, RESPUESTA_TTL
 from lib.safe_string import safe_message, safe_string, safe_curp, safe_rfc, safe_email
+from lib.typeahead import TYPEAHEAD_POR_PAGINA, TypeaheadIndex
+from lib.unicidad import add_form_errors, save_unique
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
+from orion.blueprints.personas.busqueda import buscar_similares, filter_persona_nombre_similar
 from orion.blueprints.personas.models import Persona
 from orion.blueprints.usuarios.decorators import permission_required
+from orion.blueprints.usuarios.models import Usuario
 from orion.blueprints.personas_domicilios.models import PersonaDomicilio
 from orion.blueprints.personas_fotografias.models import PersonaFotografia
 from orion.blueprints.personas.forms import (
@@ -30,6 +34,14 @@ from orion.blueprints.personas.forms import (
 
 MODULO = "PERSONAS"
 
+# Campos que no se repiten entre las personas activas y sus mensajes
+PERSONAS_UNICOS = {
+    "numero_empleado": "Este Número de Empleado ya se encuentra en uso.",
+    "curp": "Esta CURP ya se encuentra en uso.",
+    "rfc": "Este RFC ya se encuentra en uso.",
+    "email": "Este email ya se encuentra en uso.",
+}
+
 personas = Blueprint("personas", __name__, template_folder="templates")
 
 
@@ -40,63 +52,48 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Personas"""
+    return {
+        "numero_empleado": renglon.numero_empleado,
+        "detalle": {
+            "nombre_completo": renglon.nombre_completo,
+            "url": url_for("personas.detail", persona_id=renglon.id),
+        },
+        "situacion": {
+            "nombre": renglon.situacion,
+            "descripcion": Persona.SITUACIONES[renglon.situacion],
+        },
+        "sexo": "HOMBRE" if renglon.sexo == "H" else "MUJER",
+    }
+
+
+PERSONAS_DATATABLE = DataTableSpec(
+    model=Persona,
+    columns={
+        "id": Persona.id,
+        "modificado": Persona.modificado,
+        "numero_empleado": Persona.numero_empleado,
+        "nombre_completo": Persona.nombre_completo,
+        "situacion": Persona.situacion,
+        "sexo": Persona.sexo,
+    },
+    filters=[
+        filter_equal("numero_empleado", Persona.numero_empleado, limpiar=int),
+        filter_persona_nombre_similar("nombre_completo"),
+        filter_equal("situacion", Persona.situacion),
+    ],
+    keyset=[Persona.modificado, Persona.id],
+    count=CONTEO_CACHE,
+    cache=RESPUESTA_TTL,
+    row=datatable_renglon,
+)
+
+
 @personas.route("/personas/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Personas"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Persona.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "numero_empleado" in request.form:
-        try:
-            numero_empleado = int(request.form["numero_empleado"])
-            consulta = consulta.filter_by(numero_empleado=numero_empleado)
-        except ValueError:
-            pass
-    if "nombre_completo" in request.form:
-        nombre_completo = safe_string(request.form["nombre_completo"])
-        if nombre_completo != "":
-            for palabra in nombre_completo.split(" "):
-                consulta = consulta.filter(
-                    or_(
-                        Persona.nombres.contains(palabra),
-                        Persona.apellido_primero.contains(palabra),
-                        Persona.apellido_segundo.contains(palabra),
-                    )
-                )
-    if "situacion" in request.form:
-        consulta = consulta.filter_by(situacion=request.form["situacion"])
-    # Luego filtrar por columnas de otras tablas
-    # if "persona_rfc" in request.form:
-    #     consulta = consulta.join(Persona)
-    #     consulta = consulta.filter(Persona.rfc.contains(safe_rfc(request.form["persona_rfc"], search_fragment=True)))
-    # Ordenar y paginar
-    registros = consulta.order_by(Persona.modificado.desc()).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "numero_empleado": resultado.numero_empleado,
-                "detalle": {
-                    "nombre_completo": resultado.nombre_completo,
-                    "url": url_for("personas.detail", persona_id=resultado.id),
-                },
-                "situacion": {
-                    "nombre": resultado.situacion,
-                    "descripcion": Persona.SITUACIONES[resultado.situacion],
-                },
-                "sexo": "HOMBRE" if resultado.sexo == "H" else "MUJER",
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return PERSONAS_DATATABLE.output()
 
 
 @personas.route("/personas")
@@ -144,30 +141,9 @@ def new():
     """Nuevo Persana"""
     form = PersonaForm()
     if form.validate_on_submit():
-        # Validar Núm. Empleado
-        numero_empleado = form.numero_empleado.data
-        num_empleado_repetido = Persona.query.filter_by(numero_empleado=numero_empleado).first()
-        if num_empleado_repetido:
-            flash("Esta Número de Empleado ya se encuentra en uso.", "warning")
-            return render_template("personas/new.jinja2", form=form)
-        # Validar CURP
         curp = safe_curp(form.curp.data)
-        curp_repetida = Persona.query.filter_by(curp=curp).first()
-        if curp_repetida:
-            flash("Esta CURP ya se encuentra en uso.", "warning")
-            return render_template("personas/new.jinja2", form=form)
-        # Validar RFC
         rfc = safe_rfc(form.rfc.data)
-        rfc_repetida = Persona.query.filter_by(rfc=rfc).first()
-        if rfc_repetida:
-            flash("Esta RFC ya se encuentra en uso.", "warning")
-            return render_template("personas/new.jinja2", form=form)
-        # Validar Email
         email = safe_email(form.email.data)
-        email_repetida = Persona.query.filter_by(email=email).first()
-        if email_repetida:
-            flash("Este email ya se encuentra en uso.", "warning")
-            return render_template("personas/new.jinja2", form=form)
         # Definiendo variable de Numero de empleado temporal
         numero_empleado_temporal_var = False
         if form.numero_empleado_opciones.data == "TEMP":
@@ -192,10 +168,14 @@ def new():
             falta_papeleria=form.falta_papeleria.data,
             madre=False,
         )
-        persona.save()
+        # Guardar, si algún campo único ya está en uso se marca en el formulario
+        conflictos = save_unique(persona, PERSONAS_UNICOS)
+        if conflictos:
+            add_form_errors(form, conflictos)
+            return render_template("personas/new.jinja2", form=form)
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Persana {persona.nombres}"),
             url=url_for("personas.detail", persona_id=persona.id),
         )
@@ -252,8 +232,8 @@ def edit_domicilio_fiscal(persona_id):
         persona.domicilio_fiscal_cp = form.codigo_postal.data
         persona.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Editado Domicilio Fiscal de una Persona {persona.nombre_completo}"),
             url=url_for("personas.detail", persona_id=persona.id),
         )
@@ -285,8 +265,8 @@ def edit_datos_academicos(persona_id):
         persona.cedula_profesional = form.cedula_profesional.data
         persona.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Editado Datos Académicos de una Persona {persona.nombre_completo}"),
             url=url_for("personas.detail", persona_id=persona.id),
         )
@@ -318,8 +298,8 @@ def edit_datos_personales(persona_id):
         persona.madre = form.es_madre.data
         persona.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Editado Datos Personales de una Persona {persona.nombre_completo}"),
             url=url_for("personas.detail", persona_id=persona.id),
         )
@@ -347,14 +327,6 @@ def edit_datos_generales(persona_id):
     form = PersonaEditDatosGeneralesForm()
     if form.validate_on_submit():
         es_valido = True
-        # Validar Número de Empleado
-        numero_empleado = form.numero_empleado.data
-        num_empleado_repetido = (
-            Persona.query.filter_by(numero_empleado=numero_empleado).filter(Persona.id != persona.id).first()
-        )
-        if num_empleado_repetido:
-            flash("Esta Número de Empleado ya se encuentra en uso.", "warning")
-            return render_template("personas/edit_datos_generales.jinja2", form=form, persona=persona)
         # Validar RFC
         rfc = None
         try:
@@ -362,10 +334,6 @@ def edit_datos_generales(persona_id):
         except:
             flash("RFC no válido", "warning")
             es_valido = False
-        rfc_repetida = Persona.query.filter_by(rfc=rfc).filter(Persona.id != persona.id).first()
-        if rfc_repetida:
-            flash("Esta RFC ya se encuentra en uso.", "warning")
-            return render_template("personas/edit_datos_generales.jinja2", form=form, persona=persona)
         # Validar CURP
         curp = None
         try:
@@ -373,16 +341,8 @@ def edit_datos_generales(persona_id):
         except:
             flash("CURP no válido", "warning")
             es_valido = False
-        curp_repetida = Persona.query.filter_by(curp=curp).filter(Persona.id != persona.id).first()
-        if curp_repetida:
-            flash("Esta CURP ya se encuentra en uso.", "warning")
-            return render_template("personas/edit_datos_generales.jinja2", form=form, persona=persona)
         # Validar Email
         email = safe_email(form.email.data)
-        email_repetida = Persona.query.filter_by(email=email).filter(Persona.id != persona.id).first()
-        if email_repetida:
-            flash("Este email ya se encuentra en uso.", "warning")
-            return render_template("personas/edit_datos_generales.jinja2", form=form, persona=persona)
         # Definiendo variable de Numero de empleado temporal
         numero_empleado_temporal_var = False
         if form.numero_empleado_opciones.data == "TEMP":
@@ -405,10 +365,13 @@ def edit_datos_generales(persona_id):
             persona.numero_empleado_temporal = numero_empleado_temporal_var
             persona.numero_empleado = form.numero_empleado.data
             persona.falta_papeleria = form.falta_papeleria.data
-            persona.save()
+            conflictos = save_unique(persona, PERSONAS_UNICOS)
+            if conflictos:
+                add_form_errors(form, conflictos)
+                return render_template("personas/edit_datos_generales.jinja2", form=form, persona=persona)
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Datos Generales de una Persona {persona.nombre_completo}"),
                 url=url_for("personas.detail", persona_id=persona.id),
             )
@@ -447,8 +410,8 @@ def edit_observaciones(persona_id):
         persona.observaciones_especiales = safe_string(form.observaciones_especiales.data, save_enie=True)
         persona.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Editado Observaciones de una Persona {persona.nombre_completo}"),
             url=url_for("personas.detail", persona_id=persona.id),
         )
@@ -461,6 +424,19 @@ def edit_observaciones(persona_id):
     return render_template("personas/edit_observaciones.jinja2", form=form, persona=persona)
 
 
+@personas.route("/personas/detectar_duplicados")
+@permission_required(MODULO, Permiso.ADMINISTRAR)
+def detect_duplicates():
+    """Lanzar la tarea en el fondo para detectar personas duplicadas"""
+    usuario = Usuario.query.get_or_404(current_user.id)
+    tarea = usuario.launch_task(
+        comando="personas.tasks.lanzar_detectar_duplicados",
+        mensaje="Detectando personas duplicadas...",
+    )
+    flash("Se está detectando personas duplicadas, el reporte XLSX estará en esta tarea.", "info")
+    return redirect(url_for("tareas.detail", tarea_id=tarea.id))
+
+
 @personas.route("/personas/eliminar/<int:persona_id>")
 @permission_required(MODULO, Permiso.ADMINISTRAR)
 def delete(persona_id):
@@ -469,8 +445,8 @@ def delete(persona_id):
     if persona.estatus == "A":
         persona.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Persona {persona.nombre_completo}"),
             url=url_for("personas.detail", persona_id=persona.id),
         )
@@ -487,8 +463,8 @@ def recover(persona_id):
     if persona.estatus == "B":
         persona.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Persona {persona.nombre_completo}"),
             url=url_for("personas.detail", persona_id=persona.id),
         )
@@ -497,28 +473,26 @@ def recover(persona_id):
     return redirect(url_for("personas.detail", persona_id=persona.id))
 
 
+PERSONAS_TYPEAHEAD = TypeaheadIndex(
+    model=Persona,
+    columns={
+        "nombres": Persona.nombres,
+        "apellido_primero": Persona.apellido_primero,
+        "apellido_segundo": Persona.apellido_segundo,
+    },
+    text=lambda renglon: " ".join(n for n in (renglon.nombres, renglon.apellido_primero, renglon.apellido_segundo) if n),
+    search=["nombres", "apellido_primero", "apellido_segundo"],
+    order=Persona.nombre_busqueda,
+)
+
+
 @personas.route("/personas/query_personas_json", methods=["POST"])
 def query_personas_json():
-    """Proporcionar el JSON de Persona para elegir en un Select2"""
-    consulta = Persona.query.filter_by(estatus="A")
-    if "nombre_completo" in request.form:
-        nombre_completo = safe_string(request.form["nombre_completo"]).upper()
-        if nombre_completo != "":
-            palabras = nombre_completo.split()
-            for palabra in palabras:
-                consulta = consulta.filter(
-                    or_(
-                        Persona.nombres.contains(palabra),
-                        Persona.apellido_primero.contains(palabra),
-                        Persona.apellido_segundo.contains(palabra),
-                    )
-                )
-    results = []
-    for persona in consulta.order_by(Persona.id).limit(15).all():
-        results.append(
-            {
-                "id": persona.id,
-                "text": persona.nombre_completo,
-            }
-        )
-    return {"results": results, "pagination": {"more": False}}
+    """Proporcionar el JSON de Persona para elegir en un Select2, con los nombres parecidos si nadie coincide"""
+    salida = PERSONAS_TYPEAHEAD.output("nombre_completo")
+    if len(salida["results"]) == 0 and request.form.get("page", "1") == "1":
+        personas_ids = buscar_similares(request.form.get("nombre_completo", ""), TYPEAHEAD_POR_PAGINA)
+        consulta = Persona.query.with_entities(Persona.id, Persona.nombre_completo).filter(Persona.id.in_(personas_ids))
+        nombres = dict(consulta.all())
+        salida["results"] = [{"id": persona_id, "text": nombres[persona_id]} for persona_id in personas_ids]
+    return salida
@@ -7,11 +7,11 @@ from flask import Blueprint, flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from werkzeug.datastructures import CombinedMultiDict
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_equal
 from lib.safe_string import safe_string, safe_message
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.personas_adjuntos.models import PersonaAdjunto
@@ -41,41 +41,36 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Adjuntos"""
+    return {
+        "detalle": {
+            "tipo": PersonaAdjunto.TIPOS[renglon.tipo],
+            "url": url_for("personas_adjuntos.detail", persona_adjunto_id=renglon.id),
+        },
+        "descripcion": renglon.descripcion,
+    }
+
+
+PERSONAS_ADJUNTOS_DATATABLE = DataTableSpec(
+    model=PersonaAdjunto,
+    columns={
+        "id": PersonaAdjunto.id,
+        "tipo": PersonaAdjunto.tipo,
+        "descripcion": PersonaAdjunto.descripcion,
+    },
+    filters=[
+        filter_equal("persona_id", PersonaAdjunto.persona_id),
+    ],
+    order=[PersonaAdjunto.modificado.desc()],
+    row=datatable_renglon,
+)
+
+
 @personas_adjuntos.route("/personas_adjuntos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Adjuntos"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = PersonaAdjunto.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "persona_id" in request.form:
-        consulta = consulta.filter_by(persona_id=request.form["persona_id"])
-    # Luego filtrar por columnas de otras tablas
-    # if "persona_rfc" in request.form:
-    #     consulta = consulta.join(Persona)
-    #     consulta = consulta.filter(Persona.rfc.contains(safe_rfc(request.form["persona_rfc"], search_fragment=True)))
-    # Ordenar y paginar
-    registros = consulta.order_by(PersonaAdjunto.modificado.desc()).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "tipo": PersonaAdjunto.TIPOS[resultado.tipo],
-                    "url": url_for("personas_adjuntos.detail", persona_adjunto_id=resultado.id),
-                },
-                "descripcion": resultado.descripcion,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return PERSONAS_ADJUNTOS_DATATABLE.output()
 
 
 @personas_adjuntos.route("/personas_adjuntos/<int:persona_adjunto_id>")
@@ -101,8 +96,8 @@ def new_with_persona_id(persona_id):
             )
             adjunto.save()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Nuevo Archivo Adjunto {adjunto.persona.nombre_completo}"),
                 url=url_for("personas_adjuntos.detail", persona_adjunto_id=adjunto.id),
             )
@@ -152,8 +147,8 @@ def new_with_persona_id(persona_id):
                     adjunto.save()
                     # Salida en bitacora
                     bitacora = Bitacora(
-                        modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                        usuario=current_user,
+                        modulo_id=get_modulo_id(MODULO),
+                        usuario_id=current_user.id,
                         descripcion=safe_message(f"Editado Archivo Adjunto {adjunto.id}"),
                         url=url_for("personas_adjuntos.detail", persona_adjunto_id=adjunto.id),
                     )
@@ -181,8 +176,8 @@ def edit(persona_adjunto_id):
             adjunto.save()
             # Salida en bitacora
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Archivo Adjunto {adjunto.id}"),
                 url=url_for("personas_adjuntos.detail", persona_adjunto_id=adjunto.id),
             )
@@ -233,8 +228,8 @@ def edit(persona_adjunto_id):
                     adjunto_new.save()
                     # Salida en bitacora
                     bitacora = Bitacora(
-                        modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                        usuario=current_user,
+                        modulo_id=get_modulo_id(MODULO),
+                        usuario_id=current_user.id,
                         descripcion=safe_message(f"Editado Archivo Adjunto {adjunto_new.id}, se dio de baja {adjunto.id}"),
                         url=url_for("personas_adjuntos.detail", persona_adjunto_id=adjunto_new.id),
                     )
@@ -259,8 +254,8 @@ def delete(persona_adjunto_id):
     if adjunto.estatus == "A":
         adjunto.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Archivo Adjunto {adjunto.persona.nombre_completo}"),
             url=url_for("personas_adjuntos.detail", persona_adjunto_id=adjunto.id),
         )
@@ -277,8 +272,8 @@ def recover(persona_adjunto_id):
     if adjunto.estatus == "B":
         adjunto.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Archivo Adjunto {adjunto.persona.nombre_completo}"),
             url=url_for("personas_adjuntos.detail", persona_adjunto_id=adjunto.id),
         )
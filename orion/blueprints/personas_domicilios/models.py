@@ -19,9 +19,9 @@ class PersonaDomicilio(database.Model, UniversalMixin):
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Clave foránea
-    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"))
+    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"), index=True)
     persona: Mapped["Persona"] = relationship(back_populates="personas_domicilios")
-    domicilio_id: Mapped[int] = mapped_column(ForeignKey("domicilios.id"))
+    domicilio_id: Mapped[int] = mapped_column(ForeignKey("domicilios.id"), index=True)
     domicilio: Mapped["Domicilio"] = relationship(back_populates="personas_domicilios")
 
     def __repr__(self):
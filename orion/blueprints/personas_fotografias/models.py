@@ -9,6 +9,7 @@ from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, JSON, Integer, Strin
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql.functions import now
 
+from lib.indices import active_index
 from lib.universal_mixin import UniversalMixin
 from orion.extensions import database
 
@@ -19,11 +20,14 @@ class PersonaFotografia(database.Model, UniversalMixin):
     # Nombre de la tabla
     __tablename__ = "personas_fotografias"
 
+    # Índices parciales de los activos con las columnas del filtro y del orden de los listados
+    __table_args__ = (active_index("personas_fotografias", "persona_id", "modificado"),)
+
     # Clave primaria
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Clave foránea
-    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"))
+    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"), index=True)
     persona: Mapped["Persona"] = relationship(back_populates="fotografias")
 
     # Columnas
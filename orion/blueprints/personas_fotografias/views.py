@@ -11,7 +11,7 @@ from lib.datatables import get_datatable_parameters, output_datatable_json
 from lib.safe_string import safe_string, safe_message
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.personas_fotografias.models import PersonaFotografia
@@ -26,6 +26,7 @@ from lib.exceptions import (
     MyUnknownExtensionError,
 )
 from lib.storage import GoogleCloudStorage
+from lib.unit_of_work import unit_of_work_request
 
 MODULO = "PERSONAS FOTOGRAFIAS"
 
@@ -51,6 +52,7 @@ def detail(persona_fotografia_id):
 # NEW_WITH_PERSONA_ID TODO:
 @personas_fotografias.route("/personas_fotografias/nuevo_con_persona/<int:persona_id>", methods=["GET", "POST"])
 @permission_required(MODULO, Permiso.CREAR)
+@unit_of_work_request
 def new_with_persona_id(persona_id):
     """Nuevo Fotografía"""
     persona = Persona.query.get_or_404(persona_id)
@@ -96,8 +98,8 @@ def new_with_persona_id(persona_id):
                 fotografia.save()
                 # Salida en bitacora
                 bitacora = Bitacora(
-                    modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                    usuario=current_user,
+                    modulo_id=get_modulo_id(MODULO),
+                    usuario_id=current_user.id,
                     descripcion=safe_message(f"Nueva fotografia {fotografia.id}"),
                     url=url_for("personas_fotografias.detail", persona_fotografia_id=fotografia.id),
                 )
@@ -159,8 +161,8 @@ def edit(persona_fotografia_id):
                 fotografia_new.save()
                 # Salida en bitacora
                 bitacora = Bitacora(
-                    modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                    usuario=current_user,
+                    modulo_id=get_modulo_id(MODULO),
+                    usuario_id=current_user.id,
                     descripcion=safe_message(f"Editado Fotografía {fotografia_new.persona.nombre_completo}"),
                     url=url_for("personas_fotografias.detail", persona_fotografia_id=fotografia_new.id),
                 )
@@ -182,8 +184,8 @@ def delete(persona_fotografia_id):
     if fotografia.estatus == "A":
         fotografia.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Fotografía {fotografia.persona.nombre_completo}"),
             url=url_for("personas_fotografias.detail", persona_fotografia_id=fotografia.id),
         )
@@ -200,8 +202,8 @@ def recover(persona_fotografia_id):
     if fotografia.estatus == "B":
         fotografia.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Fotografía {fotografia.persona.nombre_completo}"),
             url=url_for("personas_fotografias.detail", persona_fotografia_id=fotografia.id),
         )
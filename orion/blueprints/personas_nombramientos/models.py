@@ -8,6 +8,7 @@ from typing import List, Optional
 from sqlalchemy import DateTime, Enum, ForeignKey, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from lib.indices import active_index
 from lib.universal_mixin import UniversalMixin
 from orion.extensions import database
 
@@ -27,11 +28,14 @@ class PersonaNombramiento(database.Model, UniversalMixin):
     # Nombre de la tabla
     __tablename__ = "personas_nombramientos"
 
+    # Índices parciales de los activos con las columnas del filtro y del orden de los listados
+    __table_args__ = (active_index("personas_nombramientos", "persona_id", "fecha_inicio"),)
+
     # Clave primaria
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Clave foránea
-    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"))
+    persona_id: Mapped[int] = mapped_column(ForeignKey("personas.id"), index=True)
     persona: Mapped["Persona"] = relationship(back_populates="nombramientos")
 
     # Columnas
@@ -7,11 +7,11 @@ from flask import Blueprint, flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from werkzeug.datastructures import CombinedMultiDict
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_equal
 from lib.safe_string import safe_string, safe_message
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import permission_required
 from orion.blueprints.personas_nombramientos.models import PersonaNombramiento
@@ -42,43 +42,40 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Nombramientos"""
+    fecha_termino = renglon.fecha_termino.strftime("%Y-%m-%d") if renglon.fecha_termino != None else "NONE"
+    return {
+        "detalle": {
+            "periodo": renglon.fecha_inicio.strftime("%Y-%m-%d") + " — " + fecha_termino,
+            "url": url_for("personas_nombramientos.detail", persona_nombramiento_id=renglon.id),
+        },
+        "cargo": renglon.cargo,
+        "centro_trabajo": renglon.centro_trabajo,
+    }
+
+
+PERSONAS_NOMBRAMIENTOS_DATATABLE = DataTableSpec(
+    model=PersonaNombramiento,
+    columns={
+        "id": PersonaNombramiento.id,
+        "fecha_inicio": PersonaNombramiento.fecha_inicio,
+        "fecha_termino": PersonaNombramiento.fecha_termino,
+        "cargo": PersonaNombramiento.cargo,
+        "centro_trabajo": PersonaNombramiento.centro_trabajo,
+    },
+    filters=[
+        filter_equal("persona_id", PersonaNombramiento.persona_id),
+    ],
+    order=[PersonaNombramiento.fecha_inicio.desc()],
+    row=datatable_renglon,
+)
+
+
 @personas_nombramientos.route("/personas_nombramientos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Nombramientos"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = PersonaNombramiento.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "persona_id" in request.form:
-        consulta = consulta.filter_by(persona_id=request.form["persona_id"])
-    # Luego filtrar por columnas de otras tablas
-    # if "persona_rfc" in request.form:
-    #     consulta = consulta.join(Persona)
-    #     consulta = consulta.filter(Persona.rfc.contains(safe_rfc(request.form["persona_rfc"], search_fragment=True)))
-    # Ordenar y paginar
-    registros = consulta.order_by(PersonaNombramiento.fecha_inicio.desc()).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        fecha_termino = resultado.fecha_termino.strftime("%Y-%m-%d") if resultado.fecha_termino != None else "NONE"
-        data.append(
-            {
-                "detalle": {
-                    "periodo": resultado.fecha_inicio.strftime("%Y-%m-%d") + " — " + fecha_termino,
-                    "url": url_for("personas_nombramientos.detail", persona_nombramiento_id=resultado.id),
-                },
-                "cargo": resultado.cargo,
-                "centro_trabajo": resultado.centro_trabajo,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return PERSONAS_NOMBRAMIENTOS_DATATABLE.output()
 
 
 @personas_nombramientos.route("/personas_nombramientos/<int:persona_nombramiento_id>")
@@ -114,8 +111,8 @@ def new_with_persona_id(persona_id):
                 )
                 nombramiento.save()
                 bitacora = Bitacora(
-                    modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                    usuario=current_user,
+                    modulo_id=get_modulo_id(MODULO),
+                    usuario_id=current_user.id,
                     descripcion=safe_message(f"Nuevo Nombramiento {nombramiento.persona.nombre_completo}"),
                     url=url_for("personas_nombramientos.detail", persona_nombramiento_id=nombramiento.id),
                 )
@@ -167,8 +164,8 @@ def new_with_persona_id(persona_id):
                         nombramiento.save()
                         # Salida en bitacora
                         bitacora = Bitacora(
-                            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                            usuario=current_user,
+                            modulo_id=get_modulo_id(MODULO),
+                            usuario_id=current_user.id,
                             descripcion=safe_message(f"Editado Nombramiento {nombramiento.id}"),
                             url=url_for("personas_nombramientos.detail", persona_nombramiento_id=nombramiento.id),
                         )
@@ -206,8 +203,8 @@ def edit(persona_nombramiento_id):
                 nombramiento.save()
                 # Salida en bitacora
                 bitacora = Bitacora(
-                    modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                    usuario=current_user,
+                    modulo_id=get_modulo_id(MODULO),
+                    usuario_id=current_user.id,
                     descripcion=safe_message(f"Editado Nombramiento {nombramiento.id}"),
                     url=url_for("personas_nombramientos.detail", persona_nombramiento_id=nombramiento.id),
                 )
@@ -260,8 +257,8 @@ def edit(persona_nombramiento_id):
                         nombramiento_new.save()
                         # Salida en bitacora
                         bitacora = Bitacora(
-                            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                            usuario=current_user,
+                            modulo_id=get_modulo_id(MODULO),
+                            usuario_id=current_user.id,
                             descripcion=safe_message(
                                 f"Editado Nombramiento {nombramiento_new.id}, se dio de baja {nombramiento.id}"
                             ),
@@ -291,8 +288,8 @@ def delete(persona_nombramiento_id):
     if nombramiento.estatus == "A":
         nombramiento.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Nombramiento {nombramiento.id}"),
             url=url_for("personas_nombramientos.detail", persona_nombramiento_id=nombramiento.id),
         )
@@ -309,8 +306,8 @@ def recover(persona_nombramiento_id):
     if nombramiento.estatus == "B":
         nombramiento.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Nombramiento {nombramiento.id}"),
             url=url_for("personas_nombramientos.detail", persona_nombramiento_id=nombramiento.id),
         )
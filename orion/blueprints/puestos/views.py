@@ -3,15 +3,16 @@ Puestos, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
-from sqlalchemy import or_
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains, filter_equal
 from lib.safe_string import safe_string, safe_message, safe_clave
+from lib.typeahead import TypeaheadIndex
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.catalogos.cache import PUESTOS
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.puestos.forms import PuestoForm
 from orion.blueprints.usuarios.decorators import permission_required
@@ -29,56 +30,46 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Puestos"""
+    return {
+        "detalle": {
+            "clave": renglon.clave,
+            "url": url_for("puestos.detail", puesto_id=renglon.id),
+        },
+        "nombre": renglon.nombre,
+        "tipo_cargo": Puesto.CARGOS[renglon.tipo_cargo],
+        "tipo_empleado": {
+            "nombre": renglon.tipo_empleado,
+            "descripcion": Puesto.TIPOS_EMPLEADOS[renglon.tipo_empleado],
+        },
+    }
+
+
+PUESTOS_DATATABLE = DataTableSpec(
+    model=Puesto,
+    columns={
+        "id": Puesto.id,
+        "clave": Puesto.clave,
+        "nombre": Puesto.nombre,
+        "tipo_cargo": Puesto.tipo_cargo,
+        "tipo_empleado": Puesto.tipo_empleado,
+    },
+    filters=[
+        filter_contains("clave", Puesto.clave, limpiar=safe_clave),
+        filter_contains("nombre", Puesto.nombre),
+        filter_equal("tipo_cargo", Puesto.tipo_cargo),
+        filter_equal("tipo_empleado", Puesto.tipo_empleado),
+    ],
+    order=[Puesto.clave],
+    row=datatable_renglon,
+)
+
+
 @puestos.route("/puestos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Puestos"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Puesto.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "clave" in request.form:
-        clave = safe_clave(request.form["clave"])
-        if clave != "":
-            consulta = consulta.filter(Puesto.clave.contains(clave))
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"])
-        if nombre != "":
-            consulta = consulta.filter(Puesto.nombre.contains(nombre))
-    if "tipo_cargo" in request.form:
-        consulta = consulta.filter_by(tipo_cargo=request.form["tipo_cargo"])
-    if "tipo_empleado" in request.form:
-        consulta = consulta.filter_by(tipo_empleado=request.form["tipo_empleado"])
-    # Luego filtrar por columnas de otras tablas
-    # if "persona_rfc" in request.form:
-    #     consulta = consulta.join(Persona)
-    #     consulta = consulta.filter(Persona.rfc.contains(safe_rfc(request.form["persona_rfc"], search_fragment=True)))
-    # Ordenar y paginar
-    registros = consulta.order_by(Puesto.clave).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "clave": resultado.clave,
-                    "url": url_for("puestos.detail", puesto_id=resultado.id),
-                },
-                "nombre": resultado.nombre,
-                "tipo_cargo": Puesto.CARGOS[resultado.tipo_cargo],
-                "tipo_empleado": {
-                    "nombre": resultado.tipo_empleado,
-                    "descripcion": Puesto.TIPOS_EMPLEADOS[resultado.tipo_empleado],
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return PUESTOS_DATATABLE.output()
 
 
 @puestos.route("/puestos")
@@ -135,8 +126,8 @@ def new():
         )
         puesto.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Puesto {puesto.clave}"),
             url=url_for("puestos.detail", puesto_id=puesto.id),
         )
@@ -169,8 +160,8 @@ def edit(puesto_id):
             puesto.tipo_empleado = form.tipo_empleado.data
             puesto.save()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Puesto {puesto.clave}"),
                 url=url_for("puestos.detail", puesto_id=puesto.id),
             )
@@ -192,8 +183,8 @@ def delete(puesto_id):
     if puesto.estatus == "A":
         puesto.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Puesto {puesto.clave}"),
             url=url_for("puestos.detail", puesto_id=puesto.id),
         )
@@ -210,8 +201,8 @@ def recover(puesto_id):
     if puesto.estatus == "B":
         puesto.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Puesto {puesto.clave}"),
             url=url_for("puestos.detail", puesto_id=puesto.id),
         )
@@ -220,20 +211,17 @@ def recover(puesto_id):
     return redirect(url_for("puestos.detail", puesto_id=puesto.id))
 
 
+PUESTOS_TYPEAHEAD = TypeaheadIndex(
+    model=Puesto,
+    columns={"clave": Puesto.clave, "nombre": Puesto.nombre},
+    text=lambda renglon: f"{renglon.clave}: {renglon.nombre}",
+    search=["clave", "nombre"],
+    order=Puesto.id,
+    catalog=PUESTOS,
+)
+
+
 @puestos.route("/puestos/query_puestos_json", methods=["POST"])
 def query_puestos_json():
     """Proporcionar el JSON de Puestos para elegir en un Select2"""
-    consulta = Puesto.query.filter_by(estatus="A")
-    if "clave_nombre" in request.form:
-        clave_nombre = safe_string(request.form["clave_nombre"]).upper()
-        if clave_nombre != "":
-            consulta = consulta.filter(or_(Puesto.clave.contains(clave_nombre), Puesto.nombre.contains(clave_nombre)))
-    results = []
-    for puesto in consulta.order_by(Puesto.id).limit(15).all():
-        results.append(
-            {
-                "id": puesto.id,
-                "text": puesto.clave_nombre,
-            }
-        )
-    return {"results": results, "pagination": {"more": False}}
+    return PUESTOS_TYPEAHEAD.output("clave_nombre")
@@ -18,7 +18,7 @@ class PuestoFuncion(database.Model, UniversalMixin):
     __tablename__ = "puestos_funciones"
 
     # Clave foránea
-    puesto_id: Mapped[int] = mapped_column(ForeignKey("puestos.id"))
+    puesto_id: Mapped[int] = mapped_column(ForeignKey("puestos.id"), index=True)
     puesto: Mapped["Puesto"] = relationship(back_populates="puestos_funciones")
 
     # Clave primaria
@@ -3,14 +3,16 @@ Puestos Funciones, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains, filter_equal
 from lib.safe_string import safe_string, safe_message
+from lib.typeahead import TypeaheadIndex
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.catalogos.cache import PUESTOS_FUNCIONES
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.puestos.models import Puesto
 from orion.blueprints.puestos_funciones.forms import PuestoFuncionForm
@@ -29,44 +31,35 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Puestos Funciones"""
+    return {
+        "detalle": {
+            "nombre": renglon.nombre,
+            "url": url_for("puestos_funciones.detail", puesto_funcion_id=renglon.id),
+        },
+    }
+
+
+PUESTOS_FUNCIONES_DATATABLE = DataTableSpec(
+    model=PuestoFuncion,
+    columns={
+        "id": PuestoFuncion.id,
+        "nombre": PuestoFuncion.nombre,
+    },
+    filters=[
+        filter_contains("nombre", PuestoFuncion.nombre, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+        filter_equal("puesto_id", PuestoFuncion.puesto_id),
+    ],
+    order=[PuestoFuncion.nombre],
+    row=datatable_renglon,
+)
+
+
 @puestos_funciones.route("/puestos_funciones/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Puestos Funciones"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = PuestoFuncion.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"], save_enie=True)
-        if nombre != "":
-            consulta = consulta.filter(PuestoFuncion.nombre.contains(nombre))
-    if "puesto_id" in request.form:
-        consulta = consulta.filter(PuestoFuncion.puesto_id == request.form["puesto_id"])
-    # Luego filtrar por columnas de otras tablas
-    # if "persona_rfc" in request.form:
-    #     consulta = consulta.join(Persona)
-    #     consulta = consulta.filter(Persona.rfc.contains(safe_rfc(request.form["persona_rfc"], search_fragment=True)))
-    # Ordenar y paginar
-    registros = consulta.order_by(PuestoFuncion.nombre).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "nombre": resultado.nombre,
-                    "url": url_for("puestos_funciones.detail", puesto_funcion_id=resultado.id),
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return PUESTOS_FUNCIONES_DATATABLE.output()
 
 
 @puestos_funciones.route("/puestos_funciones/<int:puesto_funcion_id>")
@@ -90,8 +83,8 @@ def new_with_puesto(puesto_id):
         )
         puesto_funcion.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Puesto Función {puesto_funcion.nombre}"),
             url=url_for("puestos_funciones.detail", puesto_funcion_id=puesto_funcion.id),
         )
@@ -112,8 +105,8 @@ def edit(puesto_funcion_id):
         puesto_funcion.nombre = safe_string(form.nombre.data)
         puesto_funcion.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Editado Puesto Función {puesto_funcion.nombre}"),
             url=url_for("puestos_funciones.detail", puesto_funcion_id=puesto_funcion.id),
         )
@@ -133,8 +126,8 @@ def delete(puesto_funcion_id):
     if puesto_funcion.estatus == "A":
         puesto_funcion.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Puesto Función {puesto_funcion.nombre}"),
             url=url_for("puestos_funciones.detail", puesto_funcion_id=puesto_funcion.id),
         )
@@ -151,8 +144,8 @@ def recover(puesto_funcion_id):
     if puesto_funcion.estatus == "B":
         puesto_funcion.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Puesto Función {puesto_funcion.nombre}"),
             url=url_for("puestos_funciones.detail", puesto_funcion_id=puesto_funcion.id),
         )
@@ -161,22 +154,18 @@ def recover(puesto_funcion_id):
     return redirect(url_for("puestos_funciones.detail", puesto_funcion_id=puesto_funcion.id))
 
 
+PUESTOS_FUNCIONES_TYPEAHEAD = TypeaheadIndex(
+    model=PuestoFuncion,
+    columns={"nombre": PuestoFuncion.nombre, "puesto_id": PuestoFuncion.puesto_id},
+    text=lambda renglon: renglon.nombre,
+    search=["nombre"],
+    order=PuestoFuncion.nombre,
+    groups=["puesto_id"],
+    catalog=PUESTOS_FUNCIONES,
+)
+
+
 @puestos_funciones.route("/puestos_funciones/query_puestos_funciones_json", methods=["POST"])
 def query_puestos_funciones_json():
     """Proporcionar el JSON de Puestos para elegir en un Select2"""
-    consulta = PuestoFuncion.query.filter_by(estatus="A")
-    if "puesto_id" in request.form:
-        consulta = consulta.filter(PuestoFuncion.puesto_id == request.form["puesto_id"])
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"]).upper()
-        if nombre != "":
-            consulta = consulta.filter(PuestoFuncion.nombre.contains(nombre))
-    results = []
-    for puesto_funcion in consulta.order_by(PuestoFuncion.nombre).limit(15).all():
-        results.append(
-            {
-                "id": puesto_funcion.id,
-                "text": puesto_funcion.nombre,
-            }
-        )
-    return {"results": results, "pagination": {"more": False}}
+    return PUESTOS_FUNCIONES_TYPEAHEAD.output("nombre")
@@ -4,13 +4,14 @@ Roles, vistas
 
 import json
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains
+from lib.permisos_cache import invalidate_permisos
 from lib.safe_string import safe_message, safe_string
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.roles.forms import RolForm
 from orion.blueprints.roles.models import Rol
@@ -28,38 +29,34 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Roles"""
+    return {
+        "detalle": {
+            "nombre": renglon.nombre,
+            "url": url_for("roles.detail", rol_id=renglon.id),
+        },
+    }
+
+
+ROLES_DATATABLE = DataTableSpec(
+    model=Rol,
+    columns={
+        "id": Rol.id,
+        "nombre": Rol.nombre,
+    },
+    filters=[
+        filter_contains("nombre", Rol.nombre, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+    ],
+    order=[Rol.nombre],
+    row=datatable_renglon,
+)
+
+
 @roles.route("/roles/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Roles"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Rol.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"], save_enie=True)
-        if nombre != "":
-            consulta = consulta.filter(Rol.nombre.contains(nombre))
-    # Ordenar y paginar
-    registros = consulta.order_by(Rol.nombre).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "nombre": resultado.nombre,
-                    "url": url_for("roles.detail", rol_id=resultado.id),
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return ROLES_DATATABLE.output()
 
 
 @roles.route("/roles")
@@ -107,8 +104,8 @@ def new():
         rol = Rol(nombre=nombre)
         rol.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Rol {rol.nombre}"),
             url=url_for("roles.detail", rol_id=rol.id),
         )
@@ -138,8 +135,8 @@ def edit(rol_id):
             rol.nombre = nombre
             rol.save()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Rol {rol.nombre}"),
                 url=url_for("roles.detail", rol_id=rol.id),
             )
@@ -164,10 +161,12 @@ def delete(rol_id):
         # Dar de baja los usuarios del rol
         for usuario_rol in rol.usuarios_roles:
             usuario_rol.delete()
+        # Invalidar la caché de permisos
+        invalidate_permisos()
         # Guardar en la bitacora
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Rol {rol.nombre}"),
             url=url_for("roles.detail", rol_id=rol.id),
         )
@@ -190,10 +189,12 @@ def recover(rol_id):
         # Dar de alta los usuarios del rol
         for usuario_rol in rol.usuarios_roles:
             usuario_rol.recover()
+        # Invalidar la caché de permisos
+        invalidate_permisos()
         # Guardar en la bitacora
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Rol {rol.nombre}"),
             url=url_for("roles.detail", rol_id=rol.id),
         )
@@ -0,0 +1,131 @@
+"""
+Sincronizaciones, vistas
+
+API de sólo lectura para que otros sistemas traigan los registros que
+cambiaron desde una fecha, en lugar de recorrer los listados o descargar todo.
+Se autentifica con la API key del usuario, que debe poder ver el módulo.
+
+    GET /api/v1/cambios/personas?desde=2024-05-01T00:00:00
+    X-Api-Key: la API key del usuario
+
+Entrega NDJSON, un renglón JSON por registro en orden de (modificado, id),
+incluidos los eliminados con estatus B. El último renglón es el de control
+
+    {"_cursor": "...", "_completo": false}
+
+Mientras _completo sea falso pida lo que sigue con ?cursor=...; al terminar
+guarde el cursor para la siguiente sincronización. Los errores se entregan en
+JSON con su código, por ejemplo 400 para un cursor inválido
+
+    {"error": 400, "mensaje": "El cursor no es válido"}
+ No se entregan los
+registros modificados en los últimos SINCRONIZACION_MARGEN segundos, así una
+transacción que aún no termina no queda atrás del cursor.
+"""
+
+import json
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, Response, abort, g, request, stream_with_context
+from sqlalchemy import tuple_
+
+from lib.datatables import decode_cursor, encode_cursor
+from orion.blueprints.centros_trabajos.models import CentroTrabajo
+from orion.blueprints.historial_puestos.models import HistorialPuesto
+from orion.blueprints.incapacidades.models import Incapacidad
+from orion.blueprints.licencias.models import Licencia
+from orion.blueprints.personas.models import Persona
+from orion.blueprints.usuarios.decorators import api_key_required
+from orion.extensions import database
+
+SINCRONIZACION_LIMITE = 1000  # Registros por petición si no se indica limite
+SINCRONIZACION_LIMITE_MAXIMO = 10000
+SINCRONIZACION_LOTE = 500  # Registros que se leen de la base de datos a la vez
+SINCRONIZACION_MARGEN = 60  # Segundos
+
+SincronizacionFuente = namedtuple("SincronizacionFuente", ["modulo", "model", "excluir"])
+
+FUENTES = {
+    "centros_trabajos": SincronizacionFuente("CENTROS TRABAJOS", CentroTrabajo, ()),
+    "historial_puestos": SincronizacionFuente("HISTORIAL PUESTOS", HistorialPuesto, ()),
+    "incapacidades": SincronizacionFuente("INCAPACIDADES", Incapacidad, ()),
+    "licencias": SincronizacionFuente("LICENCIAS", Licencia, ()),
+    "personas": SincronizacionFuente("PERSONAS", Persona, ("nombre_busqueda", "nombre_fonetico")),
+}
+
+sincronizaciones = Blueprint("sincronizaciones", __name__)
+
+
+def error_json(error):
+    """Error en JSON con su código, en lugar de la página HTML de la app"""
+    return Response(
+        json.dumps({"error": error.code, "mensaje": error.description}, ensure_ascii=False),
+        error.code,
+        mimetype="application/json",
+    )
+
+
+for codigo in (400, 401, 403, 404):  # Por código, los de la app tienen precedencia sobre uno genérico
+    sincronizaciones.register_error_handler(codigo, error_json)
+
+
+def valor_json(valor):
+    """Fechas en ISO 8601, lo que no sea de JSON como texto"""
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    return str(valor)
+
+
+def get_limite() -> int:
+    """Tomar el límite de registros de la petición"""
+    try:
+        limite = int(request.args.get("limite", SINCRONIZACION_LIMITE))
+    except ValueError:
+        abort(400, "El límite debe ser un número entero")
+    if limite < 1:
+        abort(400, "El límite debe ser mayor a cero")
+    return min(limite, SINCRONIZACION_LIMITE_MAXIMO)
+
+
+@sincronizaciones.route("/api/v1/cambios/<string:fuente_nombre>")
+@api_key_required
+def cambios(fuente_nombre):
+    """Registros que cambiaron desde una fecha o un cursor, en NDJSON"""
+    if fuente_nombre not in FUENTES:
+        abort(404, f"No hay sincronización de {fuente_nombre}")
+    fuente = FUENTES[fuente_nombre]
+    if not g.api_usuario.can_view(fuente.modulo):
+        abort(403, f"No tiene permiso para ver {fuente.modulo}")
+    limite = get_limite()
+    orden = [fuente.model.modificado, fuente.model.id]
+    columnas = [columna for columna in fuente.model.__table__.columns if columna.name not in fuente.excluir]
+    consulta = database.session.query(*columnas)
+    consulta = consulta.filter(fuente.model.modificado < datetime.now() - timedelta(seconds=SINCRONIZACION_MARGEN))
+    cursor = request.args.get("cursor", "")
+    if cursor != "":
+        valores = decode_cursor(cursor, orden)
+        if valores is None:
+            abort(400, "El cursor no es válido")
+        consulta = consulta.filter(tuple_(*orden) > tuple_(*valores))
+    elif "desde" in request.args:
+        try:
+            desde = datetime.fromisoformat(request.args["desde"])
+        except ValueError:
+            abort(400, "La fecha desde debe estar en ISO 8601")
+        consulta = consulta.filter(fuente.model.modificado >= desde)
+    consulta = consulta.order_by(*orden).limit(limite)
+
+    def generar():
+        cantidad = 0
+        siguiente = cursor
+        for renglon in consulta.yield_per(SINCRONIZACION_LOTE):
+            registro = {nombre: valor_json(valor) for nombre, valor in renglon._mapping.items()}
+            yield json.dumps(registro, ensure_ascii=False) + "\n"
+            cantidad += 1
+            siguiente = encode_cursor([renglon.modificado, renglon.id])
+        yield json.dumps({"_cursor": siguiente, "_completo": cantidad < limite}) + "\n"
+
+    return Response(stream_with_context(generar()), mimetype="application/x-ndjson")
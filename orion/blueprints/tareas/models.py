@@ -9,6 +9,7 @@ from sqlalchemy import ForeignKey, String, Uuid
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from orion.extensions import database
+from lib.indices import active_index
 from lib.universal_mixin import UniversalMixin
 
 
@@ -18,11 +19,17 @@ class Tarea(database.Model, UniversalMixin):
     # Nombre de la tabla
     __tablename__ = "tareas"
 
+    # Índices parciales de los activos con las columnas del filtro y del orden de los listados
+    __table_args__ = (
+        active_index("tareas", "usuario_id", "creado"),
+        active_index("tareas", "creado"),
+    )
+
     # Clave primaria NOTA: El id es string y es el mismo que usa el RQ worker
     id: Mapped[str] = mapped_column(Uuid, primary_key=True)
 
     # Clave foránea
-    usuario_id: Mapped[int] = mapped_column(ForeignKey("usuarios.id"))
+    usuario_id: Mapped[int] = mapped_column(ForeignKey("usuarios.id"), index=True)
     usuario: Mapped["Usuario"] = relationship(back_populates="tareas")
 
     # Columnas
@@ -4,15 +4,17 @@ Tareas, vistas
 
 import json
 
-from flask import Blueprint, current_app, flash, make_response, redirect, render_template, request, url_for
+from flask import Blueprint, current_app, flash, make_response, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_equal
+from lib.datatables import RESPUESTA_TTL
 from lib.exceptions import MyAnyError
 from lib.google_cloud_storage import get_blob_name_from_url, get_file_from_gcs
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.tareas.models import Tarea
 from orion.blueprints.usuarios.decorators import permission_required
+from orion.blueprints.usuarios.models import Usuario
 
 MODULO = "TAREAS"
 
@@ -26,49 +28,51 @@ tareas = Blueprint("tareas", __name__, template_folder="templates")
 #     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Tareas"""
+    return {
+        "creado": renglon.creado.strftime("%Y-%m-%d %H:%M:%S"),
+        "detalle": {
+            "comando": renglon.comando,
+            "url": url_for("tareas.detail", tarea_id=renglon.id),
+        },
+        "ha_terminado": renglon.ha_terminado,
+        "mensaje": renglon.mensaje,
+        "usuario": {
+            "email": renglon.usuario_email,
+            "url": url_for("usuarios.detail", usuario_id=renglon.usuario_id) if current_user.can_view("USUARIOS") else "",
+        },
+    }
+
+
+TAREAS_DATATABLE = DataTableSpec(
+    model=Tarea,
+    columns={
+        "id": Tarea.id,
+        "creado": Tarea.creado,
+        "comando": Tarea.comando,
+        "ha_terminado": Tarea.ha_terminado,
+        "mensaje": Tarea.mensaje,
+        "usuario_id": Tarea.usuario_id,
+        "usuario_email": Usuario.email,
+    },
+    joins=[(Usuario, Tarea.usuario_id == Usuario.id)],
+    filters=[
+        filter_equal("comando", Tarea.comando),
+        filter_equal("usuario_id", Tarea.usuario_id),
+    ],
+    order=[Tarea.creado.desc()],
+    cache=RESPUESTA_TTL,
+    row=datatable_renglon,
+)
+
+
 @tareas.route("/tareas/datatable_json", methods=["GET", "POST"])
 @login_required
 @permission_required(MODULO, Permiso.VER)
 def datatable_json():
     """DataTable JSON para listado de Tareas"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Tarea.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "comando" in request.form:
-        consulta = consulta.filter_by(comando=request.form["comando"])
-    if "usuario_id" in request.form:
-        consulta = consulta.filter_by(usuario_id=request.form["usuario_id"])
-    # Ordenar y paginar
-    registros = consulta.order_by(Tarea.creado.desc()).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "creado": resultado.creado.strftime("%Y-%m-%d %H:%M:%S"),
-                "detalle": {
-                    "comando": resultado.comando,
-                    "url": url_for("tareas.detail", tarea_id=resultado.id),
-                },
-                "ha_terminado": resultado.ha_terminado,
-                "mensaje": resultado.mensaje,
-                "usuario": {
-                    "email": resultado.usuario.email,
-                    "url": (
-                        url_for("usuarios.detail", usuario_id=resultado.usuario_id) if current_user.can_view("USUARIOS") else ""
-                    ),
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return TAREAS_DATATABLE.output()
 
 
 @tareas.route("/tareas")
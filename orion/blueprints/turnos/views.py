@@ -3,14 +3,16 @@ Turnos, vistas
 """
 
 import json
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains
 from lib.safe_string import safe_string, safe_message
+from lib.typeahead import TypeaheadIndex
 
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.catalogos.cache import TURNOS
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.turnos.forms import TurnoForm
 from orion.blueprints.usuarios.decorators import permission_required
@@ -28,43 +30,37 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Turnos"""
+    return {
+        "detalle": {
+            "nombre": renglon.nombre,
+            "url": url_for("turnos.detail", turno_id=renglon.id),
+        },
+        "descripcion": renglon.descripcion,
+    }
+
+
+TURNOS_DATATABLE = DataTableSpec(
+    model=Turno,
+    columns={
+        "id": Turno.id,
+        "nombre": Turno.nombre,
+        "descripcion": Turno.descripcion,
+    },
+    filters=[
+        filter_contains("nombre", Turno.nombre),
+        filter_contains("descripcion", Turno.descripcion),
+    ],
+    order=[Turno.nombre],
+    row=datatable_renglon,
+)
+
+
 @turnos.route("/turnos/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Turnos"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Turno.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"])
-        if nombre != "":
-            consulta = consulta.filter(Turno.nombre.contains(nombre))
-    if "descripcion" in request.form:
-        descripcion = safe_string(request.form["descripcion"])
-        if descripcion != "":
-            consulta = consulta.filter(Turno.descripcion.contains(descripcion))
-    # Ordenar y paginar
-    registros = consulta.order_by(Turno.nombre).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "nombre": resultado.nombre,
-                    "url": url_for("turnos.detail", turno_id=resultado.id),
-                },
-                "descripcion": resultado.descripcion,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return TURNOS_DATATABLE.output()
 
 
 @turnos.route("/turnos")
@@ -115,8 +111,8 @@ def new():
         )
         turno.save()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Turno {turno.nombre}"),
             url=url_for("turnos.detail", turno_id=turno.id),
         )
@@ -147,8 +143,8 @@ def edit(turno_id):
             turno.descripcion = safe_string(form.descripcion.data)
             turno.save()
             bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
+                modulo_id=get_modulo_id(MODULO),
+                usuario_id=current_user.id,
                 descripcion=safe_message(f"Editado Turno {turno.nombre}"),
                 url=url_for("turnos.detail", turno_id=turno.id),
             )
@@ -168,8 +164,8 @@ def delete(turno_id):
     if turno.estatus == "A":
         turno.delete()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Turno {turno.nombre}"),
             url=url_for("turnos.detail", turno_id=turno.id),
         )
@@ -186,8 +182,8 @@ def recover(turno_id):
     if turno.estatus == "B":
         turno.recover()
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Turno {turno.nombre}"),
             url=url_for("turnos.detail", turno_id=turno.id),
         )
@@ -196,20 +192,17 @@ def recover(turno_id):
     return redirect(url_for("turnos.detail", turno_id=turno.id))
 
 
+TURNOS_TYPEAHEAD = TypeaheadIndex(
+    model=Turno,
+    columns={"nombre": Turno.nombre},
+    text=lambda renglon: renglon.nombre,
+    search=["nombre"],
+    order=Turno.nombre,
+    catalog=TURNOS,
+)
+
+
 @turnos.route("/turnos/query_turnos_json", methods=["POST"])
 def query_turnos_json():
     """Proporcionar el JSON de Áreas para elegir en un Select2"""
-    consulta = Turno.query.filter_by(estatus="A")
-    if "nombre" in request.form:
-        nombre = safe_string(request.form["nombre"]).upper()
-        if nombre != "":
-            consulta = consulta.filter(Turno.nombre.contains(nombre))
-    results = []
-    for turno in consulta.order_by(Turno.nombre).limit(15).all():
-        results.append(
-            {
-                "id": turno.id,
-                "text": turno.nombre,
-            }
-        )
-    return {"results": results, "pagination": {"more": False}}
+    return TURNOS_TYPEAHEAD.output("nombre")
@@ -2,11 +2,17 @@
 Usuarios, decoradores
 """
 
+import hmac
+from datetime import datetime
 from functools import wraps
 
-from flask import abort, redirect
+from flask import abort, g, redirect, request
 from flask_login import current_user
 
+from orion.blueprints.usuarios.models import Usuario
+
+API_KEY_HEADER = "X-Api-Key"
+
 
 def anonymous_required(url="/"):
     """Redirigir si ya se ha autentificado"""
@@ -40,3 +46,29 @@ def permission_required(module, permission):
         return decorated_function
 
     return decorator
+
+
+def api_key_required(f):
+    """Autentificar con la API key del usuario en el encabezado X-Api-Key, queda en g.api_usuario"""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        api_key = request.headers.get(API_KEY_HEADER, "")
+        try:
+            usuario_id = Usuario.decode_id(api_key.split(".")[0])  # La API key empieza con el id codificado
+        except (IndexError, ValueError):
+            abort(401, "La API key no es válida")
+        usuario = Usuario.query.get(usuario_id)
+        if (
+            usuario is None
+            or usuario.estatus != "A"
+            or not usuario.api_key
+            or not hmac.compare_digest(usuario.api_key, api_key)
+            or usuario.api_key_expiracion is None
+            or usuario.api_key_expiracion < datetime.now()
+        ):
+            abort(401, "La API key no es válida o ya expiró")
+        g.api_usuario = usuario
+        return f(*args, **kwargs)
+
+    return decorated_function
@@ -7,13 +7,18 @@ from typing import List, Optional
 
 from flask import current_app
 from flask_login import UserMixin
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import ForeignKey, String, func
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from orion.blueprints.modulos.menu import get_menu, get_menu_html
+from orion.blueprints.modulos.models import Modulo
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.tareas.models import Tarea
 from orion.blueprints.usuarios_roles.models import UsuarioRol
 from orion.extensions import database, pwd_context
+from lib.permisos_cache import get_permisos
+from lib.unicidad import unique_active_index
 from lib.universal_mixin import UniversalMixin
 
 
@@ -23,11 +28,14 @@ class Usuario(database.Model, UserMixin, UniversalMixin):
     # Nombre de la tabla
     __tablename__ = "usuarios"
 
+    # Índice único parcial, el e-mail no se repite entre los usuarios activos
+    __table_args__ = (unique_active_index("usuarios", "email"),)
+
     # Clave primaria
     id: Mapped[int] = mapped_column(primary_key=True)
 
     # Columnas
-    email: Mapped[str] = mapped_column(String(256), unique=True, index=True)
+    email: Mapped[str] = mapped_column(String(256), index=True)
     nombres: Mapped[str] = mapped_column(String(256))
     apellido_paterno: Mapped[str] = mapped_column(String(256))
     apellido_materno: Mapped[str] = mapped_column(String(256))
@@ -44,55 +52,56 @@ class Usuario(database.Model, UserMixin, UniversalMixin):
     usuarios_roles: Mapped[List["UsuarioRol"]] = relationship("UsuarioRol", back_populates="usuario")
 
     # Propiedades
-    modulos_menu_principal_consultados = []
-    permisos_consultados = {}
+    modulos_menu_principal_consultados = None
+    permisos_consultados = None
 
-    @property
+    @hybrid_property
     def nombre(self):
         """Junta nombres, apellido primero y apellido segundo"""
         return self.nombres + " " + self.apellido_paterno + " " + self.apellido_materno
 
+    @property
+    def roles_ids(self):
+        """Identificadores de los roles activos"""
+        return tuple(sorted(usuario_rol.rol_id for usuario_rol in self.usuarios_roles if usuario_rol.estatus == "A"))
+
     @property
     def modulos_menu_principal(self):
         """Elaborar listado con los modulos ordenados para el menu principal"""
-        if len(self.modulos_menu_principal_consultados) > 0:
-            return self.modulos_menu_principal_consultados
-        modulos = []
-        modulos_nombres = []
-        for usuario_rol in self.usuarios_roles:
-            if usuario_rol.estatus == "A":
-                for permiso in usuario_rol.rol.permisos:
-                    if (
-                        permiso.modulo.nombre not in modulos_nombres
-                        and permiso.estatus == "A"
-                        and permiso.nivel > 0
-                        and permiso.modulo.en_navegacion
-                        and permiso.modulo.en_plataforma_orion
-                    ):
-                        modulos.append(permiso.modulo)
-                        modulos_nombres.append(permiso.modulo.nombre)
-        self.modulos_menu_principal_consultados = sorted(modulos, key=lambda x: x.nombre_corto)
+        if self.modulos_menu_principal_consultados is None:
+            self.modulos_menu_principal_consultados = get_menu(self.roles_ids)
         return self.modulos_menu_principal_consultados
 
+    @property
+    def menu_principal_html(self):
+        """HTML de las opciones del menú principal"""
+        return get_menu_html(self.roles_ids)
+
     @property
     def permisos(self):
         """Entrega un diccionario con todos los permisos"""
-        if len(self.permisos_consultados) > 0:
-            return self.permisos_consultados
-        self.permisos_consultados = {}
-        for usuario_rol in self.usuarios_roles:
-            if usuario_rol.estatus == "A":
-                for permiso in usuario_rol.rol.permisos:
-                    if permiso.estatus == "A":
-                        etiqueta = permiso.modulo.nombre
-                        if etiqueta not in self.permisos_consultados or permiso.nivel > self.permisos_consultados[etiqueta]:
-                            self.permisos_consultados[etiqueta] = permiso.nivel
+        if self.permisos_consultados is None:
+            self.permisos_consultados = get_permisos(self.id, self.consultar_permisos)
         return self.permisos_consultados
 
+    def consultar_permisos(self):
+        """Consultar en la base de datos el nivel máximo por módulo, en una sola consulta"""
+        consulta = (
+            database.session.query(Modulo.nombre, func.max(Permiso.nivel))
+            .select_from(UsuarioRol)
+            .join(Permiso, Permiso.rol_id == UsuarioRol.rol_id)
+            .join(Modulo, Modulo.id == Permiso.modulo_id)
+            .filter(UsuarioRol.usuario_id == self.id)
+            .filter(UsuarioRol.estatus == "A")
+            .filter(Permiso.estatus == "A")
+            .group_by(Modulo.nombre)
+        )
+        return {etiqueta: nivel for etiqueta, nivel in consulta.all()}
+
     @classmethod
     def find_by_identity(cls, identity):
         """Encontrar a un usuario por su correo electrónico"""
-        return Usuario.query.filter(Usuario.email == identity).first()
+        return Usuario.query.filter(Usuario.email == identity).order_by(Usuario.estatus).first()  # Primero el activo
 
     @property
     def is_active(self):
@@ -134,8 +143,8 @@ class Usuario(database.Model, UserMixin, UniversalMixin):
 
     def launch_task(self, comando, mensaje, *args, **kwargs):
         """Lanzar tarea en el fondo"""
-        rq_job = current_app.task_queue.enqueue(f"perseo.blueprints.{comando}", *args, **kwargs)
-        tarea = Tarea(id=rq_job.get_id(), comando=comando, mensaje=mensaje, usuario=self)
+        rq_job = current_app.task_queue.enqueue(f"orion.blueprints.{comando}", *args, **kwargs)
+        tarea = Tarea(id=rq_job.get_id(), archivo="", comando=comando, mensaje=mensaje, url="", usuario=self)
         tarea.save()
         return tarea
 
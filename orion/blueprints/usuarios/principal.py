@@ -0,0 +1,169 @@
+"""
+Usuarios, principal de la sesión
+
+Flask-Login necesita al usuario en cada petición. En lugar de entregar el modelo
+Usuario, que después hace varias consultas perezosas para los permisos y el menú,
+se entrega un UsuarioPrincipal inmutable que se construye una sola vez con
+selectinload de roles, permisos y módulos, y se guarda en una caché local con
+tiempo de vida, cuya llave incluye las versiones de la caché de permisos.
+
+Para usar el modelo Usuario como antes, defina USER_LOADER=orm en las variables de entorno.
+"""
+
+from types import MappingProxyType
+
+from redis.exceptions import RedisError
+from sqlalchemy.orm import selectinload
+
+from lib.local_cache import LocalCache
+from lib.permisos_cache import get_permisos_versions
+from orion.blueprints.modulos.menu import get_menu, get_menu_html
+from orion.blueprints.permisos.models import Permiso
+from orion.blueprints.roles.models import Rol
+from orion.blueprints.usuarios.models import Usuario
+from orion.blueprints.usuarios_roles.models import UsuarioRol
+
+PRINCIPAL_TTL = 60  # Segundos
+
+local_cache = LocalCache(maxsize=256, ttl=PRINCIPAL_TTL)
+
+
+class UsuarioPrincipal:
+    """Usuario de la sesión, inmutable y sin acceso al ORM"""
+
+    __slots__ = (
+        "id",
+        "email",
+        "nombres",
+        "apellido_paterno",
+        "apellido_materno",
+        "curp",
+        "puesto",
+        "estatus",
+        "permisos",
+        "roles_ids",
+        "version",
+    )
+
+    def __init__(self, **kwargs):
+        for campo in self.__slots__:
+            object.__setattr__(self, campo, kwargs[campo])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} es inmutable")
+
+    @classmethod
+    def from_usuario(cls, usuario: Usuario, version: int = None):
+        """Elaborar a partir de un Usuario con sus roles, permisos y módulos ya cargados"""
+        permisos = {}
+        roles_ids = []
+        for usuario_rol in usuario.usuarios_roles:
+            if usuario_rol.estatus != "A":
+                continue
+            roles_ids.append(usuario_rol.rol_id)
+            for permiso in usuario_rol.rol.permisos:
+                if permiso.estatus != "A":
+                    continue
+                etiqueta = permiso.modulo.nombre
+                if etiqueta not in permisos or permiso.nivel > permisos[etiqueta]:
+                    permisos[etiqueta] = permiso.nivel
+        return cls(
+            id=usuario.id,
+            email=usuario.email,
+            nombres=usuario.nombres,
+            apellido_paterno=usuario.apellido_paterno,
+            apellido_materno=usuario.apellido_materno,
+            curp=usuario.curp,
+            puesto=usuario.puesto,
+            estatus=usuario.estatus,
+            permisos=MappingProxyType(permisos),
+            roles_ids=tuple(sorted(roles_ids)),
+            version=version,
+        )
+
+    @property
+    def nombre(self):
+        """Junta nombres, apellido primero y apellido segundo"""
+        return self.nombres + " " + self.apellido_paterno + " " + self.apellido_materno
+
+    @property
+    def modulos_menu_principal(self):
+        """Módulos ordenados para el menú principal, compartidos por quienes tienen los mismos roles"""
+        return get_menu(self.roles_ids, self.version)
+
+    @property
+    def menu_principal_html(self):
+        """HTML de las opciones del menú principal"""
+        return get_menu_html(self.roles_ids, self.version)
+
+    @property
+    def is_active(self):
+        """¿Es activo?"""
+        return self.estatus == "A"
+
+    @property
+    def is_authenticated(self):
+        """¿Está autentificado?"""
+        return True
+
+    @property
+    def is_anonymous(self):
+        """¿Es anónimo?"""
+        return False
+
+    def get_id(self):
+        """ID para Flask-Login"""
+        return str(self.id)
+
+    def can(self, modulo_nombre: str, permission: int):
+        """¿Tiene permiso?"""
+        if modulo_nombre in self.permisos:
+            return self.permisos[modulo_nombre] >= permission
+        return False
+
+    def can_view(self, modulo_nombre: str):
+        """¿Tiene permiso para ver?"""
+        return self.can(modulo_nombre, Permiso.VER)
+
+    def can_edit(self, modulo_nombre: str):
+        """¿Tiene permiso para editar?"""
+        return self.can(modulo_nombre, Permiso.MODIFICAR)
+
+    def can_insert(self, modulo_nombre: str):
+        """¿Tiene permiso para agregar?"""
+        return self.can(modulo_nombre, Permiso.CREAR)
+
+    def can_admin(self, modulo_nombre: str):
+        """¿Tiene permiso para administrar?"""
+        return self.can(modulo_nombre, Permiso.ADMINISTRAR)
+
+    def __repr__(self):
+        """Representación"""
+        return f"<UsuarioPrincipal {self.email}>"
+
+
+def load_principal(usuario_id: int):
+    """Entregar el UsuarioPrincipal desde la caché o consultarlo en una sola pasada"""
+    try:
+        versiones = get_permisos_versions(usuario_id)
+    except RedisError:
+        versiones = (None, None)
+    llave = (usuario_id, versiones)
+    principal = local_cache.get(llave)
+    if principal is not None:
+        return principal
+    usuario = (
+        Usuario.query.options(
+            selectinload(Usuario.usuarios_roles)
+            .selectinload(UsuarioRol.rol)
+            .selectinload(Rol.permisos)
+            .selectinload(Permiso.modulo)
+        )
+        .filter_by(id=usuario_id)
+        .first()
+    )
+    if usuario is None:
+        return None
+    principal = UsuarioPrincipal.from_usuario(usuario, version=versiones[0])
+    local_cache.set(llave, principal)
+    return principal
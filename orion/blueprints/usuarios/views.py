@@ -15,20 +15,25 @@ from pytz import timezone
 from config.firebase import get_firebase_settings
 from orion.blueprints.bitacoras.models import Bitacora
 from orion.blueprints.entradas_salidas.models import EntradaSalida
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.usuarios.decorators import anonymous_required, permission_required
 from orion.blueprints.usuarios.forms import AccesoForm, UsuarioForm
 from orion.blueprints.usuarios.models import Usuario
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains
+from lib.permisos_cache import invalidate_permisos
 from lib.pwgen import generar_api_key, generar_contrasena
 from lib.safe_next_url import safe_next_url
 from lib.safe_string import CONTRASENA_REGEXP, EMAIL_REGEXP, TOKEN_REGEXP, safe_email, safe_message, safe_string
+from lib.unicidad import add_form_errors, save_unique
 
 HTTP_REQUEST = google.auth.transport.requests.Request()
 
 MODULO = "USUARIOS"
 
+# Campos que no se repiten entre los usuarios activos y sus mensajes
+USUARIOS_UNICOS = {"email": "El e-mail ya está en uso. Debe de ser único."}
+
 usuarios = Blueprint("usuarios", __name__, template_folder="templates")
 
 
@@ -129,52 +134,45 @@ def profile():
     )
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Usuarios"""
+    return {
+        "detalle": {
+            "email": renglon.email,
+            "url": url_for("usuarios.detail", usuario_id=renglon.id),
+        },
+        "nombre": renglon.nombre,
+        "puesto": renglon.puesto,
+    }
+
+
+USUARIOS_DATATABLE = DataTableSpec(
+    model=Usuario,
+    columns={
+        "id": Usuario.id,
+        "email": Usuario.email,
+        "nombre": Usuario.nombre,
+        "puesto": Usuario.puesto,
+    },
+    filters=[
+        filter_contains("nombres", Usuario.nombres),
+        filter_contains("apellido_paterno", Usuario.apellido_paterno),
+        filter_contains("apellido_materno", Usuario.apellido_materno),
+        filter_contains("curp", Usuario.curp),
+        filter_contains("puesto", Usuario.puesto),
+        filter_contains("email", Usuario.email, limpiar=lambda texto: safe_email(texto, search_fragment=True)),
+    ],
+    order=[Usuario.email],
+    row=datatable_renglon,
+)
+
+
 @usuarios.route("/usuarios/datatable_json", methods=["GET", "POST"])
 @login_required
 @permission_required(MODULO, Permiso.VER)
 def datatable_json():
     """DataTable JSON para listado de Usuarios"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = Usuario.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "autoridad_id" in request.form:
-        consulta = consulta.filter_by(autoridad_id=request.form["autoridad_id"])
-    if "nombres" in request.form:
-        consulta = consulta.filter(Usuario.nombres.contains(safe_string(request.form["nombres"])))
-    if "apellido_paterno" in request.form:
-        consulta = consulta.filter(Usuario.apellido_paterno.contains(safe_string(request.form["apellido_paterno"])))
-    if "apellido_materno" in request.form:
-        consulta = consulta.filter(Usuario.apellido_materno.contains(safe_string(request.form["apellido_materno"])))
-    if "curp" in request.form:
-        consulta = consulta.filter(Usuario.curp.contains(safe_string(request.form["curp"])))
-    if "puesto" in request.form:
-        consulta = consulta.filter(Usuario.puesto.contains(safe_string(request.form["puesto"])))
-    if "email" in request.form:
-        consulta = consulta.filter(Usuario.email.contains(safe_email(request.form["email"], search_fragment=True)))
-    # Ordenar y paginar
-    registros = consulta.order_by(Usuario.email).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "email": resultado.email,
-                    "url": url_for("usuarios.detail", usuario_id=resultado.id),
-                },
-                "nombre": resultado.nombre,
-                "puesto": resultado.puesto,
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return USUARIOS_DATATABLE.output()
 
 
 @usuarios.route("/usuarios/api_key_request/<int:usuario_id>", methods=["GET", "POST"])
@@ -200,8 +198,8 @@ def request_api_key_json(usuario_id):
         usuario.save()
         mensaje = f"La API Key de {usuario.email} fue eliminada"
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=mensaje,
             url=url_for("usuarios.detail", usuario_id=usuario.id),
         )
@@ -224,8 +222,8 @@ def request_api_key_json(usuario_id):
         usuario.save()
         mensaje = f"Nueva API Key para {usuario.email} con expiración en {days} días"
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=mensaje,
             url=url_for("usuarios.detail", usuario_id=usuario.id),
         )
@@ -316,12 +314,8 @@ def new():
     """Nuevo Usuario"""
     form = UsuarioForm()
     if form.validate_on_submit():
-        # Validar que el email no se repita
         email = safe_email(form.email.data)
-        if Usuario.query.filter_by(email=email).first():
-            flash("El e-mail ya está en uso. Debe de ser único.", "warning")
-            return render_template("usuarios/new.jinja2", form=form)
-        # Guadar
+        # Guadar, si el e-mail ya está en uso se marca en el formulario
         usuario = Usuario(
             email=email,
             nombres=safe_string(form.nombres.data, save_enie=True),
@@ -333,10 +327,13 @@ def new():
             api_key_expiracion=datetime(year=2000, month=1, day=1, hour=0, minute=0, second=0),
             contrasena=generar_contrasena(),
         )
-        usuario.save()
+        conflictos = save_unique(usuario, USUARIOS_UNICOS)
+        if conflictos:
+            add_form_errors(form, conflictos)
+            return render_template("usuarios/new.jinja2", form=form)
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Usuario {usuario.email}"),
             url=url_for("usuarios.detail", usuario_id=usuario.id),
         )
@@ -355,32 +352,27 @@ def edit(usuario_id):
     usuario = Usuario.query.get_or_404(usuario_id)
     form = UsuarioForm()
     if form.validate_on_submit():
-        es_valido = True
-        # Si cambia el e-mail verificar que no este en uso
-        email = safe_email(form.email.data)
-        if usuario.email != email:
-            usuario_existente = Usuario.query.filter_by(email=email).first()
-            if usuario_existente and usuario_existente.id != usuario.id:
-                es_valido = False
-                flash("La e-mail ya está en uso. Debe de ser único.", "warning")
-        # Si es valido actualizar
-        if es_valido:
-            usuario.email = email
-            usuario.nombres = safe_string(form.nombres.data, save_enie=True)
-            usuario.apellido_paterno = safe_string(form.apellido_paterno.data, save_enie=True)
-            usuario.apellido_materno = safe_string(form.apellido_materno.data, save_enie=True)
-            usuario.curp = safe_string(form.curp.data)
-            usuario.puesto = safe_string(form.puesto.data)
-            usuario.save()
-            bitacora = Bitacora(
-                modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-                usuario=current_user,
-                descripcion=safe_message(f"Editado Usuario {usuario.email}"),
-                url=url_for("usuarios.detail", usuario_id=usuario.id),
-            )
-            bitacora.save()
-            flash(bitacora.descripcion, "success")
-            return redirect(bitacora.url)
+        usuario.email = safe_email(form.email.data)
+        usuario.nombres = safe_string(form.nombres.data, save_enie=True)
+        usuario.apellido_paterno = safe_string(form.apellido_paterno.data, save_enie=True)
+        usuario.apellido_materno = safe_string(form.apellido_materno.data, save_enie=True)
+        usuario.curp = safe_string(form.curp.data)
+        usuario.puesto = safe_string(form.puesto.data)
+        # Guardar, si el e-mail ya está en uso se marca en el formulario
+        conflictos = save_unique(usuario, USUARIOS_UNICOS)
+        if conflictos:
+            add_form_errors(form, conflictos)
+            return render_template("usuarios/edit.jinja2", form=form, usuario=usuario)
+        invalidate_permisos(usuario_id=usuario.id)  # También renueva al usuario en la sesión
+        bitacora = Bitacora(
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
+            descripcion=safe_message(f"Editado Usuario {usuario.email}"),
+            url=url_for("usuarios.detail", usuario_id=usuario.id),
+        )
+        bitacora.save()
+        flash(bitacora.descripcion, "success")
+        return redirect(bitacora.url)
     form.email.data = usuario.email
     form.nombres.data = usuario.nombres
     form.apellido_paterno.data = usuario.apellido_paterno
@@ -402,10 +394,12 @@ def delete(usuario_id):
         # Dar de baja los roles del usuario
         for usuario_rol in usuario.usuarios_roles:
             usuario_rol.delete()
+        # Invalidar la caché de permisos
+        invalidate_permisos(usuario_id=usuario.id)
         # Guardar en la bitacora
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Usuario {usuario.email}"),
             url=url_for("usuarios.detail", usuario_id=usuario.id),
         )
@@ -426,10 +420,12 @@ def recover(usuario_id):
         # Recuperar los roles del usuario
         for usuario_rol in usuario.usuarios_roles:
             usuario_rol.recover()
+        # Invalidar la caché de permisos
+        invalidate_permisos(usuario_id=usuario.id)
         # Guardar en la bitacora
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Usuario {usuario.email}"),
             url=url_for("usuarios.detail", usuario_id=usuario.id),
         )
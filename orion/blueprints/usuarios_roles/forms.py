@@ -6,7 +6,7 @@ from flask_wtf import FlaskForm
 from wtforms import SelectField, StringField, SubmitField
 from wtforms.validators import DataRequired
 
-from orion.blueprints.roles.models import Rol
+from orion.blueprints.catalogos.cache import ROLES
 from orion.blueprints.usuarios.models import Usuario
 
 
@@ -35,4 +35,4 @@ class UsuarioRolNewWithUsuarioForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         """Inicializar y cargar opciones para rol"""
         super().__init__(*args, **kwargs)
-        self.rol.choices = [(r.id, r.nombre) for r in Rol.query.filter_by(estatus="A").order_by(Rol.nombre).all()]
+        self.rol.choices = ROLES.choices(lambda r: r.nombre)
@@ -4,13 +4,14 @@ Usuarios-Roles, vistas
 
 import json
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import current_user, login_required
 
-from lib.datatables import get_datatable_parameters, output_datatable_json
+from lib.datatable_engine import DataTableSpec, filter_contains, filter_equal
+from lib.permisos_cache import invalidate_permisos
 from lib.safe_string import safe_email, safe_message, safe_string
 from orion.blueprints.bitacoras.models import Bitacora
-from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import get_modulo_id
 from orion.blueprints.permisos.models import Permiso
 from orion.blueprints.roles.models import Rol
 from orion.blueprints.usuarios.decorators import permission_required
@@ -30,71 +31,57 @@ def before_request():
     """Permiso por defecto"""
 
 
+def datatable_renglon(renglon):
+    """Renglón para el DataTable de Usuarios-Roles"""
+    return {
+        "detalle": {
+            "id": renglon.id,
+            "url": url_for("usuarios_roles.detail", usuario_rol_id=renglon.id),
+        },
+        "usuario": {
+            "email": renglon.usuario_email,
+            "url": url_for("usuarios.detail", usuario_id=renglon.usuario_id) if current_user.can_view("USUARIOS") else "",
+        },
+        "usuario_nombre": renglon.usuario_nombre,
+        "usuario_puesto": renglon.usuario_puesto,
+        "rol": {
+            "nombre": renglon.rol_nombre,
+            "url": url_for("roles.detail", rol_id=renglon.rol_id) if current_user.can_view("ROLES") else "",
+        },
+    }
+
+
+USUARIOS_ROLES_DATATABLE = DataTableSpec(
+    model=UsuarioRol,
+    columns={
+        "id": UsuarioRol.id,
+        "usuario_id": UsuarioRol.usuario_id,
+        "usuario_email": Usuario.email,
+        "usuario_nombre": Usuario.nombre,
+        "usuario_puesto": Usuario.puesto,
+        "rol_id": UsuarioRol.rol_id,
+        "rol_nombre": Rol.nombre,
+    },
+    joins=[
+        (Usuario, UsuarioRol.usuario_id == Usuario.id),
+        (Rol, UsuarioRol.rol_id == Rol.id),
+    ],
+    filters=[
+        filter_equal("usuario_id", UsuarioRol.usuario_id),
+        filter_equal("rol_id", UsuarioRol.rol_id),
+        filter_contains("email", Usuario.email, limpiar=lambda texto: safe_email(texto, search_fragment=True)),
+        filter_contains("nombres", Usuario.nombres, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+        filter_contains("apellido_paterno", Usuario.apellido_paterno, limpiar=lambda texto: safe_string(texto, save_enie=True)),
+    ],
+    order=[UsuarioRol.id],
+    row=datatable_renglon,
+)
+
+
 @usuarios_roles.route("/usuarios_roles/datatable_json", methods=["GET", "POST"])
 def datatable_json():
     """DataTable JSON para listado de Usuarios-Roles"""
-    # Tomar parámetros de Datatables
-    draw, start, rows_per_page = get_datatable_parameters()
-    # Consultar
-    consulta = UsuarioRol.query
-    # Primero filtrar por columnas propias
-    if "estatus" in request.form:
-        consulta = consulta.filter_by(estatus=request.form["estatus"])
-    else:
-        consulta = consulta.filter_by(estatus="A")
-    if "usuario_id" in request.form:
-        consulta = consulta.filter_by(usuario_id=request.form["usuario_id"])
-    if "rol_id" in request.form:
-        consulta = consulta.filter_by(rol_id=request.form["rol_id"])
-    # Luego filtrar por columnas de otras tablas
-    email = ""
-    if "email" in request.form:
-        try:
-            email = safe_email(request.form["email"], search_fragment=True)
-        except ValueError:
-            pass
-    nombres = ""
-    if "nombres" in request.form:
-        nombres = safe_string(request.form["nombres"], save_enie=True)
-    apellido_paterno = ""
-    if "apellido_paterno" in request.form:
-        apellido_paterno = safe_string(request.form["apellido_paterno"], save_enie=True)
-    if email != "" or nombres != "" or apellido_paterno != "":
-        consulta = consulta.join(Usuario)
-        if email != "":
-            consulta = consulta.filter(Usuario.email.contains(email))
-        if nombres != "":
-            consulta = consulta.filter(Usuario.nombres.contains(nombres))
-        if apellido_paterno != "":
-            consulta = consulta.filter(Usuario.apellido_paterno.contains(apellido_paterno))
-    # Ordenar y paginar
-    registros = consulta.order_by(UsuarioRol.id).offset(start).limit(rows_per_page).all()
-    total = consulta.count()
-    # Elaborar datos para DataTable
-    data = []
-    for resultado in registros:
-        data.append(
-            {
-                "detalle": {
-                    "id": resultado.id,
-                    "url": url_for("usuarios_roles.detail", usuario_rol_id=resultado.id),
-                },
-                "usuario": {
-                    "email": resultado.usuario.email,
-                    "url": (
-                        url_for("usuarios.detail", usuario_id=resultado.usuario_id) if current_user.can_view("USUARIOS") else ""
-                    ),
-                },
-                "usuario_nombre": resultado.usuario.nombre,
-                "usuario_puesto": resultado.usuario.puesto,
-                "rol": {
-                    "nombre": resultado.rol.nombre,
-                    "url": url_for("roles.detail", rol_id=resultado.rol_id) if current_user.can_view("ROLES") else "",
-                },
-            }
-        )
-    # Entregar JSON
-    return output_datatable_json(draw, total, data)
+    return USUARIOS_ROLES_DATATABLE.output()
 
 
 @usuarios_roles.route("/usuarios_roles")
@@ -141,6 +128,7 @@ def new_with_rol(rol_id):
             if usuario_rol_existente.estatus == "B":
                 usuario_rol_existente.estatus = "A"
                 usuario_rol_existente.save()
+                invalidate_permisos(usuario_id=usuario_rol_existente.usuario_id)
                 flash(f"Se ha recuperado {rol.nombre} en {usuario.email}.", "success")
             else:
                 flash(f"Ya existe {rol.nombre} en {usuario.email}. Nada por hacer.", "warning")
@@ -151,9 +139,10 @@ def new_with_rol(rol_id):
             descripcion=descripcion,
         )
         usuario_rol.save()
+        invalidate_permisos(usuario_id=usuario_rol.usuario_id)
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Usuario-Rol {usuario_rol.descripcion}"),
             url=url_for("roles.detail", rol_id=rol.id),
         )
@@ -183,6 +172,7 @@ def new_with_usuario(usuario_id):
             if usuario_rol_existente.estatus == "B":
                 usuario_rol_existente.estatus = "A"
                 usuario_rol_existente.save()
+                invalidate_permisos(usuario_id=usuario_rol_existente.usuario_id)
                 flash(f"Se ha recuperado {rol.nombre} en {usuario.email}.", "success")
             else:
                 flash(f"Ya existe {rol.nombre} en {usuario.email}. Nada por hacer.", "warning")
@@ -193,9 +183,10 @@ def new_with_usuario(usuario_id):
             descripcion=descripcion,
         )
         usuario_rol.save()
+        invalidate_permisos(usuario_id=usuario_rol.usuario_id)
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Nuevo Usuario-Rol {usuario_rol.descripcion}"),
             url=url_for("usuarios.detail", usuario_id=usuario.id),
         )
@@ -220,9 +211,10 @@ def delete(usuario_rol_id):
     usuario_rol = UsuarioRol.query.get_or_404(usuario_rol_id)
     if usuario_rol.estatus == "A":
         usuario_rol.delete()
+        invalidate_permisos(usuario_id=usuario_rol.usuario_id)
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Eliminado Usuario-Rol {usuario_rol.descripcion}"),
             url=url_for("usuarios_roles.detail", usuario_rol_id=usuario_rol.id),
         )
@@ -238,9 +230,10 @@ def recover(usuario_rol_id):
     usuario_rol = UsuarioRol.query.get_or_404(usuario_rol_id)
     if usuario_rol.estatus == "B":
         usuario_rol.recover()
+        invalidate_permisos(usuario_id=usuario_rol.usuario_id)
         bitacora = Bitacora(
-            modulo=Modulo.query.filter_by(nombre=MODULO).first(),
-            usuario=current_user,
+            modulo_id=get_modulo_id(MODULO),
+            usuario_id=current_user.id,
             descripcion=safe_message(f"Recuperado Usuario-Rol {usuario_rol.descripcion}"),
             url=url_for("usuarios_roles.detail", usuario_rol_id=usuario_rol.id),
         )
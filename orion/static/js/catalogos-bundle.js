@@ -0,0 +1,89 @@
+/* Catálogos Bundle */
+const CATALOGOS_BUNDLE_LLAVE = "orion:catalogos";
+
+class CatalogosBundle {
+  // Constructor, con la URL y la huella del paquete que entrega catalogos_bundle()
+  constructor(url, huella) {
+    this.url = url;
+    this.huella = huella;
+    this.catalogos = {};
+    this.objetos = {};
+    this.promesa = null;
+  }
+
+  // Cargar de localStorage si la huella coincide, si no pedirlo al servidor y guardarlo
+  cargar() {
+    if (this.promesa) return this.promesa;
+    let guardado = null;
+    try {
+      guardado = JSON.parse(localStorage.getItem(CATALOGOS_BUNDLE_LLAVE));
+    } catch (error) {
+      guardado = null;
+    }
+    if (guardado && guardado.huella == this.huella) {
+      this.catalogos = guardado.catalogos;
+      this.promesa = Promise.resolve(this);
+      return this.promesa;
+    }
+    this.promesa = fetch(this.url, { credentials: "same-origin" })
+      .then((respuesta) => {
+        if (!respuesta.ok) throw new Error("No se pudo cargar el paquete de catálogos");
+        return respuesta.json();
+      })
+      .then((paquete) => {
+        try {
+          localStorage.setItem(CATALOGOS_BUNDLE_LLAVE, JSON.stringify(paquete));
+        } catch (error) {
+          // Sin espacio o sin localStorage, queda en la memoria de la página
+        }
+        this.catalogos = paquete.catalogos;
+        return this;
+      });
+    return this.promesa;
+  }
+
+  // Renglones de un catálogo como objetos, filtrados por igualdad en los grupos
+  renglones(nombre, grupos = {}) {
+    if (!(nombre in this.objetos)) {
+      const catalogo = this.catalogos[nombre];
+      this.objetos[nombre] = catalogo.renglones.map((renglon) => {
+        let objeto = {};
+        catalogo.columnas.forEach((columna, i) => (objeto[columna] = renglon[i]));
+        return objeto;
+      });
+    }
+    return this.objetos[nombre].filter((objeto) =>
+      Object.keys(grupos).every((campo) => String(objeto[campo]) == String(grupos[campo]))
+    );
+  }
+
+  // Opciones para Select2, marcando la elegida
+  opciones(nombre, texto, grupos = {}, elegido = null) {
+    return this.renglones(nombre, grupos).map((objeto) => ({
+      id: objeto.id,
+      text: texto(objeto),
+      selected: elegido != null && String(objeto.id) == String(elegido),
+    }));
+  }
+
+  // Configurar un Select2 con un catálogo, busca en el navegador sin pedir nada al servidor
+  select2(selector, nombre, texto, configuracion = {}, grupos = {}) {
+    const elegido = $(selector).val();
+    let opciones = this.opciones(nombre, texto, grupos, elegido);
+    // Si la opción elegida ya no está activa, se conserva para no perderla al editar
+    if (elegido && !opciones.some((opcion) => opcion.selected)) {
+      opciones.unshift({ id: elegido, text: $(selector).find("option:selected").text(), selected: true });
+    }
+    if ($(selector).hasClass("select2-hidden-accessible")) $(selector).select2("destroy");
+    $(selector).empty();
+    $(selector).select2({
+      ...configuracion,
+      data: [{ id: "", text: "" }, ...opciones],
+      matcher: function (params, data) {
+        if (params.term == undefined || params.term.trim() == "") return data;
+        if (data.text.toUpperCase().indexOf(params.term.trim().toUpperCase()) > -1) return data;
+        return null;
+      },
+    });
+  }
+}
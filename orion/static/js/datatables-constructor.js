@@ -40,4 +40,19 @@ class ConfigDataTable {
       },
     };
   }
+
+  // Paginar por cursor (keyset): envia el cursor que entregó la página anterior
+  // Si no se tiene, como al saltar a la última página, el servidor usa offset
+  keyset(dataTable) {
+    let cursores = {};
+    let siguienteStart = 0;
+    $(dataTable).on("preXhr.dt", function (e, settings, data) {
+      if (data.start === 0) cursores = {};
+      siguienteStart = data.start + data.length;
+      if (cursores[data.start] !== undefined) data.cursor = cursores[data.start];
+    });
+    $(dataTable).on("xhr.dt", function (e, settings, json) {
+      if (json && json.cursor) cursores[siguienteStart] = json.cursor;
+    });
+  }
 }
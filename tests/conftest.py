@@ -0,0 +1,106 @@
+"""
+Pruebas, configuración
+
+Las pruebas usan SQLite en memoria y fakeredis, no necesitan servicios.
+"""
+
+import os
+from datetime import date
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379")
+os.environ.setdefault("SALT", "pruebas")
+os.environ.setdefault("SECRET_KEY", "pruebas")
+os.environ.setdefault("TASK_QUEUE", "pjecz_orion_pruebas")
+
+import fakeredis
+import pytest
+import rq
+
+from lib import permisos_cache
+from lib.catalog_cache import CATALOGOS, escucha
+from orion.app import create_app
+from orion.blueprints.carreras.models import Carrera
+from orion.blueprints.modulos import menu
+from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import modulos_registry
+from orion.blueprints.niveles_academicos.models import NivelAcademico
+from orion.blueprints.permisos.models import Permiso
+from orion.blueprints.personas.models import Persona
+from orion.blueprints.roles.models import Rol
+from orion.blueprints.usuarios import principal
+from orion.blueprints.usuarios.models import Usuario
+from orion.blueprints.usuarios_roles.models import UsuarioRol
+from orion.extensions import database
+
+
+@pytest.fixture(name="app")
+def fixture_app():
+    """App con la base de datos creada y Redis falso"""
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    app.redis = fakeredis.FakeRedis()
+    app.redis.flushall()
+    for cache in (permisos_cache.local_cache, menu.local_cache, principal.local_cache):
+        cache.clear()  # Las cachés del worker no deben pasar de una prueba a otra, los id se repiten
+    modulos_registry.ids, modulos_registry.version = {}, None
+    escucha.update(pid=os.getpid(), activa=False)  # Sin el hilo suscrito, las copias revisan la versión en cada lectura
+    for catalogo in CATALOGOS.values():
+        catalogo.expire()
+        catalogo._renglones = None
+    app.task_queue = rq.Queue(app.config["TASK_QUEUE"], connection=app.redis)
+    with app.app_context():
+        database.create_all()
+        yield app
+        database.session.remove()
+        database.drop_all()
+
+
+@pytest.fixture(name="persona_datos")
+def fixture_persona_datos(app):
+    """Columnas obligatorias de una Persona, con su carrera y nivel académico"""
+    carrera = Carrera(nombre="NINGUNA").save()
+    nivel_academico = NivelAcademico(clave="00", nombre="SIN ESTUDIOS").save()
+    return {
+        "carrera_id": carrera.id,
+        "nivel_estudios_max_id": nivel_academico.id,
+        "nombres": "MARIA",
+        "apellido_primero": "PEREZ",
+        "rfc": "PEMA800101AAA",
+        "curp": "PEMA800101MCLRRR09",
+        "fecha_ingreso_gobierno": date(2010, 1, 1),
+        "fecha_ingreso_pj": date(2010, 1, 1),
+        "fecha_nacimiento": date(1980, 1, 1),
+        "situacion": "A.D.",
+        "sexo": "M",
+        "estado_civil": "S",
+    }
+
+
+@pytest.fixture(name="usuario")
+def fixture_usuario(app):
+    """Usuario con permiso para ver licencias, personas y tareas"""
+    usuario = Usuario(
+        email="pruebas@pjecz.gob.mx",
+        nombres="PRUEBAS",
+        apellido_paterno="ORION",
+        apellido_materno="",
+        curp="",
+        puesto="",
+    ).save()
+    rol = Rol(nombre="PRUEBAS").save()
+    UsuarioRol(usuario_id=usuario.id, rol_id=rol.id, descripcion="PRUEBAS").save()
+    for nombre in ("LICENCIAS", "PERSONAS", "TAREAS"):
+        modulo = Modulo(nombre=nombre, nombre_corto=nombre, icono="", ruta="", en_navegacion=False).save()
+        Permiso(rol_id=rol.id, modulo_id=modulo.id, nombre=nombre, nivel=Permiso.VER).save()
+    return usuario
+
+
+@pytest.fixture(name="client")
+def fixture_client(app, usuario):
+    """Cliente con la sesión iniciada del usuario, cargado por USER_LOADER"""
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion["_user_id"] = str(usuario.id)
+        sesion["_fresh"] = True
+    return client
@@ -0,0 +1,59 @@
+"""
+Pruebas de la Auditoría
+"""
+
+import pytest
+
+from lib.auditoria import AUDITORIA_FALLIDOS_KEY, AUDITORIA_KEY, flush, requeue_fallidos
+from lib.unit_of_work import unit_of_work
+from orion.blueprints.bitacoras.models import Bitacora
+from orion.blueprints.modulos.models import Modulo
+
+
+@pytest.fixture(name="bitacora_datos")
+def fixture_bitacora_datos(usuario):
+    """Columnas de una Bitacora con su usuario y módulo"""
+    modulo = Modulo.query.filter_by(nombre="PERSONAS").one()
+    return {"modulo_id": modulo.id, "usuario_id": usuario.id, "descripcion": "Nueva persona", "url": "/personas"}
+
+
+def test_agregar_y_vaciar(app, bitacora_datos):
+    """Fuera de una unidad de trabajo va a la cola de inmediato y flush() la inserta"""
+    Bitacora(**bitacora_datos).save()
+    assert app.redis.llen(AUDITORIA_KEY) == 1
+    assert Bitacora.query.count() == 0
+    assert flush() == 1
+    assert app.redis.llen(AUDITORIA_KEY) == 0
+    assert Bitacora.query.one().descripcion == "Nueva persona"
+
+
+def test_unidad_de_trabajo_hasta_el_commit(app, bitacora_datos):
+    """Dentro de una unidad de trabajo va a la cola hasta el commit"""
+    with unit_of_work():
+        Bitacora(**bitacora_datos).save()
+        assert app.redis.llen(AUDITORIA_KEY) == 0
+    assert app.redis.llen(AUDITORIA_KEY) == 1
+
+
+def test_unidad_de_trabajo_con_rollback(app, bitacora_datos):
+    """Si la unidad de trabajo termina con rollback no queda en la cola"""
+    with pytest.raises(RuntimeError):
+        with unit_of_work():
+            Bitacora(**bitacora_datos).save()
+            raise RuntimeError("Falla")
+    assert app.redis.llen(AUDITORIA_KEY) == 0
+    assert flush() == 0
+
+
+def test_reintentar_fallidos(app, bitacora_datos):
+    """Un lote que falla queda en los fallidos, al reintentar regresa a la cola y se inserta"""
+    Bitacora(**bitacora_datos).save()
+    app.redis.rpush(AUDITORIA_KEY, '{"tabla": "no_existe", "valores": {}}')
+    with pytest.raises(KeyError):
+        flush()
+    assert app.redis.llen(AUDITORIA_FALLIDOS_KEY) == 2
+    app.redis.lrem(AUDITORIA_FALLIDOS_KEY, 1, '{"tabla": "no_existe", "valores": {}}')
+    assert requeue_fallidos() == 1
+    assert app.redis.llen(AUDITORIA_FALLIDOS_KEY) == 0
+    assert flush() == 1
+    assert Bitacora.query.count() == 1
@@ -0,0 +1,23 @@
+"""
+Pruebas del índice del buscador global
+"""
+
+from orion.blueprints.busquedas.models import Busqueda
+from orion.blueprints.personas.models import Persona
+
+
+def test_persona_sin_apellido_segundo(persona_datos):
+    """Guardar una persona sin apellido segundo indexa su nombre sin fallar"""
+    persona = Persona(apellido_segundo=None, **persona_datos).save()
+    busqueda = Busqueda.query.filter_by(modulo="PERSONAS", registro_id=persona.id).one()
+    assert busqueda.titulo == "MARIA PEREZ"
+    assert "MARIA PEREZ" in busqueda.texto
+
+
+def test_persona_cambia_nombre(persona_datos):
+    """Al modificar la persona se actualiza su renglón del buscador"""
+    persona = Persona(apellido_segundo="LOPEZ", **persona_datos).save()
+    persona.nombres = "ANA"
+    persona.save()
+    busqueda = Busqueda.query.filter_by(modulo="PERSONAS", registro_id=persona.id).one()
+    assert busqueda.titulo == "ANA PEREZ LOPEZ"
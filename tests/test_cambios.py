@@ -0,0 +1,33 @@
+"""
+Pruebas de Cambios
+"""
+
+from lib.cambios import CAMBIOS_STREAM, decode_cambio
+from orion.blueprints.personas.models import Persona
+from orion.extensions import database
+
+
+def leer_eventos(app) -> list:
+    """Eventos del stream como diccionarios de textos"""
+    return [decode_cambio(valores) for _, valores in app.redis.xrange(CAMBIOS_STREAM)]
+
+
+def test_insertar_modificar_eliminar(app, persona_datos):
+    """Los eventos de insertar, modificar y eliminar llevan el id del registro"""
+    app.redis.delete(CAMBIOS_STREAM)
+    persona = Persona(**persona_datos).save()
+    persona.nombres = "MARTHA"
+    persona.save()
+    persona.delete()
+    eventos = [evento for evento in leer_eventos(app) if evento["tabla"] == "personas"]
+    assert [(evento["operacion"], evento["estatus"]) for evento in eventos] == [("I", "A"), ("U", "A"), ("U", "B")]
+    assert all(evento["id"] == str(persona.id) for evento in eventos)
+
+
+def test_rollback_descarta(app, persona_datos):
+    """Lo que se deshace con rollback no llega al stream"""
+    app.redis.delete(CAMBIOS_STREAM)
+    database.session.add(Persona(**persona_datos))
+    database.session.flush()
+    database.session.rollback()
+    assert leer_eventos(app) == []
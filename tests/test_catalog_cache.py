@@ -0,0 +1,53 @@
+"""
+Pruebas de las copias en memoria de los catálogos
+"""
+
+from lib import catalog_cache
+from lib.catalog_cache import escucha
+from orion.blueprints.carreras.models import Carrera
+from orion.blueprints.catalogos.cache import CARRERAS, NIVELES_ACADEMICOS
+from orion.blueprints.niveles_academicos.models import NivelAcademico
+
+
+def test_copia_hasta_cambiar(app):
+    """La copia se usa mientras no cambie la versión de la tabla, sólo con los activos y en orden"""
+    derecho = Carrera(nombre="DERECHO").save()
+    Carrera(nombre="CONTADURIA").save()
+    copia = CARRERAS.all()
+    assert [renglon.nombre for renglon in copia] == ["CONTADURIA", "DERECHO"]
+    assert CARRERAS.all() is copia
+    assert CARRERAS.get(derecho.id).nombre == "DERECHO"
+    derecho.delete()
+    assert [renglon.nombre for renglon in CARRERAS.all()] == ["CONTADURIA"]
+    assert CARRERAS.get(derecho.id) is None
+    assert CARRERAS.get(999) is None
+
+
+def test_opciones(app):
+    """Las opciones para un SelectField pueden filtrarse por igualdad"""
+    NivelAcademico(clave="01", nombre="PRIMARIA").save()
+    NivelAcademico(clave="02", nombre="SECUNDARIA").save()
+    assert [texto for _, texto in NIVELES_ACADEMICOS.choices(lambda renglon: renglon.nombre)] == ["PRIMARIA", "SECUNDARIA"]
+    assert [texto for _, texto in NIVELES_ACADEMICOS.choices(lambda renglon: renglon.clave, nombre="SECUNDARIA")] == ["02"]
+
+
+def test_con_escucha_hasta_el_aviso(app):
+    """Con el hilo suscrito la versión no se revisa hasta recibir el aviso de la tabla"""
+    Carrera(nombre="DERECHO").save()
+    escucha["activa"] = True
+    assert len(CARRERAS.all()) == 1
+    Carrera(nombre="CONTADURIA").save()
+    assert len(CARRERAS.all()) == 1
+    CARRERAS.expire()
+    assert len(CARRERAS.all()) == 2
+
+
+def test_sin_redis(app, monkeypatch):
+    """Sin Redis la copia se recarga de la base de datos cada CATALOGO_REVISION segundos"""
+    monkeypatch.setattr(catalog_cache, "get_table_version", lambda tabla: None)
+    Carrera(nombre="DERECHO").save()
+    assert len(CARRERAS.all()) == 1
+    Carrera(nombre="CONTADURIA").save()
+    assert len(CARRERAS.all()) == 1
+    monkeypatch.setattr(catalog_cache, "CATALOGO_REVISION", -1)
+    assert len(CARRERAS.all()) == 2
@@ -0,0 +1,45 @@
+"""
+Pruebas del paquete de catálogos para el navegador
+"""
+
+import json
+
+from orion.blueprints.carreras.models import Carrera
+from orion.blueprints.catalogos.cache import BUNDLE
+
+URL = "/catalogos/bundle.json"
+
+
+def test_paquete(app):
+    """El paquete lleva los renglones activos, sólo se vuelve a formar si cambia algún catálogo"""
+    Carrera(nombre="DERECHO").save()
+    huella, contenido = BUNDLE.get()
+    paquete = json.loads(contenido)
+    assert paquete["huella"] == huella
+    assert paquete["catalogos"]["carreras"] == {"columnas": ["id", "nombre"], "renglones": [[1, "DERECHO"]]}
+    assert "roles" not in paquete["catalogos"]
+    assert BUNDLE.get()[1] is contenido
+    Carrera(nombre="CONTADURIA").save()
+    assert BUNDLE.get()[0] != huella
+
+
+def test_cache_del_navegador(client):
+    """Con la huella en la URL se guarda un año, sin ella se revalida con el ETag"""
+    Carrera(nombre="DERECHO").save()
+    huella, _ = BUNDLE.get()
+    respuesta = client.get(URL)
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == "application/json"
+    assert respuesta.cache_control.no_cache
+    assert client.get(URL, headers={"If-None-Match": f'"{huella}"'}).status_code == 304
+    respuesta = client.get(f"{URL}?v={huella}")
+    assert respuesta.cache_control.max_age == 365 * 24 * 60 * 60
+    assert respuesta.cache_control.private
+    assert "immutable" in respuesta.headers["Cache-Control"]
+
+
+def test_sin_sesion(app):
+    """Sin sesión se redirige al inicio de sesión"""
+    respuesta = app.test_client().get(URL)
+    assert respuesta.status_code == 302
+    assert "/login" in respuesta.headers["Location"]
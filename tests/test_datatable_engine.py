@@ -0,0 +1,61 @@
+"""
+Pruebas del motor declarativo de DataTables
+"""
+
+from lib.datatable_engine import DataTableSpec, filter_contains, filter_equal, filter_words
+from lib.datatables import CONTEO_CACHE, CONTEO_ESTIMADO
+from orion.blueprints.carreras.models import Carrera
+from orion.blueprints.personas.models import Persona
+
+PERSONAS_DATATABLE = DataTableSpec(
+    model=Persona,
+    columns={"id": Persona.id, "nombre_completo": Persona.nombre_completo, "carrera_nombre": Carrera.nombre},
+    joins=[(Carrera, Persona.carrera_id == Carrera.id)],
+    filters=[
+        filter_words("nombre_completo", Persona.nombres, Persona.apellido_primero),
+        filter_contains("carrera", Carrera.nombre),
+        filter_equal("carrera_id", Persona.carrera_id, limpiar=int),
+    ],
+    order=[Persona.apellido_primero],
+    row=lambda renglon: {"nombre": renglon.nombre_completo, "carrera": renglon.carrera_nombre},
+    count=CONTEO_ESTIMADO,
+)
+
+
+def claves(numero: int) -> dict:
+    """RFC y CURP distintos para cada persona"""
+    return {"rfc": f"XXXX9{numero:05d}AAA", "curp": f"XXXX9{numero:05d}HCLRRR09"}
+
+
+def producir(app, formulario: dict) -> dict:
+    """Entregar el JSON del DataTable para el formulario"""
+    formulario = {"draw": "1", "start": "0", "length": "2", **formulario}
+    with app.test_request_context(method="POST", data=formulario):
+        return PERSONAS_DATATABLE.produce()
+
+
+def test_columnas_y_filtros(app, persona_datos):
+    """Proyecta las columnas con el JOIN; los filtros vacíos o que no se pueden limpiar se ignoran"""
+    derecho = Carrera(nombre="DERECHO").save()
+    Persona(**persona_datos).save()
+    Persona(**{**persona_datos, "nombres": "JUAN", "apellido_primero": "LOPEZ", "carrera_id": derecho.id, **claves(2)}).save()
+    Persona(**{**persona_datos, "nombres": "ANA", "apellido_primero": "ZAPATA", "estatus": "B", **claves(3)}).save()
+    respuesta = producir(app, {})
+    assert respuesta["iTotalRecords"] == 2
+    assert respuesta["aaData"] == [
+        {"nombre": "JUAN LOPEZ", "carrera": "DERECHO"},
+        {"nombre": "MARIA PEREZ", "carrera": "NINGUNA"},
+    ]
+    assert [renglon["nombre"] for renglon in producir(app, {"nombre_completo": "perez maria"})["aaData"]] == ["MARIA PEREZ"]
+    assert [renglon["nombre"] for renglon in producir(app, {"carrera": "dere"})["aaData"]] == ["JUAN LOPEZ"]
+    assert producir(app, {"carrera_id": str(derecho.id)})["iTotalRecords"] == 1
+    assert producir(app, {"carrera_id": "uno", "nombre_completo": ""})["iTotalRecords"] == 2
+    assert [renglon["nombre"] for renglon in producir(app, {"estatus": "B"})["aaData"]] == ["ANA ZAPATA"]
+
+
+def test_estrategia_del_conteo(app):
+    """La estimación sólo se usa sin filtros del formulario"""
+    with app.test_request_context(method="POST", data={"nombre_completo": ""}):
+        assert PERSONAS_DATATABLE.count_strategy() == CONTEO_ESTIMADO
+    with app.test_request_context(method="POST", data={"carrera": "derecho"}):
+        assert PERSONAS_DATATABLE.count_strategy() == CONTEO_CACHE
@@ -0,0 +1,64 @@
+"""
+Pruebas de la caché de respuestas de los DataTables
+"""
+
+import pytest
+
+from lib.datatables import CONTEO_CACHE, CONTEO_ESTIMADO, get_response_metrics
+from orion.blueprints.entradas_salidas.views import ENTRADAS_SALIDAS_DATATABLE
+from orion.blueprints.personas.models import Persona
+
+FORMULARIO = {"draw": 1, "start": 0, "length": 10, "estatus": "A"}
+
+
+@pytest.mark.parametrize("endpoint", ["licencias", "personas", "tareas"])
+def test_respuesta_guardada(app, client, endpoint):
+    """Con el usuario cargado por el principal, la segunda petición sale de la caché"""
+    assert app.config["USER_LOADER"] == "principal"
+    primera = client.post(f"/{endpoint}/datatable_json", data=FORMULARIO)
+    segunda = client.post(f"/{endpoint}/datatable_json", data={**FORMULARIO, "draw": 2})
+    assert primera.status_code == 200
+    assert segunda.status_code == 200
+    assert segunda.json["draw"] == 2
+    assert segunda.json["aaData"] == primera.json["aaData"]
+    metricas = get_response_metrics()[f"{endpoint}.datatable_json"]
+    assert metricas == {"aciertos": 1, "fallos": 1, "tasa": 0.5}
+
+
+def test_respuesta_cambia_al_guardar(client, persona_datos):
+    """Guardar un registro cambia la versión de la tabla y la respuesta se vuelve a consultar"""
+    antes = client.post("/personas/datatable_json", data=FORMULARIO)
+    assert antes.json["aaData"] == []
+    Persona(**persona_datos).save()
+    despues = client.post("/personas/datatable_json", data=FORMULARIO)
+    assert len(despues.json["aaData"]) == 1
+    assert get_response_metrics()["personas.datatable_json"]["aciertos"] == 0
+
+
+@pytest.mark.parametrize(
+    "formulario, conteo",
+    [
+        ({}, CONTEO_ESTIMADO),
+        ({"usuario_id": ""}, CONTEO_ESTIMADO),
+        ({"usuario_id": "1"}, CONTEO_CACHE),
+        ({"usuario_email": "pruebas"}, CONTEO_CACHE),
+    ],
+)
+def test_conteo_estimado_sin_filtros(app, formulario, conteo):
+    """La estimación sólo se usa sin filtros del formulario"""
+    with app.test_request_context("/entradas_salidas/datatable_json", method="POST", data={**FORMULARIO, **formulario}):
+        assert ENTRADAS_SALIDAS_DATATABLE.count_strategy() == conteo
+
+
+@pytest.mark.parametrize("endpoint", ["licencias", "personas", "tareas", "usuarios"])
+def test_sin_sesion(app, endpoint):
+    """Sin sesión iniciada no entrega los renglones"""
+    respuesta = app.test_client().post(f"/{endpoint}/datatable_json", data=FORMULARIO)
+    assert respuesta.status_code == 302
+    assert "/login" in respuesta.headers["Location"]
+
+
+def test_sin_permiso(client):
+    """Con sesión pero sin permiso para ver el módulo no entrega los renglones"""
+    respuesta = client.post("/usuarios/datatable_json", data=FORMULARIO)
+    assert respuesta.status_code == 403
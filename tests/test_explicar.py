@@ -0,0 +1,84 @@
+"""
+Pruebas de Explicar
+"""
+
+import pytest
+
+from lib.exceptions import MyNotValidParamError
+from lib.explicar import (
+    capturar,
+    explicar_listados,
+    get_columnas_filtro,
+    get_escenarios,
+    get_huella,
+    get_list_endpoints,
+    revisar_plan,
+)
+from orion.blueprints.personas.models import Persona
+
+
+def test_columnas_filtro():
+    """Primero las de igualdad, luego las de rango, sin estatus"""
+    filtro = "((licencias.estatus)::text = 'A'::text) AND (fecha_inicio >= '2024-01-01') AND (persona_id = 5)"
+    assert get_columnas_filtro(filtro) == ["persona_id", "fecha_inicio"]
+    assert get_columnas_filtro("") == []
+
+
+def test_revisar_plan():
+    """Marca el recorrido secuencial con su índice sugerido, el orden en disco y el ciclo anidado sin índice"""
+    plan = {
+        "Node Type": "Sort",
+        "Sort Key": ["licencias.fecha_inicio DESC"],
+        "Sort Space Type": "Disk",
+        "Sort Space Used": 2048,
+        "Plans": [
+            {
+                "Node Type": "Nested Loop",
+                "Plans": [
+                    {
+                        "Node Type": "Seq Scan",
+                        "Relation Name": "licencias",
+                        "Actual Rows": 10,
+                        "Rows Removed by Filter": 5000,
+                        "Filter": "((estatus)::text = 'A'::text) AND (persona_id = 5)",
+                    },
+                    {"Node Type": "Seq Scan", "Relation Name": "personas", "Actual Loops": 2000, "Filter": "(id = 7)"},
+                ],
+            }
+        ],
+    }
+    hallazgos = revisar_plan(plan)
+    assert [hallazgo["tipo"] for hallazgo in hallazgos] == ["SORT_DISK", "NESTED_LOOP", "SEQ_SCAN"]
+    assert hallazgos[1]["sugerencia"] == "CREATE INDEX ON personas (id)"
+    assert hallazgos[2]["sugerencia"] == "CREATE INDEX ON licencias (persona_id, fecha_inicio) WHERE estatus = 'A'"
+    assert revisar_plan({"Node Type": "Index Scan", "Relation Name": "licencias"}) == []
+
+
+def test_huella():
+    """La huella no depende de los espacios"""
+    assert get_huella("SELECT  1\n FROM x") == get_huella("SELECT 1 FROM x")
+
+
+def test_listados(app):
+    """Los listados son los datatable_json y query_*_json con POST y sin parámetros"""
+    endpoints = dict(get_list_endpoints(app))
+    assert endpoints["personas.datatable_json"] == "/personas/datatable_json"
+    assert "personas.query_personas_json" in endpoints
+    assert get_list_endpoints(app, ["tareas.datatable_json"]) == [("tareas.datatable_json", "/tareas/datatable_json")]
+
+
+def test_escenarios_y_captura(app, client, persona_datos):
+    """Un escenario sin filtros y uno por filtro con el valor más frecuente; la captura guarda los SELECT"""
+    Persona(**persona_datos).save()
+    escenarios = get_escenarios(app, "personas.datatable_json")
+    assert escenarios[0] == {}
+    assert {"situacion": "A.D."} in escenarios
+    estado, sentencias = capturar(client, "/personas/datatable_json", {})
+    assert estado == 200
+    assert any("FROM personas" in sentencia for sentencia, _ in sentencias)
+
+
+def test_requiere_postgresql(app, usuario):
+    """Con otro dialecto no explica"""
+    with pytest.raises(MyNotValidParamError):
+        explicar_listados(app, usuario.id)
@@ -0,0 +1,55 @@
+"""
+Pruebas de Fonética
+"""
+
+import pytest
+
+from lib.fonetica import clave_fonetica, claves_foneticas, distancia_edicion
+from orion.blueprints.personas.busqueda import buscar_similares
+from orion.blueprints.personas.models import Persona
+
+
+@pytest.mark.parametrize("palabra", ["González", "Gonzales", "GONSALEZ", "gonzalez"])
+def test_clave_fonetica(palabra):
+    """Las formas de escribir González comparten la clave"""
+    assert clave_fonetica(palabra) == "GNSLS"
+
+
+def test_claves_foneticas():
+    """Una clave por palabra, sin las vacías"""
+    assert claves_foneticas("Hugo Hernández Vázquez") == ["AG", "ARNDS", "BSKS"]
+    assert claves_foneticas("  ") == []
+
+
+def test_distancia_edicion():
+    """Distancia de Levenshtein"""
+    assert distancia_edicion("GONZALEZ", "GONSALES") == 2
+    assert distancia_edicion("", "ABC") == 3
+    assert distancia_edicion("PEREZ", "PEREZ") == 0
+
+
+def test_buscar_similares(persona_datos):
+    """Encuentra el nombre mal escrito, del más cercano al más lejano, sin los inactivos ni los lejanos"""
+    gonzalez = Persona(**{**persona_datos, "apellido_segundo": "GONZALEZ"}).save()
+    gonsales = Persona(
+        **{**persona_datos, "apellido_segundo": "GONSALES", "rfc": "PEMA800102AAA", "curp": "PEMA800102MCLRRR09"}
+    ).save()
+    inactiva = Persona(
+        **{**persona_datos, "apellido_segundo": "GONZALEZ", "rfc": "PEMA800103AAA", "curp": "PEMA800103MCLRRR09"}
+    ).save()
+    inactiva.delete()
+    Persona(**{**persona_datos, "apellido_segundo": "GUZMAN", "rfc": "PEMA800104AAA", "curp": "PEMA800104MCLRRR09"}).save()
+    assert buscar_similares("maria gonsales") == [gonsales.id, gonzalez.id]
+    assert buscar_similares("") == []
+
+
+def test_datatable_con_nombres_parecidos(client, persona_datos):
+    """Si nadie coincide con el nombre, el DataTable de personas muestra los parecidos"""
+    Persona(**{**persona_datos, "apellido_segundo": "GONZALEZ"}).save()
+    formulario = {"draw": 1, "start": 0, "length": 10, "estatus": "A"}
+    exacto = client.post("/personas/datatable_json", data={**formulario, "nombre_completo": "GONZALEZ"})
+    parecido = client.post("/personas/datatable_json", data={**formulario, "nombre_completo": "GONSALES"})
+    lejano = client.post("/personas/datatable_json", data={**formulario, "nombre_completo": "RODRIGUEZ"})
+    assert len(exacto.json["aaData"]) == 1
+    assert parecido.json["aaData"] == exacto.json["aaData"]
+    assert lejano.json["aaData"] == []
@@ -0,0 +1,37 @@
+"""
+Pruebas del Texto Completo
+"""
+
+from lib.full_text import FULL_TEXT_FIN, FULL_TEXT_INICIO, get_terminos
+from orion.blueprints.atribuciones.models import ATRIBUCIONES_TEXTO, Atribucion
+from orion.extensions import database
+
+
+def crear_atribucion(norma: str, fragmento: str) -> Atribucion:
+    """Atribución con el texto indicado"""
+    return Atribucion(funcion_id=1, centro_trabajo_id=1, norma=norma, fundamento="ARTICULO 1", fragmento=fragmento).save()
+
+
+def test_terminos():
+    """Sin acentos, sin palabras vacías y sin la s del plural"""
+    assert get_terminos("Las Resoluciones del Juzgado") == ["RESOLUCIONE", "JUZGADO"]
+
+
+def test_buscar_con_bm25(app):
+    """En SQLite se busca con el índice BM25, ordenado por relevancia y con el fragmento marcado"""
+    una = crear_atribucion("LEY ORGANICA", "DICTAR RESOLUCIONES EN LOS JUICIOS")
+    otra = crear_atribucion("REGLAMENTO", "DICTAR RESOLUCIONES Y RESOLUCIONES EN AMPAROS")
+    crear_atribucion("CODIGO", "RECIBIR PROMOCIONES")
+    consulta = ATRIBUCIONES_TEXTO.apply(database.session.query(Atribucion.id), "resoluciones")
+    renglones = consulta.order_by(*ATRIBUCIONES_TEXTO.order("resoluciones")).all()
+    assert [renglon.id for renglon in renglones] == [otra.id, una.id]
+    assert f"{FULL_TEXT_INICIO}RESOLUCIONES{FULL_TEXT_FIN}" in renglones[0].fragmento
+
+
+def test_indice_cambia_al_guardar(app):
+    """Al guardar cambia la versión de la tabla y el índice se reconstruye"""
+    assert ATRIBUCIONES_TEXTO.apply(database.session.query(Atribucion.id), "amparo").all() == []
+    atribucion = crear_atribucion("LEY DE AMPARO", "CONOCER DE LOS AMPAROS")
+    assert [renglon.id for renglon in ATRIBUCIONES_TEXTO.apply(database.session.query(Atribucion.id), "amparo")] == [
+        atribucion.id
+    ]
@@ -0,0 +1,38 @@
+"""
+Pruebas de Índices
+"""
+
+from sqlalchemy import text
+
+from lib.indices import active_index, create_indexes, get_active_index_name
+from orion.blueprints.licencias.models import Licencia
+from orion.extensions import database
+
+
+def test_indice_parcial():
+    """El índice de los activos lleva la condición del estatus para PostgreSQL y SQLite"""
+    indice = active_index("licencias", "persona_id", "fecha_inicio")
+    assert indice.name == "licencias_persona_id_fecha_inicio_activo_idx"
+    assert str(indice.dialect_options["postgresql"]["where"]) == "estatus = 'A'"
+    assert str(indice.dialect_options["sqlite"]["where"]) == "estatus = 'A'"
+
+
+def test_consulta_usa_el_indice(app):
+    """Los activos de una persona ordenados por fecha se buscan con el índice parcial"""
+    consulta = Licencia.query.filter(Licencia.estatus == "A", Licencia.persona_id == 1).order_by(Licencia.fecha_inicio)
+    compilado = consulta.statement.compile(database.engine, compile_kwargs={"literal_binds": True})
+    plan = " ".join(str(renglon[-1]) for renglon in database.session.execute(text(f"EXPLAIN QUERY PLAN {compilado}")))
+    assert get_active_index_name("licencias", ("persona_id", "fecha_inicio")) in plan
+
+
+def test_crear_los_que_faltan(app):
+    """Crea los índices que faltan y reporta los que ya existen"""
+    nombre = get_active_index_name("licencias", ("fecha_inicio",))
+    database.session.execute(text(f"DROP INDEX {nombre}"))
+    database.session.commit()
+    resultados = create_indexes(["licencias"])
+    estados = {indice: estado for tabla, indice, estado in resultados}
+    assert estados[nombre] == "CREADO"
+    assert estados["licencias_modificado_id_idx"] == "EXISTE"
+    assert "FALTA" not in estados.values()
+    assert {tabla for tabla, _, _ in resultados} == {"licencias"}
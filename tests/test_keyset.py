@@ -0,0 +1,56 @@
+"""
+Pruebas de la paginación por cursor
+"""
+
+from datetime import date, datetime
+
+from lib.datatables import decode_cursor, encode_cursor, paginate_keyset, paginate_offset
+from orion.blueprints.carreras.models import Carrera
+
+
+def test_codificar_cursor():
+    """El cursor conserva fechas y números, uno inválido o de otras columnas es None"""
+    columnas = [Carrera.modificado, Carrera.id]
+    cursor = encode_cursor([datetime(2024, 5, 1, 10, 0, 0), 7])
+    assert decode_cursor(cursor, columnas) == [datetime(2024, 5, 1, 10, 0, 0), 7]
+    assert decode_cursor(encode_cursor([date(2024, 5, 1).isoformat(), "7"]), columnas) == [datetime(2024, 5, 1), 7]
+    assert decode_cursor(encode_cursor([7]), columnas) is None
+    assert decode_cursor(encode_cursor(["ayer", 7]), columnas) is None
+    assert decode_cursor("no es un cursor", columnas) is None
+    assert decode_cursor("", columnas) is None
+
+
+def test_recorrer_con_empates(app):
+    """Las páginas siguen al cursor sin repetir ni saltar renglones aunque empate modificado"""
+    for numero in range(7):
+        Carrera(nombre=f"CARRERA {numero}", modificado=datetime(2024, 5, 1, 10, numero // 3, 0)).save()
+    columnas = [Carrera.modificado, Carrera.id]
+    vistos = []
+    cursor = ""
+    while True:
+        with app.test_request_context(method="POST", data={"cursor": cursor}):
+            registros, cursor = paginate_keyset(Carrera.query, columnas, len(vistos), 3)
+        vistos.extend(carrera.nombre for carrera in registros)
+        if cursor == "":
+            break
+    assert vistos == [f"CARRERA {numero}" for numero in (6, 5, 4, 3, 2, 1, 0)]
+
+
+def test_sin_cursor_usa_offset(app):
+    """Sin cursor, como al saltar a otra página, se usa start como offset"""
+    for numero in range(5):
+        Carrera(nombre=f"CARRERA {numero}").save()
+    with app.test_request_context(method="POST", data={}):
+        registros, cursor = paginate_keyset(Carrera.query, [Carrera.id], 2, 2, descending=False)
+    assert [carrera.nombre for carrera in registros] == ["CARRERA 2", "CARRERA 3"]
+    assert decode_cursor(cursor, [Carrera.id]) == [registros[-1].id]
+
+
+def test_offset_con_ventana(app):
+    """El total sale de count(*) OVER () en la misma consulta, o de count() después de la última página"""
+    for numero in range(5):
+        Carrera(nombre=f"CARRERA {numero}").save()
+    registros, total = paginate_offset(Carrera.query, [Carrera.nombre], 2, 2)
+    assert [carrera.nombre for carrera in registros] == ["CARRERA 2", "CARRERA 3"]
+    assert total == 5
+    assert paginate_offset(Carrera.query, [Carrera.nombre], 10, 2) == ([], 5)
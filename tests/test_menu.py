@@ -0,0 +1,46 @@
+"""
+Pruebas del menú principal
+"""
+
+from lib.permisos_cache import invalidate_permisos
+from orion.blueprints.modulos.menu import get_menu, get_menu_html
+from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.usuarios.principal import load_principal
+
+
+def poner_en_navegacion(nombre: str) -> None:
+    """Mostrar el módulo en la navegación de Orión"""
+    modulo = Modulo.query.filter_by(nombre=nombre).one()
+    modulo.en_navegacion = True
+    modulo.en_plataforma_orion = True
+    modulo.ruta = f"/{nombre.lower()}"
+    modulo.save()
+
+
+def test_menu_por_roles(app, usuario):
+    """Sólo los módulos en la navegación con permiso, compartido por quienes tienen los mismos roles"""
+    poner_en_navegacion("PERSONAS")
+    principal = load_principal(usuario.id)
+    assert [modulo.nombre for modulo in principal.modulos_menu_principal] == ["PERSONAS"]
+    assert get_menu(principal.roles_ids) is principal.modulos_menu_principal
+    assert get_menu(()) == ()
+
+
+def test_menu_cambia_al_invalidar(app, usuario):
+    """El menú guardado se usa hasta que cambia la versión global de los permisos"""
+    principal = load_principal(usuario.id)
+    assert get_menu(principal.roles_ids) == ()
+    poner_en_navegacion("TAREAS")
+    assert get_menu(principal.roles_ids) == ()
+    invalidate_permisos()
+    assert [modulo.nombre for modulo in get_menu(principal.roles_ids)] == ["TAREAS"]
+
+
+def test_menu_html(app, usuario):
+    """El HTML se elabora una vez con la macro de navegación"""
+    poner_en_navegacion("TAREAS")
+    principal = load_principal(usuario.id)
+    with app.test_request_context():
+        html = get_menu_html(principal.roles_ids)
+        assert "/tareas" in html
+        assert get_menu_html(principal.roles_ids) is html
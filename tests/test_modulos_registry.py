@@ -0,0 +1,50 @@
+"""
+Pruebas del registro de módulos
+"""
+
+import pytest
+
+from lib.exceptions import MyNotExistsError
+from lib.unit_of_work import unit_of_work
+from orion.blueprints.modulos.models import Modulo
+from orion.blueprints.modulos.registry import MODULOS_VERSION_KEY, get_modulo_id, invalidate_modulos, modulos_registry
+from orion.extensions import database
+
+
+def nuevo_modulo(nombre: str) -> Modulo:
+    """Módulo fuera de la navegación"""
+    return Modulo(nombre=nombre, nombre_corto=nombre, icono="", ruta="", en_navegacion=False).save()
+
+
+def test_sin_consultar(app):
+    """Después de cargar, el id sale del diccionario sin consultar la base de datos"""
+    personas = nuevo_modulo("PERSONAS")
+    assert get_modulo_id("PERSONAS") == personas.id
+    database.session.query(Modulo).delete()  # Si consultara, ya no lo encontraría
+    assert get_modulo_id("PERSONAS") == personas.id
+
+
+def test_recarga_si_no_lo_encuentra(app):
+    """Un módulo nuevo se encuentra recargando, uno que no existe causa MyNotExistsError"""
+    nuevo_modulo("PERSONAS")
+    get_modulo_id("PERSONAS")
+    tareas = nuevo_modulo("TAREAS")
+    assert get_modulo_id("TAREAS") == tareas.id
+    with pytest.raises(MyNotExistsError):
+        get_modulo_id("NO EXISTE")
+
+
+def test_invalidar(app):
+    """Al cambiar la versión en Redis se recarga, dentro de una unidad de trabajo hasta el commit"""
+    modulo = nuevo_modulo("PERSONAS")
+    get_modulo_id("PERSONAS")
+    with unit_of_work():
+        modulo.nombre = "PERSONAS ANTES"
+        modulo.save()
+        otro = nuevo_modulo("PERSONAS")
+        invalidate_modulos()
+        assert app.redis.get(MODULOS_VERSION_KEY) is None
+        assert get_modulo_id("PERSONAS") == modulo.id
+    assert int(app.redis.get(MODULOS_VERSION_KEY)) == 1
+    assert get_modulo_id("PERSONAS") == otro.id
+    assert modulos_registry.version == 1
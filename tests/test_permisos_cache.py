@@ -0,0 +1,35 @@
+"""
+Pruebas de la caché de permisos
+"""
+
+from lib.permisos_cache import get_permisos, invalidate_permisos, local_cache
+
+
+def test_consulta_una_vez(app):
+    """La segunda vez sale de la caché, al invalidar se vuelve a consultar"""
+    local_cache.clear()
+    consultas = []
+
+    def consultar():
+        consultas.append(1)
+        return {"PERSONAS": 1}
+
+    assert get_permisos(1, consultar) == {"PERSONAS": 1}
+    assert get_permisos(1, consultar) == {"PERSONAS": 1}
+    assert len(consultas) == 1
+    local_cache.clear()
+    assert get_permisos(1, consultar) == {"PERSONAS": 1}  # De Redis
+    assert len(consultas) == 1
+    invalidate_permisos(usuario_id=1)
+    get_permisos(1, consultar)
+    assert len(consultas) == 2
+    invalidate_permisos()
+    get_permisos(1, consultar)
+    assert len(consultas) == 3
+
+
+def test_usuario_puede_ver(usuario):
+    """Los permisos del usuario vienen de sus roles"""
+    assert usuario.can_view("PERSONAS")
+    assert not usuario.can_edit("PERSONAS")
+    assert not usuario.can_view("USUARIOS")
@@ -0,0 +1,48 @@
+"""
+Pruebas de Personas
+"""
+
+from orion.blueprints.personas.busqueda import buscar_personas
+from orion.blueprints.personas.models import Persona
+
+
+def test_guardar_sin_apellido_segundo(persona_datos):
+    """Sin apellido segundo se guarda con nombre_busqueda sin None"""
+    persona = Persona(apellido_segundo=None, **persona_datos).save()
+    assert persona.nombre_busqueda == "MARIA PEREZ"
+
+
+def test_buscar_sin_acentos(persona_datos):
+    """Se encuentra sin importar acentos ni mayúsculas, primero los que empiezan con lo buscado"""
+    maria = Persona(apellido_segundo="GÓMEZ", **persona_datos).save()
+    ana = Persona(**{**persona_datos, "nombres": "ANA MARÍA", "rfc": "PEAN800101AAA", "curp": "PEAN800101MCLRRR09"}).save()
+    assert [persona.id for persona in buscar_personas("maría pérez")] == [maria.id, ana.id]
+    assert [persona.id for persona in buscar_personas("gomez")] == [maria.id]
+    assert buscar_personas("LOPEZ").all() == []
+
+
+def test_nombre_completo_sin_apellido_segundo(persona_datos):
+    """En Python y en SQL el nombre completo omite el apellido segundo nulo o vacío"""
+    sin_apellido = Persona(apellido_segundo=None, **persona_datos).save()
+    vacio = Persona(**{**persona_datos, "apellido_segundo": "", "rfc": "PEAN800101AAA", "curp": "PEAN800101MCLRRR09"}).save()
+    con_apellido = Persona(
+        **{**persona_datos, "apellido_segundo": "LOPEZ", "rfc": "PEAB800101AAA", "curp": "PEAB800101MCLRRR09"}
+    )
+    con_apellido.save()
+    assert sin_apellido.nombre_completo == "MARIA PEREZ"
+    consulta = Persona.query.with_entities(Persona.id, Persona.nombre_completo).order_by(Persona.id)
+    assert consulta.all() == [
+        (sin_apellido.id, "MARIA PEREZ"),
+        (vacio.id, "MARIA PEREZ"),
+        (con_apellido.id, "MARIA PEREZ LOPEZ"),
+    ]
+
+
+def test_datatable_sin_apellido_segundo(client, persona_datos):
+    """El DataTable muestra y filtra a las personas sin apellido segundo"""
+    persona = Persona(apellido_segundo=None, **persona_datos).save()
+    formulario = {"draw": 1, "start": 0, "length": 10, "estatus": "A", "nombre_completo": "MARIA PEREZ"}
+    respuesta = client.post("/personas/datatable_json", data=formulario)
+    assert respuesta.status_code == 200
+    assert [renglon["detalle"]["nombre_completo"] for renglon in respuesta.json["aaData"]] == ["MARIA PEREZ"]
+    assert respuesta.json["aaData"][0]["detalle"]["url"].endswith(str(persona.id))
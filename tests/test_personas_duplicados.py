@@ -0,0 +1,69 @@
+"""
+Pruebas de la detección de personas duplicadas
+"""
+
+from collections import namedtuple
+from datetime import date
+from io import BytesIO
+
+from openpyxl import load_workbook
+
+from orion.blueprints.personas.models import Persona
+from orion.blueprints.personas.tasks import BLOQUE_MAXIMO, buscar_duplicados, calcular_puntaje, elaborar_xlsx, get_llaves
+
+Renglon = namedtuple(
+    "Renglon", ["id", "numero_empleado", "curp", "rfc", "fecha_nacimiento", "nombre_busqueda", "nombre_fonetico"]
+)
+
+
+def formar_renglon(renglon_id: int, curp: str, rfc: str, nombre: str, fecha_nacimiento=date(1980, 1, 1)) -> Renglon:
+    """Renglón como los que lee buscar_duplicados"""
+    return Renglon(renglon_id, None, curp, rfc, fecha_nacimiento, nombre, " MR PRS ")
+
+
+def test_llaves():
+    """Una llave por CURP raíz, fecha con claves fonéticas y RFC raíz; sin las que no alcanzan"""
+    renglon = formar_renglon(1, "PEMA800101MCLRRR09", "PEMA800101AAA", "MARIA PEREZ")
+    assert get_llaves(renglon) == ["CURP:PEMA800101", "FECHA:1980-01-01:MR PRS", "RFC:PEMA800101"]
+    assert get_llaves(formar_renglon(2, "PEMA", "", "MARIA PEREZ", None)) == []
+
+
+def test_puntaje():
+    """La misma CURP sin homoclave, RFC, fecha y nombre suman casi uno; sin coincidencias es bajo"""
+    primera = formar_renglon(1, "PEMA800101MCLRRR09", "PEMA800101AAA", "MARIA PEREZ")
+    segunda = formar_renglon(2, "PEMA800101MCLRRR01", "PEMA800101BBB", "MARIA PERES")
+    puntaje, motivos = calcular_puntaje(primera, segunda)
+    assert puntaje == round(0.4 + 0.15 + 0.1 + 0.35 * (1 - 1 / 11), 3)
+    assert motivos == ["CURP sin homoclave", "RFC raíz", "Fecha de nacimiento", "Nombre 90%"]
+    otra = formar_renglon(3, "LOJU900101HCLRRR09", "LOJU900101CCC", "JUAN LOPEZ", date(1990, 1, 1))
+    assert calcular_puntaje(primera, otra)[0] < 0.3
+
+
+def crear_persona(persona_datos, numero: int, **columnas) -> Persona:
+    """Persona con RFC y CURP distintos por número, salvo que se indiquen"""
+    datos = {**persona_datos, "rfc": f"XXXX9{numero:05d}AAA", "curp": f"XXXX9{numero:05d}HCLRRR09", **columnas}
+    return Persona(**datos).save()
+
+
+def test_buscar_duplicados(app, persona_datos):
+    """Encuentra la pareja dentro de un bloque, una sola vez aunque compartan varias llaves"""
+    primera = crear_persona(persona_datos, 1, curp="PEMA800101MCLRRR09", rfc="PEMA800101AAA")
+    segunda = crear_persona(persona_datos, 2, curp="PEMA800101MCLRRR01", rfc="PEMA800101BBB")
+    crear_persona(persona_datos, 3, nombres="JUAN", apellido_primero="LOPEZ", fecha_nacimiento=date(1990, 1, 1))
+    inactiva = crear_persona(persona_datos, 4, curp="PEMA800101MCLRRR02")
+    inactiva.delete()
+    parejas = buscar_duplicados()
+    assert [(pareja[2].id, pareja[3].id) for pareja in parejas] == [(primera.id, segunda.id)]
+    libro = load_workbook(BytesIO(elaborar_xlsx(parejas)))
+    filas = list(libro["Duplicados"].values)
+    assert filas[0][0] == "Puntaje"
+    assert filas[1][2] == primera.id and filas[1][7] == segunda.id
+
+
+def test_bloque_grande_se_omite(app, persona_datos, monkeypatch):
+    """Los bloques con más de BLOQUE_MAXIMO personas no se comparan"""
+    assert BLOQUE_MAXIMO > 2
+    monkeypatch.setattr("orion.blueprints.personas.tasks.BLOQUE_MAXIMO", 2)
+    for numero in range(3):
+        crear_persona(persona_datos, numero, curp=f"PEMA800101MCLRRR0{numero}", rfc=f"PEMA800101AA{numero}")
+    assert buscar_duplicados() == []
@@ -0,0 +1,37 @@
+"""
+Pruebas del principal de la sesión
+"""
+
+import pytest
+
+from lib.permisos_cache import invalidate_permisos
+from orion.blueprints.permisos.models import Permiso
+from orion.blueprints.usuarios.principal import UsuarioPrincipal, load_principal
+from orion.blueprints.usuarios_roles.models import UsuarioRol
+
+
+def test_cargar_principal(usuario):
+    """Con los permisos de sus roles activos, inmutable"""
+    principal = load_principal(usuario.id)
+    assert isinstance(principal, UsuarioPrincipal)
+    assert dict(principal.permisos) == {"LICENCIAS": Permiso.VER, "PERSONAS": Permiso.VER, "TAREAS": Permiso.VER}
+    assert principal.can_view("TAREAS") and not principal.can_edit("TAREAS")
+    with pytest.raises(AttributeError):
+        principal.email = "otro@pjecz.gob.mx"
+    with pytest.raises(TypeError):
+        principal.permisos["USUARIOS"] = Permiso.ADMINISTRAR
+    assert load_principal(999) is None
+
+
+def test_cache_hasta_invalidar(usuario):
+    """La segunda vez es el mismo objeto; al cambiar sus roles se vuelve a consultar"""
+    principal = load_principal(usuario.id)
+    assert load_principal(usuario.id) is principal
+    usuario_rol = UsuarioRol.query.filter_by(usuario_id=usuario.id).one()
+    usuario_rol.delete()
+    assert load_principal(usuario.id) is principal  # Aún no se invalida
+    invalidate_permisos(usuario_id=usuario.id)
+    nuevo = load_principal(usuario.id)
+    assert nuevo is not principal
+    assert dict(nuevo.permisos) == {}
+    assert nuevo.roles_ids == ()
@@ -0,0 +1,64 @@
+"""
+Pruebas de los puestos vigentes
+"""
+
+from datetime import date, datetime
+
+from orion.blueprints.historial_puestos.models import HistorialPuesto, PuestoVigente, formar_puestos_vigentes
+from orion.blueprints.historial_puestos.vigentes import get_puesto_vigente, get_puestos_vigentes
+from orion.blueprints.personas.models import Persona
+from orion.blueprints.puestos_funciones.models import PuestoFuncion
+
+ENERO = datetime(2020, 1, 1)
+JUNIO = datetime(2020, 6, 1)
+
+
+def test_formar_intervalos():
+    """Cada intervalo termina donde inicia el siguiente, si dos inician el mismo día vale el último"""
+    renglones = [(1, 10, ENERO), (2, 20, JUNIO), (3, 30, JUNIO)]
+    intervalos = formar_puestos_vigentes(5, renglones)
+    assert [(intervalo["historial_puesto_id"], intervalo["desde"], intervalo["hasta"]) for intervalo in intervalos] == [
+        (1, ENERO, JUNIO),
+        (3, JUNIO, None),
+    ]
+    assert formar_puestos_vigentes(5, []) == []
+
+
+def crear_historial(persona_id: int, puesto_funcion_id: int, fecha_inicio: datetime) -> HistorialPuesto:
+    """Historial de puesto con las columnas obligatorias"""
+    return HistorialPuesto(
+        persona_id=persona_id,
+        puesto_funcion_id=puesto_funcion_id,
+        turno_id=1,
+        area="AREA",
+        fecha_inicio=fecha_inicio,
+    ).save()
+
+
+def test_puestos_en_fechas(app, persona_datos):
+    """Se mantienen al guardar y eliminar el historial, y se consultan por fecha con empates del mismo día"""
+    persona = Persona(**persona_datos).save()
+    secretario, actuario, juez = [
+        PuestoFuncion(puesto_id=1, nombre=nombre).save() for nombre in ("SECRETARIO", "ACTUARIO", "JUEZ")
+    ]
+    crear_historial(persona.id, secretario.id, ENERO)
+    crear_historial(persona.id, actuario.id, JUNIO)
+    ultimo = crear_historial(persona.id, juez.id, JUNIO)
+    assert PuestoVigente.query.filter_by(persona_id=persona.id).count() == 2
+    assert get_puesto_vigente(persona.id, date(2019, 12, 31)) is None
+    assert get_puesto_vigente(persona.id, date(2020, 5, 31)).id == secretario.id
+    assert get_puesto_vigente(persona.id, date(2020, 6, 1)).id == juez.id
+    pares = [
+        (persona.id, date(2019, 1, 1)),
+        (persona.id, date(2020, 3, 1)),
+        (persona.id, JUNIO),
+        (persona.id, None),
+        (999, JUNIO),
+    ]
+    assert {par: puesto.id for par, puesto in get_puestos_vigentes(pares).items()} == {
+        (persona.id, date(2020, 3, 1)): secretario.id,
+        (persona.id, JUNIO): juez.id,
+    }
+    ultimo.delete()
+    assert get_puesto_vigente(persona.id, date(2021, 1, 1)).id == actuario.id
+    assert get_puestos_vigentes([]) == {}
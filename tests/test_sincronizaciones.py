@@ -0,0 +1,89 @@
+"""
+Pruebas de Sincronizaciones
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from lib.pwgen import generar_api_key
+from orion.blueprints.personas.models import Persona
+
+URL = "/api/v1/cambios/personas"
+
+
+@pytest.fixture(name="api_key")
+def fixture_api_key(usuario, monkeypatch):
+    """API key vigente del usuario, sin el margen para ver los registros recién guardados"""
+    monkeypatch.setattr("orion.blueprints.sincronizaciones.views.SINCRONIZACION_MARGEN", -60)
+    usuario.api_key = generar_api_key(usuario.id, usuario.email)
+    usuario.api_key_expiracion = datetime.now() + timedelta(days=1)
+    usuario.save()
+    return usuario.api_key
+
+
+def leer_renglones(respuesta) -> list:
+    """Renglones NDJSON de la respuesta"""
+    return [json.loads(renglon) for renglon in respuesta.get_data(as_text=True).splitlines()]
+
+
+def test_continuar_con_el_cursor(app, api_key, persona_datos):
+    """Con limite se entrega por partes, el cursor continúa donde terminó la anterior aunque empate modificado"""
+    modificado = datetime(2024, 5, 1, 10, 0, 0)  # El mismo para los tres, el id desempata
+    personas_ids = []
+    for numero in range(3):
+        persona = Persona(
+            **{**persona_datos, "rfc": f"PEMA80010{numero}AAA", "curp": f"PEMA80010{numero}MCLRRR09"},
+            modificado=modificado,
+        )
+        personas_ids.append(persona.save().id)
+    cliente = app.test_client()
+    primera = leer_renglones(cliente.get(f"{URL}?limite=2&desde=2000-01-01", headers={"X-Api-Key": api_key}))
+    assert [renglon["id"] for renglon in primera[:-1]] == personas_ids[:2]
+    assert "nombre_busqueda" not in primera[0]
+    assert primera[-1]["_completo"] is False
+    segunda = leer_renglones(cliente.get(f"{URL}?limite=2&cursor={primera[-1]['_cursor']}", headers={"X-Api-Key": api_key}))
+    assert [renglon["id"] for renglon in segunda[:-1]] == personas_ids[2:]
+    assert segunda[-1]["_completo"] is True
+
+
+def test_permiso_del_modulo(app, api_key):
+    """Sin permiso para ver el módulo entrega 403 en JSON"""
+    respuesta = app.test_client().get("/api/v1/cambios/centros_trabajos", headers={"X-Api-Key": api_key})
+    assert respuesta.status_code == 403
+    assert respuesta.mimetype == "application/json"
+    assert respuesta.json["error"] == 403
+
+
+@pytest.mark.parametrize(
+    "consulta, codigo",
+    [
+        ("?desde=xx", 400),
+        ("?cursor=xx", 400),
+        ("?limite=cero", 400),
+        ("?limite=0", 400),
+    ],
+)
+def test_errores_en_json(app, api_key, consulta, codigo):
+    """Los parámetros inválidos entregan su código en JSON, no la página HTML"""
+    respuesta = app.test_client().get(URL + consulta, headers={"X-Api-Key": api_key})
+    assert respuesta.status_code == codigo
+    assert respuesta.mimetype == "application/json"
+    assert respuesta.json["error"] == codigo
+    assert respuesta.json["mensaje"] != ""
+
+
+@pytest.mark.parametrize("encabezados", [{}, {"X-Api-Key": "xx"}, {"X-Api-Key": "xx.yy.zz"}])
+def test_sin_api_key(app, encabezados):
+    """Sin una API key válida entrega 401 en JSON"""
+    respuesta = app.test_client().get(URL, headers=encabezados)
+    assert respuesta.status_code == 401
+    assert respuesta.json["error"] == 401
+
+
+def test_fuente_desconocida(app, api_key):
+    """Una fuente que no existe entrega 404 en JSON"""
+    respuesta = app.test_client().get("/api/v1/cambios/no_existe", headers={"X-Api-Key": api_key})
+    assert respuesta.status_code == 404
+    assert respuesta.json["error"] == 404
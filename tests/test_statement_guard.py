@@ -0,0 +1,54 @@
+"""
+Pruebas del límite de sentencias SQL por petición
+"""
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from lib.exceptions import MyTooManyStatementsError
+from lib.statement_guard import count_statement, init_statement_guard, is_list_endpoint, statement_limit
+from orion.blueprints.carreras.models import Carrera
+
+
+def test_es_listado():
+    """Los endpoints datatable_json y query_*_json son listados"""
+    assert is_list_endpoint("personas.datatable_json")
+    assert is_list_endpoint("personas.query_personas_json")
+    assert not is_list_endpoint("personas.detail")
+    assert not is_list_endpoint("personas.query_personas")
+
+
+@pytest.fixture(name="vigilada")
+def fixture_vigilada(app):
+    """App con SQL_STATEMENTS_LIMIT de 2 y vistas que consultan n veces"""
+    for numero in range(3):
+        Carrera(nombre=f"CARRERA {numero}").save()
+
+    def consultar(veces):
+        for _ in range(int(veces)):
+            Carrera.query.count()
+        return "OK"
+
+    app.add_url_rule("/pruebas/datatable_json/<veces>", "datatable_json", consultar)
+    app.add_url_rule("/pruebas/detalle/<veces>", "detalle", consultar)
+    app.add_url_rule("/pruebas/exportar_json/<veces>", "exportar_json", statement_limit(4)(consultar))
+    app.config["SQL_STATEMENTS_LIMIT"] = 2
+    init_statement_guard(app)
+    yield app.test_client()
+    event.remove(Engine, "before_cursor_execute", count_statement)
+
+
+def test_limite_en_listados(vigilada):
+    """Un listado que rebasa el límite provoca el error, las demás vistas no se vigilan"""
+    assert vigilada.get("/pruebas/datatable_json/2").status_code == 200
+    with pytest.raises(MyTooManyStatementsError):
+        vigilada.get("/pruebas/datatable_json/3")
+    assert vigilada.get("/pruebas/detalle/5").status_code == 200
+
+
+def test_limite_propio(vigilada):
+    """El decorador vigila la vista con su propio límite"""
+    assert vigilada.get("/pruebas/exportar_json/4").status_code == 200
+    with pytest.raises(MyTooManyStatementsError):
+        vigilada.get("/pruebas/exportar_json/5")
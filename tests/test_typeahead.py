@@ -0,0 +1,61 @@
+"""
+Pruebas del Typeahead
+"""
+
+from lib.typeahead import TypeaheadIndex
+from orion.blueprints.personas.models import Persona
+from orion.blueprints.personas.views import PERSONAS_TYPEAHEAD
+
+
+def crear_indice() -> TypeaheadIndex:
+    """Índice nuevo con la especificación de personas, sin lo cargado por otras pruebas"""
+    return TypeaheadIndex(
+        model=Persona,
+        columns=PERSONAS_TYPEAHEAD.columns,
+        text=PERSONAS_TYPEAHEAD.text,
+        search=PERSONAS_TYPEAHEAD.search_columns,
+        order=PERSONAS_TYPEAHEAD.order,
+    )
+
+
+def test_buscar_dentro_de_las_palabras(app, persona_datos):
+    """Como contains(), lo escrito puede estar en medio de una palabra"""
+    persona = Persona(**{**persona_datos, "apellido_segundo": "DEGARCIA"}).save()
+    indice = crear_indice()
+    assert indice.search("GARC") == ([(persona.id, "MARIA PEREZ DEGARCIA")], False)
+    assert indice.search("rez mar") == ([(persona.id, "MARIA PEREZ DEGARCIA")], False)
+    assert indice.search("LOPEZ") == ([], False)
+
+
+def test_texto_sin_apellido_segundo(app, persona_datos):
+    """Sin apellido segundo el texto no termina en None"""
+    persona = Persona(**persona_datos).save()
+    assert crear_indice().search("MARIA") == ([(persona.id, "MARIA PEREZ")], False)
+
+
+def test_query_personas_json(client, persona_datos):
+    """El Select2 de personas responde desde el índice"""
+    persona = Persona(**persona_datos).save()
+    respuesta = client.post("/personas/query_personas_json", data={"nombre_completo": "PER"})
+    assert respuesta.status_code == 200
+    assert respuesta.json == {"results": [{"id": persona.id, "text": "MARIA PEREZ"}], "pagination": {"more": False}}
+
+
+def test_pocas_letras(app, persona_datos, monkeypatch):
+    """Con una o dos letras se recorren las palabras si son pocas, si no sólo se buscan prefijos"""
+    persona = Persona(**{**persona_datos, "apellido_segundo": "DEGARCIA"}).save()
+    indice = crear_indice()
+    assert indice.search("RC") == ([(persona.id, "MARIA PEREZ DEGARCIA")], False)
+    monkeypatch.setattr("lib.typeahead.TYPEAHEAD_RECORRIDO", 0)
+    assert indice.search("RC") == ([], False)
+    assert indice.search("DE") == ([(persona.id, "MARIA PEREZ DEGARCIA")], False)
+
+
+def test_quitar_palabras(app, persona_datos):
+    """Al actualizar un registro sus palabras anteriores dejan de encontrarlo"""
+    persona = Persona(**{**persona_datos, "apellido_segundo": "DEGARCIA"}).save()
+    indice = crear_indice()
+    assert indice.search("GARC") == ([(persona.id, "MARIA PEREZ DEGARCIA")], False)
+    indice._quitar(persona.id)
+    assert indice.search("GARC") == ([], False)
+    assert indice._trigramas.get("GAR") is None
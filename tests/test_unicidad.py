@@ -0,0 +1,63 @@
+"""
+Pruebas de Unicidad
+"""
+
+from lib import unicidad
+from lib.unicidad import find_conflicts, save_unique
+from lib.unit_of_work import unit_of_work
+from orion.blueprints.carreras.models import Carrera
+from orion.blueprints.personas.models import Persona
+from orion.blueprints.personas.views import PERSONAS_UNICOS
+
+
+def otra_persona(persona_datos, **columnas) -> Persona:
+    """Persona nueva con otro RFC y otra CURP, salvo que se indiquen"""
+    return Persona(**{**persona_datos, "rfc": "LOJU900101AAA", "curp": "LOJU900101HCLRRR09", **columnas})
+
+
+def test_guardar_sin_conflictos(app, persona_datos):
+    """Sin conflictos guarda y entrega un diccionario vacío"""
+    persona = Persona(**persona_datos)
+    assert save_unique(persona, PERSONAS_UNICOS) == {}
+    assert persona.id is not None
+    persona.nombres = "MARTHA"
+    assert save_unique(persona, PERSONAS_UNICOS) == {}  # Su propia CURP no es un conflicto
+
+
+def test_conflictos_con_una_consulta(app, persona_datos):
+    """Entrega todos los campos en conflicto y no guarda"""
+    Persona(**persona_datos).save()
+    repetida = otra_persona(persona_datos, curp=persona_datos["curp"], rfc=persona_datos["rfc"])
+    assert save_unique(repetida, PERSONAS_UNICOS) == {
+        "curp": PERSONAS_UNICOS["curp"],
+        "rfc": PERSONAS_UNICOS["rfc"],
+    }
+    assert Persona.query.count() == 1
+
+
+def test_eliminados_no_chocan(app, persona_datos):
+    """Un registro eliminado no impide dar de alta el mismo valor"""
+    Persona(**persona_datos).save().delete()
+    assert find_conflicts(Persona, {"curp": persona_datos["curp"], "email": ""}) == []
+    assert save_unique(Persona(**persona_datos), PERSONAS_UNICOS) == {}
+
+
+def test_carrera_ganada_por_otra_peticion(app, persona_datos, monkeypatch):
+    """Si otra petición guarda primero, el índice rechaza el registro y el punto de guardado conserva lo demás"""
+    Persona(**persona_datos).save()
+    consultas = []
+
+    def find_conflicts_tarde(model, valores, excluir_id=None):
+        consultas.append(valores)
+        if len(consultas) == 1:
+            return []  # La consulta no vio el registro de la otra petición
+        return find_conflicts(model, valores, excluir_id)
+
+    monkeypatch.setattr(unicidad, "find_conflicts", find_conflicts_tarde)
+    with unit_of_work():
+        carrera = Carrera(nombre="DERECHO").save()
+        repetida = otra_persona(persona_datos, curp=persona_datos["curp"])
+        assert save_unique(repetida, PERSONAS_UNICOS) == {"curp": PERSONAS_UNICOS["curp"]}
+    assert len(consultas) == 2
+    assert Carrera.query.get(carrera.id).nombre == "DERECHO"
+    assert Persona.query.count() == 1
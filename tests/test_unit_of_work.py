@@ -0,0 +1,67 @@
+"""
+Pruebas de la unidad de trabajo
+"""
+
+import pytest
+from flask import abort
+
+from lib.unit_of_work import is_unit_of_work, on_commit, unit_of_work, unit_of_work_request
+from orion.blueprints.carreras.models import Carrera
+from orion.extensions import database
+
+
+def test_un_solo_commit(app):
+    """save() sólo hace flush, el commit y las funciones pendientes van al final"""
+    ejecutadas = []
+    with unit_of_work():
+        assert is_unit_of_work()
+        carrera = Carrera(nombre="DERECHO").save()
+        assert carrera.id is not None
+        on_commit(lambda: ejecutadas.append(Carrera.query.count()))
+        assert ejecutadas == []
+    assert not is_unit_of_work()
+    assert ejecutadas == [1]
+    on_commit(lambda: ejecutadas.append("inmediata"))
+    assert ejecutadas == [1, "inmediata"]
+
+
+def test_rollback(app):
+    """Con un error se descartan los cambios y las funciones pendientes"""
+    ejecutadas = []
+    with pytest.raises(ValueError):
+        with unit_of_work():
+            Carrera(nombre="DERECHO").save()
+            on_commit(lambda: ejecutadas.append(1))
+            raise ValueError("Falla")
+    assert not is_unit_of_work()
+    assert ejecutadas == []
+    assert Carrera.query.count() == 0
+
+
+def test_anidada(app):
+    """La unidad de trabajo interna se integra a la externa, no hace commit"""
+    with pytest.raises(ValueError):
+        with unit_of_work():
+            with unit_of_work():
+                Carrera(nombre="DERECHO").save()
+            assert is_unit_of_work()
+            raise ValueError("Falla")
+    assert Carrera.query.count() == 0
+
+
+def test_peticion(app):
+    """En una vista el commit se hace al terminar la petición, con un error se hace rollback"""
+
+    @app.route("/pruebas/<nombre>")
+    @unit_of_work_request
+    def crear(nombre):
+        Carrera(nombre=nombre).save()
+        if nombre == "FALLA":
+            abort(400)
+        return "OK"
+
+    client = app.test_client()
+    assert client.get("/pruebas/DERECHO").status_code == 200
+    assert client.get("/pruebas/FALLA").status_code >= 400  # La app muestra su página de error
+    database.session.remove()
+    assert [carrera.nombre for carrera in Carrera.query.all()] == ["DERECHO"]